@@ -1,5 +1,6 @@
 import asyncio
-from unittest.mock import MagicMock
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock
 
 import httpx
 import openai
@@ -26,10 +27,29 @@ def create_async_openai_client_mock(content: str | None) -> openai.AsyncOpenAI:
     return openai_mock
 
 
+def structured_completion(content: BaseModel | None) -> MagicMock:
+    """A structured-output completion whose message content is `content` as JSON (None
+    for a refusal or an empty completion)."""
+    message = MagicMock(content=None if content is None else content.model_dump_json())
+    return MagicMock(choices=[MagicMock(message=message, finish_reason="stop")])
+
+
+def response_format_fields(response_format: dict[str, Any]) -> list[str]:
+    """The field names of the schema a structured-output request asks for."""
+    return list(response_format["json_schema"]["schema"]["properties"])
+
+
 def create_openai_client_mock(content: BaseModel | None) -> openai.OpenAI:
     openai_mock = MagicMock()
-    mock_response = MagicMock(choices=[MagicMock(message=MagicMock(parsed=content))])
-    openai_mock.beta.chat.completions.parse.return_value = mock_response
+    openai_mock.chat.completions.create.return_value = structured_completion(content)
+    return openai_mock
+
+
+def create_async_openai_structured_mock(content: BaseModel | None) -> openai.AsyncOpenAI:
+    """Like `create_openai_client_mock`, for code that extracts through
+    `openai.AsyncOpenAI` (the LLM engine)."""
+    openai_mock = MagicMock()
+    openai_mock.chat.completions.create = AsyncMock(return_value=structured_completion(content))
     return openai_mock
 
 
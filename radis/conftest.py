@@ -1,5 +1,6 @@
 import pytest
 
+from radis.core.utils.llm_engine import shutdown_llm_engine
 from radis.pgsearch.utils.language_utils import clear_search_config_cache
 
 pytest_plugins = ["adit_radis_shared.pytest_fixtures"]
@@ -20,3 +21,15 @@ def _clear_language_config_cache():
     clear_search_config_cache()
     yield
     clear_search_config_cache()
+
+
+@pytest.fixture(autouse=True)
+def _fresh_llm_engine():
+    """Give every test its own LLM engine.
+
+    The engine is process-global and builds its ``openai.AsyncOpenAI`` client when
+    it starts, so without this the first test to start it would pin its mock (or
+    the real client) for every later test that patches ``openai.AsyncOpenAI``.
+    """
+    yield
+    shutdown_llm_engine()
@@ -1,3 +1,113 @@
+from django.conf import settings
 from django.contrib import admin
+from django.db.models import Count, IntegerField, OuterRef, Q, QuerySet, Subquery
+from django.db.models.functions import Coalesce, Now
+from django.http import HttpRequest
+from django.utils import timezone
+
+from .models import LLMQuota, LLMResponse, LLMResponseCacheStats
 
 admin.site.site_header = "RADIS administration"
+
+
+@admin.register(LLMQuota)
+class LLMQuotaAdmin(admin.ModelAdmin):
+    """State of the shared LLM budgets (LLM_SHARED_LIMIT_ENABLED). Rows are created
+    and updated by the LLM clients; deleting one resets that budget to a full bucket."""
+
+    list_display = (
+        "key",
+        "available_tokens",
+        "in_flight",
+        "blocked_until",
+        "last_rate_limited_at",
+        "limits",
+    )
+    readonly_fields = ("key", "tokens", "refilled_at", "blocked_until", "last_rate_limited_at")
+
+    def get_queryset(self, request: HttpRequest) -> QuerySet[LLMQuota]:
+        return (
+            super()
+            .get_queryset(request)
+            .annotate(in_flight=Count("leases", filter=Q(leases__expires_at__gt=Now())))
+        )
+
+    def has_add_permission(self, request: HttpRequest) -> bool:
+        return False
+
+    def has_change_permission(self, request: HttpRequest, obj: object = None) -> bool:
+        return False
+
+    @admin.display(description="Available tokens")
+    def available_tokens(self, obj: LLMQuota) -> str:
+        # The stored level is as of the last request; refill it to now for display.
+        elapsed = max(0.0, (timezone.now() - obj.refilled_at).total_seconds())
+        rate = settings.LLM_SHARED_REQUESTS_PER_MINUTE / 60.0
+        return f"{min(float(settings.LLM_SHARED_BURST), obj.tokens + elapsed * rate):.1f}"
+
+    @admin.display(description="In flight")
+    def in_flight(self, obj: LLMQuota) -> int:
+        return obj.in_flight  # type: ignore
+
+    @admin.display(description="Limits")
+    def limits(self, obj: LLMQuota) -> str:
+        return (
+            f"{settings.LLM_SHARED_REQUESTS_PER_MINUTE:g}/min, burst {settings.LLM_SHARED_BURST}, "
+            f"{settings.LLM_SHARED_MAX_CONCURRENT} concurrent"
+        )
+
+
+@admin.register(LLMResponseCacheStats)
+class LLMResponseCacheStatsAdmin(admin.ModelAdmin):
+    """Hit and miss counts of the LLM response cache (LLM_RESPONSE_CACHE_ENABLED) per
+    feature. Processes add their counts every LLM_RESPONSE_CACHE_STATS_FLUSH_SECONDS, so
+    the latest lookups may not show yet. Deleting a row resets its counters; the cached
+    entries stay."""
+
+    list_display = ("feature", "hits", "misses", "hit_rate", "entries", "updated_at")
+    readonly_fields = ("feature", "hits", "misses", "updated_at")
+
+    def get_queryset(self, request: HttpRequest) -> QuerySet[LLMResponseCacheStats]:
+        entries = (
+            LLMResponse.objects.filter(feature=OuterRef("feature"))
+            .order_by()
+            .values("feature")
+            .annotate(count=Count("pk"))
+            .values("count")
+        )
+        return (
+            super()
+            .get_queryset(request)
+            .annotate(entries=Coalesce(Subquery(entries, output_field=IntegerField()), 0))
+        )
+
+    def has_add_permission(self, request: HttpRequest) -> bool:
+        return False
+
+    def has_change_permission(self, request: HttpRequest, obj: object = None) -> bool:
+        return False
+
+    @admin.display(description="Hit rate")
+    def hit_rate(self, obj: LLMResponseCacheStats) -> str:
+        total = obj.hits + obj.misses
+        return f"{obj.hits / total:.1%}" if total else "-"
+
+    @admin.display(description="Entries")
+    def entries(self, obj: LLMResponseCacheStats) -> int:
+        return obj.entries  # type: ignore
+
+
+@admin.register(LLMResponse)
+class LLMResponseAdmin(admin.ModelAdmin):
+    """Cached LLM answers. Deleting entries forces fresh answers for those prompts."""
+
+    list_display = ("key", "feature", "created_at")
+    list_filter = ("feature",)
+    search_fields = ("key",)
+    readonly_fields = ("key", "feature", "response", "created_at")
+
+    def has_add_permission(self, request: HttpRequest) -> bool:
+        return False
+
+    def has_change_permission(self, request: HttpRequest, obj: object = None) -> bool:
+        return False
@@ -0,0 +1,407 @@
+"""Measure LLM engine throughput against a local stub LLM with injected latency.
+
+Runs `--tasks` simulated analysis tasks side by side, the way an llm worker with
+`--concurrency` > 1 does, each submitting `--calls` prompts to one `LLMEngine` and
+collecting the results as they complete. The stub answers every call after
+`--latency` seconds plus up to `--jitter` seconds of random extra delay, so the
+numbers show what the engine's concurrency limit does to throughput without
+spending tokens:
+
+    ./manage.py llm_benchmark --tasks 4 --calls 100 --latency 0.5 --jitter 1.5
+
+With `--job N` it instead compares the two ways an extraction job of N instances can be
+scheduled over `--tasks` worker slots: fixed batches of EXTRACTION_TASK_BATCH_SIZE
+instances per task, and work stealing (EXTRACTION_WORK_STEALING), where each slot keeps
+EXTRACTION_CLAIM_SIZE instances in flight. `--slow-fraction` of the calls take
+`--slow-latency` seconds instead, like calls that hit a retry:
+
+    ./manage.py llm_benchmark --job 25000 --latency 0.01 --jitter 0.02 \
+        --slow-fraction 0.005 --slow-latency 2
+
+With `--gate-reports N` it compares the labeling gate phase for N reports against
+`--groups` label groups: one gate call per report (and LABELING_GATE_BATCH_SIZE groups)
+against the multi-report calls of LABELING_MULTI_REPORT_GATE. Reports are about
+`--report-chars` long, and `--char-latency` adds that many seconds per 1000 prompt
+characters, so the shared instructions show up in the numbers:
+
+    ./manage.py llm_benchmark --gate-reports 2000 --groups 8 --report-chars 600 \
+        --latency 0.2 --jitter 0.1 --char-latency 0.05
+"""
+
+import asyncio
+import json
+import random
+import statistics
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait
+from itertools import batched
+from types import SimpleNamespace
+from typing import Any
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandParser
+from pydantic import BaseModel
+
+from radis.core.utils.llm_engine import LLMEngine
+
+
+class _Answer(BaseModel):
+    value: str = "stub"
+
+
+_STUB_VALUES: dict[str, Any] = {
+    "string": "stub",
+    "number": 0,
+    "integer": 0,
+    "boolean": False,
+    "array": [],
+    "null": None,
+}
+
+
+def _stub_data(schema: dict[str, Any], defs: dict[str, Any] | None = None) -> Any:
+    """A valid value for a JSON schema as sent in `response_format`: objects are filled
+    in, enums get their first member and other values their default (or a stub)."""
+    if defs is None:
+        defs = schema.get("$defs", {})
+    if "$ref" in schema:
+        schema = defs[schema["$ref"].rsplit("/", 1)[-1]]
+    if "default" in schema:
+        return schema["default"]
+    if "enum" in schema:
+        return schema["enum"][0]
+    if "anyOf" in schema:
+        return _stub_data(schema["anyOf"][0], defs)
+    if schema.get("type") == "object" or "properties" in schema:
+        return {
+            name: _stub_data(property_schema, defs)
+            for name, property_schema in schema.get("properties", {}).items()
+        }
+    return _STUB_VALUES.get(schema.get("type", "string"), "stub")
+
+
+class _StubLLM:
+    """Stands in for `openai.AsyncOpenAI`: `chat.completions.create` sleeps, then
+    returns a valid answer to the requested schema. Tracks the peak number of calls in flight."""
+
+    def __init__(
+        self,
+        latency: float,
+        jitter: float,
+        slow_fraction: float = 0.0,
+        slow_latency: float = 0.0,
+        char_latency: float = 0.0,
+    ) -> None:
+        self._latency = latency
+        self._jitter = jitter
+        self._slow_fraction = slow_fraction
+        self._slow_latency = slow_latency
+        self._char_latency = char_latency
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.chat = SimpleNamespace(completions=self)
+
+    async def create(self, *, response_format: dict[str, Any], **kwargs: Any) -> Any:
+        # Runs on the engine's loop thread only, so the counters need no lock.
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        prompt_chars = sum(len(message["content"]) for message in kwargs.get("messages", []))
+        try:
+            if random.random() < self._slow_fraction:
+                await asyncio.sleep(self._slow_latency)
+            else:
+                await asyncio.sleep(
+                    self._latency
+                    + random.uniform(0, self._jitter)
+                    + self._char_latency * prompt_chars / 1000
+                )
+        finally:
+            self.in_flight -= 1
+        content = json.dumps(_stub_data(response_format["json_schema"]["schema"]))
+        message = SimpleNamespace(content=content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message, finish_reason="stop")])
+
+
+class Command(BaseCommand):
+    help = "Measure LLM engine throughput against a local stub LLM with injected latency."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--tasks", type=int, default=4, help="Tasks running side by side.")
+        parser.add_argument("--calls", type=int, default=100, help="LLM calls per task.")
+        parser.add_argument(
+            "--latency", type=float, default=0.5, help="Base stub latency per call (seconds)."
+        )
+        parser.add_argument(
+            "--jitter",
+            type=float,
+            default=1.0,
+            help="Random extra stub latency per call, up to this many seconds.",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=None,
+            help="Engine concurrency. Defaults to LLM_ENGINE_CONCURRENCY.",
+        )
+        parser.add_argument(
+            "--job",
+            type=int,
+            default=None,
+            metavar="INSTANCES",
+            help="Compare batch and work-stealing scheduling of a job with this many instances.",
+        )
+        parser.add_argument(
+            "--slow-fraction", type=float, default=0.0, help="Share of calls that are slow."
+        )
+        parser.add_argument(
+            "--slow-latency", type=float, default=5.0, help="Latency of a slow call (seconds)."
+        )
+        parser.add_argument(
+            "--char-latency",
+            type=float,
+            default=0.0,
+            help="Extra stub latency per 1000 prompt characters (seconds).",
+        )
+        parser.add_argument(
+            "--gate-reports",
+            type=int,
+            default=None,
+            metavar="REPORTS",
+            help="Compare per-report and multi-report labeling gate calls for this many reports.",
+        )
+        parser.add_argument(
+            "--groups", type=int, default=8, help="Label groups to gate (with --gate-reports)."
+        )
+        parser.add_argument(
+            "--report-chars",
+            type=int,
+            default=600,
+            help="Mean report length in characters (with --gate-reports).",
+        )
+
+    def handle(self, *args, **options) -> None:
+        concurrency: int = options["concurrency"] or settings.LLM_ENGINE_CONCURRENCY
+        num_tasks: int = options["tasks"]
+        num_calls: int = options["calls"]
+        if options["job"] is not None:
+            self._compare_job_schedules(options["job"], num_tasks, concurrency, options)
+            return
+        if options["gate_reports"] is not None:
+            self._compare_gate_modes(options["gate_reports"], concurrency, options)
+            return
+
+        stub = _StubLLM(options["latency"], options["jitter"])
+        engine = LLMEngine(concurrency, client=stub)  # type: ignore
+
+        def run_task() -> list[float]:
+            started = time.monotonic()
+            futures = [
+                engine.submit("extractions", "benchmark prompt", _Answer) for _ in range(num_calls)
+            ]
+            # The time at which each result would be written, relative to the task start.
+            return [time.monotonic() - started for _ in as_completed(futures)]
+
+        self.stdout.write(
+            f"{num_tasks} task(s) x {num_calls} call(s), engine concurrency {concurrency}, "
+            f"stub latency {options['latency']}s + up to {options['jitter']}s"
+        )
+        started = time.monotonic()
+        try:
+            with ThreadPoolExecutor(max_workers=num_tasks) as executor:
+                results = [
+                    f.result() for f in [executor.submit(run_task) for _ in range(num_tasks)]
+                ]
+        finally:
+            engine.close()
+        elapsed = time.monotonic() - started
+
+        total = num_tasks * num_calls
+        write_times = [t for task_times in results for t in task_times]
+        task_durations = [max(task_times) for task_times in results if task_times]
+        self.stdout.write(f"Elapsed:           {elapsed:.2f}s")
+        self.stdout.write(f"Throughput:        {total / elapsed:.1f} calls/s")
+        self.stdout.write(f"Peak in flight:    {stub.peak_in_flight}")
+        if write_times:
+            self.stdout.write(f"Median write time: {statistics.median(write_times):.2f}s")
+        if task_durations:
+            self.stdout.write(f"Slowest task:      {max(task_durations):.2f}s")
+
+    def _compare_job_schedules(
+        self, num_instances: int, num_slots: int, concurrency: int, options: dict
+    ) -> None:
+        batch_size = settings.EXTRACTION_TASK_BATCH_SIZE
+        claim_size = settings.EXTRACTION_CLAIM_SIZE
+        self.stdout.write(
+            f"Job of {num_instances} instance(s) on {num_slots} worker slot(s), "
+            f"engine concurrency {concurrency}, stub latency {options['latency']}s + up to "
+            f"{options['jitter']}s, {options['slow_fraction']:.1%} slow calls of "
+            f"{options['slow_latency']}s"
+        )
+
+        def batches(submit: Callable[[], Future], done: Callable[[], None]) -> Callable[[], None]:
+            pending = deque(
+                min(batch_size, num_instances - start)
+                for start in range(0, num_instances, batch_size)
+            )
+            lock = threading.Lock()
+
+            def run_slot() -> None:
+                while True:
+                    with lock:
+                        if not pending:
+                            return
+                        size = pending.popleft()
+                    for _ in as_completed([submit() for _ in range(size)]):
+                        done()
+
+            return run_slot
+
+        def claims(submit: Callable[[], Future], done: Callable[[], None]) -> Callable[[], None]:
+            remaining = [num_instances]
+            lock = threading.Lock()
+
+            def claim(limit: int) -> int:
+                with lock:
+                    taken = min(limit, remaining[0])
+                    remaining[0] -= taken
+                    return taken
+
+            def run_slot() -> None:
+                in_flight: set[Future] = set()
+                while True:
+                    in_flight.update(submit() for _ in range(claim(claim_size - len(in_flight))))
+                    if not in_flight:
+                        return
+                    finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for _ in finished:
+                        done()
+
+            return run_slot
+
+        for name, schedule in (
+            (f"Batches of {batch_size}", batches),
+            (f"Work stealing, claims of {claim_size}", claims),
+        ):
+            stub = _StubLLM(
+                options["latency"],
+                options["jitter"],
+                options["slow_fraction"],
+                options["slow_latency"],
+            )
+            engine = LLMEngine(concurrency, client=stub)  # type: ignore
+            finish_times: list[float] = []
+            lock = threading.Lock()
+            started = time.monotonic()
+
+            def submit() -> Future:
+                return engine.submit("extractions", "benchmark prompt", _Answer)
+
+            def done() -> None:
+                with lock:
+                    finish_times.append(time.monotonic() - started)
+
+            run_slot = schedule(submit, done)
+            try:
+                with ThreadPoolExecutor(max_workers=num_slots) as executor:
+                    for future in [executor.submit(run_slot) for _ in range(num_slots)]:
+                        future.result()
+            finally:
+                engine.close()
+            elapsed = time.monotonic() - started
+
+            finish_times.sort()
+            p95 = finish_times[int(0.95 * (len(finish_times) - 1))]
+            self.stdout.write(f"\n{name}:")
+            self.stdout.write(f"  Elapsed:              {elapsed:.2f}s")
+            self.stdout.write(f"  Throughput:           {num_instances / elapsed:.1f} calls/s")
+            self.stdout.write(f"  Median write time:    {statistics.median(finish_times):.2f}s")
+            self.stdout.write(f"  Last 5% took:         {elapsed - p95:.2f}s")
+            self.stdout.write(f"  Peak in flight:       {stub.peak_in_flight}")
+
+    def _compare_gate_modes(self, num_reports: int, concurrency: int, options: dict) -> None:
+        from radis.labels.labeling import pack_gate_reports
+        from radis.labels.utils.prompts import (
+            render_gate_prompt,
+            render_multi_report_gate_prompt,
+        )
+        from radis.labels.utils.schemas import build_gate_schema, build_multi_report_gate_schema
+
+        groups = [
+            SimpleNamespace(id=i, name=f"group_{i}", gate_question=f"Is this about topic {i}?")
+            for i in range(options["groups"])
+        ]
+        mean_chars = options["report_chars"]
+        bodies = {
+            i: "x" * random.randint(mean_chars // 2, mean_chars * 3 // 2)
+            for i in range(num_reports)
+        }
+        gate_batches = [list(b) for b in batched(groups, settings.LABELING_GATE_BATCH_SIZE)]
+        self.stdout.write(
+            f"Gate phase for {num_reports} report(s) of ~{mean_chars} characters and "
+            f"{len(groups)} group(s), engine concurrency {concurrency}, stub latency "
+            f"{options['latency']}s + up to {options['jitter']}s + "
+            f"{options['char_latency']}s per 1000 prompt characters"
+        )
+
+        # Each call is (prompt, schema, number of gate answers it returns).
+        def per_report_calls() -> list[tuple[str, type[BaseModel], int]]:
+            return [
+                (render_gate_prompt(body), build_gate_schema(gate_batch), len(gate_batch))
+                for body in bodies.values()
+                for gate_batch in gate_batches
+            ]
+
+        def multi_report_calls() -> list[tuple[str, type[BaseModel], int]]:
+            packs = pack_gate_reports(
+                bodies,
+                settings.LABELING_MULTI_REPORT_GATE_TOKEN_BUDGET,
+                settings.LABELING_MULTI_REPORT_GATE_MAX_REPORTS,
+            )
+            packed = {report_id for pack in packs for report_id in pack}
+            calls = [
+                (
+                    render_multi_report_gate_prompt([bodies[pk] for pk in pack]),
+                    build_multi_report_gate_schema(gate_batch, len(pack)),
+                    len(pack) * len(gate_batch),
+                )
+                for pack in packs
+                for gate_batch in gate_batches
+            ]
+            # Reports that didn't fit any pack are gated one by one.
+            calls += [
+                (render_gate_prompt(body), build_gate_schema(gate_batch), len(gate_batch))
+                for report_id, body in bodies.items()
+                if report_id not in packed
+                for gate_batch in gate_batches
+            ]
+            return calls
+
+        for name, build_calls in (
+            ("One report per call", per_report_calls),
+            ("Several reports per call", multi_report_calls),
+        ):
+            calls = build_calls()
+            stub = _StubLLM(
+                options["latency"], options["jitter"], char_latency=options["char_latency"]
+            )
+            engine = LLMEngine(concurrency, client=stub)  # type: ignore
+            started = time.monotonic()
+            try:
+                futures = [engine.submit("labeling", prompt, schema) for prompt, schema, _ in calls]
+                for future in as_completed(futures):
+                    future.result()
+            finally:
+                engine.close()
+            elapsed = time.monotonic() - started
+
+            answers = sum(answer_count for _, _, answer_count in calls)
+            prompt_chars = sum(len(prompt) for prompt, _, _ in calls)
+            self.stdout.write(f"\n{name}:")
+            self.stdout.write(f"  Calls:                {len(calls)}")
+            self.stdout.write(f"  Calls per report:     {len(calls) / num_reports:.2f}")
+            self.stdout.write(f"  Prompt characters:    {prompt_chars}")
+            self.stdout.write(f"  Elapsed:              {elapsed:.2f}s")
+            self.stdout.write(f"  Gate answers per min: {answers / elapsed * 60:.0f}")
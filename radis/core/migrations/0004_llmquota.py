@@ -0,0 +1,65 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0003_delete_coresettings"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LLMQuota",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("key", models.CharField(max_length=500, unique=True)),
+                ("tokens", models.FloatField()),
+                ("refilled_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("blocked_until", models.DateTimeField(blank=True, null=True)),
+                ("last_rate_limited_at", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "verbose_name": "LLM quota",
+            },
+        ),
+        migrations.CreateModel(
+            name="LLMQuotaLease",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("acquired_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("expires_at", models.DateTimeField()),
+                (
+                    "quota",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="leases",
+                        to="core.llmquota",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["quota", "expires_at"], name="core_llmquotalease_expiry_idx"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,57 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0004_llmquota"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LLMResponse",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("key", models.CharField(max_length=64, unique=True)),
+                ("feature", models.CharField(max_length=50)),
+                ("response", models.JSONField()),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                "verbose_name": "LLM response",
+                "indexes": [
+                    models.Index(fields=["created_at"], name="core_llmresponse_created_idx")
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="LLMResponseCacheStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("feature", models.CharField(max_length=50, unique=True)),
+                ("hits", models.BigIntegerField(default=0)),
+                ("misses", models.BigIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                "verbose_name": "LLM response cache stats",
+                "verbose_name_plural": "LLM response cache stats",
+            },
+        ),
+    ]
@@ -39,6 +39,8 @@ class AnalysisJob(models.Model):
     )
     urgent = models.BooleanField(default=False)
     send_finished_mail = models.BooleanField(default=False)
+    # Ask the LLM afresh instead of reusing cached answers (see LLM_RESPONSE_CACHE_ENABLED).
+    bypass_llm_cache = models.BooleanField(default=False)
     finished_mail_template: str | None
     message = models.TextField(blank=True, default="")
     created_at = models.DateTimeField(auto_now_add=True)
@@ -301,3 +303,77 @@ class AnalysisTask(models.Model):
             self.Status.WARNING,
             self.Status.FAILURE,
         ]
+
+
+class LLMQuota(models.Model):
+    """Shared LLM budget for one provider and feature (see `utils.llm_quota`).
+
+    Only used with LLM_SHARED_LIMIT_ENABLED. `tokens` is the token-bucket level as of
+    `refilled_at`; the bucket refills lazily whenever a process takes a token. Requests in
+    flight are the unexpired `leases`. `blocked_until` pauses every process after a 429.
+    """
+
+    key = models.CharField(max_length=500, unique=True)
+    tokens = models.FloatField()
+    refilled_at = models.DateTimeField(default=timezone.now)
+    blocked_until = models.DateTimeField(null=True, blank=True)
+    last_rate_limited_at = models.DateTimeField(null=True, blank=True)
+
+    leases: models.QuerySet["LLMQuotaLease"]
+
+    class Meta:
+        verbose_name = "LLM quota"
+
+    def __str__(self) -> str:
+        return self.key
+
+
+class LLMQuotaLease(models.Model):
+    """One request in flight against an `LLMQuota`. A process that dies mid-request
+    leaves its lease behind; it stops counting once `expires_at` passes."""
+
+    quota_id: int
+    quota = models.ForeignKey(LLMQuota, on_delete=models.CASCADE, related_name="leases")
+    acquired_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["quota", "expires_at"], name="core_llmquotalease_expiry_idx")
+        ]
+
+    def __str__(self) -> str:
+        return f"Lease [{self.pk}] on {self.quota_id}"
+
+
+class LLMResponse(models.Model):
+    """A cached structured-output answer (see `utils.llm_cache`), keyed by a hash of the
+    model, its request parameters, the rendered prompt and the response schema."""
+
+    key = models.CharField(max_length=64, unique=True)
+    feature = models.CharField(max_length=50)
+    response = models.JSONField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "LLM response"
+        indexes = [models.Index(fields=["created_at"], name="core_llmresponse_created_idx")]
+
+    def __str__(self) -> str:
+        return f"{self.feature} [{self.key[:12]}]"
+
+
+class LLMResponseCacheStats(models.Model):
+    """Hit and miss counters of the LLM response cache, one row per feature."""
+
+    feature = models.CharField(max_length=50, unique=True)
+    hits = models.BigIntegerField(default=0)
+    misses = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "LLM response cache stats"
+        verbose_name_plural = "LLM response cache stats"
+
+    def __str__(self) -> str:
+        return self.feature
@@ -0,0 +1,16 @@
+import logging
+
+from django.conf import settings
+from procrastinate.contrib.django import app
+
+from .utils.llm_cache import evict_responses
+
+logger = logging.getLogger(__name__)
+
+
+@app.periodic(cron=settings.LLM_RESPONSE_CACHE_EVICTION_CRON)
+@app.task()
+def evict_llm_response_cache(timestamp: int) -> None:
+    deleted = evict_responses()
+    if deleted:
+        logger.info("Evicted %d LLM response cache entries", deleted)
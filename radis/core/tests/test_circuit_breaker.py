@@ -0,0 +1,83 @@
+from radis.core.utils.circuit_breaker import CircuitBreaker
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.t = 1000.0
+
+    def now(self) -> float:
+        return self.t
+
+
+def make_breaker(clock: FakeClock) -> CircuitBreaker:
+    return CircuitBreaker(
+        "Test",
+        window_seconds=60.0,
+        min_calls=4,
+        error_rate=0.5,
+        slow_seconds=2.0,
+        open_seconds=30.0,
+        now=clock.now,
+    )
+
+
+def test_stays_closed_below_min_calls():
+    breaker = make_breaker(FakeClock())
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record(ok=False, latency=0.1)
+    assert breaker.state == "closed"
+
+
+def test_opens_on_error_rate_and_refuses_calls():
+    breaker = make_breaker(FakeClock())
+    for ok in (True, False, True, False):
+        breaker.allow()
+        breaker.record(ok=ok, latency=0.1)
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_opens_on_slow_p95():
+    breaker = make_breaker(FakeClock())
+    for _ in range(4):
+        breaker.allow()
+        breaker.record(ok=True, latency=2.5)
+    assert breaker.state == "open"
+
+
+def test_old_outcomes_leave_the_window():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    for _ in range(3):
+        breaker.record(ok=False, latency=0.1)
+    clock.t += 61
+    breaker.record(ok=False, latency=0.1)
+    assert breaker.state == "closed"
+
+
+def test_half_open_allows_a_single_probe_that_closes_on_success():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    for _ in range(4):
+        breaker.record(ok=False, latency=0.1)
+    clock.t += 30
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()  # probe already in flight
+    breaker.record(ok=True, latency=0.1)
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    for _ in range(4):
+        breaker.record(ok=False, latency=0.1)
+    clock.t += 30
+    assert breaker.allow()
+    breaker.record(ok=True, latency=5.0)  # too slow counts as a failed probe
+    assert breaker.state == "open"
+    clock.t += 29
+    assert not breaker.allow()
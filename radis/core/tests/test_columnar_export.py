@@ -0,0 +1,79 @@
+"""Unit tests for the shared Parquet/Arrow export helpers."""
+
+import io
+from datetime import UTC, datetime
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from radis.core.utils.columnar_export import Column, stream_columnar_response
+
+_COLUMNS = [
+    Column("id", "int"),
+    Column("size", "float"),
+    Column("present", "bool"),
+    Column("grade", "category", categories=("low", "high")),
+    Column("sites", "string", is_list=True),
+    Column("study_datetime", "timestamp"),
+]
+
+
+def _rows(count: int):
+    for i in range(count):
+        yield [
+            i,
+            i + 0.5 if i % 2 else "not a number",
+            bool(i % 2),
+            ("low", "high", "unknown")[i % 3],
+            [f"site {i}"] if i % 2 else None,
+            datetime(2024, 1, 1, tzinfo=UTC),
+        ]
+
+
+def _content(response) -> bytes:
+    return b"".join(response.streaming_content)
+
+
+@pytest.mark.parametrize("export_format", ["parquet", "arrow"])
+def test_columns_keep_their_types(settings, export_format):
+    settings.COLUMNAR_EXPORT_ROW_GROUP_SIZE = 2
+    response = stream_columnar_response(_COLUMNS, _rows(5), export_format, "export", "test")
+    assert response["Content-Disposition"] == f'attachment; filename="export.{export_format}"'
+
+    source = io.BytesIO(_content(response))
+    if export_format == "parquet":
+        table = pq.read_table(source)
+    else:
+        table = pa.ipc.open_file(source).read_all()
+
+    assert table.num_rows == 5
+    assert table.schema.field("size").type == pa.float64()
+    assert table.schema.field("sites").type.value_type == pa.string()
+    rows = table.to_pylist()
+    assert rows[1] == {
+        "id": 1,
+        "size": 1.5,
+        "present": True,
+        "grade": "high",
+        "sites": ["site 1"],
+        "study_datetime": datetime(2024, 1, 1, tzinfo=UTC),
+    }
+    # Values that don't fit the column's type (or categories) become nulls.
+    assert (rows[0]["size"], rows[2]["grade"], rows[0]["sites"]) == (None, None, None)
+
+
+def test_parquet_is_written_in_row_groups(settings):
+    settings.COLUMNAR_EXPORT_ROW_GROUP_SIZE = 2
+    content = _content(stream_columnar_response(_COLUMNS, _rows(5), "parquet", "export", "t"))
+    assert pq.ParquetFile(io.BytesIO(content)).num_row_groups == 3
+
+
+def test_aborted_stream_yields_an_unreadable_file():
+    def failing_rows():
+        yield from _rows(1)
+        raise RuntimeError("database went away")
+
+    content = _content(stream_columnar_response(_COLUMNS, failing_rows(), "parquet", "x", "t"))
+    with pytest.raises(pa.ArrowInvalid):
+        pq.read_table(io.BytesIO(content))
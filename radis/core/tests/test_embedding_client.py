@@ -379,3 +379,107 @@ def test_model_spec_parameters_reach_the_request_body(monkeypatch):
     # `dimensions` is a real OpenAI request field: asking the provider for the width we
     # store beats truncating a larger vector client-side.
     assert seen["body"]["dimensions"] == 2
+
+
+class _FakeEncoding:
+    def __init__(self, ids: list[int], attention_mask: list[int]) -> None:
+        self.ids = ids
+        self.attention_mask = attention_mask
+
+
+class _FakeTokenizer:
+    """Right-pads every text to three tokens; one real token per word."""
+
+    def encode_batch(self, texts: list[str]) -> list[_FakeEncoding]:
+        encodings = []
+        for text in texts:
+            words = len(text.split())
+            encodings.append(
+                _FakeEncoding([1] * words + [0] * (3 - words), [1] * words + [0] * (3 - words))
+            )
+        return encodings
+
+
+class _FakeInput:
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+
+class _FakeSession:
+    """Token i of every sequence gets the hidden state [i + 1, 0]."""
+
+    def __init__(self) -> None:
+        self.feeds: list[dict] = []
+
+    def get_inputs(self) -> list[_FakeInput]:
+        return [_FakeInput("input_ids"), _FakeInput("attention_mask"), _FakeInput("token_type_ids")]
+
+    def run(self, output_names, feeds):
+        import numpy as np
+
+        self.feeds.append(feeds)
+        batch, tokens = feeds["input_ids"].shape
+        hidden = np.zeros((batch, tokens, 2), dtype=np.float32)
+        hidden[:, :, 0] = np.arange(1, tokens + 1)
+        return [hidden]
+
+
+@pytest.mark.parametrize(
+    "pooling, expected",
+    [("cls", [1.0, 0.0]), ("last", [2.0, 0.0]), ("mean", [1.5, 0.0])],
+)
+def test_local_model_pools_token_states(pooling: str, expected: list[float]):
+    from radis.core.utils import embedding_client as ec
+
+    model = ec.LocalEmbeddingModel(_FakeSession(), _FakeTokenizer(), pooling, batch_size=8)
+
+    # Two real tokens, one padding token that must not leak into mean/last pooling.
+    assert model.embed(["two words"]) == [pytest.approx(expected)]
+
+
+def test_local_model_runs_in_micro_batches_and_feeds_token_type_ids():
+    from radis.core.utils import embedding_client as ec
+
+    session = _FakeSession()
+    model = ec.LocalEmbeddingModel(session, _FakeTokenizer(), "mean", batch_size=2)
+
+    vectors = model.embed(["a", "b", "c"])
+
+    assert len(vectors) == 3
+    assert [feeds["input_ids"].shape[0] for feeds in session.feeds] == [2, 1]
+    assert all("token_type_ids" in feeds for feeds in session.feeds)
+
+
+def test_local_model_rejects_unknown_pooling():
+    from radis.core.utils import embedding_client as ec
+
+    with pytest.raises(ec.EmbeddingClientError, match="pooling"):
+        ec.LocalEmbeddingModel(_FakeSession(), _FakeTokenizer(), "max", batch_size=8)
+
+
+@override_settings(
+    EMBEDDINGS_MODEL=parse_model_spec("local:/models/test?pooling=cls"),
+    EMBEDDINGS_DIM=2,
+    EMBEDDINGS_QUERY_INSTRUCTION="INST: ",
+)
+def test_local_model_spec_selects_the_in_process_backend(monkeypatch):
+    from radis.core.utils import embedding_client as ec
+
+    loaded = {}
+    tokenizer = _FakeTokenizer()
+
+    def fake_load(path: str, params: dict) -> ec.LocalEmbeddingModel:
+        loaded["path"] = path
+        loaded["params"] = params
+        return ec.LocalEmbeddingModel(_FakeSession(), tokenizer, "cls", batch_size=8)
+
+    monkeypatch.setattr(ec, "_load_local_model", fake_load)
+    # No HTTP client may be built for a local model.
+    monkeypatch.setattr(ec, "_build_http_client", lambda: pytest.fail("HTTP client built"))
+
+    with ec.EmbeddingClient() as client:
+        vector = client.embed_query("pleural effusion")
+
+    assert loaded == {"path": "/models/test", "params": {"pooling": "cls"}}
+    # Normalized like the HTTP path: [1, 0] is already a unit vector.
+    assert vector == pytest.approx([1.0, 0.0])
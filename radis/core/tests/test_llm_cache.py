@@ -0,0 +1,153 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from adit_radis_shared.accounts.factories import UserFactory
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from pydantic import BaseModel
+
+from radis.chats.utils.testing_helpers import (
+    create_async_openai_structured_mock,
+    create_openai_client_mock,
+    structured_completion,
+)
+from radis.core.models import LLMResponse, LLMResponseCacheStats
+from radis.core.utils import llm_cache
+from radis.core.utils.llm_cache import evict_responses, flush_cache_stats, response_cache_key
+from radis.core.utils.llm_client import _LLM_GATE, LLMClient
+from radis.core.utils.llm_engine import EngineLLMClient, LLMEngine
+
+pytestmark = pytest.mark.django_db
+
+# See radis/labels/tests/test_admin.py.
+_no_toolbar = override_settings(DEBUG_TOOLBAR_CONFIG={"SHOW_TOOLBAR_CALLBACK": lambda r: False})
+
+
+class _Schema(BaseModel):
+    value: str
+
+
+@pytest.fixture(autouse=True)
+def _response_cache(settings):
+    settings.LLM_RESPONSE_CACHE_ENABLED = True
+    settings.LLM_RESPONSE_CACHE_TTL_SECONDS = 3600
+    settings.LLM_RESPONSE_CACHE_MAX_ENTRIES = 100
+    settings.LLM_RESPONSE_CACHE_STATS_FLUSH_SECONDS = 3600
+    llm_cache._pending_stats.clear()
+    _LLM_GATE.reset()
+    yield
+    llm_cache._pending_stats.clear()
+    _LLM_GATE.reset()
+
+
+def _client(answer: str):
+    mock = create_openai_client_mock(_Schema(value=answer))
+    with patch("openai.OpenAI", return_value=mock):
+        return LLMClient("extractions"), mock
+
+
+def test_disabled_cache_has_no_key(settings):
+    settings.LLM_RESPONSE_CACHE_ENABLED = False
+    assert response_cache_key("model", {}, "prompt", _Schema) is None
+
+
+def test_repeated_request_is_answered_from_the_cache():
+    client, mock = _client("first")
+
+    assert client.extract_data("prompt", _Schema) == _Schema(value="first")
+    assert client.extract_data("prompt", _Schema) == _Schema(value="first")
+    client.extract_data("another prompt", _Schema)
+
+    assert mock.chat.completions.create.call_count == 2
+    assert not LLMResponseCacheStats.objects.exists()
+
+    flush_cache_stats()
+    stats = LLMResponseCacheStats.objects.get(feature="extractions")
+    assert (stats.hits, stats.misses) == (1, 2)
+
+
+def test_stats_are_flushed_once_the_interval_has_passed(settings):
+    settings.LLM_RESPONSE_CACHE_STATS_FLUSH_SECONDS = 0
+    client, _ = _client("first")
+
+    client.extract_data("prompt", _Schema)
+    client.extract_data("prompt", _Schema)
+
+    stats = LLMResponseCacheStats.objects.get(feature="extractions")
+    assert (stats.hits, stats.misses) == (1, 1)
+
+
+def test_key_covers_model_params_and_schema():
+    class _Other(BaseModel):
+        other: str
+
+    key = response_cache_key("model", {"temperature": 0}, "prompt", _Schema)
+    assert key != response_cache_key("other-model", {"temperature": 0}, "prompt", _Schema)
+    assert key != response_cache_key("model", {"temperature": 1}, "prompt", _Schema)
+    assert key != response_cache_key("model", {"temperature": 0}, "prompt", _Other)
+
+
+def test_bypass_asks_again_and_refreshes_the_entry():
+    client, mock = _client("first")
+    client.extract_data("prompt", _Schema)
+
+    mock.chat.completions.create.return_value = structured_completion(_Schema(value="second"))
+    assert client.extract_data("prompt", _Schema, use_cache=False) == _Schema(value="second")
+    assert client.extract_data("prompt", _Schema) == _Schema(value="second")
+    assert mock.chat.completions.create.call_count == 2
+
+
+def test_expired_entry_is_a_miss():
+    client, mock = _client("first")
+    client.extract_data("prompt", _Schema)
+    LLMResponse.objects.update(created_at=timezone.now() - timedelta(hours=2))
+
+    client.extract_data("prompt", _Schema)
+
+    assert mock.chat.completions.create.call_count == 2
+
+
+def test_eviction_drops_expired_and_oldest_entries(settings):
+    settings.LLM_RESPONSE_CACHE_MAX_ENTRIES = 2
+    now = timezone.now()
+    for age_minutes in (0, 1, 2, 3, 120):
+        LLMResponse.objects.create(
+            key=f"key-{age_minutes}",
+            feature="extractions",
+            response={"value": "x"},
+            created_at=now - timedelta(minutes=age_minutes),
+        )
+
+    assert evict_responses() == 3
+    assert set(LLMResponse.objects.values_list("key", flat=True)) == {"key-0", "key-1"}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_engine_client_honors_the_cache_and_its_bypass():
+    mock = create_async_openai_structured_mock(_Schema(value="answer"))
+    engine = LLMEngine(1, client=mock)
+    try:
+        EngineLLMClient("extractions", engine).extract_data("prompt", _Schema)
+        EngineLLMClient("extractions", engine).extract_data("prompt", _Schema)
+        assert mock.chat.completions.create.call_count == 1
+
+        EngineLLMClient("extractions", engine, use_cache=False).extract_data("prompt", _Schema)
+        assert mock.chat.completions.create.call_count == 2
+    finally:
+        engine.close()
+
+
+@_no_toolbar
+def test_admin_lists_cache_stats(client):
+    llm_client, _ = _client("first")
+    llm_client.extract_data("prompt", _Schema)
+    flush_cache_stats()
+    admin_user = UserFactory.create(is_staff=True, is_superuser=True, is_active=True)
+    client.force_login(admin_user)
+
+    response = client.get(reverse("admin:core_llmresponsecachestats_changelist"))
+
+    assert response.status_code == 200
+    assert "extractions" in response.content.decode()
@@ -62,7 +62,7 @@ def test_extract_data_uses_user_message_and_the_features_model(settings):
     with patch("openai.OpenAI", return_value=mock):
         result = LLMClient("extractions").extract_data("the prompt", _Schema)
     assert isinstance(result, _Schema)
-    call = mock.beta.chat.completions.parse.call_args.kwargs
+    call = mock.chat.completions.create.call_args.kwargs
     assert call["messages"] == [{"role": "user", "content": "the prompt"}]
     assert call["model"] == "extraction-model"
     assert call["extra_body"] == {"foo": "bar"}
@@ -102,7 +102,7 @@ def test_extract_data_recovers_after_one_rate_limit():
     # settings once at import time, so overriding them via `settings` here would be a no-op.)
     mock = cast(MagicMock, create_openai_client_mock(_Schema(value="ok")))
     calls = {"n": 0}
-    success_response = mock.beta.chat.completions.parse.return_value
+    success_response = mock.chat.completions.create.return_value
 
     def flaky(**kwargs):
         calls["n"] += 1
@@ -110,7 +110,7 @@ def test_extract_data_recovers_after_one_rate_limit():
             raise make_rate_limit_error({"retry-after": "0"})
         return success_response
 
-    mock.beta.chat.completions.parse.side_effect = flaky
+    mock.chat.completions.create.side_effect = flaky
     with patch("openai.OpenAI", return_value=mock):
         result = LLMClient("extractions").extract_data("p", _Schema)
     assert isinstance(result, _Schema)
@@ -124,7 +124,7 @@ def test_extract_data_defers_when_rate_limit_exceeds_budget():
     def always_429(**kwargs):
         raise make_rate_limit_error({"retry-after": "600"})
 
-    mock.beta.chat.completions.parse.side_effect = always_429
+    mock.chat.completions.create.side_effect = always_429
     with patch("openai.OpenAI", return_value=mock):
         with pytest.raises(RateLimited):
             LLMClient("extractions").extract_data("p", _Schema, max_wait=300.0)
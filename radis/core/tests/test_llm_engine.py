@@ -0,0 +1,132 @@
+import asyncio
+from types import SimpleNamespace
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+from pydantic import BaseModel
+
+from radis.chats.utils.testing_helpers import create_async_openai_structured_mock
+from radis.core.utils.llm_client import _LLM_GATE, LLMResponseError
+from radis.core.utils.llm_engine import (
+    EngineLLMClient,
+    LLMEngine,
+    get_llm_engine,
+    shutdown_llm_engine,
+)
+from radis.core.utils.model_spec import ModelSpec
+
+
+class _Schema(BaseModel):
+    value: str = "x"
+
+
+class _SlowStub:
+    """`openai.AsyncOpenAI` stand-in that records the peak number of calls in flight."""
+
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.prompts: list[str] = []
+        self.chat = SimpleNamespace(completions=self)
+
+    async def create(self, **kwargs: Any) -> Any:
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        self.prompts.append(kwargs["messages"][0]["content"])
+        await asyncio.sleep(self.latency)
+        self.in_flight -= 1
+        message = SimpleNamespace(content=_Schema().model_dump_json())
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=message, finish_reason="stop")],
+            usage=SimpleNamespace(prompt_tokens=12, completion_tokens=3),
+        )
+
+
+@pytest.fixture(autouse=True)
+def reset_gate():
+    _LLM_GATE.reset()
+    yield
+    _LLM_GATE.reset()
+
+
+def test_submit_sends_the_features_model_and_returns_the_parsed_result(settings):
+    settings.LLM_MODELS = {
+        **settings.LLM_MODELS,
+        "extractions": ModelSpec("small-model", {"reasoning_effort": "low"}),
+    }
+    mock = create_async_openai_structured_mock(_Schema(value="parsed"))
+    engine = LLMEngine(2, client=mock)
+    try:
+        result = engine.submit("extractions", "the prompt", _Schema).result(timeout=5)
+    finally:
+        engine.close()
+
+    assert result == _Schema(value="parsed")
+    kwargs = mock.chat.completions.create.call_args.kwargs
+    assert kwargs["model"] == "small-model"
+    assert kwargs["messages"] == [{"role": "user", "content": "the prompt"}]
+    assert kwargs["extra_body"] == {"reasoning_effort": "low"}
+
+
+def test_concurrency_is_capped_across_all_submitters():
+    stub = _SlowStub(latency=0.05)
+    engine = LLMEngine(2, client=stub)  # type: ignore
+    try:
+        # Two "tasks" submitting at once still share the one semaphore.
+        first = [engine.submit("extractions", "p", _Schema) for _ in range(4)]
+        second = [engine.submit("labeling", "p", _Schema) for _ in range(4)]
+        results = [f.result(timeout=5) for f in first + second]
+    finally:
+        engine.close()
+
+    assert len(results) == 8
+    assert stub.peak_in_flight == 2
+
+
+def test_urgent_calls_go_ahead_of_queued_ones():
+    stub = _SlowStub(latency=0.05)
+    engine = LLMEngine(1, client=stub)  # type: ignore
+    try:
+        queued = [engine.submit("extractions", f"batch {i}", _Schema) for i in range(4)]
+        urgent = EngineLLMClient("extractions", engine, urgent=True).submit("urgent", _Schema)
+        for future in [*queued, urgent]:
+            future.result(timeout=5)
+    finally:
+        engine.close()
+
+    # The first batch call already holds the only slot when the urgent one arrives.
+    assert stub.prompts.index("urgent") == 1
+
+
+def test_measured_calls_report_duration_and_token_usage():
+    engine = LLMEngine(1, client=_SlowStub(latency=0.05))  # type: ignore
+    try:
+        call = EngineLLMClient("extractions", engine).submit_measured("p", _Schema).result(5)
+    finally:
+        engine.close()
+
+    assert call.response == _Schema()
+    assert call.seconds >= 0.05
+    assert (call.prompt_tokens, call.completion_tokens) == (12, 3)
+    assert not call.cached
+
+
+def test_engine_client_raises_when_parsed_is_none():
+    engine = LLMEngine(1, client=create_async_openai_structured_mock(None))
+    try:
+        with pytest.raises(LLMResponseError):
+            EngineLLMClient("extractions", engine).extract_data("p", _Schema)
+    finally:
+        engine.close()
+
+
+def test_process_engine_is_shared_until_shutdown():
+    with patch("openai.AsyncOpenAI") as openai_cls:
+        engine = get_llm_engine()
+        assert get_llm_engine() is engine
+        assert openai_cls.call_args.kwargs["max_retries"] == 0
+
+        shutdown_llm_engine()
+        assert get_llm_engine() is not engine
@@ -0,0 +1,92 @@
+from datetime import timedelta
+
+import openai
+import pytest
+from adit_radis_shared.accounts.factories import UserFactory
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from radis.chats.utils.testing_helpers import make_rate_limit_error
+from radis.core.models import LLMQuota, LLMQuotaLease
+from radis.core.utils.llm_quota import llm_quota, quota_key
+from radis.core.utils.rate_limit import RateLimited
+
+pytestmark = pytest.mark.django_db
+
+# See radis/labels/tests/test_admin.py.
+_no_toolbar = override_settings(DEBUG_TOOLBAR_CONFIG={"SHOW_TOOLBAR_CALLBACK": lambda r: False})
+
+
+@pytest.fixture(autouse=True)
+def _shared_limit(settings):
+    settings.LLM_SHARED_LIMIT_ENABLED = True
+    settings.LLM_SHARED_REQUESTS_PER_MINUTE = 60.0
+    settings.LLM_SHARED_BURST = 2
+    settings.LLM_SHARED_MAX_CONCURRENT = 1
+
+
+def test_disabled_limiter_touches_no_rows(settings):
+    settings.LLM_SHARED_LIMIT_ENABLED = False
+    with llm_quota("extractions", budget=0):
+        pass
+    assert not LLMQuota.objects.exists()
+
+
+def test_bucket_defers_once_the_burst_is_spent():
+    # The test transaction freezes the database clock, so nothing refills meanwhile.
+    for _ in range(2):
+        with llm_quota("extractions", budget=0):
+            pass
+    with pytest.raises(RateLimited):
+        with llm_quota("extractions", budget=0):
+            pass
+
+    # Budgets are per feature.
+    with llm_quota("labeling", budget=0):
+        pass
+
+
+def test_concurrent_requests_are_capped_and_leases_released():
+    with llm_quota("extractions", budget=0):
+        assert LLMQuotaLease.objects.count() == 1
+        with pytest.raises(RateLimited):
+            with llm_quota("extractions", budget=0):
+                pass
+    assert not LLMQuotaLease.objects.exists()
+
+
+def test_expired_lease_of_a_dead_process_does_not_count():
+    quota = LLMQuota.objects.create(key=quota_key("extractions"), tokens=2)
+    LLMQuotaLease.objects.create(quota=quota, expires_at=timezone.now() - timedelta(hours=1))
+
+    with llm_quota("extractions", budget=0):
+        pass
+    assert not LLMQuotaLease.objects.exists()
+
+
+def test_rate_limit_pauses_every_process():
+    with pytest.raises(openai.RateLimitError):
+        with llm_quota("extractions", budget=0):
+            raise make_rate_limit_error({"retry-after": "30"})
+
+    quota = LLMQuota.objects.get(key=quota_key("extractions"))
+    assert quota.blocked_until is not None
+    assert quota.last_rate_limited_at is not None
+    assert not LLMQuotaLease.objects.exists()
+    with pytest.raises(RateLimited):
+        with llm_quota("extractions", budget=5):
+            pass
+
+
+@_no_toolbar
+def test_admin_lists_quota_state(client):
+    with llm_quota("extractions", budget=0):
+        pass
+    admin_user = UserFactory.create(is_staff=True, is_superuser=True, is_active=True)
+    client.force_login(admin_user)
+
+    response = client.get(reverse("admin:core_llmquota_changelist"))
+
+    assert response.status_code == 200
+    assert quota_key("extractions") in response.content.decode()
@@ -6,7 +6,7 @@ from radis.chats.utils.testing_helpers import make_connection_error, make_rate_l
 from radis.core.utils.rate_limit import (
     RateLimited,
     RateLimitGate,
-    _parse_retry_after,
+    parse_retry_after,
     run_through_gate,
     run_through_gate_async,
     with_transient_retries,
@@ -151,15 +151,15 @@ async def test_wait_until_open_async_defers_without_sleeping_when_window_exceeds
     assert clock.slept == []
 
 
-# --- _parse_retry_after ---
+# --- parse_retry_after ---
 
 
 def test_parse_retry_after_seconds():
-    assert _parse_retry_after(make_rate_limit_error({"retry-after": "30"})) == 30.0
+    assert parse_retry_after(make_rate_limit_error({"retry-after": "30"})) == 30.0
 
 
 def test_parse_retry_after_milliseconds():
-    assert _parse_retry_after(make_rate_limit_error({"retry-after-ms": "1500"})) == 1.5
+    assert parse_retry_after(make_rate_limit_error({"retry-after-ms": "1500"})) == 1.5
 
 
 def test_parse_retry_after_http_date():
@@ -167,7 +167,7 @@ def test_parse_retry_after_http_date():
     from email.utils import format_datetime
 
     when = datetime.now(UTC) + timedelta(seconds=60)
-    seconds = _parse_retry_after(make_rate_limit_error({"retry-after": format_datetime(when)}))
+    seconds = parse_retry_after(make_rate_limit_error({"retry-after": format_datetime(when)}))
     assert seconds is not None
     assert 55.0 <= seconds <= 60.0
 
@@ -179,13 +179,13 @@ def test_parse_retry_after_http_date_naive_offset_does_not_crash():
 
     when = datetime.now(UTC) + timedelta(seconds=60)
     value = when.strftime("%a, %d %b %Y %H:%M:%S -0000")
-    seconds = _parse_retry_after(make_rate_limit_error({"retry-after": value}))
+    seconds = parse_retry_after(make_rate_limit_error({"retry-after": value}))
     assert seconds is not None
     assert 55.0 <= seconds <= 60.0
 
 
 def test_parse_retry_after_missing_returns_none():
-    assert _parse_retry_after(make_rate_limit_error({})) is None
+    assert parse_retry_after(make_rate_limit_error({})) is None
 
 
 # --- run_through_gate (sync) ---
@@ -0,0 +1,124 @@
+import logging
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from typing import Literal
+
+logger = logging.getLogger(__name__)
+
+BreakerState = Literal["closed", "open", "half_open"]
+
+
+class CircuitBreaker:
+    """Per-process health tracker that stops calling a dependency which is failing or slow.
+
+    Closed: calls go through and their outcome and latency are recorded over a sliding
+    window. Once the window holds at least `min_calls` outcomes and either the error rate
+    reaches `error_rate` or the p95 latency reaches `slow_seconds`, the breaker opens.
+
+    Open: `allow()` refuses every call for `open_seconds`, so callers fall back at once
+    instead of each paying the timeout or the rate-limit wait themselves.
+
+    Half-open: after `open_seconds`, one caller at a time is let through as a probe. A
+    successful, fast probe closes the breaker with a fresh window; a failed or slow one
+    re-opens it for another `open_seconds`.
+
+    Complements the `RateLimitGate`: the gate coordinates backoff on 429s, the breaker
+    decides whether an interactive caller should try at all.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window_seconds: float,
+        min_calls: int,
+        error_rate: float,
+        slow_seconds: float,
+        open_seconds: float,
+        now: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._name = name
+        self._window = window_seconds
+        self._min_calls = min_calls
+        self._error_rate = error_rate
+        self._slow = slow_seconds
+        self._open_seconds = open_seconds
+        self._now = now
+        self._lock = threading.Lock()
+        self._state: BreakerState = "closed"
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._calls: deque[tuple[float, bool, float]] = deque()  # (at, ok, latency)
+
+    def reset(self) -> None:
+        """Clear runtime state. For tests that share a process-global breaker."""
+        with self._lock:
+            self._state = "closed"
+            self._opened_at = 0.0
+            self._probe_in_flight = False
+            self._calls.clear()
+
+    @property
+    def state(self) -> BreakerState:
+        with self._lock:
+            self._advance()
+            return self._state
+
+    def allow(self) -> bool:
+        """Whether the caller may make the call now. In half-open state this claims the
+        single probe slot, so the caller must follow up with `record()`."""
+        with self._lock:
+            self._advance()
+            if self._state == "closed":
+                return True
+            if self._state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record(self, ok: bool, latency: float) -> None:
+        """Record the outcome of an allowed call."""
+        with self._lock:
+            now = self._now()
+            if self._state == "half_open":
+                self._probe_in_flight = False
+                if ok and latency < self._slow:
+                    self._state = "closed"
+                    self._calls.clear()
+                    logger.info("%s circuit closed: probe succeeded", self._name)
+                else:
+                    self._trip(now, "probe failed" if not ok else f"probe took {latency:.1f}s")
+                return
+            if self._state == "open":
+                return  # a call that started before the breaker opened
+            self._calls.append((now, ok, latency))
+            self._prune(now)
+            if len(self._calls) < self._min_calls:
+                return
+            failures = sum(1 for _, call_ok, _ in self._calls if not call_ok)
+            rate = failures / len(self._calls)
+            p95 = self._p95()
+            if rate >= self._error_rate:
+                self._trip(now, f"error rate {rate:.0%} over {len(self._calls)} call(s)")
+            elif p95 >= self._slow:
+                self._trip(now, f"p95 latency {p95:.1f}s over {len(self._calls)} call(s)")
+
+    def _advance(self) -> None:
+        if self._state == "open" and self._now() - self._opened_at >= self._open_seconds:
+            self._state = "half_open"
+            self._probe_in_flight = False
+
+    def _prune(self, now: float) -> None:
+        while self._calls and now - self._calls[0][0] > self._window:
+            self._calls.popleft()
+
+    def _p95(self) -> float:
+        latencies = sorted(latency for _, _, latency in self._calls)
+        return latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+
+    def _trip(self, now: float, reason: str) -> None:
+        self._state = "open"
+        self._opened_at = now
+        self._calls.clear()
+        logger.warning("%s circuit opened for %.0fs: %s", self._name, self._open_seconds, reason)
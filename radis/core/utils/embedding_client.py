@@ -2,11 +2,15 @@ from __future__ import annotations
 
 import logging
 import math
+import threading
+from pathlib import Path
+from typing import Any
 
 import httpx
 import openai
 from django.conf import settings
 
+from radis.core.utils.model_spec import ModelSpec
 from radis.core.utils.rate_limit import RateLimitGate, run_through_gate
 
 logger = logging.getLogger(__name__)
@@ -34,6 +38,13 @@ PERMANENT_EMBEDDING_ERRORS = (
 )
 
 
+# EMBEDDINGS_MODEL values starting with this prefix name a model directory on the local
+# filesystem instead of a model served over HTTP, e.g. `local:/models/bge-m3?pooling=cls`.
+LOCAL_MODEL_PREFIX = "local:"
+
+LOCAL_POOLING_MODES = ("mean", "cls", "last")
+
+
 class EmbeddingClientError(Exception):
     """Raised when the embedding service returns a malformed response or when
     configuration is invalid. Typed `openai.OpenAIError` subclasses
@@ -89,17 +100,155 @@ def _normalize_response(
     return normalized
 
 
+def is_local_model(model: str) -> bool:
+    return model.startswith(LOCAL_MODEL_PREFIX)
+
+
+class LocalEmbeddingModel:
+    """An embedding model run in-process on CPU with ONNX Runtime.
+
+    Expects a directory holding `model.onnx` and a Hugging Face `tokenizer.json`
+    (what `optimum-cli export onnx` produces). The model's first output is pooled
+    into one vector per text; models whose first output is already a sentence
+    embedding (2-D) are used as is. Normalization and Matryoshka truncation to
+    EMBEDDINGS_DIM happen in `EmbeddingClient`, same as for the HTTP path.
+
+    Loaded once per process (see `_load_local_model`) and shared by every client;
+    an ONNX Runtime session is safe to run from several threads at once.
+    """
+
+    def __init__(self, session: Any, tokenizer: Any, pooling: str, batch_size: int) -> None:
+        if pooling not in LOCAL_POOLING_MODES:
+            raise EmbeddingClientError(
+                f"Unknown pooling {pooling!r} for local embedding model, "
+                f"expected one of {LOCAL_POOLING_MODES}"
+            )
+        self._session = session
+        self._tokenizer = tokenizer
+        self._pooling = pooling
+        self._batch_size = max(1, batch_size)
+        self._input_names = {model_input.name for model_input in session.get_inputs()}
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        vectors: list[list[float]] = []
+        # Micro-batches: the task-level EMBEDDINGS_BATCH_SIZE is sized for HTTP round
+        # trips, and a padded (batch, tokens, hidden) activation of that size is
+        # hundreds of MB on CPU.
+        for start in range(0, len(texts), self._batch_size):
+            vectors.extend(self._embed_batch(texts[start : start + self._batch_size]))
+        return vectors
+
+    def _embed_batch(self, texts: list[str]) -> list[list[float]]:
+        import numpy as np
+
+        encodings = self._tokenizer.encode_batch(texts)
+        input_ids = np.array([encoding.ids for encoding in encodings], dtype=np.int64)
+        attention_mask = np.array(
+            [encoding.attention_mask for encoding in encodings], dtype=np.int64
+        )
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+
+        output = np.asarray(self._session.run(None, feeds)[0], dtype=np.float32)
+        if output.ndim == 2:
+            return output.tolist()
+
+        if self._pooling == "cls":
+            pooled = output[:, 0]
+        elif self._pooling == "last":
+            # Right padding: the last real token sits at (number of tokens - 1).
+            last = attention_mask.sum(axis=1) - 1
+            pooled = output[np.arange(output.shape[0]), last]
+        else:
+            mask = attention_mask[:, :, None].astype(np.float32)
+            pooled = (output * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return pooled.tolist()
+
+
+_LOCAL_MODELS: dict[tuple[str, str], LocalEmbeddingModel] = {}
+_LOCAL_MODELS_LOCK = threading.Lock()
+
+
+def _load_local_model(path: str, params: dict) -> LocalEmbeddingModel:
+    """The process-wide `LocalEmbeddingModel` for `path`, loading it on first use.
+
+    onnxruntime and tokenizers are only needed by deployments that embed locally,
+    so they are imported here rather than at module level.
+    """
+    pooling = str(params.get("pooling", "mean"))
+    key = (path, pooling)
+    with _LOCAL_MODELS_LOCK:
+        model = _LOCAL_MODELS.get(key)
+        if model is not None:
+            return model
+
+        try:
+            import onnxruntime
+            from tokenizers import Tokenizer
+        except ImportError as err:
+            raise EmbeddingClientError(
+                "A local EMBEDDINGS_MODEL needs the onnxruntime and tokenizers packages "
+                "installed in the image"
+            ) from err
+
+        model_dir = Path(path)
+        model_file = model_dir / "model.onnx"
+        tokenizer_file = model_dir / "tokenizer.json"
+        if not model_file.is_file() or not tokenizer_file.is_file():
+            raise EmbeddingClientError(
+                f"Local embedding model directory {path!r} must contain model.onnx "
+                f"and tokenizer.json"
+            )
+
+        tokenizer = Tokenizer.from_file(str(tokenizer_file))
+        tokenizer.enable_truncation(max_length=settings.EMBEDDINGS_LOCAL_MAX_TOKENS)
+        tokenizer.enable_padding()
+
+        options = onnxruntime.SessionOptions()
+        if settings.EMBEDDINGS_LOCAL_THREADS > 0:
+            options.intra_op_num_threads = settings.EMBEDDINGS_LOCAL_THREADS
+        session = onnxruntime.InferenceSession(
+            str(model_file), sess_options=options, providers=["CPUExecutionProvider"]
+        )
+
+        model = LocalEmbeddingModel(
+            session, tokenizer, pooling, settings.EMBEDDINGS_LOCAL_BATCH_SIZE
+        )
+        _LOCAL_MODELS[key] = model
+        logger.info("Loaded local embedding model from %s (pooling=%s)", path, pooling)
+        return model
+
+
 class EmbeddingClient:
     """Sync embedding client over the openai SDK. Single OpenAI-compatible
     endpoint (set EMBEDDINGS_BASE_URL to end in /v1). Same shape for OpenAI,
-    Azure, vLLM, an LLM gateway, or Ollama's /v1 compatibility layer."""
+    Azure, vLLM, an LLM gateway, or Ollama's /v1 compatibility layer.
+
+    An EMBEDDINGS_MODEL of the form `local:<directory>` selects the in-process
+    `LocalEmbeddingModel` instead (air-gapped sites, low-latency query embedding);
+    callers see the same normalized EMBEDDINGS_DIM vectors either way.
+
+    `spec` defaults to EMBEDDINGS_MODEL; a zero-downtime model migration passes
+    EMBEDDINGS_SHADOW_MODEL to fill the shadow column (see radis.pgsearch)."""
 
-    def __init__(self) -> None:
-        spec = settings.EMBEDDINGS_MODEL
+    def __init__(self, spec: ModelSpec | None = None) -> None:
+        if spec is None:
+            spec = settings.EMBEDDINGS_MODEL
         if spec is None:
             raise EmbeddingClientError(
                 "EMBEDDINGS_MODEL is not configured; hybrid search is disabled"
             )
+        self._dim = settings.EMBEDDINGS_DIM
+        self._instruction = settings.EMBEDDINGS_QUERY_INSTRUCTION
+        self._local: LocalEmbeddingModel | None = None
+        self._http: httpx.Client | None = None
+        if is_local_model(spec.model):
+            self._local = _load_local_model(
+                spec.model.removeprefix(LOCAL_MODEL_PREFIX), spec.params
+            )
+            return
+
         # SDK rejects an empty api_key at construction; "unused" is the documented
         # placeholder for self-hosted endpoints that ignore auth (Ollama, vLLM).
         api_key = settings.EMBEDDINGS_API_KEY or "unused"
@@ -120,8 +269,6 @@ class EmbeddingClient:
         # nested values (e.g. a `chat_template_kwargs.*` param), which stay shared; those
         # would need a deep copy, not worth it for the scalar params actually in use today.
         self._extra_body = dict(spec.params)
-        self._dim = settings.EMBEDDINGS_DIM
-        self._instruction = settings.EMBEDDINGS_QUERY_INSTRUCTION
 
     def embed_documents(self, texts: list[str]) -> list[list[float]]:
         """Low-level call to the embedding backend, with no 429 handling of
@@ -137,6 +284,9 @@ class EmbeddingClient:
         strings instead of float lists, which `_normalize_response` does not
         expect and will misbehave on. Do not put `encoding_format` in a model
         spec's params."""
+        if self._local is not None:
+            return _normalize_response(self._local.embed(texts), len(texts), self._dim)
+
         # encoding_format="float" requests JSON-float vectors. Without this
         # the SDK defaults to base64, which would require a decode step
         # back to floats — extra work and a less debuggable wire format.
@@ -154,6 +304,9 @@ class EmbeddingClient:
         a user is waiting, so when the gate is closed beyond that budget this
         raises RateLimited and the provider falls back to FTS-only."""
         prefixed = f"{self._instruction}{text}" if self._instruction else text
+        if self._local is not None:
+            # Nothing to rate-limit in-process; skip the gate's bookkeeping.
+            return self.embed_documents([prefixed])[0]
         vectors = run_through_gate(
             EMBEDDING_GATE,
             settings.EMBEDDINGS_RATE_LIMIT_QUERY_MAX_WAIT_SECONDS,
@@ -164,7 +317,8 @@ class EmbeddingClient:
         return vectors[0]
 
     def close(self) -> None:
-        self._http.close()
+        if self._http is not None:
+            self._http.close()
 
     def __enter__(self) -> EmbeddingClient:
         return self
@@ -0,0 +1,161 @@
+"""Persistent cache of structured-output LLM answers (LLM_RESPONSE_CACHE_ENABLED).
+
+Retrying or restarting a job re-sends the exact prompts of reports that were already
+answered. With the cache on, `LLMClient.extract_data` and its async twin first look
+for an `LLMResponse` whose key hashes the same model, request parameters, rendered
+prompt and JSON schema, so a restart costs one lookup per report instead of an LLM
+call. Any change to the prompt template, the fields or the model changes the key.
+
+Entries older than LLM_RESPONSE_CACHE_TTL_SECONDS are ignored on read; the periodic
+`evict_llm_response_cache` task deletes them and trims the table to the newest
+LLM_RESPONSE_CACHE_MAX_ENTRIES. Hits and misses are counted per feature
+(`LLMResponseCacheStats`, shown in the admin). Each process tallies them in memory and
+adds its tally to the stats rows at most every LLM_RESPONSE_CACHE_STATS_FLUSH_SECONDS (and
+at exit), so concurrent LLM calls of a feature do not queue on the lock of its stats row.
+"""
+
+import atexit
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta
+from functools import lru_cache
+from typing import Any
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.db.models.functions import Now
+from django.utils import timezone
+from pydantic import BaseModel, ValidationError
+
+from radis.core.models import LLMResponse, LLMResponseCacheStats
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=256)
+def json_schema(schema: type[BaseModel]) -> dict[str, Any]:
+    """`schema.model_json_schema()`, computed once per schema class. Extraction plans
+    share their classes across calls, so this turns a schema build per call into a
+    dictionary lookup."""
+    return schema.model_json_schema()
+
+
+def response_cache_key(
+    model: str, params: dict[str, Any], prompt: str, schema: type[BaseModel]
+) -> str | None:
+    """The cache key of a request, or None when the cache is off."""
+    if not settings.LLM_RESPONSE_CACHE_ENABLED:
+        return None
+    payload = json.dumps(
+        {
+            "model": model,
+            "params": params,
+            "prompt": prompt,
+            "schema": json_schema(schema),
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+# Cache lookups of this process not yet added to `LLMResponseCacheStats`, by
+# (feature, "hits" or "misses").
+_pending_stats: Counter[tuple[str, str]] = Counter()
+_pending_stats_lock = threading.Lock()
+_last_stats_flush = time.monotonic()
+
+
+def _record(feature: str, hit: bool) -> None:
+    with _pending_stats_lock:
+        _pending_stats[(feature, "hits" if hit else "misses")] += 1
+        due = (
+            time.monotonic() - _last_stats_flush >= settings.LLM_RESPONSE_CACHE_STATS_FLUSH_SECONDS
+        )
+    if due:
+        flush_cache_stats()
+
+
+def flush_cache_stats() -> None:
+    """Add this process's tally of hits and misses to the stats rows."""
+    global _last_stats_flush
+    with _pending_stats_lock:
+        pending = dict(_pending_stats)
+        _pending_stats.clear()
+        _last_stats_flush = time.monotonic()
+
+    increments: dict[str, dict[str, int]] = defaultdict(dict)
+    for (feature, field), count in pending.items():
+        increments[feature][field] = count
+    for feature, counts in increments.items():
+        updates = {field: F(field) + count for field, count in counts.items()}
+        stats = LLMResponseCacheStats.objects.filter(feature=feature)
+        if not stats.update(**updates, updated_at=Now()):
+            LLMResponseCacheStats.objects.get_or_create(feature=feature)
+            stats.update(**updates, updated_at=Now())
+
+
+@atexit.register
+def _flush_cache_stats_at_exit() -> None:
+    if not _pending_stats:
+        return
+    try:
+        flush_cache_stats()
+    except Exception:
+        logger.warning("Could not save the LLM response cache stats at exit", exc_info=True)
+
+
+def cached_response(feature: str, key: str, schema: type[BaseModel]) -> BaseModel | None:
+    """The stored answer for `key` if it is fresh and still validates, else None."""
+    oldest = timezone.now() - timedelta(seconds=settings.LLM_RESPONSE_CACHE_TTL_SECONDS)
+    stored = (
+        LLMResponse.objects.filter(key=key, created_at__gte=oldest)
+        .values_list("response", flat=True)
+        .first()
+    )
+    result = None
+    if stored is not None:
+        try:
+            result = schema.model_validate(stored)
+        except ValidationError:
+            logger.warning(
+                "Discarding cached %s response %s that no longer validates", feature, key
+            )
+    _record(feature, hit=result is not None)
+    return result
+
+
+def store_response(feature: str, key: str, response: BaseModel) -> None:
+    LLMResponse.objects.update_or_create(
+        key=key,
+        defaults={
+            "feature": feature,
+            "response": response.model_dump(mode="json"),
+            "created_at": timezone.now(),
+        },
+    )
+
+
+def evict_responses() -> int:
+    """Delete expired entries, then the oldest beyond the size bound. Returns the count."""
+    oldest = timezone.now() - timedelta(seconds=settings.LLM_RESPONSE_CACHE_TTL_SECONDS)
+    deleted, _ = LLMResponse.objects.filter(created_at__lt=oldest).delete()
+
+    bound = settings.LLM_RESPONSE_CACHE_MAX_ENTRIES
+    cutoff = list(
+        LLMResponse.objects.order_by("-created_at", "-id").values_list("created_at", "id")[
+            bound : bound + 1
+        ]
+    )
+    if cutoff:
+        # `cutoff` is the newest entry past the bound; it and everything older go.
+        created_at, pk = cutoff[0]
+        overflow, _ = LLMResponse.objects.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lte=pk)
+        ).delete()
+        deleted += overflow
+    return deleted
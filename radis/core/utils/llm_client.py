@@ -1,11 +1,24 @@
 import logging
+import time
 from collections.abc import Iterable
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, cast
 
 import openai
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from openai.lib._parsing._completions import type_to_response_format_param
 from openai.types.chat import ChatCompletionMessageParam
 from pydantic import BaseModel
 
+from radis.core.utils.llm_cache import (
+    cached_response,
+    json_schema,
+    response_cache_key,
+    store_response,
+)
+from radis.core.utils.llm_quota import llm_quota, llm_quota_async
 from radis.core.utils.model_spec import ModelSpec
 from radis.core.utils.rate_limit import (
     RateLimitGate,
@@ -23,6 +36,7 @@ class LLMResponseError(Exception):
 
 
 # Process-global so every LLM caller in this worker/web process shares one backoff window.
+# Across processes, LLM_SHARED_LIMIT_ENABLED adds a Postgres-backed budget (utils.llm_quota).
 _LLM_GATE = RateLimitGate(
     base_seconds=settings.LLM_RATE_LIMIT_BACKOFF_BASE_SECONDS,
     backoff_max_seconds=settings.LLM_RATE_LIMIT_BACKOFF_MAX_SECONDS,
@@ -30,6 +44,29 @@ _LLM_GATE = RateLimitGate(
 )
 
 
+@lru_cache(maxsize=256)
+def response_format(schema: type[BaseModel]) -> dict[str, Any]:
+    """The strict structured-output `response_format` request parameter for `schema`.
+
+    Built once per schema class and sent as a plain dict, so the SDK does not derive the
+    strict JSON schema from the class again for every call. Extraction plans build it
+    when they are compiled (see `ExtractionPlan.response_format`).
+    """
+    return cast(dict[str, Any], type_to_response_format_param(schema))
+
+
+def _parse_completion(completion: Any, schema: type[BaseModel], model_name: str) -> BaseModel:
+    """Validate the content of a structured-output completion against `schema`."""
+    choice = completion.choices[0]
+    content = choice.message.content
+    if content is None:  # a refusal or an empty completion, not a programmer invariant
+        raise LLMResponseError(
+            f"LLM returned no parsed response (model={model_name}, "
+            f"finish_reason={choice.finish_reason})"
+        )
+    return schema.model_validate_json(content)
+
+
 def _model_spec(feature: str) -> ModelSpec:
     """The model and request parameters configured for a feature.
 
@@ -58,6 +95,7 @@ class AsyncChatClient:
             max_retries=0,
             timeout=timeout if timeout is not None else settings.LLM_REQUEST_TIMEOUT_SECONDS,
         )
+        self._feature = feature
         spec = _model_spec(feature)
         self._model_name = spec.model
         self._extra_body = spec.params
@@ -85,7 +123,7 @@ class AsyncChatClient:
             _LLM_GATE,
             max_wait,
             lambda: with_transient_retries_async(
-                lambda: self._chat(messages, max_completion_tokens),
+                lambda: self._chat(messages, max_completion_tokens, max_wait),
                 attempts,
                 settings.LLM_TRANSIENT_RETRY_BASE_SECONDS,
             ),
@@ -95,6 +133,7 @@ class AsyncChatClient:
         self,
         messages: Iterable[ChatCompletionMessageParam],
         max_completion_tokens: int | None,
+        max_wait: float,
     ) -> str:
         logger.debug(f"Sending messages to LLM for chat:\n{messages}")
         request = {
@@ -105,7 +144,8 @@ class AsyncChatClient:
         if max_completion_tokens is not None:
             request["max_completion_tokens"] = max_completion_tokens
 
-        completion = await self._client.chat.completions.create(**request)
+        async with llm_quota_async(self._feature, max_wait):
+            completion = await self._client.chat.completions.create(**request)
         answer = completion.choices[0].message.content
         if answer is None:  # a refusal or empty completion, not a programmer invariant
             raise LLMResponseError(
@@ -116,6 +156,114 @@ class AsyncChatClient:
         return answer
 
 
+@dataclass(frozen=True)
+class LLMCall:
+    """One structured-output answer and what it took: the duration of the request that
+    produced it and its token usage (None where the provider reports none). Answers
+    from the response cache took no request and report zero."""
+
+    response: BaseModel
+    seconds: float
+    prompt_tokens: int | None
+    completion_tokens: int | None
+    cached: bool = False
+
+
+def _token_count(usage: object, name: str) -> int | None:
+    count = getattr(usage, name, None)
+    return count if isinstance(count, int) else None
+
+
+class AsyncLLMClient:
+    def __init__(self, feature: str, *, client: openai.AsyncOpenAI | None = None) -> None:
+        """`feature` selects the configured model (see LLM_FEATURES).
+
+        `client` shares one HTTP connection pool between features (the LLM engine
+        passes its own); without it the instance creates and owns a client.
+        """
+        # max_retries=0 so the gate fully owns backoff (no hidden SDK retries).
+        self._client = client or openai.AsyncOpenAI(
+            base_url=settings.LLM_BASE_URL,
+            api_key=settings.LLM_API_KEY,
+            max_retries=0,
+            timeout=settings.LLM_REQUEST_TIMEOUT_SECONDS,
+        )
+        self._feature = feature
+        spec = _model_spec(feature)
+        self._llm_model_name = spec.model
+        self._extra_body = spec.params
+
+    async def extract_data(
+        self,
+        prompt: str,
+        schema: type[BaseModel],
+        max_wait: float | None = None,
+        use_cache: bool = True,
+    ) -> BaseModel:
+        """`use_cache=False` skips the response cache lookup (the fresh answer still
+        replaces the cached one)."""
+        call = await self.extract_data_measured(prompt, schema, max_wait, use_cache)
+        return call.response
+
+    async def extract_data_measured(
+        self,
+        prompt: str,
+        schema: type[BaseModel],
+        max_wait: float | None = None,
+        use_cache: bool = True,
+    ) -> LLMCall:
+        """Like `extract_data`, but also reports the duration and token usage."""
+        if max_wait is None:
+            max_wait = float(settings.LLM_RATE_LIMIT_MAX_WAIT_SECONDS)
+
+        key = response_cache_key(self._llm_model_name, self._extra_body, prompt, schema)
+        if key is not None and use_cache:
+            cached = await sync_to_async(cached_response, thread_sensitive=False)(
+                self._feature, key, schema
+            )
+            if cached is not None:
+                return LLMCall(cached, 0.0, 0, 0, cached=True)
+
+        result = await run_through_gate_async(
+            _LLM_GATE,
+            max_wait,
+            lambda: with_transient_retries_async(
+                lambda: self._extract_data(prompt, schema, max_wait),
+                settings.LLM_TRANSIENT_RETRY_ATTEMPTS,
+                settings.LLM_TRANSIENT_RETRY_BASE_SECONDS,
+            ),
+        )
+        if key is not None:
+            await sync_to_async(store_response, thread_sensitive=False)(
+                self._feature, key, result.response
+            )
+        return result
+
+    async def _extract_data(self, prompt: str, schema: type[BaseModel], max_wait: float) -> LLMCall:
+        logger.debug("Sending prompt and schema to LLM to extract data.")
+        logger.debug("Prompt:\n%s", prompt)
+        logger.debug("Schema:\n%s", json_schema(schema))
+
+        async with llm_quota_async(self._feature, max_wait):
+            started = time.monotonic()
+            completion = await self._client.chat.completions.create(
+                model=self._llm_model_name,
+                messages=[{"role": "user", "content": prompt}],
+                response_format=response_format(schema),  # type: ignore[arg-type]
+                extra_body=self._extra_body,
+            )
+            seconds = time.monotonic() - started
+        event = _parse_completion(completion, schema, self._llm_model_name)
+        logger.debug("Received from LLM: %s", event)
+        usage = getattr(completion, "usage", None)
+        return LLMCall(
+            event,
+            seconds,
+            _token_count(usage, "prompt_tokens"),
+            _token_count(usage, "completion_tokens"),
+        )
+
+
 class LLMClient:
     def __init__(self, feature: str) -> None:
         """`feature` selects the configured model (see LLM_FEATURES)."""
@@ -126,6 +274,7 @@ class LLMClient:
             max_retries=0,
             timeout=settings.LLM_REQUEST_TIMEOUT_SECONDS,
         )
+        self._feature = feature
         spec = _model_spec(feature)
         self._llm_model_name = spec.model
         # Request parameters configured with the model, e.g. reasoning_effort.
@@ -136,36 +285,44 @@ class LLMClient:
         prompt: str,
         schema: type[BaseModel],
         max_wait: float | None = None,
+        use_cache: bool = True,
     ) -> BaseModel:
+        """`use_cache=False` skips the response cache lookup (the fresh answer still
+        replaces the cached one)."""
         if max_wait is None:
             max_wait = float(settings.LLM_RATE_LIMIT_MAX_WAIT_SECONDS)
 
-        return run_through_gate(
+        key = response_cache_key(self._llm_model_name, self._extra_body, prompt, schema)
+        if key is not None and use_cache:
+            cached = cached_response(self._feature, key, schema)
+            if cached is not None:
+                return cached
+
+        result = run_through_gate(
             _LLM_GATE,
             max_wait,
             lambda: with_transient_retries(
-                lambda: self._extract_data(prompt, schema),
+                lambda: self._extract_data(prompt, schema, max_wait),
                 settings.LLM_TRANSIENT_RETRY_ATTEMPTS,
                 settings.LLM_TRANSIENT_RETRY_BASE_SECONDS,
             ),
         )
+        if key is not None:
+            store_response(self._feature, key, result)
+        return result
 
-    def _extract_data(self, prompt: str, schema: type[BaseModel]) -> BaseModel:
+    def _extract_data(self, prompt: str, schema: type[BaseModel], max_wait: float) -> BaseModel:
         logger.debug("Sending prompt and schema to LLM to extract data.")
         logger.debug("Prompt:\n%s", prompt)
-        logger.debug("Schema:\n%s", schema.model_json_schema())
+        logger.debug("Schema:\n%s", json_schema(schema))
 
-        completion = self._client.beta.chat.completions.parse(
-            model=self._llm_model_name,
-            messages=[{"role": "user", "content": prompt}],
-            response_format=schema,
-            extra_body=self._extra_body,
-        )
-        event = completion.choices[0].message.parsed
-        if event is None:  # a refusal or a parse failure, not a programmer invariant
-            raise LLMResponseError(
-                f"LLM returned no parsed response (model={self._llm_model_name}, "
-                f"finish_reason={completion.choices[0].finish_reason})"
+        with llm_quota(self._feature, max_wait):
+            completion = self._client.chat.completions.create(
+                model=self._llm_model_name,
+                messages=[{"role": "user", "content": prompt}],
+                response_format=response_format(schema),  # type: ignore[arg-type]
+                extra_body=self._extra_body,
             )
+        event = _parse_completion(completion, schema, self._llm_model_name)
         logger.debug("Received from LLM: %s", event)
         return event
@@ -0,0 +1,209 @@
+"""One asyncio loop per worker process that runs the LLM calls of all analysis tasks.
+
+Task processors run in the worker's sync task threads. Instead of each starting a
+thread pool of its own, they submit prompts to the engine and get back
+`concurrent.futures.Future`s. The calls of every in-flight task share one pool of
+LLM_ENGINE_CONCURRENCY slots and one pooled `openai.AsyncOpenAI` client, so the limit
+holds per worker process rather than per task, and a task writes each result to the
+database as soon as its future completes instead of waiting for its slowest call.
+Slots go to waiting calls in submission order, except that `urgent` calls (an
+interactive preview someone is watching) go ahead of everything queued behind the
+batch jobs. The engine itself never touches the database (the response cache aside).
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import threading
+from concurrent.futures import Future
+
+import openai
+from django.conf import settings
+from pydantic import BaseModel
+
+from radis.core.utils.llm_client import AsyncLLMClient, LLMCall
+
+logger = logging.getLogger(__name__)
+
+
+class _Slots:
+    """`asyncio.Semaphore` whose waiters are woken by priority, then in arrival order.
+    Only ever used on the engine's loop."""
+
+    def __init__(self, size: int) -> None:
+        self._free = size
+        self._waiters: list[tuple[int, int, asyncio.Future[None]]] = []
+        self._arrivals = itertools.count()
+
+    async def acquire(self, priority: int) -> None:
+        if self._free > 0 and not self._waiters:
+            self._free -= 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (-priority, next(self._arrivals), waiter))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()  # woken and cancelled at once: pass the slot on
+            raise
+
+    def release(self) -> None:
+        while self._waiters:
+            _, _, waiter = heapq.heappop(self._waiters)
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._free += 1
+
+
+class LLMEngine:
+    def __init__(self, concurrency: int, client: openai.AsyncOpenAI | None = None) -> None:
+        """`client` replaces the configured endpoint (the `llm_benchmark` stub)."""
+        self._loop = asyncio.new_event_loop()
+        self._slots = _Slots(concurrency)
+        # max_retries=0 so the gate fully owns backoff (no hidden SDK retries).
+        self._client = client or openai.AsyncOpenAI(
+            base_url=settings.LLM_BASE_URL,
+            api_key=settings.LLM_API_KEY,
+            max_retries=0,
+            timeout=settings.LLM_REQUEST_TIMEOUT_SECONDS,
+        )
+        self._feature_clients: dict[str, AsyncLLMClient] = {}
+        self._thread = threading.Thread(target=self._run_loop, name="llm-engine", daemon=True)
+        self._thread.start()
+
+    def _run_loop(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    def submit(
+        self,
+        feature: str,
+        prompt: str,
+        schema: type[BaseModel],
+        max_wait: float | None = None,
+        use_cache: bool = True,
+        *,
+        urgent: bool = False,
+    ) -> Future[BaseModel]:
+        """Schedule one structured-output call; safe to call from any thread but the
+        engine's own. The future raises whatever `AsyncLLMClient.extract_data` raises.
+        `urgent` calls take the next free slot ahead of all queued non-urgent ones."""
+        return asyncio.run_coroutine_threadsafe(
+            self._extract_data(feature, prompt, schema, max_wait, use_cache, urgent), self._loop
+        )
+
+    def submit_measured(
+        self,
+        feature: str,
+        prompt: str,
+        schema: type[BaseModel],
+        max_wait: float | None = None,
+        use_cache: bool = True,
+        *,
+        urgent: bool = False,
+    ) -> Future[LLMCall]:
+        """Like `submit`, but the future's result also carries the call's duration and
+        token usage."""
+        return asyncio.run_coroutine_threadsafe(
+            self._extract_data(feature, prompt, schema, max_wait, use_cache, urgent, True),
+            self._loop,
+        )
+
+    async def _extract_data(
+        self,
+        feature: str,
+        prompt: str,
+        schema: type[BaseModel],
+        max_wait: float | None,
+        use_cache: bool,
+        urgent: bool,
+        measured: bool = False,
+    ) -> BaseModel | LLMCall:
+        client = self._feature_clients.get(feature)
+        if client is None:
+            client = AsyncLLMClient(feature, client=self._client)
+            self._feature_clients[feature] = client
+        await self._slots.acquire(1 if urgent else 0)
+        try:
+            call = await client.extract_data_measured(prompt, schema, max_wait, use_cache)
+        finally:
+            self._slots.release()
+        return call if measured else call.response
+
+    def close(self) -> None:
+        """Stop the loop thread. Calls still pending never complete, and the pooled
+        connections are left to the process exit (engines live as long as the worker)."""
+        if not self._thread.is_alive():
+            return
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+class EngineLLMClient:
+    """`LLMClient` look-alike for sync code whose calls should run on the engine."""
+
+    def __init__(
+        self,
+        feature: str,
+        engine: "LLMEngine | None" = None,
+        *,
+        use_cache: bool = True,
+        urgent: bool = False,
+    ) -> None:
+        """`use_cache=False` bypasses the LLM response cache for every call (a job's
+        `bypass_llm_cache`); `urgent=True` puts every call ahead of the batch work."""
+        self._feature = feature
+        self._engine = engine or get_llm_engine()
+        self._use_cache = use_cache
+        self._urgent = urgent
+
+    def submit(
+        self, prompt: str, schema: type[BaseModel], max_wait: float | None = None
+    ) -> Future[BaseModel]:
+        return self._engine.submit(
+            self._feature, prompt, schema, max_wait, self._use_cache, urgent=self._urgent
+        )
+
+    def submit_measured(
+        self, prompt: str, schema: type[BaseModel], max_wait: float | None = None
+    ) -> Future[LLMCall]:
+        return self._engine.submit_measured(
+            self._feature, prompt, schema, max_wait, self._use_cache, urgent=self._urgent
+        )
+
+    def extract_data(
+        self, prompt: str, schema: type[BaseModel], max_wait: float | None = None
+    ) -> BaseModel:
+        return self.submit(prompt, schema, max_wait).result()
+
+
+_engine: LLMEngine | None = None
+_engine_pid = 0
+_engine_lock = threading.Lock()
+
+
+def get_llm_engine() -> LLMEngine:
+    """This process's engine, started on first use (and again in a forked child,
+    which inherits the parent's engine object but not its loop thread)."""
+    global _engine, _engine_pid
+    with _engine_lock:
+        if _engine is None or _engine_pid != os.getpid():
+            _engine = LLMEngine(settings.LLM_ENGINE_CONCURRENCY)
+            _engine_pid = os.getpid()
+            logger.debug("Started LLM engine with concurrency %d", settings.LLM_ENGINE_CONCURRENCY)
+        return _engine
+
+
+def shutdown_llm_engine() -> None:
+    """Stop this process's engine; the next `get_llm_engine()` starts a fresh one.
+    Tests call this so each one gets a client built under its own `openai` patch."""
+    global _engine
+    with _engine_lock:
+        if _engine is not None and _engine_pid == os.getpid():
+            _engine.close()
+        _engine = None
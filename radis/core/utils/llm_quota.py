@@ -0,0 +1,156 @@
+"""Postgres-backed LLM budget shared by every worker and web process.
+
+`RateLimitGate` only coordinates the callers of one process, so several llm workers
+each running at full concurrency still add up to bursts of 429s at the provider. With
+LLM_SHARED_LIMIT_ENABLED every request first takes a slot from the `LLMQuota` row of
+its provider and feature:
+
+- a token bucket refilled at LLM_SHARED_REQUESTS_PER_MINUTE up to LLM_SHARED_BURST,
+  so the deployment as a whole stays under the provider's request rate;
+- at most LLM_SHARED_MAX_CONCURRENT unexpired `LLMQuotaLease` rows, so the whole
+  deployment never has more requests in flight than that;
+- `blocked_until`, set by whichever process gets a 429, so all of them pause.
+
+Each attempt is one short transaction that locks the quota row. Time comes from the
+database clock so processes on different hosts agree on it.
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import AsyncIterator, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from datetime import timedelta
+
+import openai
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Now
+
+from radis.core.models import LLMQuota, LLMQuotaLease
+from radis.core.utils.rate_limit import RateLimited, parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+# How long to wait before looking for a free concurrency slot again.
+_SLOT_POLL_SECONDS = 0.25
+
+# A lease outlives a healthy request by this much (requests are bounded by their timeout),
+# so only the leases of processes that died mid-request ever expire.
+_LEASE_MARGIN_SECONDS = 30.0
+
+
+def quota_key(feature: str) -> str:
+    """The budget a feature's requests draw from: one per provider endpoint and feature."""
+    return f"{settings.LLM_BASE_URL}#{feature}"
+
+
+def _try_acquire(key: str) -> tuple[int | None, float]:
+    """One attempt: `(lease id, 0)` when a slot was taken, else `(None, seconds)` until
+    another attempt can succeed."""
+    LLMQuota.objects.get_or_create(key=key, defaults={"tokens": float(settings.LLM_SHARED_BURST)})
+    with transaction.atomic():
+        quota = LLMQuota.objects.select_for_update().annotate(db_now=Now()).get(key=key)
+        now = quota.db_now  # type: ignore
+        if quota.blocked_until is not None and quota.blocked_until > now:
+            return None, (quota.blocked_until - now).total_seconds()
+
+        rate = settings.LLM_SHARED_REQUESTS_PER_MINUTE / 60.0
+        elapsed = max(0.0, (now - quota.refilled_at).total_seconds())
+        quota.tokens = min(float(settings.LLM_SHARED_BURST), quota.tokens + elapsed * rate)
+        quota.refilled_at = now
+
+        LLMQuotaLease.objects.filter(quota=quota, expires_at__lte=now).delete()
+        if quota.tokens < 1.0:
+            quota.save(update_fields=["tokens", "refilled_at"])
+            return None, (1.0 - quota.tokens) / rate
+        if LLMQuotaLease.objects.filter(quota=quota).count() >= settings.LLM_SHARED_MAX_CONCURRENT:
+            quota.save(update_fields=["tokens", "refilled_at"])
+            return None, _SLOT_POLL_SECONDS
+
+        quota.tokens -= 1.0
+        quota.save(update_fields=["tokens", "refilled_at"])
+        lease = LLMQuotaLease.objects.create(
+            quota=quota,
+            acquired_at=now,
+            expires_at=now
+            + timedelta(seconds=settings.LLM_REQUEST_TIMEOUT_SECONDS + _LEASE_MARGIN_SECONDS),
+        )
+        return lease.pk, 0.0
+
+
+def _release(key: str, lease_id: int, block_seconds: float | None) -> None:
+    LLMQuotaLease.objects.filter(pk=lease_id).delete()
+    if block_seconds is not None:
+        until = Now() + timedelta(seconds=block_seconds)
+        # Like the gate: a shorter pause never shrinks an already longer one.
+        LLMQuota.objects.filter(key=key).filter(
+            Q(blocked_until__isnull=True) | Q(blocked_until__lt=until)
+        ).update(blocked_until=until, last_rate_limited_at=Now())
+
+
+def _shared_pause(exc: openai.RateLimitError) -> float:
+    """How long a 429 pauses everyone: a sane Retry-After, else the first backoff step
+    (each process's own gate climbs the backoff ladder on top of that)."""
+    retry_after = parse_retry_after(exc)
+    if retry_after is not None and retry_after < settings.LLM_RATE_LIMIT_HEADER_CEILING_SECONDS:
+        return retry_after
+    return settings.LLM_RATE_LIMIT_BACKOFF_BASE_SECONDS
+
+
+@contextmanager
+def llm_quota(feature: str, budget: float) -> Iterator[None]:
+    """Hold one shared slot for the duration of a request. Waits up to `budget` seconds
+    for one and raises `RateLimited` if none frees up in time. A no-op unless
+    LLM_SHARED_LIMIT_ENABLED."""
+    if not settings.LLM_SHARED_LIMIT_ENABLED:
+        yield
+        return
+
+    key = quota_key(feature)
+    deadline = time.monotonic() + budget
+    while True:
+        lease_id, wait = _try_acquire(key)
+        if lease_id is not None:
+            break
+        if time.monotonic() + wait > deadline:
+            raise RateLimited("Shared LLM budget exhausted beyond the wait budget")
+        time.sleep(wait)
+
+    block_seconds = None
+    try:
+        yield
+    except openai.RateLimitError as exc:
+        block_seconds = _shared_pause(exc)
+        raise
+    finally:
+        _release(key, lease_id, block_seconds)
+
+
+@asynccontextmanager
+async def llm_quota_async(feature: str, budget: float) -> AsyncIterator[None]:
+    """Async twin of `llm_quota`; the database round trips run in a thread."""
+    if not settings.LLM_SHARED_LIMIT_ENABLED:
+        yield
+        return
+
+    key = quota_key(feature)
+    deadline = time.monotonic() + budget
+    while True:
+        lease_id, wait = await sync_to_async(_try_acquire, thread_sensitive=False)(key)
+        if lease_id is not None:
+            break
+        if time.monotonic() + wait > deadline:
+            raise RateLimited("Shared LLM budget exhausted beyond the wait budget")
+        await asyncio.sleep(wait)
+
+    block_seconds = None
+    try:
+        yield
+    except openai.RateLimitError as exc:
+        block_seconds = _shared_pause(exc)
+        raise
+    finally:
+        await sync_to_async(_release, thread_sensitive=False)(key, lease_id, block_seconds)
@@ -105,7 +105,7 @@ class RateLimitGate:
             await self._async_sleep(max(0.0, open_at - self._now()))
 
 
-def _parse_retry_after(exc: openai.RateLimitError) -> float | None:
+def parse_retry_after(exc: openai.RateLimitError) -> float | None:
     """Read Retry-After from a 429 response as seconds, or None.
 
     Handles `retry-after-ms`, `retry-after` in seconds, and an HTTP-date.
@@ -161,7 +161,7 @@ def run_through_gate[T](
             gate.note_success()
             return result
         except openai.RateLimitError as exc:
-            retry_after = _parse_retry_after(exc)
+            retry_after = parse_retry_after(exc)
             pause = gate.note_rate_limited(retry_after)  # arm first so others back off too
             logger.warning("Rate-limited; backing off %.1fs", pause)
             # Loop back: wait_until_open() waits out the (clamped) window if it fits the
@@ -184,7 +184,7 @@ async def run_through_gate_async[T](
             gate.note_success()
             return result
         except openai.RateLimitError as exc:
-            retry_after = _parse_retry_after(exc)
+            retry_after = parse_retry_after(exc)
             pause = gate.note_rate_limited(retry_after)  # arm first so others back off too
             logger.warning("Rate-limited; backing off %.1fs", pause)
             # Loop back: wait_until_open_async() waits out the (clamped) window if it fits
@@ -20,6 +20,7 @@ from radis.search.utils.query_parser import QueryParser
 
 from .models import ExtractionJob, OutputField, OutputType
 from .site import extraction_retrieval_provider
+from .utils.result_values import FILTER_OP_LABELS, filter_ops
 from .utils.validation import validate_selection_options
 
 
@@ -325,6 +326,10 @@ class SummaryForm(forms.Form):
         label="Notify me via Email when job is finished",
         required=False,
     )
+    bypass_llm_cache = forms.BooleanField(
+        label="Ask the LLM again instead of reusing cached answers",
+        required=False,
+    )
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -332,3 +337,53 @@ class SummaryForm(forms.Form):
         self.helper = FormHelper()
         self.helper.form_tag = False
         self.helper.disable_csrf = True
+
+
+class ExtractionResultFilterForm(forms.Form):
+    """Filter of the results table by one output field (`?field=...&op=...&value=...`).
+
+    The cleaned `value` has the field's type and `output_field` is the field itself."""
+
+    field = forms.ChoiceField()
+    op = forms.ChoiceField(choices=list(FILTER_OP_LABELS.items()))
+    value = forms.CharField(max_length=200)
+
+    def __init__(self, *args, output_fields: list[OutputField], **kwargs):
+        super().__init__(*args, **kwargs)
+        self.output_fields = {field.name: field for field in output_fields}
+        self.fields["field"].choices = [(name, name) for name in self.output_fields]
+
+    def clean(self) -> dict[str, Any]:
+        cleaned_data = super().clean() or {}
+        field = self.output_fields.get(cleaned_data.get("field", ""))
+        op = cleaned_data.get("op")
+        raw = cleaned_data.get("value")
+        if field is None or op is None or raw is None:
+            return cleaned_data
+
+        if op not in filter_ops(field):
+            allowed = ", ".join(FILTER_OP_LABELS[allowed] for allowed in filter_ops(field))
+            raise forms.ValidationError(
+                f"The field {field.name} can only be filtered by {allowed}."
+            )
+
+        if field.output_type == OutputType.NUMERIC:
+            try:
+                value: Any = float(raw)
+            except ValueError:
+                raise forms.ValidationError(f"The field {field.name} needs a number.")
+        elif field.output_type == OutputType.BOOLEAN:
+            value = {"true": True, "yes": True, "false": False, "no": False}.get(raw.lower())
+            if value is None:
+                raise forms.ValidationError(f"The field {field.name} needs true or false.")
+        elif field.output_type == OutputType.SELECTION:
+            if raw not in field.selection_options:
+                options = ", ".join(field.selection_options)
+                raise forms.ValidationError(f"The field {field.name} needs one of: {options}.")
+            value = raw
+        else:
+            value = raw
+
+        cleaned_data["output_field"] = field
+        cleaned_data["value"] = value
+        return cleaned_data
@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("extractions", "0007_alter_extractionjob_language"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="extractionjob",
+            name="preparation_seconds",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="extractionjob",
+            name="prepared_task_count",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="extractionjob",
+            name="prepared_instance_count",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("extractions", "0008_extractionjob_preparation_stats"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="extractionjob",
+            name="bypass_llm_cache",
+            field=models.BooleanField(default=False),
+        ),
+    ]
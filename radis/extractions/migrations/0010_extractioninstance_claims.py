@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("extractions", "0009_extractionjob_bypass_llm_cache"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="extractioninstance",
+            name="claimed_until",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="extractioninstance",
+            name="claim_count",
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+    ]
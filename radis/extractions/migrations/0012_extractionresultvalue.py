@@ -0,0 +1,60 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("extractions", "0011_extractionpreview"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="extractionjob",
+            name="result_values_built_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name="ExtractionResultValue",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("number", models.FloatField(null=True)),
+                ("text", models.TextField(null=True)),
+                ("boolean", models.BooleanField(null=True)),
+                (
+                    "field",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="extractions.outputfield",
+                    ),
+                ),
+                (
+                    "instance",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="result_values",
+                        to="extractions.extractioninstance",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("field", "instance"),
+                        name="unique_result_value_per_field_and_instance",
+                    )
+                ],
+                "indexes": [
+                    models.Index(fields=["field", "number"], name="extractions_rv_number_idx"),
+                    models.Index(fields=["field", "text"], name="extractions_rv_text_idx"),
+                    models.Index(fields=["field", "boolean"], name="extractions_rv_boolean_idx"),
+                ],
+            },
+        ),
+    ]
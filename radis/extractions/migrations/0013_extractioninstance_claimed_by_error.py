@@ -0,0 +1,28 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("extractions", "0012_extractionresultvalue"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="extractioninstance",
+            name="claimed_by",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="extractions.extractiontask",
+            ),
+        ),
+        migrations.AddField(
+            model_name="extractioninstance",
+            name="error",
+            field=models.TextField(blank=True, default=""),
+        ),
+    ]
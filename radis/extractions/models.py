@@ -3,9 +3,11 @@ from collections.abc import Callable
 from adit_radis_shared.common.models import AppSettings
 from django.conf import settings
 from django.contrib.auth.models import Group
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.db.models import Q
 from django.urls import reverse
+from procrastinate import exceptions
 from procrastinate.contrib.django import app
 from procrastinate.contrib.django.models import ProcrastinateJob
 
@@ -51,6 +53,13 @@ class ExtractionJob(AnalysisJob):
     )
     age_from = models.IntegerField(null=True, blank=True)
     age_till = models.IntegerField(null=True, blank=True)
+    # Recorded by `process_extraction_job` once the tasks and instances exist.
+    preparation_seconds = models.FloatField(null=True, blank=True)
+    prepared_task_count = models.PositiveIntegerField(null=True, blank=True)
+    prepared_instance_count = models.PositiveIntegerField(null=True, blank=True)
+    # When the typed `ExtractionResultValue` rows of the job were last built (see
+    # radis.extractions.utils.result_values).
+    result_values_built_at = models.DateTimeField(null=True, blank=True)
 
     output_fields: models.QuerySet["OutputField"]
     tasks: models.QuerySet["ExtractionTask"]
@@ -73,6 +82,36 @@ class ExtractionJob(AnalysisJob):
         self.queued_job_id = queued_job_id
         self.save()
 
+    def delay_result_values_build(self) -> None:
+        """Defer building the typed result values of the finished job (see
+        radis.extractions.utils.result_values). Builds of a job run one at a time and are
+        queued at most once until they run."""
+        lock = f"extraction-result-values-{self.pk}"
+        try:
+            app.configure_task(
+                "radis.extractions.tasks.build_extraction_result_values",
+                allow_unknown=False,
+                lock=lock,
+                queueing_lock=lock,
+            ).defer(job_id=self.pk)
+        except exceptions.AlreadyEnqueued:
+            pass
+
+    def update_job_state(self) -> bool:
+        finished = super().update_job_state()
+        if finished:
+            self.delay_result_values_build()
+        return finished
+
+    def reset_tasks(self, only_failed=False) -> models.QuerySet[AnalysisTask]:
+        tasks = super().reset_tasks(only_failed)
+        # With EXTRACTION_WORK_STEALING any task may pick up any unprocessed instance of
+        # the job, so a retry gives all of them a fresh set of claims.
+        ExtractionInstance.objects.filter(task__job=self, is_processed=False).update(
+            claimed_until=None, claimed_by=None, claim_count=0, error=""
+        )
+        return tasks
+
 
 class OutputType(models.TextChoices):
     TEXT = "T", "Text"
@@ -174,9 +213,146 @@ class ExtractionInstance(models.Model):
     text = models.TextField()
     is_processed = models.BooleanField(default=False)
     output = models.JSONField(null=True, blank=True)
+    # Work-stealing lease (EXTRACTION_WORK_STEALING): the instance belongs to the task
+    # that claimed it until then, and how often it was claimed so far. `error` is the
+    # failure of its last attempt, kept on the instance rather than on the task that
+    # happened to run it.
+    claimed_until = models.DateTimeField(null=True, blank=True)
+    claimed_by = models.ForeignKey[ExtractionTask](
+        ExtractionTask, null=True, blank=True, on_delete=models.SET_NULL, related_name="+"
+    )
+    claim_count = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True, default="")
 
     def __str__(self) -> str:
         return f"Extraction Instance [{self.pk}]"
 
     def get_absolute_url(self) -> str:
         return reverse("extraction_instance_detail", args=[self.task.pk, self.pk])
+
+
+class ExtractionResultValue(models.Model):
+    """Typed copy of one scalar output value of a finished job, indexed per field so
+    the results table can filter and sort by it. The column matching the value's JSON
+    type is set, the others are null. Array outputs have no rows."""
+
+    instance = models.ForeignKey[ExtractionInstance](
+        ExtractionInstance, on_delete=models.CASCADE, related_name="result_values"
+    )
+    field = models.ForeignKey[OutputField](OutputField, on_delete=models.CASCADE, related_name="+")
+    number = models.FloatField(null=True)
+    text = models.TextField(null=True)  # noqa: DJ001 (null marks a non-string value)
+    boolean = models.BooleanField(null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["field", "instance"], name="unique_result_value_per_field_and_instance"
+            )
+        ]
+        indexes = [
+            models.Index(fields=["field", "number"], name="extractions_rv_number_idx"),
+            models.Index(fields=["field", "text"], name="extractions_rv_text_idx"),
+            models.Index(fields=["field", "boolean"], name="extractions_rv_boolean_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"ExtractionResultValue [{self.pk}]"
+
+
+class ExtractionPreview(models.Model):
+    """A trial run of the extraction wizard's output fields on a stratified sample of
+    the reports its search retrieves (see `radis.extractions.utils.preview`).
+
+    The measured latency and token use of the sample calls project how long and how
+    expensive the full job would be."""
+
+    class Status(models.TextChoices):
+        PENDING = "PE", "Pending"
+        IN_PROGRESS = "IP", "In Progress"
+        SUCCESS = "SU", "Success"
+        FAILURE = "FA", "Failure"
+
+    owner_id: int
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+    group = models.ForeignKey[Group](Group, on_delete=models.CASCADE, related_name="+")
+    query = models.CharField(max_length=200)
+    # The `SearchFilters` of the wizard's search step, group excluded.
+    filters = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    # The output fields in the wizard's `output_fields_data` format.
+    output_fields = models.JSONField(default=list)
+    status = models.CharField(max_length=2, choices=Status.choices, default=Status.PENDING)
+    get_status_display: Callable[[], str]
+    message = models.TextField(blank=True, default="")
+    population_count = models.PositiveIntegerField(null=True, blank=True)
+    # One dict per sampled report: report_id, document_id, modality, language, year,
+    # and either output or error.
+    results = models.JSONField(default=list)
+    call_count = models.PositiveIntegerField(default=0)
+    llm_seconds = models.FloatField(default=0.0)
+    prompt_tokens = models.PositiveIntegerField(null=True, blank=True)
+    completion_tokens = models.PositiveIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    ended_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self) -> str:
+        return f"ExtractionPreview [{self.pk}]"
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (self.Status.SUCCESS, self.Status.FAILURE)
+
+    def delay(self) -> None:
+        app.configure_task(
+            "radis.extractions.tasks.run_extraction_preview",
+            allow_unknown=False,
+            priority=settings.EXTRACTION_PREVIEW_PRIORITY,
+        ).defer(preview_id=self.pk)
+
+    def field_names(self) -> list[str]:
+        return [field["name"] for field in self.output_fields]
+
+    def result_rows(self) -> list[tuple[dict, list]]:
+        """Each result with its output values in field order (for the preview table)."""
+        names = self.field_names()
+        return [
+            (result, [(result.get("output") or {}).get(name) for name in names])
+            for result in self.results
+        ]
+
+    @property
+    def mean_call_seconds(self) -> float | None:
+        return self.llm_seconds / self.call_count if self.call_count else None
+
+    @property
+    def projected_seconds(self) -> float | None:
+        """The LLM time of the full job on one llm worker, whose engine runs
+        LLM_ENGINE_CONCURRENCY calls at once (each further worker divides it)."""
+        if self.mean_call_seconds is None or self.population_count is None:
+            return None
+        return self.population_count * self.mean_call_seconds / settings.LLM_ENGINE_CONCURRENCY
+
+    def _projected_tokens(self, sampled: int | None) -> int | None:
+        if sampled is None or not self.call_count or self.population_count is None:
+            return None
+        return round(sampled / self.call_count * self.population_count)
+
+    @property
+    def projected_prompt_tokens(self) -> int | None:
+        return self._projected_tokens(self.prompt_tokens)
+
+    @property
+    def projected_completion_tokens(self) -> int | None:
+        return self._projected_tokens(self.completion_tokens)
+
+    @property
+    def projected_cost(self) -> float | None:
+        """Priced with LLM_PRICE_PER_MILLION_*_TOKENS; None while those are unset or the
+        provider reports no token usage."""
+        prompt_price = settings.LLM_PRICE_PER_MILLION_PROMPT_TOKENS
+        completion_price = settings.LLM_PRICE_PER_MILLION_COMPLETION_TOKENS
+        prompt_tokens = self.projected_prompt_tokens
+        completion_tokens = self.projected_completion_tokens
+        if not (prompt_price or completion_price) or prompt_tokens is None:
+            return None
+        return (prompt_tokens * prompt_price + (completion_tokens or 0) * completion_price) / 1e6
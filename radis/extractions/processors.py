@@ -1,71 +1,215 @@
 import logging
-from concurrent.futures import Future, ThreadPoolExecutor
-from string import Template
+import time
+from collections.abc import Iterable
+from concurrent.futures import FIRST_COMPLETED, Future, as_completed, wait
+from datetime import timedelta
 
-from django import db
 from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, F, Q, When
+from django.utils import timezone
 
+from radis.core.models import AnalysisJob
 from radis.core.processors import AnalysisTaskProcessor
-from radis.core.utils.llm_client import LLMClient
-from radis.extractions.utils.processor_utils import (
-    generate_output_fields_prompt,
-    generate_output_fields_schema,
-)
+from radis.core.utils.llm_engine import EngineLLMClient
+from radis.extractions.utils.processor_utils import ExtractionPlan, compile_extraction_plan
 
-from .models import ExtractionInstance, ExtractionTask
+from .models import ExtractionInstance, ExtractionJob, ExtractionTask
 
 logger = logging.getLogger(__name__)
 
+# How often a work-stealing task whose own instances are leased to other tasks checks
+# whether they were answered or came free again.
+_CLAIM_POLL_SECONDS = 5.0
+
+
+def claim_instances(task: ExtractionTask, limit: int) -> list[ExtractionInstance]:
+    """Lease up to `limit` unprocessed instances of the task's job, the task's own first.
+
+    Rows another worker is claiming right now are skipped rather than waited for, and
+    leases that ran out (their worker died) count as free again."""
+    now = timezone.now()
+    with transaction.atomic():
+        pks = list(
+            ExtractionInstance.objects.select_for_update(skip_locked=True, of=("self",))
+            .filter(
+                task__job_id=task.job_id,
+                is_processed=False,
+                claim_count__lt=settings.EXTRACTION_CLAIM_MAX_ATTEMPTS,
+            )
+            .filter(Q(claimed_until__isnull=True) | Q(claimed_until__lt=now))
+            .order_by(Case(When(task_id=task.pk, then=0), default=1), "pk")
+            .values_list("pk", flat=True)[:limit]
+        )
+        ExtractionInstance.objects.filter(pk__in=pks).update(
+            claimed_until=now + timedelta(seconds=settings.EXTRACTION_CLAIM_LEASE_SECONDS),
+            claimed_by=task,
+            claim_count=F("claim_count") + 1,
+        )
+    return list(ExtractionInstance.objects.filter(pk__in=pks).select_related("report"))
+
+
+def renew_claims(task: ExtractionTask, instances: Iterable[ExtractionInstance]) -> None:
+    """Extend the leases the task still holds on `instances`, whose calls are queued on
+    the engine or running. Leases that ran out and went to another task stay theirs."""
+    ExtractionInstance.objects.filter(
+        pk__in=[instance.pk for instance in instances], claimed_by=task, is_processed=False
+    ).update(
+        claimed_until=timezone.now() + timedelta(seconds=settings.EXTRACTION_CLAIM_LEASE_SECONDS)
+    )
+
 
 class ExtractionTaskProcessor(AnalysisTaskProcessor):
     def __init__(self, task: ExtractionTask) -> None:
         super().__init__(task)
-        self.client = LLMClient("extractions")
+        self.client = EngineLLMClient("extractions", use_cache=not task.job.bypass_llm_cache)
 
     def process_task(self, task: ExtractionTask) -> None:
-        with ThreadPoolExecutor(max_workers=settings.EXTRACTION_LLM_CONCURRENCY_LIMIT) as executor:
-            try:
-                futures: list[Future] = []
-                for instance in task.instances.all():
-                    future = executor.submit(self.process_instance, instance)
-                    futures.append(future)
-
-                exceptions: list[Exception] = []
-                for future in futures:
-                    try:
-                        future.result()
-                    except Exception as e:
-                        logger.error("Error processing instance in extraction task: %s", e)
-                        exceptions.append(e)
+        # Instances go to the worker's LLM engine, which bounds how many run at once
+        # across every task in this process. Results are written here, in the task's
+        # own thread, in the order the calls finish.
+        plan = compile_extraction_plan(
+            task.job.output_fields.order_by("pk"), settings.OUTPUT_FIELDS_SYSTEM_PROMPT
+        )
+        if settings.EXTRACTION_WORK_STEALING:
+            self._process_claims(task, plan)
+            return
+
+        # Instances answered by an earlier, partially failed run are kept.
+        futures: dict[Future, ExtractionInstance] = {}
+        for instance in task.instances.filter(is_processed=False).select_related("report"):
+            futures[self._submit(plan, instance)] = instance
+
+        # Answered instances are buffered and bulk-updated in batches. Whatever ends the
+        # loop, the buffer is flushed, so exactly the answered instances end up processed
+        # and a retry only redoes the rest.
+        answered: list[ExtractionInstance] = []
+        exceptions: list[Exception] = []
+        try:
+            for future in as_completed(futures):
+                instance = futures[future]
+                try:
+                    self._answer(instance, future)
+                except Exception as e:
+                    logger.error("Error processing instance in extraction task: %s", e)
+                    exceptions.append(e)
+                    continue
+                answered.append(instance)
+                if len(answered) >= settings.EXTRACTION_RESULT_FLUSH_SIZE:
+                    self._save_answered(answered)
+        finally:
+            self._save_answered(answered)
 
-                if exceptions:
-                    raise exceptions[0]
+        if exceptions:
+            raise exceptions[0]
 
-            finally:
-                db.close_old_connections()
+    def _process_claims(self, task: ExtractionTask, plan: ExtractionPlan) -> None:
+        """Work-stealing mode: keep EXTRACTION_CLAIM_SIZE instances of the job in flight,
+        claiming more whenever calls finish, until the job has none left to claim.
 
-    def process_instance(self, instance: ExtractionInstance) -> None:
-        # Runs in a worker thread; its connection must be closed in that same
-        # thread, also when processing fails.
+        Leases are renewed while their calls are pending. Once nothing is left to claim,
+        the task waits for its own instances still leased to other tasks, so it ends only
+        when each of them is answered or out of attempts. Its status comes from those
+        counts: a failed call is recorded on its instance, and fails the task the
+        instance belongs to once the instance has no attempts left, whichever task ran
+        it."""
+        renew_every = settings.EXTRACTION_CLAIM_LEASE_SECONDS / 3
+        futures: dict[Future, ExtractionInstance] = {}
+        answered: list[ExtractionInstance] = []
+        processed = stolen = 0
+        drained = canceled = False
+        renewed_at = time.monotonic()
         try:
-            assert not instance.is_processed
-            instance.text = instance.report.body
-            self.process_output_fields(instance)
-            instance.is_processed = True
-            instance.save()
+            while True:
+                if not drained and len(futures) < settings.EXTRACTION_CLAIM_SIZE:
+                    claimed = []
+                    canceled = self._is_canceling(task)
+                    if not canceled:
+                        claimed = claim_instances(
+                            task, settings.EXTRACTION_CLAIM_SIZE - len(futures)
+                        )
+                    drained = not claimed
+                    for instance in claimed:
+                        futures[self._submit(plan, instance)] = instance
+                if not futures:
+                    if canceled or not self._leased_elsewhere(task):
+                        break
+                    time.sleep(_CLAIM_POLL_SECONDS)
+                    drained = False
+                    continue
+
+                done, _ = wait(futures, timeout=renew_every, return_when=FIRST_COMPLETED)
+                for future in done:
+                    instance = futures.pop(future)
+                    try:
+                        self._answer(instance, future)
+                    except Exception as e:
+                        logger.error("Error processing instance in extraction task: %s", e)
+                        # Free for another attempt right away (within the claim limit).
+                        ExtractionInstance.objects.filter(pk=instance.pk).update(
+                            claimed_until=None, claimed_by=None, error=str(e)
+                        )
+                        continue
+                    answered.append(instance)
+                    processed += 1
+                    stolen += instance.task_id != task.pk
+                if len(answered) >= settings.EXTRACTION_RESULT_FLUSH_SIZE:
+                    self._save_answered(answered)
+                if futures and time.monotonic() - renewed_at >= renew_every:
+                    renew_claims(task, futures.values())
+                    renewed_at = time.monotonic()
         finally:
-            db.connections.close_all()
-
-    def process_output_fields(self, instance: ExtractionInstance) -> None:
-        job = instance.task.job
-        output_fields = list(job.output_fields.order_by("pk"))
-        Schema = generate_output_fields_schema(output_fields)
-        prompt = Template(settings.OUTPUT_FIELDS_SYSTEM_PROMPT).substitute(
-            {
-                "report": instance.text,
-                "fields": generate_output_fields_prompt(output_fields),
-            }
+            self._save_answered(answered)
+
+        task.message = f"Processed {processed} instance(s), {stolen} of them from other tasks."
+        counts = task.instances.aggregate(
+            unprocessed=Count("pk", filter=Q(is_processed=False)),
+            failed=Count("pk", filter=Q(is_processed=False) & ~Q(error="")),
         )
-        result = self.client.extract_data(prompt.strip(), Schema)
-        instance.output = result.model_dump()
-        instance.save()
+        if not counts["unprocessed"]:
+            return
+        if canceled:
+            task.status = ExtractionTask.Status.CANCELED
+            task.message += f" {counts['unprocessed']} instance(s) of this task were canceled."
+            return
+
+        # Nothing left to claim and nothing leased: the rest ran out of attempts, with a
+        # failed call or with their workers dying.
+        task.status = ExtractionTask.Status.FAILURE
+        task.message += f" {counts['unprocessed']} instance(s) of this task failed"
+        error = (
+            task.instances.filter(is_processed=False)
+            .exclude(error="")
+            .values_list("error", flat=True)
+            .first()
+        )
+        task.message += f": {error}" if error else "."
+
+    def _leased_elsewhere(self, task: ExtractionTask) -> bool:
+        """Whether instances of the task are still leased to other tasks."""
+        return task.instances.filter(is_processed=False, claimed_until__gte=timezone.now()).exists()
+
+    def _is_canceling(self, task: ExtractionTask) -> bool:
+        return ExtractionJob.objects.filter(
+            pk=task.job_id,
+            status__in=[AnalysisJob.Status.CANCELING, AnalysisJob.Status.CANCELED],
+        ).exists()
+
+    def _submit(self, plan: ExtractionPlan, instance: ExtractionInstance) -> Future:
+        instance.text = instance.report.body
+        return self.client.submit(plan.render(instance.text).strip(), plan.schema)
+
+    def _answer(self, instance: ExtractionInstance, future: Future) -> None:
+        instance.output = future.result().model_dump()
+        instance.is_processed = True
+        instance.claimed_until = None
+        instance.claimed_by = None
+        instance.error = ""
+
+    def _save_answered(self, answered: list[ExtractionInstance]) -> None:
+        if answered:
+            ExtractionInstance.objects.bulk_update(
+                answered,
+                ["text", "output", "is_processed", "claimed_until", "claimed_by", "error"],
+            )
+            answered.clear()
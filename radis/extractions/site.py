@@ -14,12 +14,16 @@ class ExtractionRetrievalProvider(NamedTuple):
       for a search.
     - max_results: The maximum number of results that can be retrieved by this
       provider, or None if there is no limit.
+    - retrieve_report_ids: Optional. A function that retrieves the report primary keys
+      for a search (same results and order as `retrieve`), so job preparation doesn't
+      have to resolve each document ID with its own query.
     """
 
     name: str
     count: Callable[[Search], int]
     retrieve: Callable[[Search], Iterable[str]]
     max_results: int | None
+    retrieve_report_ids: Callable[[Search], Iterable[int]] | None = None
 
 
 extraction_retrieval_provider: ExtractionRetrievalProvider | None = None
@@ -2,7 +2,8 @@ import django_tables2 as tables
 
 from radis.core.tables import AnalysisJobTable, AnalysisTaskTable
 
-from .models import ExtractionInstance, ExtractionJob, ExtractionTask
+from .models import ExtractionInstance, ExtractionJob, ExtractionTask, OutputField
+from .utils.result_values import order_results
 
 
 class ExtractionJobTable(AnalysisJobTable):
@@ -25,6 +26,21 @@ class ExtractionInstanceTable(tables.Table):
         attrs = {"class": "table table-bordered table-hover"}
 
 
+class OutputValueColumn(tables.Column):
+    """A column of one output field, sorted in the database by its value (see
+    radis.extractions.utils.result_values). Array fields can't be sorted."""
+
+    def __init__(self, field: OutputField, typed: bool, **kwargs):
+        super().__init__(
+            field.name, accessor=f"output.{field.name}", orderable=not field.is_array, **kwargs
+        )
+        self.field = field
+        self.typed = typed
+
+    def order(self, queryset, is_descending):
+        return order_results(queryset, self.field, is_descending, self.typed), True
+
+
 class ExtractionResultsTable(tables.Table):
     id = tables.LinkColumn("extraction_instance_detail", args=[tables.A("id")])
 
@@ -1,8 +1,12 @@
 import logging
+import time
+from collections.abc import Iterable, Iterator
 from itertools import batched
 
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.utils import timezone
 from procrastinate.contrib.django import app
 
 from radis.reports.models import Report
@@ -10,12 +14,69 @@ from radis.search.site import Search, SearchFilters
 from radis.search.utils.query_parser import QueryParser
 
 from . import site
-from .models import ExtractionInstance, ExtractionJob, ExtractionTask
+from .models import ExtractionInstance, ExtractionJob, ExtractionPreview, ExtractionTask
 from .processors import ExtractionTaskProcessor
+from .site import ExtractionRetrievalProvider
+from .utils.preview import preview_search, run_preview
+from .utils.result_values import build_result_values
 
 logger = logging.getLogger(__name__)
 
 
+def _retrieve_report_ids(provider: ExtractionRetrievalProvider, search: Search) -> Iterator[int]:
+    """Report primary keys for the search, in retrieval order.
+
+    Uses the provider's `retrieve_report_ids` when it has one. Otherwise document
+    IDs are resolved in batches (one query per batch, not per document); IDs that
+    no longer match a report are skipped."""
+    if provider.retrieve_report_ids is not None:
+        yield from provider.retrieve_report_ids(search)
+        return
+
+    for document_ids in batched(provider.retrieve(search), settings.EXTRACTION_TASK_BATCH_SIZE):
+        pks = dict(
+            Report.objects.filter(document_id__in=document_ids).values_list("document_id", "pk")
+        )
+        missing = [document_id for document_id in document_ids if document_id not in pks]
+        if missing:
+            logger.warning("Skipping %d unknown document ID(s): %s", len(missing), missing[:10])
+        yield from (pks[document_id] for document_id in document_ids if document_id in pks)
+
+
+def _create_tasks(job: ExtractionJob, report_ids: Iterable[int]) -> tuple[int, int]:
+    """Create the job's tasks and instances with bulk inserts.
+
+    Every EXTRACTION_TASK_BATCH_SIZE reports form one task. Tasks are written in
+    chunks of about EXTRACTION_PREPARATION_CHUNK_SIZE instances, each chunk in its
+    own transaction: two INSERTs per chunk instead of two queries per report.
+    Returns (task count, instance count)."""
+    task_batch_size = settings.EXTRACTION_TASK_BATCH_SIZE
+    tasks_per_chunk = max(1, settings.EXTRACTION_PREPARATION_CHUNK_SIZE // task_batch_size)
+    task_count = 0
+    instance_count = 0
+    for chunk in batched(batched(report_ids, task_batch_size), tasks_per_chunk):
+        with transaction.atomic():
+            tasks = ExtractionTask.objects.bulk_create(
+                [ExtractionTask(job=job, status=ExtractionTask.Status.PENDING) for _ in chunk]
+            )
+            instances = ExtractionInstance.objects.bulk_create(
+                [
+                    ExtractionInstance(task=task, report_id=report_id)
+                    for task, task_report_ids in zip(tasks, chunk, strict=True)
+                    for report_id in task_report_ids
+                ]
+            )
+        task_count += len(tasks)
+        instance_count += len(instances)
+        logger.debug(
+            "Created %d extraction task(s) with %d instance(s) for job %s",
+            len(tasks),
+            len(instances),
+            job,
+        )
+    return task_count, instance_count
+
+
 @app.task(queue="llm")
 def process_extraction_task(task_id: int) -> None:
     task = ExtractionTask.objects.get(id=task_id)
@@ -84,15 +145,20 @@ def process_extraction_job(job_id: int) -> None:
 
         logger.debug("Searching reports for task with search: %s", search)
 
-        for document_ids in batched(
-            retrieval_provider.retrieve(search), settings.EXTRACTION_TASK_BATCH_SIZE
-        ):
-            logger.debug("Creating an extraction task for document IDs: %s", document_ids)
-            task = ExtractionTask.objects.create(job=job, status=ExtractionTask.Status.PENDING)
-
-            for document_id in document_ids:
-                report = Report.objects.get(document_id=document_id)
-                ExtractionInstance.objects.create(task=task, report_id=report.pk)
+        start = time.perf_counter()
+        task_count, instance_count = _create_tasks(
+            job, _retrieve_report_ids(retrieval_provider, search)
+        )
+        job.preparation_seconds = time.perf_counter() - start
+        job.prepared_task_count = task_count
+        job.prepared_instance_count = instance_count
+        logger.info(
+            "Prepared job %s: %d task(s), %d instance(s) in %.2fs",
+            job,
+            task_count,
+            instance_count,
+            job.preparation_seconds,
+        )
 
         # Preparation is complete. Only now do we allow enqueuing tasks.
         job.status = ExtractionJob.Status.PENDING
@@ -109,3 +175,38 @@ def process_extraction_job(job_id: int) -> None:
     for task in tasks_to_enqueue:
         if not task.is_queued:
             task.delay()
+
+
+@app.task
+def build_extraction_result_values(job_id: int) -> None:
+    if build_result_values(job_id):
+        logger.info("Built the typed result values of extraction job %s", job_id)
+
+
+@app.task(queue="llm")
+def run_extraction_preview(preview_id: int) -> None:
+    preview = ExtractionPreview.objects.get(id=preview_id)
+    preview.status = ExtractionPreview.Status.IN_PROGRESS
+    preview.save()
+
+    try:
+        if site.extraction_retrieval_provider is None:
+            raise ImproperlyConfigured("Extraction retrieval provider is not configured.")
+        provider = site.extraction_retrieval_provider
+        search = preview_search(preview, provider.max_results)
+        run_preview(preview, list(_retrieve_report_ids(provider, search)))
+    except Exception as e:
+        # The wizard shows the outcome; there is nothing to retry in the background.
+        logger.exception("Extraction preview %s failed", preview)
+        preview.status = ExtractionPreview.Status.FAILURE
+        preview.message = str(e)
+    else:
+        preview.status = ExtractionPreview.Status.SUCCESS
+        failed = sum("error" in result for result in preview.results)
+        preview.message = (
+            f"Answered {preview.call_count} of {len(preview.results)} sampled report(s)."
+        )
+        if failed:
+            preview.message += f" {failed} call(s) failed."
+    preview.ended_at = timezone.now()
+    preview.save()
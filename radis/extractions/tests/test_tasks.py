@@ -112,3 +112,82 @@ def test_process_extraction_job_with_no_language_matches_each_documents_own_conf
     # query still reaches the document written in that language.
     assert matched_document_ids("effusion") == {english.document_id}
     assert matched_document_ids("Pleuraerguss") == {german.document_id}
+
+
+def _pending_job() -> ExtractionJob:
+    return ExtractionJob.objects.create(
+        owner=UserFactory.create(is_active=True),
+        group=GroupFactory.create(),
+        title="Bulk preparation",
+        query="test",
+        language=LanguageFactory.create(code="en"),
+        status=ExtractionJob.Status.PENDING,
+    )
+
+
+@pytest.mark.django_db
+def test_process_extraction_job_bulk_creates_tasks_from_report_ids(
+    monkeypatch, settings, django_assert_max_num_queries
+):
+    settings.EXTRACTION_TASK_BATCH_SIZE = 2
+    settings.EXTRACTION_PREPARATION_CHUNK_SIZE = 12
+    job = _pending_job()
+    reports = [ReportFactory.create() for _ in range(21)]
+    report_ids = [r.pk for r in reports]
+
+    def retrieve(_search):
+        raise AssertionError("document IDs must not be resolved when report IDs are available")
+
+    provider = ExtractionRetrievalProvider(
+        name="dummy",
+        count=lambda _search: len(report_ids),
+        retrieve=retrieve,
+        max_results=100,
+        retrieve_report_ids=lambda _search: report_ids,
+    )
+    monkeypatch.setattr(extraction_site, "extraction_retrieval_provider", provider)
+    monkeypatch.setattr(ExtractionTask, "delay", lambda self: None, raising=True)
+
+    # Query count is independent of the number of reports: 11 tasks in 2 chunks,
+    # where per-report inserts alone would take more than 40 queries.
+    with django_assert_max_num_queries(25):
+        process_extraction_job(int(job.pk))
+
+    tasks = list(job.tasks.order_by("pk"))
+    assert [task.instances.count() for task in tasks] == [2] * 10 + [1]
+    assert (
+        list(
+            ExtractionInstance.objects.filter(task__job=job)
+            .order_by("task_id", "pk")
+            .values_list("report_id", flat=True)
+        )
+        == report_ids
+    )
+    job.refresh_from_db()
+    assert job.prepared_task_count == 11
+    assert job.prepared_instance_count == 21
+    assert job.preparation_seconds is not None
+
+
+@pytest.mark.django_db
+def test_process_extraction_job_resolves_document_ids_in_batches(monkeypatch):
+    job = _pending_job()
+    reports = [ReportFactory.create(document_id=f"DOC-{i}") for i in range(3)]
+    doc_ids = [r.document_id for r in reports] + ["DOC-UNKNOWN"]
+
+    provider = ExtractionRetrievalProvider(
+        name="dummy",
+        count=lambda _search: len(doc_ids),
+        retrieve=lambda _search: doc_ids,
+        max_results=100,
+    )
+    monkeypatch.setattr(extraction_site, "extraction_retrieval_provider", provider)
+    monkeypatch.setattr(ExtractionTask, "delay", lambda self: None, raising=True)
+
+    process_extraction_job(int(job.pk))
+
+    assert sorted(
+        ExtractionInstance.objects.filter(task__job=job).values_list("report_id", flat=True)
+    ) == sorted(r.pk for r in reports)
+    job.refresh_from_db()
+    assert job.prepared_instance_count == 3
@@ -1,3 +1,6 @@
+import io
+
+import pyarrow.parquet as pq
 import pytest
 from adit_radis_shared.accounts.factories import GroupFactory, UserFactory
 from django.contrib.auth.models import Permission
@@ -10,7 +13,7 @@ from radis.extractions.factories import (
     ExtractionTaskFactory,
     OutputFieldFactory,
 )
-from radis.extractions.models import ExtractionJob
+from radis.extractions.models import ExtractionJob, ExtractionPreview, OutputType
 from radis.reports.factories import LanguageFactory, ReportFactory
 
 
@@ -69,6 +72,45 @@ def test_extraction_job_create_view_get(client: Client):
     assert response.status_code == 200
 
 
+@pytest.mark.django_db
+@override_settings(DEBUG_TOOLBAR_CONFIG={"SHOW_TOOLBAR_CALLBACK": _hide_toolbar})
+def test_extraction_preview_view_is_only_visible_to_its_owner(client: Client):
+    user = UserFactory.create(is_active=True)
+    user.user_permissions.add(Permission.objects.get(codename="add_extractionjob"))
+    preview = ExtractionPreview.objects.create(
+        owner=user,
+        group=GroupFactory.create(),
+        query="effusion",
+        status=ExtractionPreview.Status.SUCCESS,
+        message="Answered 1 of 1 sampled report(s).",
+        population_count=10,
+        call_count=1,
+        llm_seconds=2.0,
+        output_fields=[{"name": "effusion"}],
+        results=[
+            {
+                "report_id": 1,
+                "document_id": "DOC-1",
+                "modality": "CT",
+                "language": "en",
+                "year": 2020,
+                "output": {"effusion": True},
+            }
+        ],
+    )
+
+    client.force_login(user)
+    response = client.get(f"/extractions/jobs/new/preview/{preview.pk}/")
+    assert response.status_code == 200
+    assert "DOC-1" in response.content.decode()
+
+    other = UserFactory.create(is_active=True)
+    other.user_permissions.add(Permission.objects.get(codename="add_extractionjob"))
+    client.force_login(other)
+    response = client.get(f"/extractions/jobs/new/preview/{preview.pk}/")
+    assert response.status_code == 404
+
+
 @pytest.mark.django_db
 def test_extraction_job_detail_view(client: Client):
     user = UserFactory.create(is_active=True)
@@ -250,6 +292,46 @@ def test_extraction_result_download_view(client: Client):
     assert lines[1] == f"{instance.pk},{instance.report.pk},yes,value,42,no"
 
 
+@override_settings(DEBUG_TOOLBAR_CONFIG={"SHOW_TOOLBAR_CALLBACK": _hide_toolbar})
+@pytest.mark.django_db
+def test_extraction_result_download_view_as_parquet(client: Client):
+    user = UserFactory.create(is_active=True)
+    job = create_test_extraction_job(owner=user)
+    OutputFieldFactory.create(job=job, name="size", output_type=OutputType.NUMERIC)
+    OutputFieldFactory.create(job=job, name="sites", output_type=OutputType.TEXT, is_array=True)
+    task = create_test_extraction_task(job=job)
+    report = ReportFactory.create(language=LanguageFactory.create(code="en"))
+    instance = ExtractionInstanceFactory.create(
+        task=task, report=report, is_processed=True, output={"size": 42, "sites": ["a", "b"]}
+    )
+
+    client.force_login(user)
+    response = client.get(f"/extractions/jobs/{job.pk}/results/download/?format=parquet")
+    assert response.status_code == 200
+    assert response["Content-Disposition"].endswith('.parquet"')
+
+    content = b"".join(response.streaming_content)  # type: ignore[attr-defined]
+    rows = pq.read_table(io.BytesIO(content)).to_pylist()
+    assert rows == [
+        {
+            "instance_id": instance.pk,
+            "report_id": report.pk,
+            "is_processed": True,
+            "size": 42.0,
+            "sites": ["a", "b"],
+        }
+    ]
+
+
+@pytest.mark.django_db
+def test_extraction_result_download_view_rejects_unknown_formats(client: Client):
+    user = UserFactory.create(is_active=True)
+    job = create_test_extraction_job(owner=user)
+    client.force_login(user)
+    response = client.get(f"/extractions/jobs/{job.pk}/results/download/?format=xls")
+    assert response.status_code == 404
+
+
 @override_settings(DEBUG_TOOLBAR_CONFIG={"SHOW_TOOLBAR_CALLBACK": _hide_toolbar})
 @pytest.mark.django_db
 def test_extraction_result_download_view_unauthorized(client: Client):
@@ -596,3 +678,26 @@ def test_query_generation_needed_respects_disabled_setting(settings):
         )
         is False
     )
+
+
+@override_settings(DEBUG_TOOLBAR_CONFIG={"SHOW_TOOLBAR_CALLBACK": _hide_toolbar})
+@pytest.mark.django_db
+def test_extraction_result_list_view_filters_by_output_value(client: Client):
+    user = UserFactory.create(is_active=True)
+    job = create_test_extraction_job(owner=user)
+    OutputFieldFactory.create(job=job, name="size", output_type=OutputType.NUMERIC)
+    task = create_test_extraction_task(job=job)
+    small = ExtractionInstanceFactory.create(task=task, is_processed=True, output={"size": 2})
+    large = ExtractionInstanceFactory.create(task=task, is_processed=True, output={"size": 20})
+
+    client.force_login(user)
+    response = client.get(
+        f"/extractions/jobs/{job.pk}/results/?field=size&op=gt&value=10&sort=-size"
+    )
+    assert response.status_code == 200
+    assert [row.record.pk for row in response.context["table"].rows] == [large.pk]
+    assert small.pk not in [row.record.pk for row in response.context["table"].rows]
+
+    response = client.get(f"/extractions/jobs/{job.pk}/results/?field=size&op=gt&value=big")
+    assert response.status_code == 200
+    assert "needs a number" in response.content.decode()
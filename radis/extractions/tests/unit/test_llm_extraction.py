@@ -6,17 +6,18 @@ configured output fields actually reach the model. They also cover output-field
 schema generation (incl. the unknown-type error branch), output
 parsing/persistence and job orchestration (task/instance creation).
 
-The LLM is never called for real -- ``openai.OpenAI`` is patched at the SDK
-boundary used by ``radis.core.utils.llm_client.LLMClient``.
+The LLM is never called for real -- ``openai.AsyncOpenAI`` is patched at the SDK
+boundary used by the worker's LLM engine (``radis.core.utils.llm_engine``).
 """
 
 from typing import Any, cast
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from pydantic import BaseModel, ValidationError
 from pytest_mock import MockerFixture
 
+from radis.chats.utils.testing_helpers import response_format_fields, structured_completion
 from radis.extractions.models import (
     ExtractionInstance,
     ExtractionJob,
@@ -33,22 +34,22 @@ from radis.extractions.utils.testing_helpers import create_extraction_task
 
 
 class _Capture:
-    """Records every call made to ``beta.chat.completions.parse``."""
+    """Records every call made to ``chat.completions.create``."""
 
     def __init__(self) -> None:
         self.calls: list[dict[str, Any]] = []
 
 
 def make_capturing_openai_mock(output: BaseModel) -> tuple[MagicMock, _Capture]:
-    """Return a fake ``openai.OpenAI`` instance + a capture object.
+    """Return a fake ``openai.AsyncOpenAI`` instance + a capture object.
 
-    The fake's ``beta.chat.completions.parse`` records the ``model``,
-    ``messages`` and ``response_format`` it was called with and returns a
-    completion whose ``choices[0].message.parsed`` is ``output``.
+    The fake's ``chat.completions.create`` records the ``model``, ``messages`` and
+    ``response_format`` it was called with and returns a completion whose
+    ``choices[0].message.content`` is ``output`` as JSON.
     """
     capture = _Capture()
 
-    def fake_parse(
+    async def fake_create(
         *, model: str, messages: Any, response_format: Any, extra_body: Any = None
     ) -> MagicMock:
         capture.calls.append(
@@ -58,13 +59,22 @@ def make_capturing_openai_mock(output: BaseModel) -> tuple[MagicMock, _Capture]:
                 "response_format": response_format,
             }
         )
-        return MagicMock(choices=[MagicMock(message=MagicMock(parsed=output))])
+        return structured_completion(output)
 
     openai_mock = MagicMock()
-    openai_mock.beta.chat.completions.parse.side_effect = fake_parse
+    openai_mock.chat.completions.create.side_effect = fake_create
     return openai_mock, capture
 
 
+def _set_output_fields(task: ExtractionTask, **output_types: OutputType) -> None:
+    """Replace the job's output fields with these, so mocked answers validate."""
+    task.job.output_fields.all().delete()
+    for name, output_type in output_types.items():
+        OutputField.objects.create(
+            job=task.job, name=name, description=f"The {name}", output_type=output_type
+        )
+
+
 # --------------------------------------------------------------------------- #
 # Schema generation
 # --------------------------------------------------------------------------- #
@@ -142,24 +152,28 @@ def test_generate_output_fields_prompt_lists_name_and_description():
 
 @pytest.mark.django_db(transaction=True)
 def test_report_text_and_fields_reach_the_model(mocker: MockerFixture):
-    task = create_extraction_task(num_output_fields=3, num_extraction_instances=1)
+    task = create_extraction_task(num_output_fields=0, num_extraction_instances=1)
+    _set_output_fields(
+        task, finding=OutputType.TEXT, location=OutputType.TEXT, size=OutputType.TEXT
+    )
     instance = task.instances.get()
     report_body = instance.report.body
     field_names = list(task.job.output_fields.values_list("name", flat=True))
     field_descriptions = list(task.job.output_fields.values_list("description", flat=True))
 
     class Output(BaseModel):
-        # The shape does not matter for capture; persistence is asserted elsewhere.
-        dummy: str = "x"
+        finding: str = "x"
+        location: str = "x"
+        size: str = "x"
 
     openai_mock, capture = make_capturing_openai_mock(Output())
-    with patch("openai.OpenAI", return_value=openai_mock):
+    with patch("openai.AsyncOpenAI", return_value=openai_mock):
         ExtractionTaskProcessor(task).start()
 
     assert len(capture.calls) == 1
     call = capture.calls[0]
 
-    # The prompt is the single message sent (role=user in LLMClient).
+    # The prompt is the single message sent (role=user in AsyncLLMClient).
     assert len(call["messages"]) == 1
     assert call["messages"][0]["role"] == "user"
     sent_prompt = call["messages"][0]["content"]
@@ -172,11 +186,9 @@ def test_report_text_and_fields_reach_the_model(mocker: MockerFixture):
     for description in field_descriptions:
         assert description in sent_prompt
 
-    # The requested schema is the dynamically generated OutputFieldsModel and it
-    # must carry exactly the configured field names.
-    schema = call["response_format"]
-    assert issubclass(schema, BaseModel)
-    assert set(schema.model_fields) == set(field_names)
+    # The requested schema is the strict form of the dynamically generated
+    # OutputFieldsModel and it must carry exactly the configured field names.
+    assert set(response_format_fields(call["response_format"])) == set(field_names)
 
 
 # --------------------------------------------------------------------------- #
@@ -187,7 +199,8 @@ def test_report_text_and_fields_reach_the_model(mocker: MockerFixture):
 @pytest.mark.django_db(transaction=True)
 def test_output_is_parsed_and_persisted_per_instance(mocker: MockerFixture):
     num_instances = 4
-    task = create_extraction_task(num_output_fields=2, num_extraction_instances=num_instances)
+    task = create_extraction_task(num_output_fields=0, num_extraction_instances=num_instances)
+    _set_output_fields(task, answer=OutputType.TEXT, score=OutputType.NUMERIC)
 
     class Output(BaseModel):
         answer: str
@@ -195,7 +208,7 @@ def test_output_is_parsed_and_persisted_per_instance(mocker: MockerFixture):
 
     output = Output(answer="positive", score=42)
     openai_mock, _ = make_capturing_openai_mock(output)
-    with patch("openai.OpenAI", return_value=openai_mock):
+    with patch("openai.AsyncOpenAI", return_value=openai_mock):
         ExtractionTaskProcessor(task).start()
 
     instances = list(task.instances.all())
@@ -217,8 +230,8 @@ def test_processor_marks_task_failure_when_model_call_raises():
     task = create_extraction_task(num_output_fields=2, num_extraction_instances=2)
 
     openai_mock = MagicMock()
-    openai_mock.beta.chat.completions.parse.side_effect = RuntimeError("llm boom")
-    with patch("openai.OpenAI", return_value=openai_mock):
+    openai_mock.chat.completions.create = AsyncMock(side_effect=RuntimeError("llm boom"))
+    with patch("openai.AsyncOpenAI", return_value=openai_mock):
         ExtractionTaskProcessor(task).start()
 
     task.refresh_from_db()
@@ -228,6 +241,36 @@ def test_processor_marks_task_failure_when_model_call_raises():
     assert not task.instances.filter(is_processed=True).exists()
 
 
+@pytest.mark.django_db(transaction=True)
+def test_answered_instances_are_flushed_when_another_call_fails(settings):
+    settings.EXTRACTION_RESULT_FLUSH_SIZE = 2
+    task = create_extraction_task(num_output_fields=0, num_extraction_instances=5)
+    _set_output_fields(task, answer=OutputType.TEXT)
+    failing = task.instances.order_by("pk").first()
+    assert failing
+    failing_body = failing.report.body
+
+    class Output(BaseModel):
+        answer: str
+
+    async def fake_create(*, messages: Any, **kwargs: Any) -> MagicMock:
+        if failing_body in messages[0]["content"]:
+            raise RuntimeError("llm boom")
+        return structured_completion(Output(answer="ok"))
+
+    openai_mock = MagicMock()
+    openai_mock.chat.completions.create = AsyncMock(side_effect=fake_create)
+    with patch("openai.AsyncOpenAI", return_value=openai_mock):
+        ExtractionTaskProcessor(task).start()
+
+    task.refresh_from_db()
+    assert task.status == ExtractionTask.Status.FAILURE
+    # Every answered instance reached the database (incl. a partial last batch); only
+    # the failed one is left for the retry.
+    assert list(task.instances.filter(is_processed=False)) == [failing]
+    assert task.instances.filter(is_processed=True, output={"answer": "ok"}).count() == 4
+
+
 # --------------------------------------------------------------------------- #
 # Job / task orchestration (preparation -> task & instance creation)
 # --------------------------------------------------------------------------- #
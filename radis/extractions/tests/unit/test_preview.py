@@ -0,0 +1,135 @@
+import random
+from datetime import UTC, datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from adit_radis_shared.accounts.factories import GroupFactory, UserFactory
+
+from radis.extractions import site as extraction_site
+from radis.extractions.models import ExtractionPreview, OutputType
+from radis.extractions.site import ExtractionRetrievalProvider
+from radis.extractions.tasks import run_extraction_preview
+from radis.extractions.utils.preview import report_strata, stratified_sample
+from radis.reports.factories import LanguageFactory, ReportFactory
+
+
+def test_stratified_sample_is_proportional_and_covers_every_stratum():
+    strata = {
+        ("CT", "en", 2020): list(range(0, 700)),
+        ("MR", "en", 2021): list(range(1000, 1250)),
+        ("DX", "de", 2019): list(range(2000, 2050)),
+        ("US", "de", 2018): [3000],
+    }
+
+    sample = stratified_sample(strata, 20, random.Random(0))
+
+    assert len(sample) == len(set(sample)) == 20
+    per_stratum = [sum(1 for pk in sample if pk // 1000 == i) for i in range(4)]
+    assert per_stratum == [12, 5, 2, 1]
+
+
+def test_stratified_sample_of_a_small_population_takes_everything():
+    strata = {"a": [1, 2], "b": [3]}
+    assert sorted(stratified_sample(strata, 5, random.Random(0))) == [1, 2, 3]
+
+
+def test_stratified_sample_with_more_strata_than_draws_takes_the_largest():
+    strata = {"a": [1], "b": [2, 3, 4], "c": [5, 6]}
+    sample = stratified_sample(strata, 2, random.Random(0))
+    assert len(sample) == 2
+    assert 1 not in sample
+
+
+@pytest.mark.django_db
+def test_report_strata_groups_by_first_modality_language_and_year():
+    english = LanguageFactory.create(code="en")
+    first = ReportFactory.create(
+        language=english, modalities=["MR", "CT"], study_datetime=datetime(2020, 5, 1, tzinfo=UTC)
+    )
+    second = ReportFactory.create(
+        language=english, modalities=["CT"], study_datetime=datetime(2020, 8, 1, tzinfo=UTC)
+    )
+    third = ReportFactory.create(
+        language=english, modalities=["CT"], study_datetime=datetime(2021, 1, 1, tzinfo=UTC)
+    )
+
+    strata = report_strata([first.pk, second.pk, third.pk])
+
+    assert sorted(strata[("CT", "en", 2020)]) == sorted([first.pk, second.pk])
+    assert strata[("CT", "en", 2021)] == [third.pk]
+
+
+@pytest.mark.django_db
+def test_preview_run_measures_the_sample_and_projects_the_full_job(monkeypatch, settings):
+    settings.EXTRACTION_PREVIEW_SAMPLE_SIZE = 2
+    settings.LLM_ENGINE_CONCURRENCY = 2
+    settings.LLM_PRICE_PER_MILLION_PROMPT_TOKENS = 1.0
+    settings.LLM_PRICE_PER_MILLION_COMPLETION_TOKENS = 2.0
+    english = LanguageFactory.create(code="en")
+    doc_ids = [f"DOC-{i}" for i in range(6)]
+    for doc_id in doc_ids:
+        ReportFactory.create(document_id=doc_id, language=english, modalities=["CT"])
+    provider = ExtractionRetrievalProvider(
+        name="dummy",
+        count=lambda _search: len(doc_ids),
+        retrieve=lambda _search: doc_ids,
+        max_results=100,
+    )
+    monkeypatch.setattr(extraction_site, "extraction_retrieval_provider", provider)
+
+    preview = ExtractionPreview.objects.create(
+        owner=UserFactory.create(is_active=True),
+        group=GroupFactory.create(),
+        query="effusion",
+        filters={"language": "en", "study_date_from": "2020-01-01"},
+        output_fields=[
+            {
+                "name": "effusion",
+                "description": "Is there an effusion?",
+                "output_type": OutputType.BOOLEAN,
+                "selection_options": [],
+                "is_array": False,
+            }
+        ],
+    )
+
+    async def fake_create(**kwargs):
+        return MagicMock(
+            choices=[MagicMock(message=MagicMock(content='{"effusion": true}'))],
+            usage=MagicMock(prompt_tokens=100, completion_tokens=10),
+        )
+
+    openai_mock = MagicMock()
+    openai_mock.chat.completions.create = AsyncMock(side_effect=fake_create)
+    with patch("openai.AsyncOpenAI", return_value=openai_mock):
+        run_extraction_preview(preview.pk)
+
+    preview.refresh_from_db()
+    assert preview.status == ExtractionPreview.Status.SUCCESS
+    assert preview.population_count == 6
+    assert preview.call_count == 2
+    assert [result["output"] for result in preview.results] == [{"effusion": True}] * 2
+    assert {result["document_id"] for result in preview.results} <= set(doc_ids)
+    assert (preview.prompt_tokens, preview.completion_tokens) == (200, 20)
+    assert preview.projected_prompt_tokens == 600
+    assert preview.projected_completion_tokens == 60
+    assert preview.projected_cost == pytest.approx((600 * 1.0 + 60 * 2.0) / 1e6)
+    assert preview.projected_seconds == pytest.approx(6 * preview.llm_seconds / 2 / 2)
+
+
+@pytest.mark.django_db
+def test_preview_run_without_a_provider_fails_with_a_message(monkeypatch):
+    monkeypatch.setattr(extraction_site, "extraction_retrieval_provider", None)
+    preview = ExtractionPreview.objects.create(
+        owner=UserFactory.create(is_active=True),
+        group=GroupFactory.create(),
+        query="effusion",
+        output_fields=[],
+    )
+
+    run_extraction_preview(preview.pk)
+
+    preview.refresh_from_db()
+    assert preview.status == ExtractionPreview.Status.FAILURE
+    assert "not configured" in preview.message
+    assert preview.ended_at is not None
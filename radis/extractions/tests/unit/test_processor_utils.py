@@ -1,10 +1,17 @@
 from typing import Literal, get_args, get_origin
+from unittest.mock import patch
 
 import pytest
+from openai.lib._parsing._completions import type_to_response_format_param
 
+from radis.chats.utils.testing_helpers import create_openai_client_mock
+from radis.core.utils.llm_client import LLMClient
 from radis.extractions.factories import ExtractionJobFactory, OutputFieldFactory
 from radis.extractions.models import OutputType
-from radis.extractions.utils.processor_utils import generate_output_fields_schema
+from radis.extractions.utils.processor_utils import (
+    compile_extraction_plan,
+    generate_output_fields_schema,
+)
 
 
 @pytest.mark.django_db
@@ -78,3 +85,47 @@ def test_generate_output_fields_schema_nullable_accepts_null_values():
     strict_schema = generate_output_fields_schema(job.output_fields.all())
     with pytest.raises(ValueError):
         strict_schema(finding=None, grade="Grade 1")
+
+
+@pytest.mark.django_db
+def test_compile_extraction_plan_is_shared_until_a_field_changes():
+    job = ExtractionJobFactory.create()
+    field = OutputFieldFactory(job=job, name="finding", output_type=OutputType.TEXT)
+    template = "Report: $report\nFields: $fields"
+
+    plan = compile_extraction_plan(job.output_fields.all(), template)
+    assert compile_extraction_plan(job.output_fields.all(), template) is plan
+    assert plan.render("Normal chest.") == (
+        f"Report: Normal chest.\nFields: finding: {field.description}\n"
+    )
+
+    field.description = "Something else"
+    field.save()
+    changed = compile_extraction_plan(job.output_fields.all(), template)
+    assert changed is not plan
+    assert "Something else" in changed.render("Normal chest.")
+    assert compile_extraction_plan(job.output_fields.all(), template, nullable=True) is not changed
+
+
+@pytest.mark.django_db
+def test_strict_response_format_is_built_once_per_plan_not_per_call(settings):
+    settings.LLM_RESPONSE_CACHE_ENABLED = False
+    job = ExtractionJobFactory.create()
+    OutputFieldFactory(job=job, name="built_once", output_type=OutputType.TEXT)
+
+    with patch(
+        "radis.core.utils.llm_client.type_to_response_format_param",
+        wraps=type_to_response_format_param,
+    ) as build:
+        plan = compile_extraction_plan(job.output_fields.all(), "Report: $report\n$fields")
+        mock = create_openai_client_mock(plan.schema(built_once="yes"))
+        with patch("openai.OpenAI", return_value=mock):
+            client = LLMClient("extractions")
+            for body in ("First report.", "Second report.", "Third report."):
+                client.extract_data(plan.render(body), plan.schema)
+
+    assert build.call_count == 1
+    calls = mock.chat.completions.create.call_args_list
+    assert len(calls) == 3
+    assert all(call.kwargs["response_format"] is plan.response_format for call in calls)
+    assert plan.response_format["json_schema"]["strict"] is True
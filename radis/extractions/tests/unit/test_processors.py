@@ -1,35 +1,158 @@
-from unittest.mock import patch
+from datetime import timedelta
+from typing import Any
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
+from django.utils import timezone
 from pydantic import BaseModel
 from pytest_mock import MockerFixture
 
 from radis.chats.utils.testing_helpers import (
-    create_openai_client_mock,
+    create_async_openai_structured_mock,
+    structured_completion,
+)
+from radis.extractions.factories import (
+    ExtractionInstanceFactory,
+    ExtractionTaskFactory,
+    OutputFieldFactory,
+)
+from radis.extractions.models import ExtractionInstance, ExtractionTask, OutputType
+from radis.extractions.processors import (
+    ExtractionTaskProcessor,
+    claim_instances,
+    renew_claims,
 )
-from radis.extractions.processors import ExtractionTaskProcessor
 from radis.extractions.utils.testing_helpers import create_extraction_task
+from radis.reports.factories import ReportFactory
 
 
 class Output(BaseModel):
     foo: str
 
 
-@pytest.mark.django_db(transaction=True)
-def test_extraction_task_processor(mocker: MockerFixture):
-    num_output_fields = 5
-    num_extraction_instances = 5
+def _create_task(num_extraction_instances: int) -> ExtractionTask:
+    """An extraction task with the one output field `Output` answers."""
     task = create_extraction_task(
-        language_code="en",
-        num_output_fields=num_output_fields,
-        num_extraction_instances=num_extraction_instances,
+        language_code="en", num_output_fields=0, num_extraction_instances=num_extraction_instances
     )
+    OutputFieldFactory.create(job=task.job, name="foo", output_type=OutputType.TEXT)
+    return task
+
+
+@pytest.mark.django_db(transaction=True)
+def test_extraction_task_processor(mocker: MockerFixture):
+    task = _create_task(num_extraction_instances=5)
 
     output = Output(foo="bar")
-    openai_mock = create_openai_client_mock(output)
-    with patch("openai.OpenAI", return_value=openai_mock):
+    openai_mock = create_async_openai_structured_mock(output)
+    with patch("openai.AsyncOpenAI", return_value=openai_mock):
         ExtractionTaskProcessor(task).start()
 
         for instance in task.instances.all():
             assert instance.is_processed
             assert instance.output == output.model_dump()
+
+
+def _create_sibling_task(task: ExtractionTask, num_extraction_instances: int) -> ExtractionTask:
+    sibling = ExtractionTaskFactory.create(job=task.job)
+    for _ in range(num_extraction_instances):
+        ExtractionInstanceFactory.create(task=sibling, report=ReportFactory.create())
+    return sibling
+
+
+@pytest.mark.django_db(transaction=True)
+def test_work_stealing_task_drains_the_whole_job(settings):
+    settings.EXTRACTION_WORK_STEALING = True
+    settings.EXTRACTION_CLAIM_SIZE = 2
+    task = _create_task(num_extraction_instances=3)
+    sibling = _create_sibling_task(task, 2)
+
+    openai_mock = create_async_openai_structured_mock(Output(foo="bar"))
+    with patch("openai.AsyncOpenAI", return_value=openai_mock):
+        ExtractionTaskProcessor(task).start()
+        assert not ExtractionInstance.objects.filter(is_processed=False).exists()
+        assert not ExtractionInstance.objects.filter(claimed_until__isnull=False).exists()
+        assert not ExtractionInstance.objects.filter(claimed_by__isnull=False).exists()
+        task.refresh_from_db()
+        assert task.status == ExtractionTask.Status.SUCCESS
+        assert task.message == "Processed 5 instance(s), 2 of them from other tasks."
+
+        # The sibling's own run finds nothing left to do.
+        ExtractionTaskProcessor(sibling).start()
+    sibling.refresh_from_db()
+    assert sibling.status == ExtractionTask.Status.SUCCESS
+    assert openai_mock.chat.completions.create.call_count == 5
+
+
+@pytest.mark.django_db
+def test_claims_skip_live_leases_and_reclaim_expired_ones(settings):
+    settings.EXTRACTION_CLAIM_MAX_ATTEMPTS = 2
+    task = create_extraction_task(num_output_fields=1, num_extraction_instances=3)
+    sibling = _create_sibling_task(task, 1)
+    first, second, third = task.instances.order_by("pk")
+
+    # The task's own instances come first.
+    assert claim_instances(sibling, 1) == [sibling.instances.get()]
+    assert claim_instances(task, 2) == [first, second]
+    assert claim_instances(task, 5) == [third]
+    assert claim_instances(task, 5) == []
+
+    task.instances.filter(pk=first.pk).update(claimed_until=timezone.now() - timedelta(minutes=1))
+    assert claim_instances(task, 5) == [first]
+    # Out of attempts once expired again.
+    task.instances.filter(pk=first.pk).update(claimed_until=timezone.now() - timedelta(minutes=1))
+    assert claim_instances(task, 5) == []
+
+    task.job.reset_tasks()
+    assert len(claim_instances(task, 5)) == 4
+
+
+@pytest.mark.django_db(transaction=True)
+def test_failed_stolen_instance_fails_its_own_task(settings):
+    settings.EXTRACTION_WORK_STEALING = True
+    settings.EXTRACTION_CLAIM_MAX_ATTEMPTS = 1
+    task = _create_task(num_extraction_instances=1)
+    sibling = _create_sibling_task(task, 1)
+    failing_body = sibling.instances.get().report.body
+
+    async def create(*, messages: Any, **kwargs: Any) -> Any:
+        if failing_body in messages[0]["content"]:
+            raise ValueError("boom")
+        return structured_completion(Output(foo="bar"))
+
+    openai_mock = MagicMock()
+    openai_mock.chat.completions.create = AsyncMock(side_effect=create)
+    with patch("openai.AsyncOpenAI", return_value=openai_mock):
+        ExtractionTaskProcessor(task).start()
+        task.refresh_from_db()
+        assert task.status == ExtractionTask.Status.SUCCESS
+        assert task.message == "Processed 1 instance(s), 0 of them from other tasks."
+        failed = sibling.instances.get()
+        assert (failed.is_processed, failed.error, failed.claimed_until) == (False, "boom", None)
+
+        ExtractionTaskProcessor(sibling).start()
+    sibling.refresh_from_db()
+    assert sibling.status == ExtractionTask.Status.FAILURE
+    assert sibling.message == (
+        "Processed 0 instance(s), 0 of them from other tasks. "
+        "1 instance(s) of this task failed: boom"
+    )
+
+
+@pytest.mark.django_db
+def test_renewal_extends_only_the_tasks_own_leases(settings):
+    settings.EXTRACTION_CLAIM_LEASE_SECONDS = 60
+    task = create_extraction_task(num_output_fields=1, num_extraction_instances=2)
+    sibling = _create_sibling_task(task, 0)
+    first, second = claim_instances(task, 2)
+    # The lease on `second` ran out and went to the sibling.
+    soon = timezone.now() + timedelta(seconds=1)
+    ExtractionInstance.objects.filter(pk=first.pk).update(claimed_until=soon)
+    ExtractionInstance.objects.filter(pk=second.pk).update(claimed_until=soon, claimed_by=sibling)
+
+    renew_claims(task, [first, second])
+
+    first.refresh_from_db()
+    second.refresh_from_db()
+    assert first.claimed_until > timezone.now() + timedelta(seconds=30)
+    assert second.claimed_until == soon
@@ -0,0 +1,151 @@
+import pytest
+from django.utils import timezone
+from procrastinate.contrib.django.models import ProcrastinateJob
+
+from radis.core.models import AnalysisJob
+from radis.extractions.factories import (
+    ExtractionInstanceFactory,
+    ExtractionJobFactory,
+    ExtractionTaskFactory,
+    OutputFieldFactory,
+)
+from radis.extractions.models import (
+    ExtractionInstance,
+    ExtractionResultValue,
+    ExtractionTask,
+    OutputType,
+)
+from radis.extractions.utils.result_values import (
+    build_result_values,
+    filter_results,
+    order_results,
+    result_values_missing,
+    result_values_ready,
+)
+from radis.reports.factories import LanguageFactory
+
+
+def _create_job_with_results():
+    job = ExtractionJobFactory.create(language=LanguageFactory.create(code="en"))
+    size = OutputFieldFactory.create(job=job, name="size", output_type=OutputType.NUMERIC)
+    grade = OutputFieldFactory.create(
+        job=job,
+        name="grade",
+        output_type=OutputType.SELECTION,
+        selection_options=["low", "high"],
+    )
+    sites = OutputFieldFactory.create(
+        job=job, name="sites", output_type=OutputType.TEXT, is_array=True
+    )
+    task = ExtractionTaskFactory.create(job=job)
+    outputs = [
+        {"size": 12, "grade": "low", "sites": ["liver"]},
+        {"size": 3.5, "grade": "high", "sites": ["lung", "liver"]},
+        {"size": 40, "grade": "high", "sites": []},
+        {"size": None, "grade": "low", "sites": ["lung"]},
+    ]
+    instances = [
+        ExtractionInstanceFactory.create(task=task, is_processed=True, output=output)
+        for output in outputs
+    ]
+    return job, (size, grade, sites), instances
+
+
+def _finish(job):
+    job.status = AnalysisJob.Status.SUCCESS
+    job.ended_at = timezone.now()
+    job.save()
+
+
+@pytest.mark.django_db
+def test_result_values_are_only_built_for_finished_jobs():
+    job, _, _ = _create_job_with_results()
+    job.status = AnalysisJob.Status.IN_PROGRESS
+    job.save()
+
+    assert not build_result_values(job.pk)
+    assert not ExtractionResultValue.objects.exists()
+
+    _finish(job)
+    assert result_values_missing(job)
+    assert build_result_values(job.pk)
+    # Three non-null sizes and four grades; array fields get no rows.
+    assert ExtractionResultValue.objects.count() == 7
+    job.refresh_from_db()
+    assert result_values_ready(job)
+
+
+@pytest.mark.django_db
+def test_result_values_are_rebuilt_after_the_job_ran_again():
+    job, (size, _, _), instances = _create_job_with_results()
+    _finish(job)
+    build_result_values(job.pk)
+
+    instances[0].output = {"size": 99, "grade": "low", "sites": []}
+    instances[0].save()
+    _finish(job)
+    job.refresh_from_db()
+    assert not result_values_ready(job)
+    build_result_values(job.pk)
+
+    assert ExtractionResultValue.objects.get(instance=instances[0], field=size).number == 99
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("typed", [False, True])
+def test_filter_and_order_results(typed):
+    job, (size, grade, sites), instances = _create_job_with_results()
+    _finish(job)
+    if typed:
+        assert build_result_values(job.pk)
+    results = ExtractionInstance.objects.filter(task__job=job)
+
+    def pks(queryset):
+        return [instance.pk for instance in queryset]
+
+    assert set(pks(filter_results(results, size, "gt", 10.0, typed))) == {
+        instances[0].pk,
+        instances[2].pk,
+    }
+    assert set(pks(filter_results(results, grade, "eq", "high", typed))) == {
+        instances[1].pk,
+        instances[2].pk,
+    }
+    assert set(pks(filter_results(results, grade, "ne", "high", typed))) == {
+        instances[0].pk,
+        instances[3].pk,
+    }
+    assert set(pks(filter_results(results, sites, "contains", "liver", typed))) == {
+        instances[0].pk,
+        instances[1].pk,
+    }
+
+    ascending = pks(order_results(results, size, False, typed))
+    assert ascending[:3] == [instances[1].pk, instances[0].pk, instances[2].pk]
+    descending = pks(order_results(results, size, True, typed))
+    assert descending[:3] == [instances[2].pk, instances[0].pk, instances[1].pk]
+
+
+@pytest.mark.django_db
+def test_finishing_the_job_defers_the_build():
+    job, _, _ = _create_job_with_results()
+    job.status = AnalysisJob.Status.IN_PROGRESS
+    job.save()
+    ExtractionTask.objects.filter(job=job).update(status=ExtractionTask.Status.SUCCESS)
+
+    assert job.update_job_state()
+    # Deferred once until it runs, however often it is asked for.
+    job.delay_result_values_build()
+
+    builds = ProcrastinateJob.objects.filter(
+        task_name="radis.extractions.tasks.build_extraction_result_values"
+    )
+    assert list(builds.values_list("args", flat=True)) == [{"job_id": job.pk}]
+    assert not ExtractionResultValue.objects.exists()
+
+
+@pytest.mark.django_db
+def test_filter_results_rejects_operators_the_field_type_does_not_support():
+    job, (_, grade, _), _ = _create_job_with_results()
+    with pytest.raises(ValueError):
+        filter_results(ExtractionInstance.objects.all(), grade, "gt", "low", False)
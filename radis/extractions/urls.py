@@ -12,6 +12,7 @@ from .views import (
     ExtractionJobRetryView,
     ExtractionJobVerifyView,
     ExtractionJobWizardView,
+    ExtractionPreviewView,
     ExtractionResultDownloadView,
     ExtractionResultListView,
     ExtractionSearchPreviewView,
@@ -47,6 +48,11 @@ urlpatterns = [
         ExtractionSearchPreviewView.as_view(),
         name="extraction_search_preview",
     ),
+    path(
+        "jobs/new/preview/<int:pk>/",
+        ExtractionPreviewView.as_view(),
+        name="extraction_preview",
+    ),
     path(
         "jobs/new/generate-query/",
         extraction_query_generator_view,
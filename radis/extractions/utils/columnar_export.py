@@ -0,0 +1,54 @@
+"""Helpers for exporting extraction results as typed columns (Parquet, Arrow IPC)."""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Sequence
+from typing import Any
+
+from django.conf import settings
+
+from radis.core.utils.columnar_export import Column, ColumnKind
+from radis.extractions.models import ExtractionInstance, ExtractionJob, OutputField, OutputType
+
+_OUTPUT_KINDS: dict[str, ColumnKind] = {
+    OutputType.TEXT: "string",
+    OutputType.NUMERIC: "float",
+    OutputType.BOOLEAN: "bool",
+    OutputType.SELECTION: "category",
+}
+
+
+def output_field_column(field: OutputField) -> Column:
+    """The column of an output field: numeric outputs are floats (the schema accepts
+    ints and floats alike), selections categorical, array outputs list columns."""
+    return Column(
+        field.name,
+        _OUTPUT_KINDS[field.output_type],
+        is_list=field.is_array,
+        categories=tuple(field.selection_options),
+    )
+
+
+def extraction_result_columns(job: ExtractionJob) -> list[Column]:
+    columns = [
+        Column("instance_id", "int"),
+        Column("report_id", "int"),
+        Column("is_processed", "bool"),
+    ]
+    columns.extend(output_field_column(field) for field in job.output_fields.order_by("pk"))
+    return columns
+
+
+def iter_extraction_result_values(job: ExtractionJob) -> Iterable[Sequence[Any]]:
+    """Yield one row of raw values per instance, matching `extraction_result_columns`."""
+    field_names: list[str] = list(job.output_fields.order_by("pk").values_list("name", flat=True))
+    instances = (
+        ExtractionInstance.objects.filter(task__job=job)
+        .order_by("pk")
+        .values_list("pk", "report_id", "is_processed", "output")
+    )
+    for instance_id, report_id, is_processed, output in instances.iterator(
+        chunk_size=settings.COLUMNAR_EXPORT_ROW_GROUP_SIZE
+    ):
+        output_dict = output or {}
+        yield [instance_id, report_id, is_processed, *(output_dict.get(n) for n in field_names)]
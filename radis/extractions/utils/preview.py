@@ -0,0 +1,158 @@
+"""Preview runs of the extraction wizard.
+
+Before a job is created, the wizard can run its output fields on a small sample of the
+reports the search retrieves: EXTRACTION_PREVIEW_SAMPLE_SIZE reports, drawn in
+proportion from every (modality, language, study year) stratum of the search results,
+so the sample shows how the fields behave on each kind of report rather than only the
+most common one. The calls go through the worker's LLM engine as urgent calls and
+bypass the response cache, so their measured latency and token use are real and can be
+projected onto the full job (`ExtractionPreview.projected_*`).
+"""
+
+import math
+import random
+from collections import defaultdict
+from collections.abc import Hashable, Iterable, Mapping, Sequence
+from concurrent.futures import Future, as_completed
+from datetime import date
+from itertools import batched
+
+from django.conf import settings
+from django.db.models import F, Min
+from django.db.models.functions import ExtractYear
+
+from radis.core.utils.llm_client import LLMCall
+from radis.core.utils.llm_engine import EngineLLMClient
+from radis.reports.models import Report
+from radis.search.site import Search, SearchFilters
+from radis.search.utils.query_parser import QueryParser
+
+from ..models import ExtractionPreview, OutputField
+from .processor_utils import compile_extraction_plan
+
+type Stratum = tuple[str | None, str, int]
+
+# Report IDs resolved to their stratum per query.
+_STRATA_CHUNK_SIZE = 5000
+
+
+def stratified_sample[K: Hashable](
+    strata: Mapping[K, Sequence[int]], size: int, rng: random.Random
+) -> list[int]:
+    """Draw `size` IDs, allocated to the strata in proportion to their sizes.
+
+    Every stratum gets at least one draw while there are no more strata than draws
+    (the remaining draws go by largest remainder); otherwise the largest strata get
+    one each. With `size` or fewer IDs in total, all of them are returned."""
+    keys = sorted((key for key, ids in strata.items() if ids), key=repr)
+    total = sum(len(strata[key]) for key in keys)
+    if total <= size:
+        return [pk for key in keys for pk in strata[key]]
+
+    if len(keys) >= size:
+        largest = sorted(keys, key=lambda key: len(strata[key]), reverse=True)[:size]
+        quotas = dict.fromkeys(largest, 1)
+    else:
+        quotas = dict.fromkeys(keys, 1)
+        spare = size - len(keys)
+        exact = {key: spare * (len(strata[key]) - 1) / (total - len(keys)) for key in keys}
+        for key in keys:
+            quotas[key] += math.floor(exact[key])
+        left = size - sum(quotas.values())
+        by_remainder = sorted(
+            keys, key=lambda key: exact[key] - math.floor(exact[key]), reverse=True
+        )
+        for key in by_remainder[:left]:
+            quotas[key] += 1
+
+    return [pk for key in keys if key in quotas for pk in rng.sample(strata[key], quotas[key])]
+
+
+def report_strata(report_ids: Iterable[int]) -> dict[Stratum, list[int]]:
+    """The reports grouped by (modality, language, study year). A report with several
+    modalities counts towards the alphabetically first one."""
+    strata: dict[Stratum, list[int]] = defaultdict(list)
+    for chunk in batched(report_ids, _STRATA_CHUNK_SIZE):
+        rows = (
+            Report.objects.filter(pk__in=chunk)
+            .annotate(language_code=F("language__code"), year=ExtractYear("study_datetime"))
+            .values("pk", "language_code", "year")
+            .annotate(modality=Min("modalities__code"))
+            .order_by()
+            .values_list("pk", "modality", "language_code", "year")
+        )
+        for pk, modality, language_code, year in rows:
+            strata[(modality, language_code, year)].append(pk)
+    return strata
+
+
+def preview_search(preview: ExtractionPreview, limit: int | None) -> Search:
+    query_node, _ = QueryParser().parse(preview.query)
+    if query_node is None:
+        raise ValueError(f"Not a valid query (evaluated as empty): {preview.query}")
+    filters = dict(preview.filters)
+    for name in ("study_date_from", "study_date_till"):
+        if filters.get(name):
+            filters[name] = date.fromisoformat(filters[name])
+    return Search(
+        query=query_node,
+        offset=0,
+        limit=limit,
+        filters=SearchFilters(group=preview.group_id, **filters),
+    )
+
+
+def run_preview(preview: ExtractionPreview, report_ids: Sequence[int]) -> None:
+    """Answer a sample of `report_ids` and record the results and their cost on
+    `preview` (unsaved). A failed call is recorded with its sample row and left out of
+    the measurements."""
+    strata = report_strata(report_ids)
+    stratum_of = {pk: stratum for stratum, pks in strata.items() for pk in pks}
+    sample = stratified_sample(
+        strata, settings.EXTRACTION_PREVIEW_SAMPLE_SIZE, random.Random(preview.pk)
+    )
+
+    plan = compile_extraction_plan(
+        [OutputField(**field) for field in preview.output_fields],
+        settings.OUTPUT_FIELDS_SYSTEM_PROMPT,
+    )
+    client = EngineLLMClient("extractions", use_cache=False, urgent=True)
+    reports = Report.objects.in_bulk(sample)
+    futures: dict[Future[LLMCall], Report] = {
+        client.submit_measured(plan.render(reports[pk].body), plan.schema): reports[pk]
+        for pk in sample
+        if pk in reports
+    }
+
+    results: dict[int, dict] = {}
+    prompt_tokens: list[int | None] = []
+    completion_tokens: list[int | None] = []
+    for future in as_completed(futures):
+        report = futures[future]
+        modality, language_code, year = stratum_of[report.pk]
+        result = {
+            "report_id": report.pk,
+            "document_id": report.document_id,
+            "modality": modality,
+            "language": language_code,
+            "year": year,
+        }
+        try:
+            call = future.result()
+        except Exception as e:
+            result["error"] = str(e)
+        else:
+            result["output"] = call.response.model_dump(mode="json")
+            preview.call_count += 1
+            preview.llm_seconds += call.seconds
+            prompt_tokens.append(call.prompt_tokens)
+            completion_tokens.append(call.completion_tokens)
+        results[report.pk] = result
+
+    preview.population_count = len(report_ids)
+    preview.results = [results[pk] for pk in sample if pk in results]
+    # Token counts only mean something if the provider reported them for every call.
+    if prompt_tokens and None not in prompt_tokens:
+        preview.prompt_tokens = sum(prompt_tokens)  # type: ignore
+    if completion_tokens and None not in completion_tokens:
+        preview.completion_tokens = sum(completion_tokens)  # type: ignore
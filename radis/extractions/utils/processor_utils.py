@@ -1,8 +1,13 @@
 from collections.abc import Iterable
+from dataclasses import dataclass
+from functools import lru_cache
+from string import Template
 from typing import Any, Literal
 
 from pydantic import BaseModel, create_model
 
+from radis.core.utils.llm_client import response_format
+
 from ..models import OutputField, OutputType
 
 type Numeric = float | int
@@ -65,3 +70,84 @@ def generate_output_fields_prompt(fields: Iterable[OutputField]) -> str:
         prompt += f"{field.name}: {description}\n"
 
     return prompt
+
+
+@dataclass(frozen=True)
+class ExtractionPlan:
+    """The report-independent part of an LLM call: the response schema, its strict
+    `response_format` request parameter and the prompt template with everything but
+    the report filled in.
+
+    Plans are compiled once per distinct definition and shared by every task and engine
+    call in the process, so neither the Pydantic model nor the strict JSON schema the
+    provider gets is rebuilt for each report. The LLM clients send the dict built here
+    (`llm_client.response_format` returns it for `schema`) and validate the answer with
+    `schema`.
+    """
+
+    schema: type[BaseModel]
+    response_format: dict[str, Any]
+    template: Template
+    substitutions: dict[str, str]
+
+    @classmethod
+    def build(
+        cls, schema: type[BaseModel], template: Template, substitutions: dict[str, str]
+    ) -> "ExtractionPlan":
+        return cls(
+            schema=schema,
+            response_format=response_format(schema),
+            template=template,
+            substitutions=substitutions,
+        )
+
+    def render(self, report_body: str) -> str:
+        return self.template.substitute({**self.substitutions, "report": report_body})
+
+
+# Compiled plans kept per process; a job's definition only changes when its fields are
+# edited (subscriptions), so this holds every job that is running at the same time.
+PLAN_CACHE_SIZE = 64
+
+type _FieldSignature = tuple[str, str, str, tuple[str, ...], bool]
+
+
+def _field_signature(field: OutputField) -> _FieldSignature:
+    return (
+        field.name,
+        field.description,
+        field.output_type,
+        tuple(field.selection_options),
+        field.is_array,
+    )
+
+
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def _compile_extraction_plan(
+    signatures: tuple[_FieldSignature, ...], prompt_template: str, nullable: bool
+) -> ExtractionPlan:
+    fields = [
+        OutputField(
+            name=name,
+            description=description,
+            output_type=output_type,
+            selection_options=list(selection_options),
+            is_array=is_array,
+        )
+        for name, description, output_type, selection_options, is_array in signatures
+    ]
+    return ExtractionPlan.build(
+        schema=generate_output_fields_schema(fields, nullable=nullable),
+        template=Template(prompt_template),
+        substitutions={"fields": generate_output_fields_prompt(fields)},
+    )
+
+
+def compile_extraction_plan(
+    fields: Iterable[OutputField], prompt_template: str, *, nullable: bool = False
+) -> ExtractionPlan:
+    """The plan for extracting `fields` with `prompt_template` (which takes `$report` and
+    `$fields`). Fields with the same definition in the same order share one plan, so an
+    edited field yields a new plan rather than a stale one."""
+    signatures = tuple(_field_signature(field) for field in fields)
+    return _compile_extraction_plan(signatures, prompt_template, nullable)
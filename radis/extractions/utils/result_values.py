@@ -0,0 +1,211 @@
+"""Filtering and sorting extraction results by output-field value.
+
+Outputs are stored as one JSONB document per instance, so a filter like
+`tumor_size > 20` or a sort by a field can always be written against the JSON keys
+(`output__tumor_size__gt=20`). Postgres can't index that per job without DDL, though,
+and on a job with tens of thousands of instances every such page scans and sorts the
+whole job. Once a job is finished its outputs no longer change, so the
+`build_extraction_result_values` task, deferred when the job finishes, copies every
+scalar output into `ExtractionResultValue`, one typed row per (field, instance) with an
+index per type, and the results table filters and sorts through those rows instead.
+Jobs still running, jobs whose values are not built yet, and array fields use the JSONB
+expressions directly.
+"""
+
+from typing import Any, Literal
+
+from django.db import connection, transaction
+from django.db.models import (
+    Exists,
+    F,
+    FilteredRelation,
+    JSONField,
+    OuterRef,
+    Q,
+    QuerySet,
+    Value,
+)
+from django.db.models.fields.json import KeyTransform
+from django.db.models.functions import Cast, NullIf
+from django.utils import timezone
+
+from radis.core.models import AnalysisJob
+
+from ..models import (
+    ExtractionInstance,
+    ExtractionJob,
+    ExtractionResultValue,
+    ExtractionTask,
+    OutputField,
+    OutputType,
+)
+
+type FilterOp = Literal["eq", "ne", "lt", "lte", "gt", "gte", "contains"]
+
+# The operators a filter on a field of each type (or on an array field) may use.
+FILTER_OPS: dict[str, tuple[FilterOp, ...]] = {
+    OutputType.NUMERIC: ("eq", "ne", "lt", "lte", "gt", "gte"),
+    OutputType.BOOLEAN: ("eq", "ne"),
+    OutputType.SELECTION: ("eq", "ne"),
+    OutputType.TEXT: ("eq", "ne", "contains"),
+    "array": ("contains",),
+}
+
+FILTER_OP_LABELS: dict[FilterOp, str] = {
+    "eq": "=",
+    "ne": "≠",
+    "lt": "<",
+    "lte": "≤",
+    "gt": ">",
+    "gte": "≥",
+    "contains": "contains",
+}
+
+# Jobs whose outputs can no longer change. A canceled job may be resumed without its
+# `ended_at` being reset, so it keeps using the JSONB path.
+_FINAL_STATUSES = (
+    AnalysisJob.Status.SUCCESS,
+    AnalysisJob.Status.WARNING,
+    AnalysisJob.Status.FAILURE,
+)
+
+_VALUE_COLUMN = {
+    OutputType.NUMERIC: "number",
+    OutputType.BOOLEAN: "boolean",
+    OutputType.SELECTION: "text",
+    OutputType.TEXT: "text",
+}
+
+
+def filter_ops(field: OutputField) -> tuple[FilterOp, ...]:
+    return FILTER_OPS["array" if field.is_array else field.output_type]
+
+
+def result_values_ready(job: ExtractionJob) -> bool:
+    """Whether the job is finished and its typed result values are built for its last
+    run."""
+    return (
+        job.status in _FINAL_STATUSES
+        and job.ended_at is not None
+        and job.result_values_built_at is not None
+        and job.result_values_built_at >= job.ended_at
+    )
+
+
+def result_values_missing(job: ExtractionJob) -> bool:
+    """Whether the job is finished but its typed result values are missing or older than
+    its last run (the build is still queued, or the job finished before there were any)."""
+    return (
+        job.status in _FINAL_STATUSES and job.ended_at is not None and not result_values_ready(job)
+    )
+
+
+def build_result_values(job_id: int) -> bool:
+    """Build the typed result values of a finished job unless they are up to date.
+    Returns whether they can be used.
+
+    The rows are replaced in one transaction, so readers see either the old or the new
+    ones; the job row itself is not locked. If the job is retried meanwhile, the build
+    is not marked as done."""
+    job = ExtractionJob.objects.get(pk=job_id)
+    if not result_values_missing(job):
+        return result_values_ready(job)
+
+    with transaction.atomic():
+        _build_result_values(job)
+        built = (
+            ExtractionJob.objects.filter(
+                pk=job.pk, status__in=_FINAL_STATUSES, ended_at=job.ended_at
+            ).update(result_values_built_at=timezone.now())
+            > 0
+        )
+    return built
+
+
+def _build_result_values(job: ExtractionJob) -> None:
+    ExtractionResultValue.objects.filter(instance__task__job=job).delete()
+    values_table = ExtractionResultValue._meta.db_table
+    instance_table = ExtractionInstance._meta.db_table
+    task_table = ExtractionTask._meta.db_table
+    fields = job.output_fields.filter(is_array=False)
+    with connection.cursor() as cursor:
+        for field in fields:
+            # Values of another JSON type than the field's (fields can be edited after a
+            # run) get no row, so they never match a filter and sort last.
+            cursor.execute(
+                f"""
+                INSERT INTO {values_table} (instance_id, field_id, number, text, boolean)
+                SELECT i.id, %s,
+                    CASE WHEN jsonb_typeof(i.output -> %s) = 'number'
+                        THEN (i.output ->> %s)::double precision END,
+                    CASE WHEN jsonb_typeof(i.output -> %s) = 'string'
+                        THEN i.output ->> %s END,
+                    CASE WHEN jsonb_typeof(i.output -> %s) = 'boolean'
+                        THEN (i.output ->> %s)::boolean END
+                FROM {instance_table} i
+                JOIN {task_table} t ON t.id = i.task_id
+                WHERE t.job_id = %s
+                    AND jsonb_typeof(i.output -> %s) IN ('number', 'string', 'boolean')
+                """,
+                [field.pk] + [field.name] * 6 + [job.pk, field.name],
+            )
+
+
+def _lookup(op: FilterOp) -> str:
+    return {"eq": "exact", "ne": "exact", "contains": "icontains"}.get(op, op)
+
+
+def filter_results(
+    queryset: QuerySet[ExtractionInstance],
+    field: OutputField,
+    op: FilterOp,
+    value: Any,
+    typed: bool,
+) -> QuerySet[ExtractionInstance]:
+    """Keep the results whose `field` output matches `op value`. `value` must already
+    have the field's type; `ne` keeps results without a value as well."""
+    if op not in filter_ops(field):
+        raise ValueError(f"Operator {op} is not supported for the field {field.name}.")
+
+    if field.is_array:
+        # JSONB containment, served by any index on the output column.
+        return queryset.filter(**{f"output__{field.name}__contains": [value]})
+
+    if typed:
+        column = _VALUE_COLUMN[field.output_type]
+        matching = ExtractionResultValue.objects.filter(
+            instance=OuterRef("pk"), field=field, **{f"{column}__{_lookup(op)}": value}
+        )
+        condition = Exists(matching)
+    elif field.output_type == OutputType.NUMERIC:
+        condition = Q(**{f"output__{field.name}__{_lookup(op)}": value})
+    elif op == "contains":
+        condition = Q(**{f"output__{field.name}__icontains": value})
+    else:
+        condition = Q(**{f"output__{field.name}": value})
+
+    if op == "ne":
+        return queryset.exclude(condition)
+    return queryset.filter(condition)
+
+
+def order_results(
+    queryset: QuerySet[ExtractionInstance],
+    field: OutputField,
+    descending: bool,
+    typed: bool,
+) -> QuerySet[ExtractionInstance]:
+    """Order the results by their `field` output, empty values last either way."""
+    if typed:
+        alias = f"value_{field.pk}"
+        queryset = queryset.annotate(
+            **{alias: FilteredRelation("result_values", condition=Q(result_values__field=field))}
+        )
+        key = F(f"{alias}__{_VALUE_COLUMN[field.output_type]}")
+    else:
+        # jsonb orders numbers numerically and strings by collation, but puts JSON null
+        # before everything else, so it is turned into SQL NULL to sort it last.
+        key = NullIf(KeyTransform(field.name, "output"), Cast(Value("null"), JSONField()))
+
+    ordering = key.desc(nulls_last=True) if descending else key.asc(nulls_last=True)
+    return queryset.order_by(ordering, "pk")
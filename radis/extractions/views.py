@@ -1,4 +1,5 @@
 import logging
+from datetime import timedelta
 from importlib import import_module
 from typing import Any, cast
 from urllib.parse import urlencode
@@ -21,15 +22,20 @@ from django.core.exceptions import SuspiciousOperation
 from django.db import transaction
 from django.db.models import QuerySet
 from django.forms import BaseInlineFormSet
-from django.http import HttpResponse, QueryDict, StreamingHttpResponse
-from django.shortcuts import redirect, render
+from django.http import Http404, HttpResponse, QueryDict, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse, reverse_lazy
+from django.utils import timezone
 from django.utils.text import slugify
 from django.views.decorators.http import require_POST
 from django.views.generic import DetailView, View
-from django_tables2 import SingleTableMixin, tables
+from django_tables2 import SingleTableMixin
 from formtools.wizard.views import SessionWizardView
 
+from radis.core.utils.columnar_export import (
+    COLUMNAR_FORMATS,
+    stream_columnar_response,
+)
 from radis.core.utils.csv_export import stream_csv_response
 from radis.core.utils.llm_client import LLMResponseError
 from radis.core.utils.rate_limit import RateLimited
@@ -52,20 +58,24 @@ from radis.search.utils.query_parser import QueryParser
 
 from .filters import ExtractionInstanceFilter, ExtractionJobFilter, ExtractionTaskFilter
 from .forms import (
+    ExtractionResultFilterForm,
     OutputFieldFormSet,
     SearchForm,
     SummaryForm,
 )
 from .mixins import ExtractionsLockedMixin
-from .models import ExtractionInstance, ExtractionJob, ExtractionTask
+from .models import ExtractionInstance, ExtractionJob, ExtractionPreview, ExtractionTask
 from .site import extraction_retrieval_provider
 from .tables import (
     ExtractionInstanceTable,
     ExtractionJobTable,
     ExtractionResultsTable,
     ExtractionTaskTable,
+    OutputValueColumn,
 )
+from .utils.columnar_export import extraction_result_columns, iter_extraction_result_values
 from .utils.csv_export import iter_extraction_result_rows
+from .utils.result_values import filter_results, result_values_missing, result_values_ready
 
 EXTRACTIONS_SEARCH_PROVIDER = "extractions_search_provider"
 
@@ -271,6 +281,50 @@ class ExtractionJobWizardView(
 
         return context
 
+    def post(self, *args, **kwargs):
+        # The summary step's "Preview" button posts the wizard form via HTMX; it starts a
+        # preview run of the stored steps instead of finishing the wizard.
+        if "preview" in self.request.POST and self.steps.current == self.SUMMARY_STEP:
+            return self._start_preview()
+        return super().post(*args, **kwargs)
+
+    def _start_preview(self) -> HttpResponse:
+        user = self.request.user
+        output_fields_data = self.storage.extra_data.get("output_fields_data")
+        search_data = self.get_cleaned_data_for_step(ExtractionJobWizardView.SEARCH_STEP)
+        if not output_fields_data or not isinstance(search_data, dict):
+            return render(
+                self.request,
+                "extractions/_extraction_preview.html",
+                {"error": "Wizard data is missing. Please go back and complete the steps."},
+            )
+
+        group = user.active_group
+        assert group
+        # Previews are only looked at while the wizard is open; older ones just pile up.
+        ExtractionPreview.objects.filter(
+            owner=user, created_at__lt=timezone.now() - timedelta(days=1)
+        ).delete()
+        language = search_data["language"]
+        preview = ExtractionPreview.objects.create(
+            owner=user,
+            group=group,
+            query=search_data["query"],
+            filters={
+                "language": language.code if language else "",
+                "modalities": list(search_data["modalities"].values_list("code", flat=True)),
+                "study_date_from": search_data["study_date_from"],
+                "study_date_till": search_data["study_date_till"],
+                "study_description": search_data["study_description"],
+                "patient_sex": search_data["patient_sex"],
+                "patient_age_from": search_data["age_from"],
+                "patient_age_till": search_data["age_till"],
+            },
+            output_fields=output_fields_data,
+        )
+        preview.delay()
+        return render(self.request, "extractions/_extraction_preview.html", {"preview": preview})
+
     def get_template_names(self) -> list[str]:
         step = self.steps.current
         if step == ExtractionJobWizardView.OUTPUT_FIELDS_STEP:
@@ -296,8 +350,9 @@ class ExtractionJobWizardView(
 
             job: ExtractionJob = search_form.save(commit=False)
             # cleaned_data is ignored by save(commit=False) for non-Meta fields,
-            # so the summary step's checkbox must be set on the instance.
+            # so the summary step's checkboxes must be set on the instance.
             job.send_finished_mail = summary_form.cleaned_data["send_finished_mail"]
+            job.bypass_llm_cache = summary_form.cleaned_data["bypass_llm_cache"]
 
             # Parse and normalize the query
             query = job.query
@@ -483,6 +538,20 @@ class ExtractionSearchPreviewView(LoginRequiredMixin, PermissionRequiredMixin, V
         return render(request, "extractions/_search_preview.html", context)
 
 
+class ExtractionPreviewView(LoginRequiredMixin, PermissionRequiredMixin, View):
+    """HTMX endpoint polled by the wizard until its preview run has finished."""
+
+    permission_required = "extractions.add_extractionjob"
+    request: AuthenticatedHttpRequest
+
+    def get(self, request: AuthenticatedHttpRequest, pk: int):
+        preview = get_object_or_404(ExtractionPreview, pk=pk, owner=request.user)
+        context: dict[str, Any] = {"preview": preview}
+        if preview.projected_seconds is not None:
+            context["projected_duration"] = timedelta(seconds=round(preview.projected_seconds))
+        return render(request, "extractions/_extraction_preview.html", context)
+
+
 class ExtractionJobDetailView(AnalysisJobDetailView):
     model = ExtractionJob
     table_class = ExtractionTaskTable
@@ -734,24 +803,44 @@ class ExtractionResultListView(
             return model.objects.all()
         return model.objects.filter(owner=self.request.user)
 
-    def get_table(self, **kwargs):
-        job = cast(ExtractionJob, self.get_object())
+    def get(self, request: AuthenticatedHttpRequest, *args, **kwargs) -> HttpResponse:
+        self.object = job = cast(ExtractionJob, self.get_object())
+        self.output_fields = list(job.output_fields.all())
+        # Finished jobs filter and sort through their typed result values once the
+        # build deferred at the end of the job has run; until then through the outputs.
+        self.typed = result_values_ready(job)
+        if result_values_missing(job):
+            job.delay_result_values_build()
+        self.filter_form = ExtractionResultFilterForm(
+            request.GET if "field" in request.GET else None, output_fields=self.output_fields
+        )
+        context = self.get_context_data(object=job)
+        return self.render_to_response(context)
 
-        extra_columns = []
-        for field in job.output_fields.all():
-            extra_columns.append(
-                (field.name, tables.Column(field.name, accessor=f"output.{field.name}"))
-            )
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["filter_form"] = self.filter_form
+        return context
 
+    def get_table(self, **kwargs):
+        extra_columns = [
+            (field.name, OutputValueColumn(field, self.typed)) for field in self.output_fields
+        ]
         return super().get_table(extra_columns=extra_columns, **kwargs)
 
     def get_table_data(self):
-        job = cast(ExtractionJob, self.get_object())
-        return ExtractionInstance.objects.filter(task__job=job)
+        results = ExtractionInstance.objects.filter(task__job=self.object)
+        if self.filter_form.is_valid():
+            data = self.filter_form.cleaned_data
+            results = filter_results(
+                results, data["output_field"], data["op"], data["value"], self.typed
+            )
+        return results
 
 
 class ExtractionResultDownloadView(ExtractionsLockedMixin, LoginRequiredMixin, DetailView):
-    """Stream extraction results as a CSV download."""
+    """Stream extraction results as a CSV download, or with `?format=parquet` or
+    `?format=arrow` as a typed columnar one."""
 
     model = ExtractionJob
     request: AuthenticatedHttpRequest
@@ -764,16 +853,27 @@ class ExtractionResultDownloadView(ExtractionsLockedMixin, LoginRequiredMixin, D
             return model.objects.all()
         return model.objects.filter(owner=self.request.user)
 
-    def get(self, _request: AuthenticatedHttpRequest, *_args, **_kwargs) -> StreamingHttpResponse:
-        """Stream the CSV file response."""
+    def get(self, request: AuthenticatedHttpRequest, *_args, **_kwargs) -> StreamingHttpResponse:
+        """Stream the file response."""
         job = cast(ExtractionJob, self.get_object())
-        return stream_csv_response(
-            iter_extraction_result_rows(job),
+        export_format = request.GET.get("format", "csv")
+        if export_format == "csv":
+            return stream_csv_response(
+                iter_extraction_result_rows(job),
+                f"{self._build_filename(job)}.csv",
+                f"extraction job {job.pk}",
+            )
+        if export_format not in COLUMNAR_FORMATS:
+            raise Http404(f"Export format {export_format!r} is not available.")
+        return stream_columnar_response(
+            extraction_result_columns(job),
+            iter_extraction_result_values(job),
+            export_format,
             self._build_filename(job),
             f"extraction job {job.pk}",
         )
 
     def _build_filename(self, job: ExtractionJob) -> str:
-        """Generate a descriptive CSV filename for the extraction job."""
+        """Generate a descriptive filename (without extension) for the extraction job."""
         slug = slugify(job.title) or "results"
-        return f"extraction_job_{job.pk}_{slug}.csv"
+        return f"extraction_job_{job.pk}_{slug}"
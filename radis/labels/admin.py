@@ -1,5 +1,6 @@
 from django.contrib import admin, messages
 from django.db import IntegrityError, transaction
+from django.db.models import F, Q, QuerySet, Sum
 from django.http import HttpRequest, HttpResponseRedirect
 from django.shortcuts import get_object_or_404
 from django.urls import path, reverse
@@ -10,7 +11,9 @@ from .models import (
     GateAnswer,
     Label,
     LabelGroup,
+    LabelingDirtyEntry,
     LabelingJob,
+    LabelingLiveEntry,
     LabelingScanCheckpoint,
     LabelingTask,
     LabelResult,
@@ -19,21 +22,46 @@ from .models import (
 
 @admin.register(LabelGroup)
 class LabelGroupAdmin(admin.ModelAdmin):
-    list_display = ("name", "gate_question", "updated_at")
+    list_display = ("name", "gate_question", "prescreen_threshold", "updated_at")
     search_fields = ("name",)  # required for LabelAdmin autocomplete
     ordering = ("name",)
-    readonly_fields = ("updated_at",)
+    # The threshold is set by `calibrate_gate_prescreen`; the vectors are derived data.
+    exclude = ("gate_vectors",)
+    readonly_fields = ("prescreen_threshold", "gate_vectors_model", "gate_vectors_at", "updated_at")
 
 
 @admin.register(Label)
 class LabelAdmin(admin.ModelAdmin):
     autocomplete_fields = ["group"]
-    list_display = ("name", "group", "active", "updated_at")
+    list_display = ("name", "group", "active", "surfacing", "stale", "updated_at")
     list_filter = ("active", "group")
     search_fields = ("name", "group__name", "description")
     ordering = ("group__name", "name")
     readonly_fields = ("created_at", "updated_at")
 
+    def get_queryset(self, request: HttpRequest) -> QuerySet[Label]:
+        # From the trigger-maintained counts (see radis.labels.counts), not the results.
+        return (
+            super()
+            .get_queryset(request)
+            .annotate(
+                surfacing_count=Sum(
+                    "result_counts__count",
+                    filter=Q(result_counts__value__in=LabelResult.SURFACING_VALUES),
+                    default=0,
+                ),
+                stale_count=Sum(F("result_counts__count") - F("result_counts__fresh"), default=0),
+            )
+        )
+
+    @admin.display(description="Surfacing reports", ordering="surfacing_count")
+    def surfacing(self, obj: Label) -> int:
+        return obj.surfacing_count  # type: ignore[attr-defined]
+
+    @admin.display(description="Stale results", ordering="stale_count")
+    def stale(self, obj: Label) -> int:
+        return obj.stale_count  # type: ignore[attr-defined]
+
 
 class _ReadOnlyAdmin(admin.ModelAdmin):
     def has_add_permission(self, request: HttpRequest) -> bool:
@@ -62,8 +90,8 @@ class LabelResultAdmin(_ReadOnlyAdmin):
 
 @admin.register(GateAnswer)
 class GateAnswerAdmin(_ReadOnlyAdmin):
-    list_display = ("report", "label_group", "value", "is_stale", "generated_at")
-    list_filter = ("value", "label_group")
+    list_display = ("report", "label_group", "value", "prescreened", "is_stale", "generated_at")
+    list_filter = ("value", "prescreened", "label_group")
     search_fields = ("report__document_id", "label_group__name")
     # Inert under read-only; see LabelResultAdmin.
     raw_id_fields = ("report", "label_group")
@@ -73,6 +101,23 @@ class GateAnswerAdmin(_ReadOnlyAdmin):
         return obj.generated_at < obj.label_group.updated_at
 
 
+@admin.register(LabelingDirtyEntry)
+class LabelingDirtyEntryAdmin(_ReadOnlyAdmin):
+    list_display = ("report", "label_group", "marked_at")
+    list_filter = ("label_group",)
+    search_fields = ("report__document_id",)
+    # Inert under read-only; see LabelResultAdmin.
+    raw_id_fields = ("report", "label_group")
+
+
+@admin.register(LabelingLiveEntry)
+class LabelingLiveEntryAdmin(_ReadOnlyAdmin):
+    list_display = ("report", "queued_at")
+    search_fields = ("report__document_id",)
+    # Inert under read-only; see LabelResultAdmin.
+    raw_id_fields = ("report",)
+
+
 @admin.register(LabelingScanCheckpoint)
 class LabelingScanCheckpointAdmin(admin.ModelAdmin):
     list_display = ("last_scanned_at",)
@@ -106,10 +151,12 @@ class LabelingJobAdmin(admin.ModelAdmin):
     readonly_fields = (
         "trigger",
         "scan_from",
+        "live_date",
         "status",
         "owner",
         "urgent",
         "send_finished_mail",
+        "bypass_llm_cache",
         "message",
         "queued_job",
         "created_at",
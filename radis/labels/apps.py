@@ -4,3 +4,25 @@ from django.apps import AppConfig
 class LabelsConfig(AppConfig):
     name = "radis.labels"
     verbose_name = "Labels"
+
+    def ready(self):
+        from . import signals as signals  # noqa: F401
+
+        register_app()
+
+
+def _handle_created_reports(reports) -> None:
+    from .dirty import mark_reports_dirty
+    from .live import queue_live_labeling
+
+    report_ids = [report.pk for report in reports]
+    mark_reports_dirty(report_ids)
+    queue_live_labeling(report_ids)
+
+
+def register_app():
+    from radis.reports.site import ReportsCreatedHandler, register_reports_created_handler
+
+    register_reports_created_handler(
+        ReportsCreatedHandler(name="Labels", handle=_handle_created_reports)
+    )
@@ -0,0 +1,123 @@
+"""Label result and gate answer counts, without counting the result tables.
+
+Counting a label's results per bucket, and the stale ones, is an index scan over its
+results; `labels_status` and the admin did that for every label and value. Instead,
+database triggers (migration 0006) append a delta row to `LabelResultCount` or
+`GateAnswerCount` for every statement that writes results or gate answers, keyed by
+(label or group, value), and reset the fresh counts when a label or group is edited, since
+that makes all its rows stale. The counts are the sums of the deltas, read with one
+grouped query over a small table. Appending instead of updating a row per key keeps
+concurrent labeling tasks from queueing (or deadlocking) on the same counter rows;
+`compact_label_counts` folds the deltas into one row per key every
+LABELING_COUNTS_COMPACT_CRON tick.
+
+`./manage.py rebuild_label_counts` recounts everything from the result tables, should
+the counts ever drift (a label edit racing a labeling write can leave a fresh count a few
+rows off until the label's results are rewritten).
+"""
+
+from collections import defaultdict
+from typing import NamedTuple
+
+from django.db import connection, transaction
+from django.db.models import Sum
+
+from .models import (
+    GateAnswer,
+    GateAnswerCount,
+    Label,
+    LabelGroup,
+    LabelResult,
+    LabelResultCount,
+)
+
+
+class Counts(NamedTuple):
+    count: int
+    fresh: int
+    prescreened: int = 0
+
+    @property
+    def stale(self) -> int:
+        return self.count - self.fresh
+
+
+def label_result_counts() -> dict[int, dict[str, Counts]]:
+    """Label ID -> result value -> counts."""
+    counts: dict[int, dict[str, Counts]] = defaultdict(dict)
+    rows = (
+        LabelResultCount.objects.values("label_id", "value")
+        .annotate(total=Sum("count"), fresh_total=Sum("fresh"))
+        .order_by()
+        .values_list("label_id", "value", "total", "fresh_total")
+    )
+    for label_id, value, total, fresh in rows:
+        counts[label_id][value] = Counts(total, fresh)
+    return counts
+
+
+def gate_answer_counts() -> dict[int, dict[str, Counts]]:
+    """Label group ID -> gate value -> counts."""
+    counts: dict[int, dict[str, Counts]] = defaultdict(dict)
+    rows = (
+        GateAnswerCount.objects.values("label_group_id", "value")
+        .annotate(
+            total=Sum("count"), fresh_total=Sum("fresh"), prescreened_total=Sum("prescreened")
+        )
+        .order_by()
+        .values_list("label_group_id", "value", "total", "fresh_total", "prescreened_total")
+    )
+    for group_id, value, total, fresh, prescreened in rows:
+        counts[group_id][value] = Counts(total, fresh, prescreened)
+    return counts
+
+
+# (count model, parent model, foreign key column, extra summed columns)
+_COUNTED = [
+    (LabelResultCount, Label, "label_id", []),
+    (GateAnswerCount, LabelGroup, "label_group_id", ["prescreened"]),
+]
+
+
+def compact_label_counts() -> None:
+    """Fold the delta rows into one row per key, dropping keys whose label or group is
+    gone and keys that sum to nothing. Deltas appended meanwhile are left for the next
+    run."""
+    with connection.cursor() as cursor:
+        for model, parent, fk, extra in _COUNTED:
+            table = model._meta.db_table
+            columns = ", ".join([fk, "value", "count", "fresh", *extra])
+            sums = ", ".join(f"sum(m.{column})" for column in ["count", "fresh", *extra])
+            nonzero = " OR ".join(f"sum(m.{column}) <> 0" for column in ["count", "fresh", *extra])
+            cursor.execute(
+                f"""
+                WITH moved AS (DELETE FROM {table} RETURNING {columns})
+                INSERT INTO {table} ({columns})
+                SELECT m.{fk}, m.value, {sums} FROM moved m
+                WHERE EXISTS (SELECT 1 FROM {parent._meta.db_table} p WHERE p.id = m.{fk})
+                GROUP BY m.{fk}, m.value HAVING {nonzero}
+                """
+            )
+
+
+def rebuild_label_counts() -> None:
+    """Recount everything from the results and gate answers. Writes to them wait until
+    the recount is committed."""
+    sources = {LabelResultCount: LabelResult, GateAnswerCount: GateAnswer}
+    with transaction.atomic(), connection.cursor() as cursor:
+        for model, parent, fk, extra in _COUNTED:
+            table = model._meta.db_table
+            source = sources[model]._meta.db_table
+            columns = ", ".join([fk, "value", "count", "fresh", *extra])
+            extra_counts = "".join(f", count(*) FILTER (WHERE r.{column})" for column in extra)
+            cursor.execute(f"LOCK TABLE {source} IN SHARE MODE")
+            cursor.execute(f"DELETE FROM {table}")
+            cursor.execute(
+                f"""
+                INSERT INTO {table} ({columns})
+                SELECT r.{fk}, r.value, count(*),
+                    count(*) FILTER (WHERE r.generated_at >= p.updated_at){extra_counts}
+                FROM {source} r JOIN {parent._meta.db_table} p ON p.id = r.{fk}
+                GROUP BY r.{fk}, r.value
+                """
+            )
@@ -0,0 +1,101 @@
+"""The labeling dirty set: (report, label group) pairs that may need labeling work.
+
+Manual backfills used to find their reports by checking every report's gate answers and
+label results against the active groups, which costs time in proportion to the corpus.
+Instead, the pairs are marked when something makes them due:
+
+- a report is created: the report with every active group (`mark_reports_dirty`);
+- a group is edited: every report with the group, since all its gates went stale;
+- a label is edited or activated: the reports with a YES gate on its group, whose results
+  for it went stale (every report, if it is the group's only active label).
+
+Group and label edits are marked by a deferred task, as they can touch the whole corpus.
+A backfill pages through the marked reports by ID (`dirty_report_ids`), and a labeling
+run removes a report's entries once the report is labeled (`clear_dirty_reports`). An
+entry marked again after that run started stays. A report that fails keeps its entries,
+so the next backfill retries it.
+
+`./manage.py rebuild_labeling_dirty_set` marks everything the old corpus-wide scan would
+find, for reports added behind the application's back.
+"""
+
+from collections.abc import Iterator, Sequence
+from datetime import datetime
+
+from django.db import connection
+from django.utils import timezone
+
+from radis.reports.models import Report
+
+from .models import GateAnswer, Label, LabelingDirtyEntry
+
+
+def _upsert_sql(select: str) -> str:
+    """INSERT the (report_id, label_group_id) pairs of `select` as marked now."""
+    return f"""
+        INSERT INTO {LabelingDirtyEntry._meta.db_table} (report_id, label_group_id, marked_at)
+        SELECT pair.report_id, pair.label_group_id, %(now)s::timestamptz FROM ({select}) pair
+        ON CONFLICT (report_id, label_group_id) DO UPDATE SET marked_at = EXCLUDED.marked_at
+    """
+
+
+def mark_reports_dirty(report_ids: Sequence[int]) -> None:
+    """Mark new reports as due for every active label group."""
+    if not report_ids:
+        return
+    select = f"""
+        SELECT r.report_id, g.group_id AS label_group_id
+        FROM unnest(%(report_ids)s::bigint[]) AS r (report_id)
+        CROSS JOIN (SELECT DISTINCT group_id FROM {Label._meta.db_table} WHERE active) g
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(_upsert_sql(select), {"report_ids": list(report_ids), "now": timezone.now()})
+
+
+def mark_group_dirty(label_group_id: int, yes_gates_only: bool) -> None:
+    """Mark the reports of a label group as due: every report, or with `yes_gates_only`
+    only those whose gate answer for the group is YES."""
+    if yes_gates_only:
+        select = f"""
+            SELECT report_id, label_group_id FROM {GateAnswer._meta.db_table}
+            WHERE label_group_id = %(label_group_id)s AND value = %(yes)s
+        """
+    else:
+        select = f"""
+            SELECT id AS report_id, %(label_group_id)s::bigint AS label_group_id
+            FROM {Report._meta.db_table}
+        """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            _upsert_sql(select),
+            {
+                "label_group_id": label_group_id,
+                "yes": GateAnswer.Value.YES.value,
+                "now": timezone.now(),
+            },
+        )
+
+
+def dirty_report_ids(chunk_size: int) -> Iterator[int]:
+    """The IDs of all reports with dirty entries, in ascending order, read `chunk_size`
+    at a time by keyset pagination over the entries' (report, label_group) index."""
+    last_id = 0
+    while True:
+        chunk = list(
+            LabelingDirtyEntry.objects.filter(report_id__gt=last_id)
+            .order_by("report_id")
+            .values_list("report_id", flat=True)
+            .distinct()[:chunk_size]
+        )
+        if not chunk:
+            return
+        yield from chunk
+        last_id = chunk[-1]
+
+
+def clear_dirty_reports(report_ids: Sequence[int], labeled_since: datetime) -> None:
+    """Remove the entries of reports labeled by a run that started at `labeled_since`,
+    except those marked again after it started."""
+    LabelingDirtyEntry.objects.filter(
+        report_id__in=report_ids, marked_at__lt=labeled_since
+    ).delete()
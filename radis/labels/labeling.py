@@ -1,118 +1,405 @@
 import logging
+import operator
+import threading
+from collections import defaultdict
+from collections.abc import Iterable, Mapping, Sequence
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from functools import reduce
 from itertools import batched
 
 from django.conf import settings
 from django.db import transaction
-from django.db.models import F
+from django.db.models import F, Q
+from django.utils import timezone
 
-from radis.core.utils.llm_client import LLMClient
+from radis.core.utils.llm_engine import EngineLLMClient
+from radis.pgsearch.utils.embedding_columns import model_key, serving_embedding
 from radis.reports.models import Report
 
+from .dirty import clear_dirty_reports
 from .models import GateAnswer, Label, LabelGroup, LabelResult
-from .utils.prompts import render_gate_prompt, render_label_prompt
+from .prescreen import ensure_gate_vectors, report_similarities
+from .utils.prompts import (
+    render_gate_prompt,
+    render_label_prompt,
+    render_multi_report_gate_prompt,
+)
 from .utils.schemas import (
     build_gate_schema,
     build_label_classification_schema,
+    build_multi_report_gate_schema,
 )
 
 logger = logging.getLogger(__name__)
 
+# Rough size of a token in characters of report text, for packing multi-report gate calls.
+_CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // _CHARS_PER_TOKEN + 1
+
+
+def pack_gate_reports(
+    report_bodies: Mapping[int, str], token_budget: int, max_reports: int
+) -> list[list[int]]:
+    """Pack reports, in order, into multi-report gate calls of at most `token_budget`
+    estimated tokens of report text and `max_reports` reports each.
+
+    Only calls of two or more reports are returned; a report too long to share a call
+    with another one (or left alone at the end) isn't in any and is gated on its own."""
+    packs: list[list[int]] = []
+    pack: list[int] = []
+    pack_tokens = 0
+    for report_id, body in report_bodies.items():
+        tokens = estimate_tokens(body)
+        if tokens > token_budget // 2:
+            continue
+        if pack and (pack_tokens + tokens > token_budget or len(pack) >= max_reports):
+            packs.append(pack)
+            pack, pack_tokens = [], 0
+        pack.append(report_id)
+        pack_tokens += tokens
+    packs.append(pack)
+    return [pack for pack in packs if len(pack) > 1]
+
+
+def _groups_needing_gate(
+    groups: Sequence[LabelGroup], existing_gates: Mapping[int, GateAnswer]
+) -> list[LabelGroup]:
+    """The groups whose gate answer on a report is missing or older than the group."""
+    return [
+        g
+        for g in groups
+        if g.id not in existing_gates or existing_gates[g.id].generated_at < g.updated_at
+    ]
+
+
+@dataclass
+class ReportOutcome:
+    """Everything one report's labeling run decided, written later by `LabelingBatch.flush`."""
+
+    report_id: int
+    # Group ID -> gate value, for the gates asked in this run.
+    gates: dict[int, str] = field(default_factory=dict)
+    # Groups whose gate flipped from YES to NO; their results on the report are deleted.
+    cleared_groups: list[int] = field(default_factory=list)
+    # Groups whose NO gate came from the embedding pre-screen.
+    prescreened_groups: set[int] = field(default_factory=set)
+    # Label ID -> bucket, for the labels classified in this run.
+    labels: dict[int, str] = field(default_factory=dict)
+
+
+class LabelingBatch:
+    """The state shared by the reports of one labeling run (usually a `LabelingTask`).
+
+    The active groups and the reports' existing gate answers and fresh label results are
+    loaded up front with one query each instead of a few per report and group. Outcomes
+    are buffered and written with one upsert per model every LABELING_RESULT_FLUSH_SIZE
+    reports, and once more by the final `flush()`. A report only reaches the buffer once
+    all its calls have succeeded, so a failed report leaves nothing behind (and stays in
+    the dirty set, see radis.labels.dirty) and a retry redoes it from scratch. Outcomes
+    leave the buffer only once their write has committed; a write that fails in `add()`
+    is retried by the next one or the final `flush()`, which raises if it fails too
+    (see `unwritten_report_ids`).
+    """
+
+    def __init__(self, report_ids: Iterable[int]) -> None:
+        report_ids = list(report_ids)
+        # Dirty entries marked after this are left for the next run.
+        self.started_at = timezone.now()
+        self.active_groups = list(
+            LabelGroup.objects.filter(labels__active=True).prefetch_related("labels").distinct()
+        )
+        self._gate_answers: dict[int, dict[int, GateAnswer]] = defaultdict(dict)
+        for gate_answer in GateAnswer.objects.filter(
+            report_id__in=report_ids, label_group__in=self.active_groups
+        ):
+            self._gate_answers[gate_answer.report_id][gate_answer.label_group_id] = gate_answer
+
+        # A label that previously came back ABSENT/UNMENTIONED still has a fresh row.
+        self._fresh_labels: dict[int, set[int]] = defaultdict(set)
+        for report_id, label_id in LabelResult.objects.filter(
+            report_id__in=report_ids,
+            label__active=True,
+            generated_at__gte=F("label__updated_at"),
+        ).values_list("report_id", "label_id"):
+            self._fresh_labels[report_id].add(label_id)
+
+        self.report_ids = report_ids
+        # Report ID -> group ID -> gate value, answered by `prescreen_gates` or
+        # `screen_gates`.
+        self._screened_gates: dict[int, dict[int, str]] = defaultdict(dict)
+        self._prescreened: dict[int, set[int]] = defaultdict(set)
+        self._outcomes: list[ReportOutcome] = []
+        self._lock = threading.Lock()
+
+    def gate_answers(self, report_id: int) -> dict[int, GateAnswer]:
+        return self._gate_answers.get(report_id, {})
+
+    def screened_gates(self, report_id: int) -> dict[int, str]:
+        return self._screened_gates.get(report_id, {})
+
+    def prescreened_groups(self, report_id: int) -> set[int]:
+        return self._prescreened.get(report_id, set())
+
+    def prescreen_gates(self) -> int:
+        """Answer NO, without the LLM, the due gates of the reports that are clearly
+        unrelated to their group (LABELING_GATE_PRESCREEN, see radis.labels.prescreen).
+        Returns the number of gates answered."""
+        target = serving_embedding()
+        if target is None:
+            return 0
+        key = model_key(target.spec)
+        answered = 0
+        for group in self.active_groups:
+            threshold = group.prescreen_threshold
+            if threshold is None:
+                continue
+            if group.gate_vectors_model != key:
+                logger.warning(
+                    "Gate pre-screen of group %s was calibrated with another embedding "
+                    "model; re-run calibrate_gate_prescreen.",
+                    group.name,
+                )
+                continue
+            # A report whose gate was YES goes back to the LLM, so the pre-screen never
+            # clears results the LLM let through.
+            due = []
+            for report_id in self.report_ids:
+                gate_answers = self.gate_answers(report_id)
+                previous = gate_answers.get(group.id)
+                if _groups_needing_gate([group], gate_answers) and not (
+                    previous and previous.value == GateAnswer.Value.YES
+                ):
+                    due.append(report_id)
+            if not due:
+                continue
+
+            try:
+                vectors = ensure_gate_vectors(group, target)
+                similarities = report_similarities(due, vectors, target.column)
+            except Exception:
+                logger.warning(
+                    "Gate pre-screen of group %s failed; asking the LLM.", group.name, exc_info=True
+                )
+                continue
+            for report_id, similarity in similarities.items():
+                if similarity < threshold:
+                    self._screened_gates[report_id][group.id] = GateAnswer.Value.NO
+                    self._prescreened[report_id].add(group.id)
+                    answered += 1
+        return answered
+
+    def screen_gates(self, client: EngineLLMClient) -> int:
+        """Answer the due gates of the batch's short reports several reports per call
+        (LABELING_MULTI_REPORT_GATE). `label_report` then only asks the gates this left
+        unanswered. Returns the number of reports screened."""
+        bodies = {
+            pk: body
+            for pk, body in Report.objects.filter(pk__in=self.report_ids).values_list("pk", "body")
+            if body and body.strip()
+        }
+        # Reports due for the same gates can share calls.
+        by_groups: dict[tuple[int, ...], dict[int, str]] = defaultdict(dict)
+        groups_by_id = {g.id: g for g in self.active_groups}
+        for report_id, body in bodies.items():
+            prescreened = self.screened_gates(report_id)
+            due = [
+                g
+                for g in _groups_needing_gate(self.active_groups, self.gate_answers(report_id))
+                if g.id not in prescreened
+            ]
+            if due:
+                by_groups[tuple(g.id for g in due)][report_id] = body
+
+        calls: dict[Future, tuple[list[LabelGroup], list[int]]] = {}
+        for group_ids, group_bodies in by_groups.items():
+            packs = pack_gate_reports(
+                group_bodies,
+                settings.LABELING_MULTI_REPORT_GATE_TOKEN_BUDGET,
+                settings.LABELING_MULTI_REPORT_GATE_MAX_REPORTS,
+            )
+            groups = [groups_by_id[group_id] for group_id in group_ids]
+            for gate_batch in batched(groups, settings.LABELING_GATE_BATCH_SIZE):
+                for pack in packs:
+                    schema = build_multi_report_gate_schema(gate_batch, len(pack))
+                    prompt = render_multi_report_gate_prompt([group_bodies[pk] for pk in pack])
+                    calls[client.submit(prompt, schema)] = (list(gate_batch), pack)
+
+        screened: set[int] = set()
+        for future, (gate_batch, pack) in calls.items():
+            try:
+                result_map = future.result().model_dump()
+            except Exception:
+                # Malformed or failed: these reports fall back to the per-report gate.
+                logger.warning(
+                    "Multi-report gate call for reports %s failed; gating them one by one.",
+                    pack,
+                    exc_info=True,
+                )
+                continue
+            for i, report_id in enumerate(pack, start=1):
+                for g in gate_batch:
+                    self._screened_gates[report_id][g.id] = str(result_map[f"report_{i}"][g.name])
+                screened.add(report_id)
+        return len(screened)
+
+    def stale_or_missing_labels(self, report_id: int, labels: list[Label]) -> list[Label]:
+        """The labels whose result on the report is missing or older than the label."""
+        fresh_ids = self._fresh_labels.get(report_id, set())
+        return [lbl for lbl in labels if lbl.id not in fresh_ids]
+
+    def add(self, outcome: ReportOutcome) -> None:
+        with self._lock:
+            self._outcomes.append(outcome)
+            if len(self._outcomes) >= settings.LABELING_RESULT_FLUSH_SIZE:
+                try:
+                    self._write()
+                except Exception:
+                    # Not the added report's failure; the outcomes stay buffered.
+                    logger.warning(
+                        "Writing the outcomes of %d reports failed; retrying later.",
+                        len(self._outcomes),
+                        exc_info=True,
+                    )
+
+    def flush(self) -> None:
+        with self._lock:
+            self._write()
 
-def label_report(report_id: int) -> None:
+    def unwritten_report_ids(self) -> list[int]:
+        """The reports whose outcomes are still buffered, e.g. after a failed `flush()`."""
+        with self._lock:
+            return [outcome.report_id for outcome in self._outcomes]
+
+    def _write(self) -> None:
+        outcomes = self._outcomes
+        if not outcomes:
+            return
+
+        cleared = [
+            Q(report_id=outcome.report_id, label__group_id__in=outcome.cleared_groups)
+            for outcome in outcomes
+            if outcome.cleared_groups
+        ]
+        gate_answers = [
+            GateAnswer(
+                report_id=outcome.report_id,
+                label_group_id=group_id,
+                value=value,
+                prescreened=group_id in outcome.prescreened_groups,
+            )
+            for outcome in outcomes
+            for group_id, value in outcome.gates.items()
+        ]
+        label_results = [
+            LabelResult(report_id=outcome.report_id, label_id=label_id, value=value)
+            for outcome in outcomes
+            for label_id, value in outcome.labels.items()
+        ]
+        with transaction.atomic():
+            clear_dirty_reports([outcome.report_id for outcome in outcomes], self.started_at)
+            if cleared:
+                LabelResult.objects.filter(reduce(operator.or_, cleared)).delete()
+            # `generated_at` is auto_now, so bulk_create stamps it and the upsert copies it.
+            GateAnswer.objects.bulk_create(
+                gate_answers,
+                update_conflicts=True,
+                unique_fields=["report", "label_group"],
+                update_fields=["value", "prescreened", "generated_at"],
+            )
+            LabelResult.objects.bulk_create(
+                label_results,
+                update_conflicts=True,
+                unique_fields=["report", "label"],
+                update_fields=["value", "generated_at"],
+            )
+        self._outcomes = []
+
+
+def label_report(
+    report_id: int, use_llm_cache: bool = True, batch: LabelingBatch | None = None
+) -> None:
     """Classify one report against all active label groups using the gate-then-label flow.
 
     The single function used by both execution paths. Nothing in its control flow
     branches on a label's bucket value — the LLM returns a bucket per label and it is stored
-    as-is.
+    as-is. `use_llm_cache=False` bypasses the LLM response cache (a job's `bypass_llm_cache`).
+    Without a `batch` the report is labeled on its own and its outcome written right away;
+    with one, the outcome joins the batch's next write.
     """
+    own_batch = batch is None
+    if batch is None:
+        batch = LabelingBatch([report_id])
+    outcome = ReportOutcome(report_id)
+
     report = Report.objects.get(id=report_id)
     if not report.body or not report.body.strip():
         logger.warning("Report %s has empty body, skipping labeling.", report_id)
-        return
-
-    active_groups = list(
-        LabelGroup.objects.filter(labels__active=True).prefetch_related("labels").distinct()
-    )
-    if not active_groups:
+    elif not batch.active_groups:
         logger.warning("No active label groups, skipping labeling of report %s.", report_id)
-        return
+    else:
+        client = EngineLLMClient("labeling", use_cache=use_llm_cache)
+        _label_groups(client, report, batch, outcome)
 
-    client = LLMClient("labeling")
+    # Skipped reports are recorded too, so they leave the dirty set.
+    batch.add(outcome)
+    if own_batch:
+        batch.flush()
 
-    existing_gates = {
-        ga.label_group_id: ga
-        for ga in GateAnswer.objects.filter(report=report, label_group__in=active_groups)
-    }
 
-    groups_needing_gate = [
-        g
-        for g in active_groups
-        if g.id not in existing_gates or existing_gates[g.id].generated_at < g.updated_at
-    ]
+def _label_groups(
+    client: EngineLLMClient, report: Report, batch: LabelingBatch, outcome: ReportOutcome
+) -> None:
+    report_id = report.pk
+    active_groups = batch.active_groups
+    existing_gates = batch.gate_answers(report_id)
+
+    groups_needing_gate = _groups_needing_gate(active_groups, existing_gates)
     needing_ids = {g.id for g in groups_needing_gate}
     groups_with_fresh_gate = {
         g.id: existing_gates[g.id].value for g in active_groups if g.id not in needing_ids
     }
 
-    # Phase 1 — Gate: only for groups with stale or missing gate answers.
-    new_gate_results: dict[int, str] = {}
-    for gate_batch in batched(groups_needing_gate, settings.LABELING_GATE_BATCH_SIZE):
+    # Phase 1 — Gate: only for groups with stale or missing gate answers, and only for
+    # those the batch didn't already pre-screen or screen along with other reports.
+    screened = batch.screened_gates(report_id)
+    for g in groups_needing_gate:
+        if g.id in screened:
+            outcome.gates[g.id] = screened[g.id]
+    outcome.prescreened_groups = batch.prescreened_groups(report_id) & outcome.gates.keys()
+    unscreened = [g for g in groups_needing_gate if g.id not in screened]
+    for gate_batch in batched(unscreened, settings.LABELING_GATE_BATCH_SIZE):
         schema = build_gate_schema(gate_batch)
         parsed = client.extract_data(render_gate_prompt(report.body), schema)
         result_map = parsed.model_dump()
         for g in gate_batch:
-            new_gate_results[g.id] = str(result_map[g.name])
+            outcome.gates[g.id] = str(result_map[g.name])
 
     # Phase 2 — process each group.
     for group in active_groups:
         labels = [lbl for lbl in group.labels.all() if lbl.active]
 
-        if group.id in new_gate_results:
-            new_value = new_gate_results[group.id]
+        if group.id in outcome.gates:
+            gate_value = outcome.gates[group.id]
             old_gate = existing_gates.get(group.id)
             old_value = old_gate.value if old_gate else None
-
-            with transaction.atomic():
-                GateAnswer.objects.update_or_create(
-                    report=report, label_group=group, defaults={"value": new_value}
-                )
-                if new_value == GateAnswer.Value.NO and old_value == GateAnswer.Value.YES:
-                    LabelResult.objects.filter(report=report, label__group=group).delete()
-
-            if new_value == GateAnswer.Value.YES:
-                labels_to_run = _get_stale_or_missing_labels(report, labels)
-                if labels_to_run:
-                    _run_label_set(client, report, labels_to_run)
+            if gate_value == GateAnswer.Value.NO and old_value == GateAnswer.Value.YES:
+                outcome.cleared_groups.append(group.id)
         else:
             gate_value = groups_with_fresh_gate[group.id]
-            if gate_value == GateAnswer.Value.YES:
-                labels_to_run = _get_stale_or_missing_labels(report, labels)
-                if labels_to_run:
-                    _run_label_set(client, report, labels_to_run)
-            # else: gate = NO, fresh — skip group entirely.
 
+        # A fresh NO gate skips the group entirely.
+        if gate_value == GateAnswer.Value.YES:
+            labels_to_run = batch.stale_or_missing_labels(report_id, labels)
+            if labels_to_run:
+                outcome.labels.update(_run_label_set(client, report, labels_to_run))
 
-def _run_label_set(client: LLMClient, report: Report, labels: list[Label]) -> None:
+
+def _run_label_set(client: EngineLLMClient, report: Report, labels: list[Label]) -> dict[int, str]:
     schema = build_label_classification_schema(labels)
     parsed = client.extract_data(render_label_prompt(report.body), schema)
     result_map = parsed.model_dump()
-    for lbl in labels:
-        LabelResult.objects.update_or_create(
-            report=report, label_id=lbl.id, defaults={"value": result_map[lbl.name]}
-        )
-
-
-def _get_stale_or_missing_labels(report: Report, labels: list[Label]) -> list[Label]:
-    """Return labels whose LabelResult is missing or stale (result.generated_at < label.updated_at).
-
-    One query answers both "should we run?" (non-empty) and "what to run?" (the list).
-    A label that previously came back ABSENT/UNMENTIONED still has a fresh row → excluded.
-    """
-    fresh_ids = set(
-        LabelResult.objects.filter(
-            report=report,
-            label_id__in=[lbl.id for lbl in labels],
-            generated_at__gte=F("label__updated_at"),
-        ).values_list("label_id", flat=True)
-    )
-    return [lbl for lbl in labels if lbl.id not in fresh_ids]
+    return {lbl.id: result_map[lbl.name] for lbl in labels}
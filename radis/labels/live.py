@@ -0,0 +1,121 @@
+"""Near-real-time labeling of new reports (LABELING_LIVE).
+
+The periodic scan labels new reports once per LABELING_SCAN_CRON tick, and not at all while
+a backfill is running, so labels lag ingest by up to a day. With LABELING_LIVE on, the
+reports-created handler also queues the new reports here (`LabelingLiveEntry`), and they
+are labeled in micro-batches: one as soon as LABELING_LIVE_BATCH_SIZE reports are waiting,
+and whatever is left LABELING_LIVE_BATCH_SECONDS after it was queued.
+
+Each micro-batch is a `LabelingTask` of the day's live `LabelingJob` (LIVE trigger, one per
+`live_date`), so the job list gets one entry per day rather than one per batch. The job is
+reopened whenever a batch arrives after its earlier tasks finished. It is urgent, so its
+tasks run on the llm queue at LABELING_LIVE_PRIORITY, ahead of backfill tasks but within
+the same worker concurrency and LLM budget. Live jobs are exempt from the one active
+scan-or-manual job rule; that rule itself is unchanged. Once the day's job is canceled, its
+later batches are left to the scan. The scan still covers the same reports afterwards, but
+finds their answers fresh and makes no LLM calls for them.
+"""
+
+import logging
+from collections.abc import Sequence
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from radis.core.models import AnalysisJob, AnalysisTask
+
+from .models import Label, LabelingJob, LabelingLiveEntry, LabelingTask
+
+logger = logging.getLogger(__name__)
+
+# The states of a live job that a new batch reopens.
+_FINISHED_STATUSES = (
+    AnalysisJob.Status.SUCCESS,
+    AnalysisJob.Status.WARNING,
+    AnalysisJob.Status.FAILURE,
+)
+
+
+def queue_live_labeling(report_ids: Sequence[int]) -> None:
+    """Queue new reports for live labeling and make sure a flush is coming."""
+    from .tasks import enqueue_live_labeling_flush
+
+    if not settings.LABELING_LIVE or not report_ids:
+        return
+    if not Label.objects.filter(active=True).exists():
+        return
+
+    now = timezone.now()
+    LabelingLiveEntry.objects.bulk_create(
+        [LabelingLiveEntry(report_id=report_id, queued_at=now) for report_id in report_ids],
+        ignore_conflicts=True,
+    )
+    enqueue_live_labeling_flush(full_batches_only=False)
+    if LabelingLiveEntry.objects.count() >= settings.LABELING_LIVE_BATCH_SIZE:
+        enqueue_live_labeling_flush(full_batches_only=True)
+
+
+def _claim_batch(size: int) -> list[int]:
+    """Remove up to `size` of the longest-waiting reports from the queue and return them.
+    Concurrent flushes skip each other's rows."""
+    table = LabelingLiveEntry._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            DELETE FROM {table} WHERE id IN (
+                SELECT id FROM {table} ORDER BY id LIMIT %s FOR UPDATE SKIP LOCKED
+            )
+            RETURNING report_id
+            """,
+            [size],
+        )
+        return sorted(row[0] for row in cursor.fetchall())
+
+
+def _live_job() -> LabelingJob:
+    """Today's live job, locked, created if need be."""
+    job, _ = LabelingJob.objects.get_or_create(
+        live_date=timezone.localdate(),
+        defaults={
+            "trigger": LabelingJob.Trigger.LIVE,
+            "urgent": True,
+            "status": AnalysisJob.Status.PENDING,
+        },
+    )
+    return LabelingJob.objects.select_for_update().get(pk=job.pk)
+
+
+def flush_live_queue(full_batches_only: bool) -> int:
+    """Add a task to today's live labeling job for each batch of queued reports, leaving a
+    batch short of LABELING_LIVE_BATCH_SIZE in the queue if `full_batches_only`. Returns
+    the number of tasks started."""
+    size = settings.LABELING_LIVE_BATCH_SIZE
+    started = 0
+    while True:
+        # Claim and task commit together, so a crash in between loses no reports.
+        with transaction.atomic():
+            if full_batches_only and LabelingLiveEntry.objects.count() < size:
+                return started
+            report_ids = _claim_batch(size)
+            if not report_ids:
+                return started
+            job = _live_job()
+            if job.status in (AnalysisJob.Status.CANCELING, AnalysisJob.Status.CANCELED):
+                logger.info(
+                    "Live labeling job %s is canceled; leaving %d report(s) to the scan.",
+                    job.pk,
+                    len(report_ids),
+                )
+                continue
+            if job.status in _FINISHED_STATUSES:
+                job.status = AnalysisJob.Status.PENDING
+                job.message = ""
+                job.ended_at = None
+                job.save()
+            task = LabelingTask.objects.create(job=job, status=AnalysisTask.Status.PENDING)
+            task.reports.add(*report_ids)
+            task.delay()
+        started += 1
+        if len(report_ids) < size:
+            return started
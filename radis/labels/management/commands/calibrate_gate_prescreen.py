@@ -0,0 +1,127 @@
+"""Calibrate the embedding pre-screen of labeling gates (see radis.labels.prescreen).
+
+For every active label group (or the one named with --group), the reports the LLM
+already gated are scored by their embedding similarity to the group's gate question and
+exemplars, and the threshold is picked so that at least --target-recall of the LLM's YES
+answers score at or above it. The command prints, per group, the recall that threshold
+reaches on the sample and the share of the LLM's NO answers it would have answered
+without a gate call. With --apply the thresholds are stored; the group's earlier
+pre-screened answers are then dropped and their reports marked for labeling, so they are
+screened again with the new threshold.
+"""
+
+from itertools import batched
+from typing import Any
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import transaction
+
+from radis.labels.dirty import mark_reports_dirty
+from radis.labels.models import GateAnswer, LabelGroup
+from radis.labels.prescreen import calibrate_threshold, ensure_gate_vectors, report_similarities
+from radis.pgsearch.utils.embedding_columns import serving_embedding
+
+# Fewer YES answers than this don't say enough about a group's recall.
+_MIN_YES_ANSWERS = 20
+
+# Reports marked per statement.
+_CHUNK_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = (
+        "Pick each label group's embedding pre-screen threshold from the LLM's past gate "
+        "answers and report the recall and the gate calls it would save."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--group", help="Calibrate only the label group with this name.")
+        parser.add_argument(
+            "--target-recall",
+            type=float,
+            default=settings.LABELING_GATE_PRESCREEN_TARGET_RECALL,
+            help=(
+                "Share of the LLM's YES answers the pre-screen must let through (default "
+                f"{settings.LABELING_GATE_PRESCREEN_TARGET_RECALL})."
+            ),
+        )
+        parser.add_argument(
+            "--sample",
+            type=int,
+            default=5000,
+            help="Most recent LLM gate answers per group to calibrate on (default 5000).",
+        )
+        parser.add_argument(
+            "--apply", action="store_true", help="Store the thresholds (default: dry run)."
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        target_recall = options["target_recall"]
+        if not 0.0 < target_recall <= 1.0:
+            raise CommandError("--target-recall must be in (0, 1].")
+        target = serving_embedding()
+        if target is None:
+            raise CommandError("EMBEDDINGS_MODEL is not configured; nothing to pre-screen with.")
+
+        groups = LabelGroup.objects.filter(labels__active=True).distinct()
+        if options["group"]:
+            groups = groups.filter(name=options["group"])
+            if not groups.exists():
+                raise CommandError(f"No active label group named {options['group']!r}.")
+
+        for group in groups:
+            answers = list(
+                GateAnswer.objects.filter(label_group=group, prescreened=False)
+                .order_by("-generated_at")
+                .values_list("report_id", "value")[: options["sample"]]
+            )
+            vectors = ensure_gate_vectors(group, target)
+            similarities = report_similarities(
+                [report_id for report_id, _ in answers], vectors, target.column
+            )
+            yes = [
+                similarities[r]
+                for r, v in answers
+                if v == GateAnswer.Value.YES and r in similarities
+            ]
+            no = [
+                similarities[r]
+                for r, v in answers
+                if v == GateAnswer.Value.NO and r in similarities
+            ]
+            if len(yes) < _MIN_YES_ANSWERS:
+                self.stdout.write(
+                    f"{group.name}: skipped, only {len(yes)} YES answer(s) of reports with an "
+                    f"embedding (need {_MIN_YES_ANSWERS})."
+                )
+                continue
+
+            threshold = calibrate_threshold(yes, target_recall)
+            assert threshold is not None
+            recall = sum(1 for s in yes if s >= threshold) / len(yes)
+            skipped = sum(1 for s in no if s < threshold) / len(no) if no else 0.0
+            self.stdout.write(
+                f"{group.name}: threshold {threshold:.4f} · recall {recall:.1%} of {len(yes)} "
+                f"YES · answers {skipped:.1%} of {len(no)} NO without the LLM"
+            )
+            if options["apply"]:
+                self._apply(group, threshold)
+
+        if not options["apply"]:
+            self.stdout.write("Dry run; pass --apply to store the thresholds.")
+
+    def _apply(self, group: LabelGroup, threshold: float) -> None:
+        with transaction.atomic():
+            # `update()` keeps `updated_at`, so the group's gate answers stay fresh.
+            LabelGroup.objects.filter(pk=group.pk).update(prescreen_threshold=threshold)
+            earlier = GateAnswer.objects.filter(label_group=group, prescreened=True)
+            report_ids = list(earlier.values_list("report_id", flat=True))
+            earlier.delete()
+            for chunk in batched(report_ids, _CHUNK_SIZE):
+                mark_reports_dirty(chunk)
+        if report_ids:
+            self.stdout.write(
+                f"  Dropped {len(report_ids)} earlier pre-screened answer(s); run a labeling "
+                "backfill to screen them again."
+            )
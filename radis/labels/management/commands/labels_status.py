@@ -1,12 +1,14 @@
 from typing import Any
 
 from django.core.management.base import BaseCommand
-from django.db.models import F
 
+from radis.labels.counts import Counts, gate_answer_counts, label_result_counts
 from radis.labels.models import (
     GateAnswer,
     Label,
     LabelGroup,
+    LabelingDirtyEntry,
+    LabelingLiveEntry,
     LabelingScanCheckpoint,
     LabelResult,
 )
@@ -21,19 +23,27 @@ class Command(BaseCommand):
         last = checkpoint.last_scanned_at if checkpoint and checkpoint.last_scanned_at else "never"
         self.stdout.write(f"Last scan checkpoint: {last}")
         self.stdout.write(f"Total reports: {Report.objects.count()}")
+        pending = LabelingDirtyEntry.objects.values("report_id").distinct().count()
+        self.stdout.write(f"Reports with pending labeling work: {pending}")
+        self.stdout.write(f"Reports waiting for live labeling: {LabelingLiveEntry.objects.count()}")
 
         self.stdout.write("\nPer-label results:")
+        result_counts = label_result_counts()
         for label in Label.objects.select_related("group").order_by("group__name", "name"):
-            counts = {v.label: label.results.filter(value=v).count() for v in LabelResult.Value}
-            stale = label.results.filter(generated_at__lt=F("label__updated_at")).count()
-            summary = " · ".join(f"{n} {lbl}" for lbl, n in counts.items())
+            by_value = result_counts.get(label.pk, {})
+            counts = {v.label: by_value.get(v, Counts(0, 0)) for v in LabelResult.Value}
+            stale = sum(c.stale for c in counts.values())
+            summary = " · ".join(f"{c.count} {lbl}" for lbl, c in counts.items())
             self.stdout.write(f"  [{label.group.name}] {label.name}: {summary} · {stale} stale")
 
         self.stdout.write("\nPer-group gate answers:")
+        answer_counts = gate_answer_counts()
         for group in LabelGroup.objects.order_by("name"):
-            gc = {v.label: group.gate_answers.filter(value=v).count() for v in GateAnswer.Value}
-            gstale = group.gate_answers.filter(
-                generated_at__lt=F("label_group__updated_at")
-            ).count()
-            summary = " · ".join(f"{n} {lbl}" for lbl, n in gc.items())
-            self.stdout.write(f"  {group.name}: {summary} · {gstale} stale")
+            by_value = answer_counts.get(group.pk, {})
+            gc = {v.label: by_value.get(v, Counts(0, 0)) for v in GateAnswer.Value}
+            gstale = sum(c.stale for c in gc.values())
+            prescreened = sum(c.prescreened for c in gc.values())
+            summary = " · ".join(f"{c.count} {lbl}" for lbl, c in gc.items())
+            self.stdout.write(
+                f"  {group.name}: {summary} · {gstale} stale · {prescreened} pre-screened"
+            )
@@ -0,0 +1,16 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand
+
+from radis.labels.counts import rebuild_label_counts
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount the label result and gate answer counts from the results themselves. "
+        "Only needed if the counts drifted; labeling writes wait while it runs."
+    )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        rebuild_label_counts()
+        self.stdout.write("Rebuilt the label result and gate answer counts.")
@@ -0,0 +1,32 @@
+from itertools import batched
+from typing import Any
+
+from django.core.management.base import BaseCommand
+
+from radis.labels.dirty import mark_reports_dirty
+from radis.labels.models import LabelGroup
+from radis.labels.scope import _needs_work_queryset
+
+# Reports marked per statement.
+_CHUNK_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = (
+        "Mark every report that needs labeling work in the labeling dirty set, by checking "
+        "the whole corpus. Only needed for reports added without going through the app."
+    )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        active_group_count = LabelGroup.objects.filter(labels__active=True).distinct().count()
+        report_ids = (
+            _needs_work_queryset(active_group_count)
+            .order_by("pk")
+            .values_list("pk", flat=True)
+            .iterator(chunk_size=_CHUNK_SIZE)
+        )
+        marked = 0
+        for chunk in batched(report_ids, _CHUNK_SIZE):
+            mark_reports_dirty(chunk)
+            marked += len(chunk)
+        self.stdout.write(f"Marked {marked} report(s) as needing labeling work.")
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("labels", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="labelingjob",
+            name="bypass_llm_cache",
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,82 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Seed the dirty set with every (report, active group) pair the corpus-wide scan would
+# have found: a missing or stale gate answer, or a fresh YES gate with an active label
+# whose result is missing or stale.
+SEED_SQL = """
+INSERT INTO labels_labelingdirtyentry (report_id, label_group_id, marked_at)
+SELECT r.id, g.id, now()
+FROM reports_report r
+CROSS JOIN labels_labelgroup g
+WHERE EXISTS (SELECT 1 FROM labels_label l WHERE l.group_id = g.id AND l.active)
+AND (
+    NOT EXISTS (
+        SELECT 1 FROM labels_gateanswer ga
+        WHERE ga.report_id = r.id AND ga.label_group_id = g.id
+            AND ga.generated_at >= g.updated_at
+    )
+    OR EXISTS (
+        SELECT 1 FROM labels_gateanswer ga
+        JOIN labels_label l ON l.group_id = ga.label_group_id AND l.active
+        WHERE ga.report_id = r.id AND ga.label_group_id = g.id AND ga.value = 'YES'
+            AND ga.generated_at >= g.updated_at
+            AND NOT EXISTS (
+                SELECT 1 FROM labels_labelresult lr
+                WHERE lr.report_id = r.id AND lr.label_id = l.id
+                    AND lr.generated_at >= l.updated_at
+            )
+    )
+)
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("labels", "0002_labelingjob_bypass_llm_cache"),
+        ("reports", "0013_alter_report_options"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LabelingDirtyEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("marked_at", models.DateTimeField()),
+                (
+                    "label_group",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="labels.labelgroup",
+                    ),
+                ),
+                (
+                    "report",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="reports.report",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Labeling dirty entry",
+                "verbose_name_plural": "Labeling dirty entries",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("report", "label_group"),
+                        name="unique_dirty_entry_per_report_group",
+                    )
+                ],
+            },
+        ),
+        migrations.RunSQL(SEED_SQL, reverse_sql=migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,41 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("labels", "0003_labelingdirtyentry"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="labelgroup",
+            name="gate_exemplars",
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name="labelgroup",
+            name="prescreen_threshold",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="labelgroup",
+            name="gate_vectors",
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name="labelgroup",
+            name="gate_vectors_model",
+            field=models.CharField(blank=True, max_length=500),
+        ),
+        migrations.AddField(
+            model_name="labelgroup",
+            name="gate_vectors_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="gateanswer",
+            name="prescreened",
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,68 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Live micro-batches run alongside the one active scan or manual job, so the singleton index
+# leaves them out.
+ACTIVE_STATUSES = "('UV', 'PR', 'PE', 'IP', 'CI')"
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("labels", "0004_labelgroup_gate_prescreen"),
+        ("reports", "0013_alter_report_options"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LabelingLiveEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("queued_at", models.DateTimeField()),
+                (
+                    "report",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="reports.report",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Labeling live entry",
+                "verbose_name_plural": "Labeling live entries",
+            },
+        ),
+        migrations.AlterField(
+            model_name="labelingjob",
+            name="trigger",
+            field=models.CharField(
+                choices=[
+                    ("SCAN", "Periodic scan"),
+                    ("MANUAL", "Manual backfill"),
+                    ("LIVE", "Live micro-batch"),
+                ],
+                default="MANUAL",
+                max_length=10,
+            ),
+        ),
+        migrations.RunSQL(
+            sql=(
+                "DROP INDEX IF EXISTS one_active_labeling_job;"
+                "CREATE UNIQUE INDEX one_active_labeling_job "
+                "ON labels_labelingjob ((true)) "
+                f"WHERE status IN {ACTIVE_STATUSES} AND trigger <> 'LIVE';"
+            ),
+            reverse_sql=(
+                "DROP INDEX IF EXISTS one_active_labeling_job;"
+                "CREATE UNIQUE INDEX one_active_labeling_job "
+                "ON labels_labelingjob ((true)) "
+                f"WHERE status IN {ACTIVE_STATUSES};"
+            ),
+        ),
+    ]
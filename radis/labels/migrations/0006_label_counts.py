@@ -0,0 +1,177 @@
+from django.db import migrations, models
+from django.db.models import deletion
+
+# Statement-level triggers append one delta row per (parent, value) to the count tables for
+# every statement that writes results or gate answers; a row-level trigger on the parent
+# (label or group) zeroes the fresh counts when its `updated_at` moves. The tables are
+# seeded from the current rows. See radis.labels.counts.
+
+COUNTED = [
+    # (source table, count table, parent table, foreign key, extra summed columns)
+    ("labels_labelresult", "labels_labelresultcount", "labels_label", "label_id", []),
+    (
+        "labels_gateanswer",
+        "labels_gateanswercount",
+        "labels_labelgroup",
+        "label_group_id",
+        ["prescreened"],
+    ),
+]
+
+
+def _delta(rows: str, sign: int, parent: str, fk: str, extra: list[str]) -> str:
+    extra_columns = "".join(f", {sign} * r.{column}::int AS {column}" for column in extra)
+    return f"""
+        SELECT r.{fk}, r.value, {sign} AS count,
+            {sign} * (r.generated_at >= p.updated_at)::int AS fresh{extra_columns}
+        FROM {rows} r JOIN {parent} p ON p.id = r.{fk}
+    """
+
+
+def _append(count_table: str, fk: str, extra: list[str], deltas: str) -> str:
+    columns = ", ".join([fk, "value", "count", "fresh", *extra])
+    sums = ", ".join(f"sum({column})" for column in ["count", "fresh", *extra])
+    nonzero = " OR ".join(f"sum({column}) <> 0" for column in ["count", "fresh", *extra])
+    return f"""
+        INSERT INTO {count_table} ({columns})
+        SELECT {fk}, value, {sums} FROM ({deltas}) d
+        GROUP BY {fk}, value HAVING {nonzero};
+    """
+
+
+def _create_sql(source: str, count_table: str, parent: str, fk: str, extra: list[str]) -> str:
+    new = _delta("new_rows", 1, parent, fk, extra)
+    old = _delta("old_rows", -1, parent, fk, extra)
+    extra_zeros = "".join(", 0" for _ in extra)
+    return f"""
+        CREATE FUNCTION {count_table}_append() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                {_append(count_table, fk, extra, new)}
+            ELSIF TG_OP = 'UPDATE' THEN
+                {_append(count_table, fk, extra, f"{new} UNION ALL {old}")}
+            ELSE
+                {_append(count_table, fk, extra, old)}
+            END IF;
+            RETURN NULL;
+        END;
+        $$;
+
+        CREATE TRIGGER {source}_count_insert AFTER INSERT ON {source}
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION {count_table}_append();
+        CREATE TRIGGER {source}_count_update AFTER UPDATE ON {source}
+            REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION {count_table}_append();
+        CREATE TRIGGER {source}_count_delete AFTER DELETE ON {source}
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION {count_table}_append();
+
+        CREATE FUNCTION {count_table}_reset_fresh() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            -- Every row was generated before the edit, so none of them is fresh any more.
+            INSERT INTO {count_table} ({fk}, value, count, fresh{"".join(f", {c}" for c in extra)})
+            SELECT NEW.id, value, 0, -sum(fresh){extra_zeros} FROM {count_table}
+            WHERE {fk} = NEW.id
+            GROUP BY value HAVING sum(fresh) <> 0;
+            RETURN NULL;
+        END;
+        $$;
+
+        CREATE TRIGGER {parent}_reset_fresh AFTER UPDATE OF updated_at ON {parent}
+            FOR EACH ROW WHEN (OLD.updated_at IS DISTINCT FROM NEW.updated_at)
+            EXECUTE FUNCTION {count_table}_reset_fresh();
+
+        INSERT INTO {count_table} ({fk}, value, count, fresh{"".join(f", {c}" for c in extra)})
+        SELECT r.{fk}, r.value, count(*), count(*) FILTER (WHERE r.generated_at >= p.updated_at)
+            {"".join(f", count(*) FILTER (WHERE r.{c})" for c in extra)}
+        FROM {source} r JOIN {parent} p ON p.id = r.{fk}
+        GROUP BY r.{fk}, r.value;
+    """
+
+
+def _drop_sql(source: str, count_table: str, parent: str, fk: str, extra: list[str]) -> str:
+    return f"""
+        DROP TRIGGER IF EXISTS {parent}_reset_fresh ON {parent};
+        DROP TRIGGER IF EXISTS {source}_count_insert ON {source};
+        DROP TRIGGER IF EXISTS {source}_count_update ON {source};
+        DROP TRIGGER IF EXISTS {source}_count_delete ON {source};
+        DROP FUNCTION IF EXISTS {count_table}_reset_fresh();
+        DROP FUNCTION IF EXISTS {count_table}_append();
+    """
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("labels", "0005_labelinglive"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LabelResultCount",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                (
+                    "value",
+                    models.CharField(
+                        choices=[
+                            ("PRESENT", "Present"),
+                            ("LIKELY", "Likely"),
+                            ("POSSIBLE", "Possible"),
+                            ("ABSENT", "Absent"),
+                            ("UNMENTIONED", "Unmentioned"),
+                        ],
+                        max_length=11,
+                    ),
+                ),
+                ("count", models.BigIntegerField(default=0)),
+                ("fresh", models.BigIntegerField(default=0)),
+                (
+                    "label",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        on_delete=deletion.DO_NOTHING,
+                        related_name="result_counts",
+                        to="labels.label",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="GateAnswerCount",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                (
+                    "value",
+                    models.CharField(choices=[("YES", "Yes"), ("NO", "No")], max_length=3),
+                ),
+                ("count", models.BigIntegerField(default=0)),
+                ("fresh", models.BigIntegerField(default=0)),
+                ("prescreened", models.BigIntegerField(default=0)),
+                (
+                    "label_group",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        on_delete=deletion.DO_NOTHING,
+                        related_name="gate_answer_counts",
+                        to="labels.labelgroup",
+                    ),
+                ),
+            ],
+        ),
+        *[
+            migrations.RunSQL(sql=_create_sql(*counted), reverse_sql=_drop_sql(*counted))
+            for counted in COUNTED
+        ],
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("labels", "0006_label_counts"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="labelingjob",
+            name="live_date",
+            field=models.DateField(blank=True, null=True, unique=True),
+        ),
+    ]
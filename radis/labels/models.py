@@ -1,5 +1,5 @@
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
 from django.urls import reverse
 from procrastinate.contrib.django import app
 from procrastinate.contrib.django.models import ProcrastinateJob
@@ -12,6 +12,18 @@ class LabelGroup(models.Model):
     id: int
     name = models.CharField(max_length=100, unique=True)
     gate_question = models.TextField()  # upfront Yes/No screening question for this group
+    # Example report passages that should pass the gate, separated by blank lines. Embedded
+    # with the gate question for the embedding pre-screen (see radis.labels.prescreen).
+    gate_exemplars = models.TextField(blank=True)
+    # Reports less similar than this to the gate question and exemplars get a pre-screened
+    # NO gate answer. Set by `calibrate_gate_prescreen`; null leaves every gate to the LLM.
+    prescreen_threshold = models.FloatField(null=True, blank=True)
+    # The embedded gate question and exemplars, the embedding model (`model_key`) they and
+    # the threshold belong to, and when they were embedded. Written with `update()`, so
+    # they don't touch `updated_at`.
+    gate_vectors = models.JSONField(default=list, blank=True)
+    gate_vectors_model = models.CharField(max_length=500, blank=True)
+    gate_vectors_at = models.DateTimeField(null=True, blank=True)
     updated_at = models.DateTimeField(auto_now=True)  # drives gate stale detection
 
     labels: models.QuerySet["Label"]
@@ -91,6 +103,8 @@ class GateAnswer(models.Model):
         LabelGroup, on_delete=models.CASCADE, related_name="gate_answers"
     )
     value = models.CharField(max_length=3, choices=Value.choices)
+    # A NO answered by the embedding pre-screen instead of the LLM.
+    prescreened = models.BooleanField(default=False)
     generated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
@@ -105,6 +119,73 @@ class GateAnswer(models.Model):
         return f"GateAnswer {self.label_group_id}={self.value} [{self.pk}]"
 
 
+class LabelResultCount(models.Model):
+    """Result counts of a label per bucket: all of them, and the fresh ones.
+
+    The rows are deltas appended by database triggers on every write to the results and
+    on label edits, and folded into one row per (label, value) every few minutes; the
+    counts are the sums (see radis.labels.counts)."""
+
+    # No foreign key constraint: a label's results are deleted with it, and their delta rows
+    # may be written after the label's counts were; compaction drops them.
+    label = models.ForeignKey(
+        Label,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="result_counts",
+    )
+    value = models.CharField(max_length=11, choices=LabelResult.Value.choices)
+    count = models.BigIntegerField(default=0)
+    fresh = models.BigIntegerField(default=0)
+
+    def __str__(self) -> str:
+        return f"LabelResultCount {self.label_id}={self.value}: {self.count} [{self.pk}]"  # type: ignore
+
+
+class GateAnswerCount(models.Model):
+    """Gate answer counts of a label group per value: all of them, the fresh ones and
+    the pre-screened ones. Kept like `LabelResultCount`."""
+
+    label_group = models.ForeignKey(
+        LabelGroup,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="gate_answer_counts",
+    )
+    value = models.CharField(max_length=3, choices=GateAnswer.Value.choices)
+    count = models.BigIntegerField(default=0)
+    fresh = models.BigIntegerField(default=0)
+    prescreened = models.BigIntegerField(default=0)
+
+    def __str__(self) -> str:
+        return f"GateAnswerCount {self.label_group_id}={self.value}: {self.count} [{self.pk}]"  # type: ignore
+
+
+class LabelingDirtyEntry(models.Model):
+    """A (report, label group) pair that may need labeling work: a new report, an edited
+    group or label, or a report whose last labeling failed. Manual backfills take their
+    reports from here, and labeling a report drains its entries (see radis.labels.dirty)."""
+
+    report = models.ForeignKey(Report, on_delete=models.CASCADE, related_name="+", db_index=False)
+    label_group = models.ForeignKey(LabelGroup, on_delete=models.CASCADE, related_name="+")
+    # Refreshed when the pair is marked again, so a labeling run that started before
+    # the latest mark leaves the entry in place.
+    marked_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Labeling dirty entry"
+        verbose_name_plural = "Labeling dirty entries"
+        constraints = [
+            # Also the index the backfill pages through by report.
+            models.UniqueConstraint(
+                fields=["report", "label_group"], name="unique_dirty_entry_per_report_group"
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f"LabelingDirtyEntry {self.report_id}/{self.label_group_id} [{self.pk}]"  # type: ignore
+
+
 class LabelingScanCheckpoint(models.Model):
     last_scanned_at = models.DateTimeField(null=True, blank=True)
 
@@ -124,13 +205,29 @@ class LabelingScanCheckpoint(models.Model):
         super().save(*args, **kwargs)
 
 
+class LabelingLiveEntry(models.Model):
+    """A new report waiting for its live labeling micro-batch (see radis.labels.live)."""
+
+    report = models.OneToOneField(Report, on_delete=models.CASCADE, related_name="+")
+    queued_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Labeling live entry"
+        verbose_name_plural = "Labeling live entries"
+
+    def __str__(self) -> str:
+        return f"LabelingLiveEntry {self.report_id} [{self.pk}]"  # type: ignore
+
+
 class LabelingJob(AnalysisJob):
     class Trigger(models.TextChoices):
         SCAN = "SCAN", "Periodic scan"
         MANUAL = "MANUAL", "Manual backfill"
+        LIVE = "LIVE", "Live micro-batch"
 
     default_priority = settings.LABELING_JOB_PRIORITY
-    urgent_priority = settings.LABELING_JOB_PRIORITY  # labeling is never urgent
+    # Only live micro-batches are urgent, so new reports overtake a running backfill.
+    urgent_priority = settings.LABELING_LIVE_PRIORITY
 
     # Scan jobs have no human owner; override the non-nullable base FK to allow null.
     owner = models.ForeignKey(
@@ -146,9 +243,13 @@ class LabelingJob(AnalysisJob):
     )
     trigger = models.CharField(max_length=10, choices=Trigger.choices, default=Trigger.MANUAL)
     scan_from = models.DateTimeField(null=True, blank=True)
+    # The day a live job collects the micro-batch tasks of (one live job per day).
+    live_date = models.DateField(null=True, blank=True, unique=True)
 
     tasks: models.QuerySet["LabelingTask"]
 
+    # At most one scan or manual job may be in these statuses at a time (a partial unique
+    # index, see migrations 0001 and 0005); live micro-batches run alongside it.
     ACTIVE_STATUSES = (
         AnalysisJob.Status.UNVERIFIED,
         AnalysisJob.Status.PREPARING,
@@ -170,11 +271,26 @@ class LabelingJob(AnalysisJob):
         queued_job_id = app.configure_task(
             "radis.labels.tasks.process_labeling_job",
             allow_unknown=False,
-            priority=self.default_priority,
+            priority=self.urgent_priority if self.urgent else self.default_priority,
         ).defer(job_id=self.pk)
         self.queued_job_id = queued_job_id
         self.save()
 
+    def update_job_state(self) -> bool:
+        if self.trigger != self.Trigger.LIVE:
+            return super().update_job_state()
+        # A live job gets new tasks while its others finish (radis.labels.live). The flush
+        # adds them under this row lock, so a state computed from the tasks before one was
+        # added cannot overwrite the reopened job afterwards.
+        with transaction.atomic():
+            status = (
+                LabelingJob.objects.select_for_update()
+                .values_list("status", flat=True)
+                .get(pk=self.pk)
+            )
+            self.status = status
+            return super().update_job_state()
+
     # No completion mail in v1 (scan jobs are owner-less; no labeling mail template exists).
     finished_mail_template = None
 
@@ -193,7 +309,7 @@ class LabelingTask(AnalysisTask):
         queued_job_id = app.configure_task(
             "radis.labels.tasks.process_labeling_task",
             allow_unknown=False,
-            priority=self.job.default_priority,
+            priority=self.job.urgent_priority if self.job.urgent else self.job.default_priority,
         ).defer(task_id=self.pk)
         self.queued_job_id = queued_job_id
         self.save()
@@ -0,0 +1,105 @@
+"""Embedding pre-screen of labeling gates (LABELING_GATE_PRESCREEN).
+
+Every report gets a gate call per active label group, even when it obviously has nothing
+to do with the group (a knee MRI against a chest group). Most reports already have a
+vector in the search index, so each group's gate question and exemplars are embedded
+once, and a report whose best cosine similarity to them stays below the group's
+`prescreen_threshold` gets a NO gate answer marked `prescreened` without an LLM call.
+
+The threshold belongs to the embedding model it was calibrated with:
+`calibrate_gate_prescreen` picks, per group, the highest threshold that still lets the
+target share of the LLM's past YES answers through. Groups without a threshold, or
+calibrated with another model than the one search serves, reports without a vector, and
+reports whose gate was YES before are always left to the LLM.
+"""
+
+import math
+import re
+from collections.abc import Iterable, Sequence
+from itertools import batched
+
+from django.conf import settings
+from django.db.models import FloatField
+from django.db.models.functions import Least
+from django.utils import timezone
+from pgvector.django import CosineDistance
+
+from radis.core.utils.embedding_client import EMBEDDING_GATE, EmbeddingClient
+from radis.core.utils.rate_limit import run_through_gate
+from radis.pgsearch.models import ReportSearchIndex
+from radis.pgsearch.utils.embedding_columns import EmbeddingTarget, model_key
+
+from .models import LabelGroup
+
+# Report IDs whose similarities are computed per query.
+_SIMILARITY_CHUNK_SIZE = 1000
+
+
+def gate_texts(group: LabelGroup) -> list[str]:
+    """The gate question followed by the group's exemplars."""
+    exemplars = [text.strip() for text in re.split(r"\n\s*\n", group.gate_exemplars)]
+    return [group.gate_question] + [text for text in exemplars if text]
+
+
+def ensure_gate_vectors(group: LabelGroup, target: EmbeddingTarget) -> list[list[float]]:
+    """The group's embedded gate texts, embedded again if the group changed since or
+    they were embedded with another model than `target`'s."""
+    key = model_key(target.spec)
+    if (
+        group.gate_vectors
+        and group.gate_vectors_model == key
+        and group.gate_vectors_at is not None
+        and group.gate_vectors_at >= group.updated_at
+    ):
+        return group.gate_vectors
+
+    question, *exemplars = gate_texts(group)
+    # The question is embedded like a search query, the exemplars like the reports.
+    instruction = settings.EMBEDDINGS_QUERY_INSTRUCTION
+    texts = [f"{instruction}{question}" if instruction else question, *exemplars]
+    with EmbeddingClient(target.spec) as client:
+        vectors = run_through_gate(
+            EMBEDDING_GATE,
+            settings.EMBEDDINGS_RATE_LIMIT_MAX_WAIT_SECONDS,
+            lambda: client.embed_documents(texts),
+        )
+
+    group.gate_vectors = vectors
+    group.gate_vectors_model = key
+    group.gate_vectors_at = timezone.now()
+    LabelGroup.objects.filter(pk=group.pk).update(
+        gate_vectors=group.gate_vectors,
+        gate_vectors_model=group.gate_vectors_model,
+        gate_vectors_at=group.gate_vectors_at,
+    )
+    return vectors
+
+
+def report_similarities(
+    report_ids: Iterable[int], vectors: Sequence[list[float]], column: str
+) -> dict[int, float]:
+    """The best cosine similarity of each report's vector in `column` to any of
+    `vectors`. Reports without a vector are left out."""
+    distances = [CosineDistance(column, vector) for vector in vectors]
+    distance = distances[0] if len(distances) == 1 else Least(*distances, output_field=FloatField())
+    similarities: dict[int, float] = {}
+    for chunk in batched(report_ids, _SIMILARITY_CHUNK_SIZE):
+        rows = (
+            ReportSearchIndex.objects.filter(report_id__in=chunk)
+            .exclude(**{f"{column}__isnull": True})
+            .annotate(distance=distance)
+            .values_list("report_id", "distance")
+        )
+        for report_id, report_distance in rows:
+            similarities[report_id] = 1.0 - float(report_distance)
+    return similarities
+
+
+def calibrate_threshold(yes_similarities: Sequence[float], target_recall: float) -> float | None:
+    """The highest threshold that keeps at least `target_recall` of the reports the LLM
+    answered YES at or above it, or None without any YES answers."""
+    if not yes_similarities:
+        return None
+    ordered = sorted(yes_similarities)
+    allowed_misses = math.floor(len(ordered) * (1.0 - target_recall) + 1e-9)
+    return ordered[min(allowed_misses, len(ordered) - 1)]
@@ -6,8 +6,9 @@ from django.conf import settings
 
 from radis.core.models import AnalysisTask
 from radis.core.processors import AnalysisTaskProcessor
+from radis.core.utils.llm_engine import EngineLLMClient
 
-from .labeling import label_report
+from .labeling import LabelingBatch, label_report
 from .models import LabelingTask
 
 logger = logging.getLogger(__name__)
@@ -21,17 +22,43 @@ class LabelingTaskProcessor(AnalysisTaskProcessor):
     def process_task(self, task: LabelingTask) -> None:
         total = 0
         failures: list[tuple[int, str]] = []
+        use_llm_cache = not task.job.bypass_llm_cache
+        report_ids = list(task.reports.values_list("pk", flat=True))
+        # The reports share one batch: their existing answers are loaded together and
+        # their outcomes written together (see LabelingBatch).
+        batch = LabelingBatch(report_ids)
+        if settings.LABELING_GATE_PRESCREEN:
+            prescreened = batch.prescreen_gates()
+            logger.debug("Pre-screened %d gates of %d reports.", prescreened, len(report_ids))
+        if settings.LABELING_MULTI_REPORT_GATE:
+            screened = batch.screen_gates(EngineLLMClient("labeling", use_cache=use_llm_cache))
+            logger.debug(
+                "Screened %d of %d reports in shared gate calls.", screened, len(report_ids)
+            )
+        # Each thread runs one report's gate-then-label flow; the LLM calls themselves queue
+        # on the worker's shared engine, which bounds them across all tasks in the process.
         with ThreadPoolExecutor(max_workers=settings.LABELING_LLM_CONCURRENCY_LIMIT) as executor:
             try:
                 futures: list[Future] = []
-                for report_id in task.reports.values_list("pk", flat=True):
+                for report_id in report_ids:
                     total += 1
-                    futures.append(executor.submit(self._safe_label, report_id))
+                    futures.append(
+                        executor.submit(self._safe_label, report_id, use_llm_cache, batch)
+                    )
                 for future in futures:
                     failure = future.result()
                     if failure is not None:
                         failures.append(failure)
             finally:
+                try:
+                    batch.flush()
+                except Exception as err:
+                    # Every report whose outcome didn't make it to the database failed.
+                    logger.exception("Writing the labeling outcomes failed")
+                    failures.extend(
+                        (report_id, f"{type(err).__name__}: {err}")
+                        for report_id in batch.unwritten_report_ids()
+                    )
                 db.close_old_connections()
 
         if failures:
@@ -55,9 +82,11 @@ class LabelingTaskProcessor(AnalysisTaskProcessor):
             lines.append(f"… and {remaining} more")
         return "\n".join(lines)
 
-    def _safe_label(self, report_id: int) -> tuple[int, str] | None:
+    def _safe_label(
+        self, report_id: int, use_llm_cache: bool, batch: LabelingBatch
+    ) -> tuple[int, str] | None:
         try:
-            label_report(report_id)
+            label_report(report_id, use_llm_cache=use_llm_cache, batch=batch)
             return None
         except Exception as err:
             logger.exception("Labeling failed for report %s", report_id)
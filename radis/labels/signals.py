@@ -0,0 +1,43 @@
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from radis.reports.models import Report
+
+from .dirty import mark_reports_dirty
+from .models import Label, LabelGroup
+
+
+def _defer_mark_group_dirty(label_group_id: int, yes_gates_only: bool) -> None:
+    from .tasks import enqueue_mark_group_dirty
+
+    transaction.on_commit(lambda: enqueue_mark_group_dirty(label_group_id, yes_gates_only))
+
+
+@receiver(post_save, sender=Report)
+def mark_new_report_dirty(sender, instance: Report, created: bool, **kwargs) -> None:
+    # Reports bulk-created by the API are marked by the reports-created handler instead;
+    # marking a report twice is harmless.
+    if created:
+        mark_reports_dirty([instance.pk])
+
+
+@receiver(post_save, sender=LabelGroup)
+def mark_edited_group_dirty(sender, instance: LabelGroup, created: bool, **kwargs) -> None:
+    # A new group has no labels yet; its first active label marks it.
+    if not created:
+        _defer_mark_group_dirty(instance.pk, yes_gates_only=False)
+
+
+@receiver(post_save, sender=Label)
+def mark_edited_label_dirty(sender, instance: Label, created: bool, **kwargs) -> None:
+    if not instance.active:
+        return
+    # The group's only active label may just have made the group active, so every report
+    # needs its gate; otherwise only the reports that passed the gate need the label.
+    others_active = (
+        Label.objects.filter(group_id=instance.group_id, active=True)  # type: ignore
+        .exclude(pk=instance.pk)
+        .exists()
+    )
+    _defer_mark_group_dirty(instance.group_id, yes_gates_only=others_active)  # type: ignore
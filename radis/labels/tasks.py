@@ -1,26 +1,34 @@
 import logging
+from collections.abc import Iterator
 from datetime import UTC, datetime
 
 from django.conf import settings
 from django.db import transaction
-from django.db.models import QuerySet
 from django.utils import timezone
+from procrastinate import exceptions
 from procrastinate.contrib.django import app
 
 from radis.core.models import AnalysisJob, AnalysisTask
 from radis.reports.models import Report
 
-from .models import Label, LabelGroup, LabelingJob, LabelingScanCheckpoint, LabelingTask
-from .scope import _needs_work_queryset
+from . import counts
+from .dirty import dirty_report_ids, mark_group_dirty
+from .live import flush_live_queue
+from .models import Label, LabelingJob, LabelingScanCheckpoint, LabelingTask
 
 logger = logging.getLogger(__name__)
 
 
-def _scope_queryset(job: LabelingJob) -> QuerySet:
+def _scope_report_ids(job: LabelingJob) -> Iterator[int]:
     if job.scan_from is not None:  # SCAN job: recent window
-        return Report.objects.filter(created_at__gte=job.scan_from).order_by("pk")
-    active_group_count = LabelGroup.objects.filter(labels__active=True).distinct().count()
-    return _needs_work_queryset(active_group_count).order_by("pk")
+        return (
+            Report.objects.filter(created_at__gte=job.scan_from)
+            .order_by("pk")
+            .values_list("pk", flat=True)
+            .iterator(chunk_size=settings.LABELING_TASK_BATCH_SIZE)
+        )
+    # MANUAL backfill: the reports with pending work (see radis.labels.dirty).
+    return dirty_report_ids(settings.LABELING_TASK_BATCH_SIZE)
 
 
 def _flush_task(job: LabelingJob, report_ids: list[int]) -> None:
@@ -30,11 +38,7 @@ def _flush_task(job: LabelingJob, report_ids: list[int]) -> None:
 
 def _create_labeling_tasks_streaming(job: LabelingJob) -> None:
     batch: list[int] = []
-    for report_id in (
-        _scope_queryset(job)
-        .values_list("pk", flat=True)
-        .iterator(chunk_size=settings.LABELING_TASK_BATCH_SIZE)
-    ):
+    for report_id in _scope_report_ids(job):
         batch.append(report_id)
         if len(batch) >= settings.LABELING_TASK_BATCH_SIZE:
             _flush_task(job, batch)
@@ -101,6 +105,48 @@ def process_labeling_job(job_id: int) -> None:
             task.delay()
 
 
+@app.task
+def mark_labeling_group_dirty(label_group_id: int, yes_gates_only: bool) -> None:
+    mark_group_dirty(label_group_id, yes_gates_only)
+
+
+def enqueue_mark_group_dirty(label_group_id: int, yes_gates_only: bool) -> None:
+    app.configure_task(
+        "radis.labels.tasks.mark_labeling_group_dirty",
+        allow_unknown=False,
+    ).defer(label_group_id=label_group_id, yes_gates_only=yes_gates_only)
+
+
+@app.task
+def flush_live_labeling(full_batches_only: bool) -> None:
+    started = flush_live_queue(full_batches_only)
+    if started:
+        logger.info("Started %d live labeling task(s).", started)
+
+
+def enqueue_live_labeling_flush(full_batches_only: bool) -> None:
+    """Defer a flush of the live labeling queue: right away for the full batches, or
+    LABELING_LIVE_BATCH_SECONDS from now for everything. Each kind is deferred at most once
+    until it runs (queueing lock), however many reports arrive meanwhile."""
+    if full_batches_only:
+        deferrer = app.configure_task(
+            "radis.labels.tasks.flush_live_labeling",
+            allow_unknown=False,
+            queueing_lock="labels-live-flush-full",
+        )
+    else:
+        deferrer = app.configure_task(
+            "radis.labels.tasks.flush_live_labeling",
+            allow_unknown=False,
+            queueing_lock="labels-live-flush-all",
+            schedule_in={"seconds": settings.LABELING_LIVE_BATCH_SECONDS},
+        )
+    try:
+        deferrer.defer(full_batches_only=full_batches_only)
+    except exceptions.AlreadyEnqueued:
+        pass
+
+
 @app.task(queue="llm")
 def process_labeling_task(task_id: int) -> None:
     from .processors import LabelingTaskProcessor
@@ -120,7 +166,11 @@ def incremental_label_scan(timestamp: int) -> None:
     now = datetime.fromtimestamp(timestamp, tz=UTC)
     checkpoint, _ = LabelingScanCheckpoint.objects.get_or_create(pk=1)
 
-    active_job = LabelingJob.objects.filter(status__in=LabelingJob.ACTIVE_STATUSES).first()
+    active_job = (
+        LabelingJob.objects.filter(status__in=LabelingJob.ACTIVE_STATUSES)
+        .exclude(trigger=LabelingJob.Trigger.LIVE)
+        .first()
+    )
     if active_job is not None:
         # WARNING on purpose: a wedged active job blocks every future scan tick, so consecutive
         # occurrences of this line are the only signal that labeling has silently stopped.
@@ -157,3 +207,9 @@ def incremental_label_scan(timestamp: int) -> None:
 
     checkpoint.last_scanned_at = now
     checkpoint.save()
+
+
+@app.periodic(cron=settings.LABELING_COUNTS_COMPACT_CRON)
+@app.task()
+def compact_label_counts(timestamp: int) -> None:
+    counts.compact_label_counts()
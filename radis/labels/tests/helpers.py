@@ -1,29 +1,56 @@
 """Test doubles for the LLM boundary used by ``label_report``.
 
-- ``FakeChatClient`` replaces ``LLMClient`` outright (unit tests).
-- ``create_labeling_openai_mock`` patches ``openai.OpenAI`` so the real ``LLMClient`` runs with
-  only the network mocked (integration test).
+- ``FakeChatClient`` replaces ``EngineLLMClient`` outright (unit tests).
+- ``create_labeling_openai_mock`` patches ``openai.AsyncOpenAI`` so the real LLM engine runs
+  with only the network mocked (integration test).
 """
 
+import json
+from concurrent.futures import Future
 from unittest.mock import MagicMock
 
 from pydantic import BaseModel
 
+from radis.chats.utils.testing_helpers import response_format_fields
+
 
 class FakeChatClient:
     def __init__(
         self,
         gate_values: dict[str, str] | None = None,
         label_values: dict[str, str] | None = None,
+        fail_multi_report_gate: bool = False,
     ) -> None:
         self.gate_values = gate_values or {}
         self.label_values = label_values or {}
+        self.fail_multi_report_gate = fail_multi_report_gate
         self.gate_calls: list[list[str]] = []
         self.label_calls: list[list[str]] = []
+        # Number of reports per multi-report gate call.
+        self.multi_report_gate_calls: list[int] = []
+
+    def submit(self, prompt: str, schema: type[BaseModel]) -> Future[BaseModel]:
+        future: Future[BaseModel] = Future()
+        try:
+            future.set_result(self.extract_data(prompt, schema))
+        except Exception as err:
+            future.set_exception(err)
+        return future
 
     def extract_data(self, prompt: str, schema: type[BaseModel]) -> BaseModel:
         field_names = list(schema.model_fields.keys())
-        if schema.__name__ == "GateScreening":
+        if schema.__name__ == "MultiReportGateScreening":
+            self.multi_report_gate_calls.append(len(field_names))
+            if self.fail_multi_report_gate:
+                return schema.model_validate({})  # a malformed answer fails validation
+            gate_schema = schema.model_fields[field_names[0]].annotation
+            assert gate_schema is not None
+            gate_names = list(gate_schema.model_fields.keys())
+            data = {
+                report: {name: self.gate_values[name] for name in gate_names}
+                for report in field_names
+            }
+        elif schema.__name__ == "GateScreening":
             self.gate_calls.append(field_names)
             data = {name: self.gate_values[name] for name in field_names}
         else:
@@ -36,21 +63,23 @@ def create_labeling_openai_mock(
     gate_values: dict[str, str] | None = None,
     label_values: dict[str, str] | None = None,
 ) -> MagicMock:
-    """An ``openai.OpenAI`` double for the two-phase flow: ``parse`` returns an instance of
-    whichever schema each call requests — gate ("GateScreening") from ``gate_values``, label
-    ("LabelClassification") from ``label_values``, keyed by group/label name. Patch via
-    ``patch("openai.OpenAI", return_value=...)`` so the real ``LLMClient`` runs.
+    """An ``openai.AsyncOpenAI`` double for the two-phase flow: ``create`` answers whichever
+    schema each call's ``response_format`` requests — gate ("GateScreening") from
+    ``gate_values``, label ("LabelClassification") from ``label_values``, keyed by group/label
+    name. Patch via ``patch("openai.AsyncOpenAI", return_value=...)`` so the real LLM engine
+    runs.
     """
     gate_values = gate_values or {}
     label_values = label_values or {}
 
-    def _parse(**kwargs) -> MagicMock:
-        schema: type[BaseModel] = kwargs["response_format"]
-        names = list(schema.model_fields.keys())
-        source = gate_values if schema.__name__ == "GateScreening" else label_values
-        parsed = schema.model_validate({name: source[name] for name in names})
-        return MagicMock(choices=[MagicMock(message=MagicMock(parsed=parsed))])
+    async def _create(**kwargs) -> MagicMock:
+        response_format = kwargs["response_format"]
+        names = response_format_fields(response_format)
+        is_gate = response_format["json_schema"]["name"] == "GateScreening"
+        source = gate_values if is_gate else label_values
+        content = json.dumps({name: source[name] for name in names})
+        return MagicMock(choices=[MagicMock(message=MagicMock(content=content))])
 
     client = MagicMock()
-    client.beta.chat.completions.parse.side_effect = _parse
+    client.chat.completions.create.side_effect = _create
     return client
@@ -0,0 +1,123 @@
+import pytest
+from django.core.management import call_command
+
+from radis.labels.counts import (
+    compact_label_counts,
+    gate_answer_counts,
+    label_result_counts,
+    rebuild_label_counts,
+)
+from radis.labels.factories import (
+    GateAnswerFactory,
+    LabelFactory,
+    LabelGroupFactory,
+    LabelResultFactory,
+)
+from radis.labels.models import GateAnswer, LabelResult, LabelResultCount
+from radis.reports.factories import ReportFactory
+
+
+def _result_counts(label) -> dict[str, tuple[int, int]]:
+    counts = label_result_counts().get(label.pk, {})
+    return {value: (c.count, c.fresh) for value, c in counts.items() if c.count or c.fresh}
+
+
+@pytest.mark.django_db
+def test_result_writes_are_counted():
+    label = LabelFactory.create()
+    reports = ReportFactory.create_batch(3)
+    for report in reports:
+        LabelResultFactory.create(report=report, label=label, value=LabelResult.Value.PRESENT)
+
+    LabelResult.objects.bulk_create(
+        [LabelResult(report=reports[0], label=label, value=LabelResult.Value.ABSENT)],
+        update_conflicts=True,
+        unique_fields=["report", "label"],
+        update_fields=["value", "generated_at"],
+    )
+    LabelResult.objects.filter(report=reports[1]).delete()
+
+    assert _result_counts(label) == {
+        LabelResult.Value.PRESENT: (1, 1),
+        LabelResult.Value.ABSENT: (1, 1),
+    }
+
+
+@pytest.mark.django_db
+def test_label_edit_makes_all_its_results_stale():
+    label = LabelFactory.create()
+    report, other_report = ReportFactory.create_batch(2)
+    LabelResultFactory.create(report=report, label=label, value=LabelResult.Value.PRESENT)
+
+    label.description = "Edited."
+    label.save()
+    assert _result_counts(label) == {LabelResult.Value.PRESENT: (1, 0)}
+    assert label_result_counts()[label.pk][LabelResult.Value.PRESENT].stale == 1
+
+    LabelResultFactory.create(report=other_report, label=label, value=LabelResult.Value.PRESENT)
+    assert _result_counts(label) == {LabelResult.Value.PRESENT: (2, 1)}
+
+
+@pytest.mark.django_db
+def test_gate_answers_are_counted_with_the_prescreened_ones():
+    group = LabelGroupFactory.create()
+    yes_report, no_report, prescreened_report = ReportFactory.create_batch(3)
+    GateAnswerFactory.create(report=yes_report, label_group=group, value=GateAnswer.Value.YES)
+    GateAnswerFactory.create(report=no_report, label_group=group, value=GateAnswer.Value.NO)
+    GateAnswerFactory.create(
+        report=prescreened_report,
+        label_group=group,
+        value=GateAnswer.Value.NO,
+        prescreened=True,
+    )
+
+    counts = gate_answer_counts()[group.pk]
+
+    assert counts[GateAnswer.Value.YES].count == 1
+    assert counts[GateAnswer.Value.NO].count == 2
+    assert counts[GateAnswer.Value.NO].prescreened == 1
+
+
+@pytest.mark.django_db
+def test_compaction_folds_the_deltas_and_drops_deleted_labels():
+    label, deleted_label = LabelFactory.create_batch(2)
+    for report in ReportFactory.create_batch(3):
+        LabelResultFactory.create(report=report, label=label, value=LabelResult.Value.PRESENT)
+        LabelResultFactory.create(
+            report=report, label=deleted_label, value=LabelResult.Value.ABSENT
+        )
+    deleted_label.delete()
+
+    compact_label_counts()
+
+    assert list(LabelResultCount.objects.values_list("label_id", "value", "count", "fresh")) == [
+        (label.pk, LabelResult.Value.PRESENT, 3, 3)
+    ]
+
+
+@pytest.mark.django_db
+def test_rebuild_recounts_from_the_results():
+    label = LabelFactory.create()
+    LabelResultFactory.create(
+        report=ReportFactory.create(), label=label, value=LabelResult.Value.LIKELY
+    )
+    LabelResultCount.objects.create(label=label, value=LabelResult.Value.PRESENT, count=5)
+
+    rebuild_label_counts()
+
+    assert _result_counts(label) == {LabelResult.Value.LIKELY: (1, 1)}
+
+
+@pytest.mark.django_db
+def test_labels_status_reads_the_counts(capsys):
+    group = LabelGroupFactory.create(name="Chest")
+    label = LabelFactory.create(group=group, name="edema")
+    for report in ReportFactory.create_batch(2):
+        LabelResultFactory.create(report=report, label=label, value=LabelResult.Value.PRESENT)
+    label.save()
+
+    call_command("labels_status")
+    out = capsys.readouterr().out
+
+    assert "[Chest] edema: 2 Present · 0 Likely" in out
+    assert "· 2 stale" in out
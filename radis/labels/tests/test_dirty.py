@@ -0,0 +1,139 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from radis.labels.dirty import (
+    clear_dirty_reports,
+    dirty_report_ids,
+    mark_group_dirty,
+    mark_reports_dirty,
+)
+from radis.labels.factories import GateAnswerFactory, LabelFactory, LabelGroupFactory
+from radis.labels.models import GateAnswer, LabelingDirtyEntry
+from radis.labels.tests.helpers import FakeChatClient
+from radis.reports.factories import ReportFactory
+
+
+def _dirty_pairs():
+    return set(LabelingDirtyEntry.objects.values_list("report_id", "label_group_id"))
+
+
+@pytest.mark.django_db
+def test_new_reports_are_dirty_for_every_active_group():
+    group = LabelGroupFactory.create()
+    LabelFactory.create(group=group)
+    inactive_group = LabelGroupFactory.create()
+    LabelFactory.create(group=inactive_group, active=False)
+
+    report = ReportFactory.create()
+
+    assert _dirty_pairs() == {(report.pk, group.pk)}
+
+
+@pytest.mark.django_db
+def test_marking_again_is_idempotent_and_refreshes_the_mark():
+    LabelFactory.create(group=LabelGroupFactory.create())
+    report = ReportFactory.create()
+    LabelingDirtyEntry.objects.update(marked_at=timezone.now() - timedelta(days=1))
+
+    mark_reports_dirty([report.pk])
+
+    entry = LabelingDirtyEntry.objects.get()
+    assert entry.marked_at > timezone.now() - timedelta(minutes=1)
+
+
+@pytest.mark.django_db
+def test_group_marks_all_reports_or_only_those_past_the_gate():
+    group = LabelGroupFactory.create()
+    yes_report, no_report = ReportFactory.create(), ReportFactory.create()
+    GateAnswerFactory.create(report=yes_report, label_group=group, value=GateAnswer.Value.YES)
+    GateAnswerFactory.create(report=no_report, label_group=group, value=GateAnswer.Value.NO)
+
+    mark_group_dirty(group.pk, yes_gates_only=True)
+    assert _dirty_pairs() == {(yes_report.pk, group.pk)}
+
+    mark_group_dirty(group.pk, yes_gates_only=False)
+    assert _dirty_pairs() == {(yes_report.pk, group.pk), (no_report.pk, group.pk)}
+
+
+@pytest.mark.django_db
+def test_label_edits_mark_their_group_after_commit(monkeypatch, django_capture_on_commit_callbacks):
+    from radis.labels import tasks
+
+    deferred = []
+    monkeypatch.setattr(tasks, "enqueue_mark_group_dirty", lambda *args: deferred.append(args))
+    group = LabelGroupFactory.create()
+    with django_capture_on_commit_callbacks(execute=True):
+        first = LabelFactory.create(group=group)
+    with django_capture_on_commit_callbacks(execute=True):
+        LabelFactory.create(group=group)
+    with django_capture_on_commit_callbacks(execute=True):
+        first.description = "edited"
+        first.save()
+        group.gate_question = "edited?"
+        group.save()
+
+    # The group's first active label needs every gate; later ones only the YES reports.
+    assert deferred == [(group.pk, False), (group.pk, True), (group.pk, True), (group.pk, False)]
+
+
+@pytest.mark.django_db
+def test_dirty_report_ids_pages_through_each_report_once():
+    for _ in range(2):
+        LabelFactory.create(group=LabelGroupFactory.create())
+    reports = [ReportFactory.create() for _ in range(5)]
+
+    assert list(dirty_report_ids(chunk_size=2)) == sorted(report.pk for report in reports)
+
+
+@pytest.mark.django_db
+def test_clear_keeps_entries_marked_after_the_run_started():
+    LabelFactory.create(group=LabelGroupFactory.create())
+    report = ReportFactory.create()
+    started_at = timezone.now()
+    LabelingDirtyEntry.objects.update(marked_at=started_at + timedelta(seconds=1))
+
+    clear_dirty_reports([report.pk], started_at)
+    assert LabelingDirtyEntry.objects.exists()
+
+    clear_dirty_reports([report.pk], started_at + timedelta(seconds=2))
+    assert not LabelingDirtyEntry.objects.exists()
+
+
+@pytest.mark.django_db
+def test_labeling_a_report_drains_it_from_the_dirty_set():
+    from unittest.mock import patch
+
+    from radis.labels.labeling import label_report
+
+    group = LabelGroupFactory.create()
+    LabelFactory.create(group=group)
+    labeled, pending = ReportFactory.create(), ReportFactory.create()
+
+    client = FakeChatClient(gate_values={group.name: "NO"})
+    with patch("radis.labels.labeling.EngineLLMClient", return_value=client):
+        label_report(labeled.pk)
+
+    assert _dirty_pairs() == {(pending.pk, group.pk)}
+
+
+@pytest.mark.django_db
+def test_manual_backfill_only_takes_dirty_reports(monkeypatch):
+    from radis.labels import tasks
+    from radis.labels.factories import LabelingJobFactory
+    from radis.labels.models import LabelingJob, LabelingTask
+
+    unlabeled_before = ReportFactory.create()  # created before any label: not dirty
+    LabelFactory.create(group=LabelGroupFactory.create())
+    dirty = ReportFactory.create()
+
+    job = LabelingJobFactory.create(
+        trigger=LabelingJob.Trigger.MANUAL, status=LabelingJob.Status.PENDING
+    )
+    monkeypatch.setattr(LabelingTask, "delay", lambda self: None)
+    tasks.process_labeling_job(job.pk)
+
+    included = {pk for task in job.tasks.all() for pk in task.reports.values_list("pk", flat=True)}
+    assert included == {dirty.pk}
+    assert unlabeled_before.pk not in included  # the rebuild command would pick it up
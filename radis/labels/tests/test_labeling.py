@@ -1,6 +1,7 @@
 from unittest.mock import patch
 
 import pytest
+from django.db import DatabaseError
 from django.test import override_settings
 
 from radis.labels.factories import GateAnswerFactory, LabelFactory, LabelGroupFactory
@@ -10,7 +11,7 @@ from radis.reports.factories import ReportFactory
 
 
 def _patch_client(client):
-    return patch("radis.labels.labeling.LLMClient", return_value=client)
+    return patch("radis.labels.labeling.EngineLLMClient", return_value=client)
 
 
 @pytest.mark.django_db
@@ -236,3 +237,133 @@ def test_stale_gate_yes_yes_with_fresh_results_makes_no_label_calls():
     assert len(client.gate_calls) == 1
     assert client.label_calls == []  # results already fresh -> no label LLM call
     assert LabelResult.objects.get(report=report, label=label).value == "PRESENT"
+
+
+@pytest.mark.django_db
+@override_settings(LABELING_RESULT_FLUSH_SIZE=100)
+def test_batch_buffers_outcomes_until_flushed_and_then_upserts_them():
+    from radis.labels.labeling import LabelingBatch, label_report
+
+    reports = [ReportFactory.create(body=f"study {i}") for i in range(3)]
+    group = LabelGroupFactory.create()
+    label = LabelFactory.create(group=group)
+    stale = LabelResult.objects.create(
+        report=reports[0], label=label, value=LabelResult.Value.ABSENT
+    )
+    label.description = "edited"
+    label.save()
+
+    batch = LabelingBatch([report.pk for report in reports])
+    client = FakeChatClient(gate_values={group.name: "YES"}, label_values={label.name: "PRESENT"})
+    with _patch_client(client):
+        for report in reports:
+            label_report(report.pk, batch=batch)
+
+    assert GateAnswer.objects.count() == 0
+    assert LabelResult.objects.get(pk=stale.pk).value == "ABSENT"
+
+    batch.flush()
+
+    assert GateAnswer.objects.filter(label_group=group, value="YES").count() == 3
+    assert LabelResult.objects.filter(label=label, value="PRESENT").count() == 3
+    # The stale row was updated in place rather than replaced.
+    assert LabelResult.objects.get(pk=stale.pk).value == "PRESENT"
+
+
+@pytest.mark.django_db
+@override_settings(LABELING_RESULT_FLUSH_SIZE=2)
+def test_batch_writes_every_flush_size_reports():
+    from radis.labels.labeling import LabelingBatch, label_report
+
+    reports = [ReportFactory.create(body=f"study {i}") for i in range(3)]
+    group = LabelGroupFactory.create()
+    LabelFactory.create(group=group)
+
+    batch = LabelingBatch([report.pk for report in reports])
+    client = FakeChatClient(gate_values={group.name: "NO"})
+    with _patch_client(client):
+        for report in reports:
+            label_report(report.pk, batch=batch)
+
+    assert GateAnswer.objects.count() == 2
+    batch.flush()
+    assert GateAnswer.objects.count() == 3
+
+
+@pytest.mark.django_db
+@override_settings(LABELING_RESULT_FLUSH_SIZE=2)
+def test_batch_keeps_the_outcomes_of_a_failed_write_for_the_flush():
+    from radis.labels.labeling import LabelingBatch, label_report
+
+    reports = [ReportFactory.create(body=f"study {i}") for i in range(3)]
+    group = LabelGroupFactory.create()
+    LabelFactory.create(group=group)
+    batch = LabelingBatch([report.pk for report in reports])
+    client = FakeChatClient(gate_values={group.name: "NO"})
+    failing = patch.object(
+        GateAnswer.objects, "bulk_create", side_effect=DatabaseError("upsert failed")
+    )
+    with _patch_client(client), failing:
+        for report in reports:
+            label_report(report.pk, batch=batch)
+
+    assert batch.unwritten_report_ids() == [report.pk for report in reports]
+    batch.flush()
+
+    assert batch.unwritten_report_ids() == []
+    assert GateAnswer.objects.filter(label_group=group, value="NO").count() == 3
+
+
+def test_pack_gate_reports_respects_budget_and_leaves_long_reports_alone():
+    from radis.labels.labeling import pack_gate_reports
+
+    bodies = {1: "a" * 400, 2: "b" * 400, 3: "c" * 4000, 4: "d" * 400, 5: "e" * 400, 6: "f" * 400}
+
+    # About 100 tokens per short report: two fit a 300 token budget, the long one never does
+    # and the last one has nobody left to share a call with.
+    assert pack_gate_reports(bodies, token_budget=300, max_reports=8) == [[1, 2], [4, 5]]
+    assert pack_gate_reports(bodies, token_budget=10_000, max_reports=3) == [[1, 2, 3], [4, 5, 6]]
+
+
+@pytest.mark.django_db
+@override_settings(LABELING_MULTI_REPORT_GATE_MAX_REPORTS=8)
+def test_screened_gates_replace_per_report_gate_calls():
+    from radis.labels.labeling import LabelingBatch, label_report
+
+    reports = [ReportFactory.create(body=f"short study {i}") for i in range(3)]
+    group = LabelGroupFactory.create()
+    label = LabelFactory.create(group=group)
+    client = FakeChatClient(gate_values={group.name: "YES"}, label_values={label.name: "ABSENT"})
+
+    batch = LabelingBatch([report.pk for report in reports])
+    with _patch_client(client):
+        assert batch.screen_gates(client) == 3  # type: ignore[arg-type]
+        for report in reports:
+            label_report(report.pk, batch=batch)
+    batch.flush()
+
+    assert client.multi_report_gate_calls == [3]
+    assert client.gate_calls == []
+    assert len(client.label_calls) == 3
+    assert GateAnswer.objects.filter(label_group=group, value="YES").count() == 3
+
+
+@pytest.mark.django_db
+def test_malformed_multi_report_gate_answer_falls_back_to_per_report_calls():
+    from radis.labels.labeling import LabelingBatch, label_report
+
+    reports = [ReportFactory.create(body=f"short study {i}") for i in range(2)]
+    group = LabelGroupFactory.create()
+    LabelFactory.create(group=group)
+    client = FakeChatClient(gate_values={group.name: "NO"}, fail_multi_report_gate=True)
+
+    batch = LabelingBatch([report.pk for report in reports])
+    with _patch_client(client):
+        assert batch.screen_gates(client) == 0  # type: ignore[arg-type]
+        for report in reports:
+            label_report(report.pk, batch=batch)
+    batch.flush()
+
+    assert client.multi_report_gate_calls == [2]
+    assert len(client.gate_calls) == 2
+    assert GateAnswer.objects.filter(label_group=group, value="NO").count() == 2
@@ -1,5 +1,5 @@
-"""Runs the real LLMClient + schema/prompt builders with only openai.OpenAI mocked (the unit
-suite fakes that), pinning the prompt/schema sent on the wire and the gate→label flow."""
+"""Runs the real LLM engine + schema/prompt builders with only openai.AsyncOpenAI mocked (the
+unit suite fakes the client), pinning the prompt/schema sent on the wire and the gate→label flow."""
 
 from unittest.mock import patch
 
@@ -25,14 +25,14 @@ def test_real_llm_client_two_phase_flow_persists_results():
         gate_values={group.name: "YES"},
         label_values={present.name: "PRESENT", absent.name: "ABSENT"},
     )
-    with patch("openai.OpenAI", return_value=client):
+    with patch("openai.AsyncOpenAI", return_value=client):
         label_report(report.pk)
 
     assert GateAnswer.objects.get(report=report, label_group=group).value == GateAnswer.Value.YES
     assert LabelResult.objects.get(report=report, label=present).value == LabelResult.Value.PRESENT
     assert LabelResult.objects.get(report=report, label=absent).value == LabelResult.Value.ABSENT
-    # Exactly one gate parse and one label parse — no redundant calls.
-    assert client.beta.chat.completions.parse.call_count == 2
+    # Exactly one gate call and one label call — no redundant calls.
+    assert client.chat.completions.create.call_count == 2
 
 
 @pytest.mark.django_db
@@ -48,15 +48,19 @@ def test_real_llm_client_sends_rendered_prompt_and_built_schema():
         gate_values={group.name: "YES"},
         label_values={label.name: "ABSENT"},
     )
-    with patch("openai.OpenAI", return_value=client):
+    with patch("openai.AsyncOpenAI", return_value=client):
         label_report(report.pk)
 
-    calls = client.beta.chat.completions.parse.call_args_list
+    calls = client.chat.completions.create.call_args_list
     gate_kwargs = next(
-        c.kwargs for c in calls if c.kwargs["response_format"].__name__ == "GateScreening"
+        c.kwargs
+        for c in calls
+        if c.kwargs["response_format"]["json_schema"]["name"] == "GateScreening"
     )
     label_kwargs = next(
-        c.kwargs for c in calls if c.kwargs["response_format"].__name__ == "LabelClassification"
+        c.kwargs
+        for c in calls
+        if c.kwargs["response_format"]["json_schema"]["name"] == "LabelClassification"
     )
 
     # The user message sent is exactly the labels code's rendered prompt for this report body.
@@ -67,13 +71,13 @@ def test_real_llm_client_sends_rendered_prompt_and_built_schema():
 
     # response_format is the dynamically-built schema: name-keyed, carrying the gate question /
     # label definition the LLM is asked to honor.
-    gate_schema = gate_kwargs["response_format"]
-    assert set(gate_schema.model_fields) == {group.name}
-    assert gate_schema.model_fields[group.name].description == group.gate_question
+    gate_schema = gate_kwargs["response_format"]["json_schema"]["schema"]["properties"]
+    assert set(gate_schema) == {group.name}
+    assert gate_schema[group.name]["description"] == group.gate_question
 
-    label_schema = label_kwargs["response_format"]
-    assert set(label_schema.model_fields) == {label.name}
-    assert label_schema.model_fields[label.name].description == label.description
+    label_schema = label_kwargs["response_format"]["json_schema"]["schema"]["properties"]
+    assert set(label_schema) == {label.name}
+    assert label_schema[label.name]["description"] == label.description
 
 
 @pytest.mark.django_db
@@ -84,11 +88,11 @@ def test_real_llm_client_gate_no_skips_label_classification():
     label = LabelFactory.create(group=group, name="pneumonia")
 
     client = create_labeling_openai_mock(gate_values={group.name: "NO"})
-    with patch("openai.OpenAI", return_value=client):
+    with patch("openai.AsyncOpenAI", return_value=client):
         label_report(report.pk)
 
-    calls = client.beta.chat.completions.parse.call_args_list
+    calls = client.chat.completions.create.call_args_list
     assert len(calls) == 1
-    assert calls[0].kwargs["response_format"].__name__ == "GateScreening"
+    assert calls[0].kwargs["response_format"]["json_schema"]["name"] == "GateScreening"
     assert GateAnswer.objects.get(report=report, label_group=group).value == GateAnswer.Value.NO
     assert not LabelResult.objects.filter(report=report, label=label).exists()
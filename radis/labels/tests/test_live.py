@@ -0,0 +1,119 @@
+import pytest
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from radis.labels import tasks
+from radis.labels.factories import LabelFactory, LabelingJobFactory
+from radis.labels.live import flush_live_queue, queue_live_labeling
+from radis.labels.models import LabelingJob, LabelingLiveEntry, LabelingTask
+from radis.reports.factories import ReportFactory
+
+
+@pytest.fixture
+def deferred_flushes(monkeypatch):
+    deferred = []
+    monkeypatch.setattr(tasks, "enqueue_live_labeling_flush", lambda **kw: deferred.append(kw))
+    return deferred
+
+
+@pytest.mark.django_db
+def test_queueing_is_off_unless_enabled(settings, deferred_flushes):
+    settings.LABELING_LIVE = False
+    LabelFactory.create()
+    queue_live_labeling([ReportFactory.create().pk])
+
+    assert not LabelingLiveEntry.objects.exists()
+    assert deferred_flushes == []
+
+
+@pytest.mark.django_db
+def test_queue_flushes_after_the_delay_or_once_a_batch_is_full(settings, deferred_flushes):
+    settings.LABELING_LIVE = True
+    settings.LABELING_LIVE_BATCH_SIZE = 3
+    LabelFactory.create()
+    reports = [ReportFactory.create() for _ in range(3)]
+
+    queue_live_labeling([reports[0].pk, reports[1].pk])
+    assert deferred_flushes == [{"full_batches_only": False}]
+
+    queue_live_labeling([reports[1].pk, reports[2].pk])  # queued twice, kept once
+    assert LabelingLiveEntry.objects.count() == 3
+    assert deferred_flushes[1:] == [{"full_batches_only": False}, {"full_batches_only": True}]
+
+
+@pytest.mark.django_db
+def test_nothing_is_queued_without_active_labels(settings, deferred_flushes):
+    settings.LABELING_LIVE = True
+    LabelFactory.create(active=False)
+    queue_live_labeling([ReportFactory.create().pk])
+
+    assert not LabelingLiveEntry.objects.exists()
+
+
+@pytest.mark.django_db
+def test_flush_adds_one_task_per_batch_to_the_days_live_job(settings, monkeypatch):
+    settings.LABELING_LIVE_BATCH_SIZE = 2
+    monkeypatch.setattr(LabelingTask, "delay", lambda self: None)
+    reports = [ReportFactory.create() for _ in range(5)]
+    for report in reports:
+        LabelingLiveEntry.objects.create(report=report, queued_at=report.created_at)
+
+    assert flush_live_queue(full_batches_only=True) == 2
+    assert list(LabelingLiveEntry.objects.values_list("report_id", flat=True)) == [reports[4].pk]
+
+    assert flush_live_queue(full_batches_only=False) == 1
+    assert not LabelingLiveEntry.objects.exists()
+
+    job = LabelingJob.objects.get()
+    assert (job.trigger, job.live_date) == (LabelingJob.Trigger.LIVE, timezone.localdate())
+    assert job.urgent and job.status == LabelingJob.Status.PENDING
+    batches = [
+        list(task.reports.order_by("pk").values_list("pk", flat=True))
+        for task in job.tasks.order_by("pk")
+    ]
+    assert batches == [[r.pk for r in reports[:2]], [r.pk for r in reports[2:4]], [reports[4].pk]]
+
+
+@pytest.mark.django_db
+def test_a_new_batch_reopens_the_finished_live_job(settings, monkeypatch):
+    monkeypatch.setattr(LabelingTask, "delay", lambda self: None)
+    job = LabelingJobFactory.create(
+        trigger=LabelingJob.Trigger.LIVE,
+        live_date=timezone.localdate(),
+        status=LabelingJob.Status.SUCCESS,
+        ended_at=timezone.now(),
+    )
+    LabelingLiveEntry.objects.create(report=ReportFactory.create(), queued_at=timezone.now())
+
+    assert flush_live_queue(full_batches_only=False) == 1
+
+    job.refresh_from_db()
+    assert (job.status, job.ended_at) == (LabelingJob.Status.PENDING, None)
+    assert not job.update_job_state()
+    assert job.status == LabelingJob.Status.PENDING
+
+
+@pytest.mark.django_db
+def test_batches_of_a_canceled_live_job_are_left_to_the_scan(monkeypatch):
+    monkeypatch.setattr(LabelingTask, "delay", lambda self: None)
+    job = LabelingJobFactory.create(
+        trigger=LabelingJob.Trigger.LIVE,
+        live_date=timezone.localdate(),
+        status=LabelingJob.Status.CANCELED,
+    )
+    LabelingLiveEntry.objects.create(report=ReportFactory.create(), queued_at=timezone.now())
+
+    assert flush_live_queue(full_batches_only=False) == 0
+    assert not LabelingLiveEntry.objects.exists()
+    assert not job.tasks.exists()
+
+
+@pytest.mark.django_db
+def test_live_jobs_leave_the_single_active_job_rule_to_scans_and_backfills():
+    LabelingJobFactory.create(trigger=LabelingJob.Trigger.LIVE, status=LabelingJob.Status.PENDING)
+    LabelingJobFactory.create(trigger=LabelingJob.Trigger.LIVE, status=LabelingJob.Status.PENDING)
+    LabelingJobFactory.create(status=LabelingJob.Status.PENDING)
+
+    with pytest.raises(IntegrityError):
+        with transaction.atomic():
+            LabelingJobFactory.create(status=LabelingJob.Status.IN_PROGRESS)
@@ -0,0 +1,107 @@
+from unittest.mock import patch
+
+import pytest
+from django.core.management import call_command
+
+from radis.core.utils.model_spec import ModelSpec
+from radis.labels.factories import GateAnswerFactory, LabelFactory, LabelGroupFactory
+from radis.labels.labeling import LabelingBatch, label_report
+from radis.labels.models import GateAnswer, LabelGroup
+from radis.labels.tests.helpers import FakeChatClient
+from radis.pgsearch.utils.embedding_columns import EmbeddingTarget, model_key
+from radis.reports.factories import ReportFactory
+
+SPEC = ModelSpec("test-embedding")
+TARGET = EmbeddingTarget("embedding", SPEC)
+
+
+def _calibrated_group(threshold: float) -> LabelGroup:
+    group = LabelGroupFactory.create(name="Chest")
+    LabelFactory.create(group=group, name="effusion")
+    LabelGroup.objects.filter(pk=group.pk).update(
+        prescreen_threshold=threshold, gate_vectors_model=model_key(SPEC)
+    )
+    return LabelGroup.objects.get(pk=group.pk)
+
+
+@pytest.mark.django_db
+def test_prescreen_answers_unrelated_reports_no_without_the_llm():
+    group = _calibrated_group(threshold=0.5)
+    knee = ReportFactory.create(body="MRI of the left knee: meniscal tear.")
+    chest = ReportFactory.create(body="Chest X-ray: small left pleural effusion.")
+    similarities = {knee.pk: 0.2, chest.pk: 0.8}
+
+    batch = LabelingBatch([knee.pk, chest.pk])
+    with (
+        patch("radis.labels.labeling.serving_embedding", return_value=TARGET),
+        patch("radis.labels.labeling.ensure_gate_vectors", return_value=[[1.0]]),
+        patch("radis.labels.labeling.report_similarities", return_value=similarities),
+    ):
+        assert batch.prescreen_gates() == 1
+
+    client = FakeChatClient(gate_values={"Chest": "YES"}, label_values={"effusion": "PRESENT"})
+    with patch("radis.labels.labeling.EngineLLMClient", return_value=client):
+        label_report(knee.pk, batch=batch)
+        label_report(chest.pk, batch=batch)
+    batch.flush()
+
+    assert len(client.gate_calls) == 1  # only the chest report was asked
+    knee_gate = GateAnswer.objects.get(report=knee, label_group=group)
+    assert (knee_gate.value, knee_gate.prescreened) == ("NO", True)
+    chest_gate = GateAnswer.objects.get(report=chest, label_group=group)
+    assert (chest_gate.value, chest_gate.prescreened) == ("YES", False)
+
+
+@pytest.mark.django_db
+def test_prescreen_leaves_previous_yes_gates_and_uncalibrated_models_to_the_llm():
+    group = _calibrated_group(threshold=0.5)
+    report = ReportFactory.create()
+    gate = GateAnswerFactory.create(report=report, label_group=group, value=GateAnswer.Value.YES)
+    # The group was edited after the gate was answered, so the gate is due again.
+    GateAnswer.objects.filter(pk=gate.pk).update(generated_at=group.updated_at.replace(year=2000))
+
+    with (
+        patch("radis.labels.labeling.serving_embedding", return_value=TARGET),
+        patch("radis.labels.labeling.ensure_gate_vectors", return_value=[[1.0]]),
+        patch("radis.labels.labeling.report_similarities", return_value={report.pk: 0.0}),
+    ):
+        assert LabelingBatch([report.pk]).prescreen_gates() == 0
+
+    other = ReportFactory.create()
+    other_model = EmbeddingTarget("embedding", ModelSpec("another-embedding"))
+    with (
+        patch("radis.labels.labeling.serving_embedding", return_value=other_model),
+        patch("radis.labels.labeling.report_similarities", return_value={other.pk: 0.0}),
+    ):
+        assert LabelingBatch([other.pk]).prescreen_gates() == 0
+
+
+@pytest.mark.django_db
+def test_calibration_stores_the_threshold_and_rescreens_earlier_answers(capsys):
+    group = _calibrated_group(threshold=0.9)
+    yes_reports = [ReportFactory.create() for _ in range(20)]
+    no_reports = [ReportFactory.create() for _ in range(4)]
+    for report in yes_reports:
+        GateAnswerFactory.create(report=report, label_group=group, value=GateAnswer.Value.YES)
+    for report in no_reports:
+        GateAnswerFactory.create(report=report, label_group=group, value=GateAnswer.Value.NO)
+    prescreened = GateAnswerFactory.create(
+        label_group=group, value=GateAnswer.Value.NO, prescreened=True
+    )
+    similarities = {report.pk: 0.5 + i / 100 for i, report in enumerate(yes_reports)}
+    similarities.update({report.pk: 0.1 for report in no_reports})
+
+    command = "radis.labels.management.commands.calibrate_gate_prescreen"
+    with (
+        patch(f"{command}.serving_embedding", return_value=TARGET),
+        patch(f"{command}.ensure_gate_vectors", return_value=[[1.0]]),
+        patch(f"{command}.report_similarities", return_value=similarities),
+    ):
+        call_command("calibrate_gate_prescreen", "--target-recall", "0.95", "--apply")
+
+    out = capsys.readouterr().out
+    assert "recall 95.0% of 20 YES" in out
+    assert "100.0% of 4 NO" in out
+    group.refresh_from_db()
+    assert group.prescreen_threshold == pytest.approx(0.51)
+    assert not GateAnswer.objects.filter(pk=prescreened.pk).exists()
@@ -1,4 +1,6 @@
 import pytest
+from django.db import DatabaseError
+from django.test import override_settings
 
 from radis.core.models import AnalysisTask
 from radis.labels.factories import LabelingJobFactory, LabelingTaskFactory
@@ -11,7 +13,7 @@ def test_processor_calls_label_report_for_each_report(monkeypatch):
     from radis.labels import processors
 
     called = []
-    monkeypatch.setattr(processors, "label_report", lambda rid: called.append(rid))
+    monkeypatch.setattr(processors, "label_report", lambda rid, **kwargs: called.append(rid))
 
     job = LabelingJobFactory.create(status=LabelingJob.Status.PENDING)
     task = LabelingTaskFactory.create(job=job, status=AnalysisTask.Status.PENDING)
@@ -31,7 +33,7 @@ def test_processor_one_report_failure_yields_warning(monkeypatch):
 
     r_ok, r_bad = ReportFactory.create(), ReportFactory.create()
 
-    def fake_label_report(rid):
+    def fake_label_report(rid, **kwargs):
         if rid == r_bad.pk:
             raise RuntimeError("LLM exploded")
 
@@ -54,7 +56,7 @@ def test_processor_persists_per_report_failures_to_log(monkeypatch):
 
     r_ok, r_bad = ReportFactory.create(), ReportFactory.create()
 
-    def fake_label_report(rid):
+    def fake_label_report(rid, **kwargs):
         if rid == r_bad.pk:
             raise RuntimeError("LLM exploded")
 
@@ -79,7 +81,7 @@ def test_processor_all_reports_failed_yields_failure(monkeypatch):
     escalate to FAILURE so the job doesn't settle at WARNING like a partial failure would."""
     from radis.labels import processors
 
-    def fake_label_report(rid):
+    def fake_label_report(rid, **kwargs):
         raise RuntimeError("LLM down")
 
     monkeypatch.setattr(processors, "label_report", fake_label_report)
@@ -98,13 +100,39 @@ def test_processor_all_reports_failed_yields_failure(monkeypatch):
     assert f"Report {r2.pk}: RuntimeError: LLM down" in task.log
 
 
+@pytest.mark.django_db(transaction=True)
+@override_settings(LABELING_RESULT_FLUSH_SIZE=2)
+def test_processor_reports_every_report_of_a_failed_write_as_failed(monkeypatch):
+    from radis.labels import processors
+    from radis.labels.models import GateAnswer
+
+    def fail(*args, **kwargs):
+        raise DatabaseError("upsert failed")
+
+    monkeypatch.setattr(GateAnswer.objects, "bulk_create", fail)
+
+    # Empty reports skip the LLM but still write their (empty) outcomes.
+    reports = [ReportFactory.create(body="") for _ in range(3)]
+    job = LabelingJobFactory.create(status=LabelingJob.Status.PENDING)
+    task = LabelingTaskFactory.create(job=job, status=AnalysisTask.Status.PENDING)
+    task.reports.add(*reports)
+
+    processors.LabelingTaskProcessor(task).start()
+
+    task.refresh_from_db()
+    assert task.status == AnalysisTask.Status.FAILURE
+    assert task.message == "All 3 reports failed to label."
+    for report in reports:
+        assert f"Report {report.pk}: DatabaseError: upsert failed" in task.log
+
+
 @pytest.mark.django_db(transaction=True)
 def test_processor_truncates_large_failure_log(monkeypatch):
     from radis.labels import processors
 
     monkeypatch.setattr(processors, "_MAX_LOGGED_FAILURES", 2)
 
-    def fake_label_report(rid):
+    def fake_label_report(rid, **kwargs):
         raise RuntimeError("boom")
 
     monkeypatch.setattr(processors, "label_report", fake_label_report)
@@ -89,3 +89,18 @@ def test_no_active_labels_skips(monkeypatch):
 
     assert not LabelingJob.objects.exists()
     assert LabelingScanCheckpoint.objects.get(pk=1).last_scanned_at == frozen
+
+
+@pytest.mark.django_db
+def test_live_micro_batches_do_not_hold_up_the_scan(monkeypatch):
+    from radis.labels import tasks
+
+    LabelFactory.create(group=LabelGroupFactory.create())
+    LabelingScanCheckpoint.objects.create(last_scanned_at=timezone.now() - timedelta(hours=1))
+    ReportFactory.create()
+    LabelingJobFactory.create(trigger=LabelingJob.Trigger.LIVE, status=LabelingJob.Status.PENDING)
+
+    monkeypatch.setattr(LabelingJob, "delay", lambda self: None)
+    tasks.incremental_label_scan(_now_ts())
+
+    assert LabelingJob.objects.filter(trigger=LabelingJob.Trigger.SCAN).count() == 1
@@ -0,0 +1,28 @@
+from radis.labels.models import LabelGroup
+from radis.labels.prescreen import calibrate_threshold, gate_texts
+
+
+def test_gate_texts_split_exemplars_on_blank_lines():
+    group = LabelGroup(
+        gate_question="Does the report cover the chest?",
+        gate_exemplars="Bilateral pleural effusions.\n\n  \nNo pneumothorax.\nLungs clear.\n\n",
+    )
+    assert gate_texts(group) == [
+        "Does the report cover the chest?",
+        "Bilateral pleural effusions.",
+        "No pneumothorax.\nLungs clear.",
+    ]
+
+
+def test_calibrated_threshold_keeps_the_target_share_of_yes_answers():
+    similarities = [i / 100 for i in range(100)]  # 0.00 .. 0.99
+
+    threshold = calibrate_threshold(similarities, 0.95)
+
+    assert threshold == 0.05
+    assert sum(1 for s in similarities if s >= threshold) / len(similarities) >= 0.95
+
+
+def test_full_recall_keeps_every_yes_answer():
+    assert calibrate_threshold([0.4, 0.2, 0.3], 1.0) == 0.2
+    assert calibrate_threshold([], 0.99) is None
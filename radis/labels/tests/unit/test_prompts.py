@@ -1,4 +1,8 @@
-from radis.labels.utils.prompts import render_gate_prompt, render_label_prompt
+from radis.labels.utils.prompts import (
+    render_gate_prompt,
+    render_label_prompt,
+    render_multi_report_gate_prompt,
+)
 
 
 def test_label_prompt_substitutes_report_including_unicode():
@@ -26,3 +30,10 @@ def test_prompts_contain_no_label_specific_text():
     rendered = render_label_prompt("the lungs are clear")
     assert "pneumonia" not in rendered.lower()
     assert "$report" not in rendered  # placeholder must be fully substituted
+
+
+def test_multi_report_gate_prompt_numbers_the_reports():
+    rendered = render_multi_report_gate_prompt(["first body", "second body"])
+    assert "Report 1:\nfirst body" in rendered
+    assert "Report 2:\nsecond body" in rendered
+    assert "$reports" not in rendered
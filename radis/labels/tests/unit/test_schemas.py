@@ -9,6 +9,7 @@ from radis.labels.utils.schemas import (
     GateValue,
     build_gate_schema,
     build_label_classification_schema,
+    build_multi_report_gate_schema,
 )
 
 
@@ -95,3 +96,13 @@ def test_label_schema_keeps_multiple_non_identifier_names_distinct():
     payload = {name: "ABSENT" for name in NON_IDENTIFIER_NAMES}
     dumped = Schema.model_validate(payload).model_dump()
     assert all(dumped[name] == BucketValue.ABSENT for name in NON_IDENTIFIER_NAMES)
+
+
+def test_multi_report_gate_schema_is_keyed_by_report_and_needs_every_report():
+    Schema = build_multi_report_gate_schema([_group(1, "chest"), _group(2, "abdomen")], 2)
+    answer = {"chest": "YES", "abdomen": "NO"}
+    assert list(Schema.model_fields) == ["report_1", "report_2"]
+    parsed = Schema.model_validate({"report_1": answer, "report_2": answer})
+    assert parsed.model_dump()["report_2"] == answer
+    with pytest.raises(ValidationError):
+        Schema.model_validate({"report_1": answer})
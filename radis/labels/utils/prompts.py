@@ -1,3 +1,4 @@
+from collections.abc import Sequence
 from string import Template
 
 from django.conf import settings
@@ -9,3 +10,10 @@ def render_label_prompt(report_body: str) -> str:
 
 def render_gate_prompt(report_body: str) -> str:
     return Template(settings.LABELING_GATE_SYSTEM_PROMPT).substitute(report=report_body)
+
+
+def render_multi_report_gate_prompt(report_bodies: Sequence[str]) -> str:
+    reports = "\n\n".join(
+        f"Report {i}:\n{body.strip()}" for i, body in enumerate(report_bodies, start=1)
+    )
+    return Template(settings.LABELING_MULTI_REPORT_GATE_SYSTEM_PROMPT).substitute(reports=reports)
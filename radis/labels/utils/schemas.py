@@ -30,3 +30,13 @@ def build_gate_schema(groups: Sequence) -> type[BaseModel]:
         g.name: (GateValue, Field(description=g.gate_question)) for g in groups
     }
     return create_model("GateScreening", **fields)
+
+
+def build_multi_report_gate_schema(groups: Sequence, report_count: int) -> type[BaseModel]:
+    """One gate screening per report, keyed report_1 … report_<report_count>."""
+    gate_schema = build_gate_schema(groups)
+    fields: dict[str, Any] = {
+        f"report_{i}": (gate_schema, Field(description=f"Screening of Report {i}"))
+        for i in range(1, report_count + 1)
+    }
+    return create_model("MultiReportGateScreening", **fields)
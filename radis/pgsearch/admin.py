@@ -12,22 +12,28 @@ from django.http.request import HttpRequest
 from django.urls import path, reverse
 from procrastinate.contrib.django.models import ProcrastinateJob
 
-from .models import EmbeddingBackfillRun, ReportSearchIndex
+from .models import EmbeddingBackfillRun, EmbeddingLayout, ReportSearchIndex
 from .tasks import (
     ActiveBackfillError,
     active_backfill_run_ids,
     cancel_backfill_embeddings,
     create_backfill_run,
     enqueue_embed_reports,
+    enqueue_page_size,
+    iter_pending_pages,
 )
+from .utils.embedding_columns import embedding_coverage, shadow_embedding
 
 logger = logging.getLogger(__name__)
 
 
 @admin.register(ReportSearchIndex)
 class ReportSearchIndexAdmin(admin.ModelAdmin):
-    list_display = ("id", "report_id", "has_embedding")
-    list_filter = (("embedding", admin.EmptyFieldListFilter),)
+    list_display = ("id", "report_id", "has_embedding", "has_shadow_embedding")
+    list_filter = (
+        ("embedding", admin.EmptyFieldListFilter),
+        ("embedding_shadow", admin.EmptyFieldListFilter),
+    )
     search_fields = ("report__document_id",)
     actions = ("enqueue_pending_embeddings", "clear_embeddings")
     change_list_template = "admin/pgsearch/reportsearchindex/change_list.html"
@@ -47,6 +53,10 @@ class ReportSearchIndexAdmin(admin.ModelAdmin):
     def has_embedding(self, obj: ReportSearchIndex) -> bool:
         return obj.embedding is not None
 
+    @admin.display(boolean=True, description="Shadow embedded")
+    def has_shadow_embedding(self, obj: ReportSearchIndex) -> bool:
+        return obj.embedding_shadow is not None
+
     def changelist_view(self, request, extra_context=None):
         extra_context = extra_context or {}
         extra_context["embedding_pipeline_stats"] = self._embedding_pipeline_stats()
@@ -103,9 +113,15 @@ class ReportSearchIndexAdmin(admin.ModelAdmin):
         (queued / in progress / not queued), the active backfill run with
         a stall flag, and the subjob mechanics for the secondary line.
         Report totals per status are summed DB-side from each job's
-        args->'report_ids' (the id arrays never leave Postgres)."""
+        args->'report_ids' (the id arrays never leave Postgres). Processed
+        counts refer to the column search is reading; a shadow-model
+        migration in progress is reported as its own coverage line."""
+        layout = EmbeddingLayout.get()
         total = ReportSearchIndex.objects.count()
-        pending = ReportSearchIndex.objects.filter(embedding__isnull=True).count()
+        pending = ReportSearchIndex.objects.filter(
+            **{f"{layout.serving_column}__isnull": True}
+        ).count()
+        shadow = shadow_embedding(layout)
         report_count = Func(
             KeyTransform("report_ids", "args"),
             function="jsonb_array_length",
@@ -155,18 +171,21 @@ class ReportSearchIndexAdmin(admin.ModelAdmin):
             "failed": queue_rows.get("failed", {}).get("jobs", 0),
             "run": run,
             "run_stalled": run_stalled,
+            "serving_column": layout.serving_column,
+            "serving_model": layout.model_for(layout.serving_column),
+            "shadow": shadow,
+            "shadow_coverage": embedding_coverage(shadow.column) if shadow else None,
         }
 
     @admin.action(description="Enqueue embedding for selected rows (NULL only)")
     def enqueue_pending_embeddings(
         self, request: HttpRequest, queryset: QuerySet[ReportSearchIndex]
     ) -> None:
-        report_ids = list(
-            queryset.filter(embedding__isnull=True)
-            .order_by("report_id")
-            .values_list("report_id", flat=True)
-        )
-        if not report_ids:
+        column = EmbeddingLayout.get().serving_column
+        # Streamed like `embed_pending`: "select all" on the changelist hands
+        # us the whole table, so count DB-side and keyset-page the ids.
+        total = queryset.filter(**{f"{column}__isnull": True}).count()
+        if not total:
             self.message_user(
                 request,
                 "No selected rows are missing an embedding.",
@@ -184,18 +203,32 @@ class ReportSearchIndexAdmin(admin.ModelAdmin):
             return
 
         try:
-            run = create_backfill_run(len(report_ids), triggered_by=request.user.get_username())
+            run = create_backfill_run(
+                total, triggered_by=request.user.get_username(), column=column
+            )
         except ActiveBackfillError as exc:
             self.message_user(request, str(exc), level=messages.WARNING)
             return
 
-        subjob_count = enqueue_embed_reports(
-            report_ids, priority=settings.EMBEDDINGS_BACKFILL_PRIORITY, run_id=run.pk
-        )
+        subjob_count = 0
+        for report_ids, cursor in iter_pending_pages(
+            queryset,
+            column,
+            page_size=enqueue_page_size(settings.EMBEDDINGS_SUBJOB_SIZE),
+            limit=total,
+        ):
+            subjob_count += enqueue_embed_reports(
+                report_ids,
+                priority=settings.EMBEDDINGS_BACKFILL_PRIORITY,
+                run_id=run.pk,
+                column=column,
+            )
+            run.advance_enqueue_cursor(cursor, len(report_ids))
+        run.close_enqueue()
 
         self.message_user(
             request,
-            f"Enqueued {len(report_ids)} report(s) across {subjob_count} subjob(s) "
+            f"Enqueued {run.enqueued_reports} report(s) across {subjob_count} subjob(s) "
             f"for embedding (run {run.pk}).",
             level=messages.SUCCESS,
         )
@@ -203,7 +236,7 @@ class ReportSearchIndexAdmin(admin.ModelAdmin):
             "admin.enqueue_pending_embeddings: user=%s enqueued %d report(s) across "
             "%d subjob(s) for run %d",
             request.user.get_username(),
-            len(report_ids),
+            run.enqueued_reports,
             subjob_count,
             run.pk,
         )
@@ -215,7 +248,10 @@ class ReportSearchIndexAdmin(admin.ModelAdmin):
         # signals don't fire (we don't want auto-re-embedding here — that'd
         # hit the embedding service immediately, possibly with the OLD model
         # still configured). The operator drives the backfill explicitly.
-        cleared = queryset.filter(embedding__isnull=False).update(embedding=None)
+        # Only the serving column: a shadow column is managed by
+        # `embed_pending --shadow`, which clears it when its model changes.
+        column = EmbeddingLayout.get().serving_column
+        cleared = queryset.filter(**{f"{column}__isnull": False}).update(**{column: None})
         if not cleared:
             self.message_user(
                 request,
@@ -250,6 +286,8 @@ class EmbeddingBackfillRunAdmin(admin.ModelAdmin):
         "cancelled_at",
         "processed_reports",
         "total_reports",
+        "enqueued_reports",
+        "column",
         "triggered_by",
     )
 
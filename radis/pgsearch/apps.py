@@ -77,33 +77,36 @@ def check_embedding_dim_matches_migration(app_configs, **kwargs):
 
 @register()
 def check_embeddings_dimensions_param(app_configs, **kwargs):
-    """Fail loudly when the model spec's `dimensions` disagrees with EMBEDDINGS_DIM.
+    """Fail loudly when a model spec's `dimensions` disagrees with EMBEDDINGS_DIM.
 
     Both describe the width of the stored vector: `dimensions` asks the provider for
     it, EMBEDDINGS_DIM is what the column was migrated to. Disagreement surfaces as an
     opaque pgvector dimension error on the first write, long after the deploy.
     """
-    spec = settings.EMBEDDINGS_MODEL
-    if spec is None:
-        return []
-
-    requested = spec.params.get("dimensions")
-    if requested is None or requested == settings.EMBEDDINGS_DIM:
-        return []
-
-    return [
-        Error(
-            f"EMBEDDINGS_MODEL requests dimensions={requested} but EMBEDDINGS_DIM is "
-            f"{settings.EMBEDDINGS_DIM}. The provider would return vectors the "
-            f"embedding column cannot store.",
-            id="pgsearch.E003",
-            hint=(
-                "Drop the 'dimensions' parameter from EMBEDDINGS_MODEL in your .env to "
-                "let the client truncate to EMBEDDINGS_DIM, or set EMBEDDINGS_DIM to "
-                "match the 'dimensions' value."
-            ),
+    errors = []
+    for name in ("EMBEDDINGS_MODEL", "EMBEDDINGS_SHADOW_MODEL"):
+        spec = getattr(settings, name)
+        if spec is None:
+            continue
+
+        requested = spec.params.get("dimensions")
+        if requested is None or requested == settings.EMBEDDINGS_DIM:
+            continue
+
+        errors.append(
+            Error(
+                f"{name} requests dimensions={requested} but EMBEDDINGS_DIM is "
+                f"{settings.EMBEDDINGS_DIM}. The provider would return vectors the "
+                f"embedding column cannot store.",
+                id="pgsearch.E003",
+                hint=(
+                    f"Drop the 'dimensions' parameter from {name} in your .env to "
+                    "let the client truncate to EMBEDDINGS_DIM, or set EMBEDDINGS_DIM to "
+                    "match the 'dimensions' value."
+                ),
+            )
         )
-    ]
+    return errors
 
 
 def _index_reports(reports):
@@ -130,13 +133,13 @@ def _index_reports(reports):
         "sync" if settings.PGSEARCH_SYNC_INDEXING else "async",
     )
 
-    from radis.pgsearch.tasks import enqueue_bulk_index_reports, enqueue_embed_reports
+    from radis.pgsearch.tasks import enqueue_bulk_index_reports, enqueue_live_embeddings
     from radis.pgsearch.utils.indexing import bulk_upsert_report_search_indexes
 
     report_ids = [report.pk for report in reports]
     if settings.PGSEARCH_SYNC_INDEXING:
         bulk_upsert_report_search_indexes(report_ids)
-        enqueue_embed_reports(report_ids)
+        enqueue_live_embeddings(report_ids)
     else:
         enqueue_bulk_index_reports(report_ids)
 
@@ -156,13 +159,11 @@ def register_app():
     )
     from radis.search.site import SearchProvider, register_search_provider
     from radis.subscriptions.site import (
-        SubscriptionFilterProvider,
         SubscriptionRetrievalProvider,
-        register_subscription_filter_provider,
         register_subscription_retrieval_provider,
     )
 
-    from .providers import count, filter, retrieve, search
+    from .providers import count, retrieve, retrieve_report_ids, search
 
     register_reports_created_handler(ReportsCreatedHandler(name="PG Search", handle=_index_reports))
     register_reports_updated_handler(ReportsUpdatedHandler(name="PG Search", handle=_index_reports))
@@ -183,6 +184,7 @@ def register_app():
             count=count,
             retrieve=retrieve,
             max_results=None,
+            retrieve_report_ids=retrieve_report_ids,
         )
     )
 
@@ -192,9 +194,3 @@ def register_app():
             retrieve=retrieve,
         )
     )
-    register_subscription_filter_provider(
-        SubscriptionFilterProvider(
-            name="PG Search",
-            filter=filter,
-        )
-    )
@@ -0,0 +1,102 @@
+"""Measure the configured embedding backend: documents/second and query latency.
+
+Runs against whatever `EMBEDDINGS_MODEL` currently selects, so comparing the
+HTTP path with the local CPU backend (`local:<directory>`) means running it once
+per configuration, e.g.
+
+    EMBEDDINGS_MODEL=Qwen/Qwen3-Embedding-0.6B ./manage.py embed_benchmark
+    EMBEDDINGS_MODEL=local:/models/qwen3-embedding-0.6b?pooling=last ./manage.py embed_benchmark
+
+Document bodies are sampled from the newest reports and embedded in chunks of
+EMBEDDINGS_BATCH_SIZE, exactly as `embed_reports_task` does. Nothing is written
+to the database. The first call is excluded from the timings: it pays for
+connection setup (HTTP) or model loading (local), which a long-running worker
+pays only once.
+"""
+
+import logging
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from radis.core.utils.embedding_client import EmbeddingClient
+from radis.reports.models import Report
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUERIES = [
+    "pulmonary embolism",
+    "pleural effusion right",
+    "lung nodule follow-up",
+    "fracture of the distal radius",
+    "liver lesion hypervascular",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the configured embedding backend (HTTP or local): documents per "
+        "second over sampled report bodies, and query embedding latency."
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--documents",
+            type=int,
+            default=200,
+            help="Number of report bodies to embed (default 200).",
+        )
+        parser.add_argument(
+            "--queries",
+            type=int,
+            default=20,
+            help="Number of query embeddings to time (default 20).",
+        )
+
+    def handle(self, *args, **opts) -> None:
+        if settings.EMBEDDINGS_MODEL is None:
+            raise CommandError("EMBEDDINGS_MODEL is not configured; nothing to benchmark.")
+
+        bodies = list(
+            Report.objects.order_by("-id").values_list("body", flat=True)[: opts["documents"]]
+        )
+        batch_size = settings.EMBEDDINGS_BATCH_SIZE
+
+        with EmbeddingClient() as client:
+            client.embed_query(DEFAULT_QUERIES[0])  # warm-up, not timed
+
+            if bodies:
+                start = time.perf_counter()
+                for offset in range(0, len(bodies), batch_size):
+                    client.embed_documents(bodies[offset : offset + batch_size])
+                elapsed = time.perf_counter() - start
+                self.stdout.write(
+                    f"Documents: {len(bodies)} in {elapsed:.2f}s "
+                    f"({len(bodies) / elapsed:.1f} docs/s, batch size {batch_size})"
+                )
+            else:
+                self.stdout.write("Documents: no reports to sample, skipped.")
+
+            latencies_ms: list[float] = []
+            for i in range(opts["queries"]):
+                query = DEFAULT_QUERIES[i % len(DEFAULT_QUERIES)]
+                start = time.perf_counter()
+                client.embed_query(query)
+                latencies_ms.append((time.perf_counter() - start) * 1000)
+
+        if latencies_ms:
+            latencies_ms.sort()
+            p95 = latencies_ms[min(len(latencies_ms) - 1, int(len(latencies_ms) * 0.95))]
+            self.stdout.write(
+                f"Queries: {len(latencies_ms)} "
+                f"(p50 {statistics.median(latencies_ms):.1f} ms, p95 {p95:.1f} ms, "
+                f"max {latencies_ms[-1]:.1f} ms)"
+            )
+        logger.info(
+            "embed_benchmark: model=%s documents=%d queries=%d",
+            settings.EMBEDDINGS_MODEL.model,
+            len(bodies),
+            len(latencies_ms),
+        )
@@ -9,6 +9,11 @@ Operators run this for three scenarios:
    swap), then run this command to re-embed against the new model.
 3. **Outage recovery.** Tasks that exhausted Procrastinate retries during an
    extended embedding-service outage — re-run after the service recovers.
+4. **Zero-downtime model change** (`--shadow`). Fills the column search is
+   not reading with EMBEDDINGS_SHADOW_MODEL while search keeps serving the
+   current model; search switches over once coverage reaches
+   EMBEDDINGS_SHADOW_SWITCH_COVERAGE (see `utils/embedding_columns.py` and
+   `embed_switch`). Pair it with `--reports-per-minute` to throttle.
 
 The command itself does no HTTP work; it defers Procrastinate tasks onto the
 `embeddings` queue. The embeddings worker drains them at its configured
@@ -22,8 +27,13 @@ Properties:
 
 - **Idempotent.** The filter is `embedding IS NULL`; re-runs are no-ops on
   rows the worker has already drained.
-- **Resumable.** No checkpoint state. Killed mid-enqueue → re-run picks up
-  the still-NULL rows.
+- **Streaming.** Pending rows are read with keyset pagination on
+  `ReportSearchIndex.id`, one page of EMBEDDINGS_DEFER_BATCH_SUBJOBS subjobs
+  at a time, and each page is deferred with one multi-row insert. The run's
+  `total_reports` comes from a COUNT, so no id list is materialized.
+- **Resumable.** The run records the last enqueued id. Killed mid-enqueue →
+  `--resume` continues from that cursor; a plain re-run (once the run's
+  queued subjobs are cancelled or drained) picks up the still-NULL rows.
 - **Rate-limited.** Worker concurrency caps load on the embedding service
   regardless of how many tasks this command enqueues.
 - **Single-active.** Only one backfill run can be active at a time; a
@@ -35,8 +45,16 @@ import logging
 from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
 
-from radis.pgsearch.models import ReportSearchIndex
-from radis.pgsearch.tasks import ActiveBackfillError, create_backfill_run, enqueue_embed_reports
+from radis.pgsearch.models import EmbeddingBackfillRun, EmbeddingLayout, ReportSearchIndex
+from radis.pgsearch.tasks import (
+    ActiveBackfillError,
+    EmbeddingMigrationError,
+    create_backfill_run,
+    enqueue_embed_reports,
+    enqueue_page_size,
+    iter_pending_pages,
+    start_embedding_migration,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -66,6 +84,28 @@ class Command(BaseCommand):
             default=None,
             help="Stop after enqueuing N reports (default: enqueue all).",
         )
+        parser.add_argument(
+            "--shadow",
+            action="store_true",
+            help=(
+                "Fill the column search is not reading with EMBEDDINGS_SHADOW_MODEL "
+                "(zero-downtime model migration) instead of the serving column."
+            ),
+        )
+        parser.add_argument(
+            "--reports-per-minute",
+            type=int,
+            default=None,
+            help="Throttle: spread subjob start times so at most N reports start per minute.",
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help=(
+                "Continue the active run's interrupted enqueue from its recorded cursor "
+                "instead of starting a new run."
+            ),
+        )
 
     def handle(self, *args, **opts) -> None:
         if settings.EMBEDDINGS_MODEL is None:
@@ -81,34 +121,65 @@ class Command(BaseCommand):
             opts["limit"],
         )
 
-        ids = list(
-            ReportSearchIndex.objects.filter(embedding__isnull=True)
-            .order_by("report_id")
-            .values_list("report_id", flat=True)
-        )
-        if opts["limit"] is not None:
-            ids = ids[: opts["limit"]]
-        if not ids:
-            self.stdout.write("Nothing to embed.")
-            return
-
-        try:
-            run = create_backfill_run(len(ids), triggered_by="embed_pending")
-        except ActiveBackfillError as exc:
-            raise CommandError(str(exc)) from exc
-
-        self.stdout.write(f"Enqueuing {len(ids)} report(s) in subjobs of {subjob_size}...")
-        subjob_count = enqueue_embed_reports(
-            ids,
-            subjob_size=subjob_size,
-            priority=settings.EMBEDDINGS_BACKFILL_PRIORITY,
-            run_id=run.pk,
-        )
+        if opts["resume"]:
+            run = EmbeddingBackfillRun.get_active()
+            if run is None or run.enqueue_complete:
+                raise CommandError("No active backfill run with an unfinished enqueue to resume.")
+            column = run.column
+            total = run.total_reports - run.enqueued_reports
+            self.stdout.write(
+                f"Resuming run {run.pk} after id {run.enqueue_cursor}: "
+                f"{total} report(s) left to enqueue in subjobs of {subjob_size}..."
+            )
+        else:
+            if opts["shadow"]:
+                try:
+                    column = start_embedding_migration().column
+                except EmbeddingMigrationError as exc:
+                    raise CommandError(str(exc)) from exc
+            else:
+                column = EmbeddingLayout.get().serving_column
+
+            total = ReportSearchIndex.objects.filter(**{f"{column}__isnull": True}).count()
+            if opts["limit"] is not None:
+                total = min(total, opts["limit"])
+            if not total:
+                self.stdout.write("Nothing to embed.")
+                return
+
+            try:
+                run = create_backfill_run(total, triggered_by="embed_pending", column=column)
+            except ActiveBackfillError as exc:
+                raise CommandError(str(exc)) from exc
+            self.stdout.write(f"Enqueuing {total} report(s) in subjobs of {subjob_size}...")
+
+        subjob_count = 0
+        enqueued = 0
+        for report_ids, cursor in iter_pending_pages(
+            ReportSearchIndex.objects.all(),
+            column,
+            page_size=enqueue_page_size(subjob_size),
+            after_id=run.enqueue_cursor,
+            limit=total,
+        ):
+            subjob_count += enqueue_embed_reports(
+                report_ids,
+                subjob_size=subjob_size,
+                priority=settings.EMBEDDINGS_BACKFILL_PRIORITY,
+                run_id=run.pk,
+                column=column,
+                reports_per_minute=opts["reports_per_minute"],
+                throttle_offset=enqueued,
+            )
+            enqueued += len(report_ids)
+            run.advance_enqueue_cursor(cursor, len(report_ids))
+
+        run.close_enqueue()
         self.stdout.write(
             self.style.SUCCESS(f"Done. Deferred {subjob_count} subjob(s) for run {run.pk}.")
         )
         logger.info(
             "embed_pending: done; reports=%d subjobs=%d",
-            len(ids),
+            enqueued,
             subjob_count,
         )
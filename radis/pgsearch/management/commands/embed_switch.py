@@ -0,0 +1,58 @@
+"""Show shadow-migration coverage and switch search to the shadow column.
+
+The switch normally happens on its own when the last `embed_pending --shadow`
+run finishes with coverage at or above EMBEDDINGS_SHADOW_SWITCH_COVERAGE. Use
+this command to check progress, to switch after topping up stragglers, or with
+`--force` to switch below the threshold (reports without a shadow vector then
+drop out of the vector half of hybrid search until they are embedded).
+"""
+
+import logging
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from radis.pgsearch.models import EmbeddingLayout
+from radis.pgsearch.tasks import switch_embedding_column
+from radis.pgsearch.utils.embedding_columns import embedding_coverage, shadow_embedding
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Report shadow-embedding coverage and switch search over to the shadow column."
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Switch even if coverage is below EMBEDDINGS_SHADOW_SWITCH_COVERAGE.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only print coverage; don't switch.",
+        )
+
+    def handle(self, *args, **opts) -> None:
+        layout = EmbeddingLayout.get()
+        target = shadow_embedding(layout)
+        if target is None:
+            raise CommandError(
+                "No shadow migration in progress. Set EMBEDDINGS_SHADOW_MODEL and run "
+                "`embed_pending --shadow` first."
+            )
+
+        coverage = embedding_coverage(target.column)
+        self.stdout.write(
+            f"Serving {layout.serving_column} ({layout.model_for(layout.serving_column) or '-'}); "
+            f"{target.column} ({target.spec.model}) coverage {coverage:.2%}, "
+            f"threshold {settings.EMBEDDINGS_SHADOW_SWITCH_COVERAGE:.2%}."
+        )
+        if opts["dry_run"]:
+            return
+
+        if not switch_embedding_column(force=opts["force"]):
+            raise CommandError("Coverage below threshold; not switched. Use --force to override.")
+        self.stdout.write(self.style.SUCCESS(f"Search now reads {target.column}."))
+        logger.info("embed_switch: switched to %s; coverage=%.4f", target.column, coverage)
@@ -0,0 +1,83 @@
+"""Shadow embedding column for zero-downtime model migrations:
+
+- `ReportSearchIndex.embedding_shadow` with its own HNSW index and a partial
+  index on its NULL rows (the coverage check and `embed_pending --shadow`
+  run `WHERE embedding_shadow IS NULL`).
+- `EmbeddingBackfillRun.column`, the column a run fills.
+- `EmbeddingLayout`, the singleton row that says which column search reads.
+
+The new column is empty, so both indexes build instantly.
+"""
+
+import pgvector.django.indexes
+import pgvector.django.vector
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("pgsearch", "0002_hybrid_search"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="reportsearchindex",
+            name="embedding_shadow",
+            field=pgvector.django.vector.VectorField(dimensions=1024, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="reportsearchindex",
+            index=pgvector.django.indexes.HnswIndex(
+                ef_construction=64,
+                fields=["embedding_shadow"],
+                m=16,
+                name="pgsearch_embedding_shadow_hnsw",
+                opclasses=["vector_cosine_ops"],
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="reportsearchindex",
+            index=models.Index(
+                condition=models.Q(embedding_shadow__isnull=True),
+                fields=["id"],
+                name="pgsearch_pending_shadow_idx",
+            ),
+        ),
+        migrations.AddField(
+            model_name="embeddingbackfillrun",
+            name="column",
+            field=models.CharField(
+                choices=[("embedding", "embedding"), ("embedding_shadow", "embedding_shadow")],
+                default="embedding",
+                max_length=32,
+            ),
+        ),
+        migrations.CreateModel(
+            name="EmbeddingLayout",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "serving_column",
+                    models.CharField(
+                        choices=[
+                            ("embedding", "embedding"),
+                            ("embedding_shadow", "embedding_shadow"),
+                        ],
+                        default="embedding",
+                        max_length=32,
+                    ),
+                ),
+                ("primary_model", models.CharField(blank=True, max_length=500)),
+                ("shadow_model", models.CharField(blank=True, max_length=500)),
+                ("switched_at", models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
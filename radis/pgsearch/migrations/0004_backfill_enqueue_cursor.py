@@ -0,0 +1,23 @@
+"""Enqueue progress on `EmbeddingBackfillRun`, so `embed_pending --resume` can
+continue an interrupted streaming enqueue from the last deferred row."""
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("pgsearch", "0003_embedding_shadow"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="embeddingbackfillrun",
+            name="enqueue_cursor",
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="embeddingbackfillrun",
+            name="enqueued_reports",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -2,6 +2,8 @@ from django.conf import settings
 from django.contrib.postgres.indexes import GinIndex
 from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Now
 from pgvector.django import HnswIndex, VectorField
 from procrastinate.contrib.django.models import ProcrastinateJob
 
@@ -10,16 +12,29 @@ from radis.reports.models import Report
 from .utils.language_utils import code_to_language
 
 
+class EmbeddingColumn(models.TextChoices):
+    """The two physical embedding columns of `ReportSearchIndex`. Which one
+    search reads is recorded in `EmbeddingLayout`; the other one is where a
+    zero-downtime model migration builds the next model's vectors."""
+
+    PRIMARY = "embedding", "embedding"
+    SHADOW = "embedding_shadow", "embedding_shadow"
+
+
 class ReportSearchIndex(models.Model):
     """Per-report row that backs every search modality. Holds the FTS
     `search_vector` (tsvector) and the dense `embedding` vector for
     hybrid search; a future trigram column would also live here. Named
     after its role, not after any single field — adding another search
-    representation shouldn't force another rename."""
+    representation shouldn't force another rename.
+
+    `embedding_shadow` is the second embedding column used by model
+    migrations (see `EmbeddingLayout`); it is NULL outside of one."""
 
     report = models.OneToOneField(Report, on_delete=models.CASCADE, related_name="search_index")
     search_vector = SearchVectorField(null=True)
     embedding = VectorField(dimensions=settings.EMBEDDINGS_DIM, null=True)
+    embedding_shadow = VectorField(dimensions=settings.EMBEDDINGS_DIM, null=True)
 
     class Meta:
         verbose_name = "Report search index"
@@ -41,6 +56,18 @@ class ReportSearchIndex(models.Model):
                 condition=models.Q(embedding__isnull=True),
                 name="pgsearch_pending_embedding_idx",
             ),
+            HnswIndex(
+                name="pgsearch_embedding_shadow_hnsw",
+                fields=["embedding_shadow"],
+                m=16,
+                ef_construction=64,
+                opclasses=["vector_cosine_ops"],
+            ),
+            models.Index(
+                fields=["id"],
+                condition=models.Q(embedding_shadow__isnull=True),
+                name="pgsearch_pending_shadow_idx",
+            ),
         ]
 
     def __str__(self) -> str:
@@ -63,17 +90,30 @@ class EmbeddingBackfillRun(models.Model):
     involves queue state). Write-path (live-priority) embedding work
     carries no run.
 
+    `column` is the embedding column the run fills; a shadow backfill
+    (`embed_pending --shadow`) targets the column search is not reading.
+
     Progress is counter-based: `embed_reports_task` increments
     `processed_reports` after each successful subjob bulk-write (immune to
     the worker's --delete-jobs policy) and stamps `finished_at` when the
-    counter reaches `total_reports`. Failed subjobs never increment."""
+    counter reaches `total_reports`. Failed subjobs never increment.
+
+    Enqueueing streams pending rows in `ReportSearchIndex.id` order;
+    `enqueue_cursor` is the last id deferred and `enqueued_reports` the
+    running total, so an interrupted enqueue resumes (`embed_pending
+    --resume`) without re-deferring what is already queued."""
 
     started_at = models.DateTimeField(auto_now_add=True)
     finished_at = models.DateTimeField(null=True, blank=True)
     cancelled_at = models.DateTimeField(null=True, blank=True)
+    column = models.CharField(
+        max_length=32, choices=EmbeddingColumn.choices, default=EmbeddingColumn.PRIMARY
+    )
     total_reports = models.PositiveIntegerField()
     processed_reports = models.PositiveIntegerField(default=0)
     triggered_by = models.CharField(max_length=150)
+    enqueue_cursor = models.BigIntegerField(default=0)
+    enqueued_reports = models.PositiveIntegerField(default=0)
 
     class Meta:
         ordering = ["-started_at"]
@@ -93,6 +133,34 @@ class EmbeddingBackfillRun(models.Model):
             .first()
         )
 
+    @property
+    def enqueue_complete(self) -> bool:
+        return self.enqueued_reports >= self.total_reports
+
+    def advance_enqueue_cursor(self, cursor: int, reports: int) -> None:
+        """Record one deferred page: everything up to `cursor` is queued."""
+        EmbeddingBackfillRun.objects.filter(pk=self.pk).update(
+            enqueue_cursor=cursor, enqueued_reports=F("enqueued_reports") + reports
+        )
+        self.enqueue_cursor = cursor
+        self.enqueued_reports += reports
+
+    def close_enqueue(self) -> None:
+        """Called once every page is deferred. Rows embedded by live writes
+        between the initial COUNT and their page are never enqueued, so
+        shrink the target to what was actually deferred — otherwise the run
+        could never finish."""
+        if self.enqueue_complete:
+            return
+        runs = EmbeddingBackfillRun.objects.filter(pk=self.pk)
+        runs.update(total_reports=self.enqueued_reports)
+        runs.filter(
+            finished_at__isnull=True,
+            cancelled_at__isnull=True,
+            processed_reports__gte=F("total_reports"),
+        ).update(finished_at=Now())
+        self.total_reports = self.enqueued_reports
+
     def live_subjob_count(self) -> int:
         """Queued+running subjobs carrying this run's id. Zero while
         `processed < total` means the run is abandoned (dead worker or
@@ -104,3 +172,49 @@ class EmbeddingBackfillRun(models.Model):
             status__in=("todo", "doing"),
             args__run_id=self.pk,
         ).count()
+
+
+class EmbeddingLayout(models.Model):
+    """Singleton row (pk=1) recording which embedding column search reads and
+    which model filled each column.
+
+    Model keys are `utils.embedding_columns.model_key` strings. A blank key on
+    the serving column means "whatever EMBEDDINGS_MODEL is" — the state of every
+    deployment that never ran a migration. Switching the serving column is one
+    UPDATE of this row, so every process moves to the new model on its next
+    search; nothing is copied between columns."""
+
+    serving_column = models.CharField(
+        max_length=32, choices=EmbeddingColumn.choices, default=EmbeddingColumn.PRIMARY
+    )
+    primary_model = models.CharField(max_length=500, blank=True)
+    shadow_model = models.CharField(max_length=500, blank=True)
+    switched_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self) -> str:
+        return f"Embedding layout (serving {self.serving_column})"
+
+    @classmethod
+    def get(cls) -> "EmbeddingLayout":
+        """The stored layout, or an unsaved default one. Read paths (every
+        search) must not write, so the row is only created by the first
+        migration."""
+        return cls.objects.filter(pk=1).first() or cls(pk=1)
+
+    @property
+    def target_column(self) -> str:
+        """The column search is not reading; where a migration builds vectors."""
+        if self.serving_column == EmbeddingColumn.PRIMARY:
+            return EmbeddingColumn.SHADOW
+        return EmbeddingColumn.PRIMARY
+
+    def model_for(self, column: str) -> str:
+        if column == EmbeddingColumn.PRIMARY:
+            return self.primary_model
+        return self.shadow_model
+
+    def set_model_for(self, column: str, key: str) -> None:
+        if column == EmbeddingColumn.PRIMARY:
+            self.primary_model = key
+        else:
+            self.shadow_model = key
@@ -1,6 +1,7 @@
 import hashlib
 import json
 import logging
+import time
 import unicodedata
 from collections.abc import Iterator
 from typing import Literal, NamedTuple, cast
@@ -12,11 +13,13 @@ from django.core.cache import cache
 from django.db.models import Case, F, FloatField, Q, TextField, Value, When
 from pgvector.django import CosineDistance
 
+from radis.core.utils.circuit_breaker import CircuitBreaker
 from radis.core.utils.embedding_client import (
     PERMANENT_EMBEDDING_ERRORS,
     EmbeddingClient,
     EmbeddingClientError,
 )
+from radis.core.utils.model_spec import ModelSpec
 from radis.core.utils.rate_limit import RateLimited
 from radis.reports.models import Language, Report
 from radis.search.site import ReportDocument, Search, SearchFilters, SearchResult
@@ -32,6 +35,7 @@ from radis.search.utils.query_parser import (
 
 from .models import ReportSearchIndex
 from .utils.document_utils import AnnotatedReportSearchIndex, document_from_pgsearch_response
+from .utils.embedding_columns import EmbeddingTarget, serving_embedding
 from .utils.fusion import rrf_fuse, summary_with_fallback
 from .utils.language_utils import code_to_language
 
@@ -248,25 +252,53 @@ def _build_filter_query(filters: SearchFilters) -> Q:
 _LOGGED_PERMANENT_FAILURE_CONFIGS: set[tuple[str, str | None]] = set()
 
 
-def _embedding_config_key() -> tuple[str, str | None]:
-    spec = settings.EMBEDDINGS_MODEL
+# Per-process breaker around query embedding: while the embedding service is failing or
+# slow, searches skip it and run FTS-only at once instead of each waiting out the
+# request timeout or EMBEDDINGS_RATE_LIMIT_QUERY_MAX_WAIT_SECONDS first. Cache hits
+# never reach it.
+QUERY_EMBEDDING_BREAKER = CircuitBreaker(
+    "Query embedding",
+    window_seconds=settings.EMBEDDINGS_QUERY_BREAKER_WINDOW_SECONDS,
+    min_calls=settings.EMBEDDINGS_QUERY_BREAKER_MIN_CALLS,
+    error_rate=settings.EMBEDDINGS_QUERY_BREAKER_ERROR_RATE,
+    slow_seconds=settings.EMBEDDINGS_QUERY_BREAKER_SLOW_SECONDS,
+    open_seconds=settings.EMBEDDINGS_QUERY_BREAKER_OPEN_SECONDS,
+)
+
+
+def _embedding_config_key(spec: ModelSpec | None = None) -> tuple[str, str | None]:
+    if spec is None:
+        spec = settings.EMBEDDINGS_MODEL
     return (settings.EMBEDDINGS_BASE_URL, spec.model if spec is not None else None)
 
 
-def _embed_query_or_none(query_text: str, caller: str) -> list[float] | None:
-    """Embed the query text, or return None to signal FTS-only fallback.
+def _embed_query_or_none(
+    query_text: str, caller: str, spec: ModelSpec | None = None
+) -> list[float] | None:
+    """Embed the query text with `spec` (default EMBEDDINGS_MODEL), or return
+    None to signal FTS-only fallback.
 
     Search must stay usable when the embedding service doesn't, so every
     failure falls back — but at different log levels: transient conditions
     (rate limiting, connection blips, 5xx) are expected under load and log a
     WARNING, while permanent misconfiguration logs a full exception (once per
     configuration, see _LOGGED_PERMANENT_FAILURE_CONFIGS) so it reaches operators
-    instead of hiding as a silently degraded search."""
+    instead of hiding as a silently degraded search.
+
+    Every attempt feeds QUERY_EMBEDDING_BREAKER; while it is open this returns
+    None without calling the service."""
+    if not QUERY_EMBEDDING_BREAKER.allow():
+        logger.debug("%s falling back to FTS-only: query embedding circuit is open", caller)
+        return None
+    start = time.monotonic()
+    ok = False
     try:
-        with EmbeddingClient() as ec:
-            return ec.embed_query(query_text)
+        with EmbeddingClient(spec) as ec:
+            vec = ec.embed_query(query_text)
+        ok = True
+        return vec
     except (EmbeddingClientError, *PERMANENT_EMBEDDING_ERRORS) as exc:
-        config_key = _embedding_config_key()
+        config_key = _embedding_config_key(spec)
         if config_key not in _LOGGED_PERMANENT_FAILURE_CONFIGS:
             _LOGGED_PERMANENT_FAILURE_CONFIGS.add(config_key)
             logger.exception(
@@ -292,9 +324,13 @@ def _embed_query_or_none(query_text: str, caller: str) -> list[float] | None:
     except (RateLimited, openai.OpenAIError) as e:
         logger.warning("%s falling back to FTS-only: %s", caller, e)
         return None
+    finally:
+        QUERY_EMBEDDING_BREAKER.record(ok=ok, latency=time.monotonic() - start)
 
 
-def _embed_query_cached(query_text: str, caller: str) -> list[float] | None:
+def _embed_query_cached(
+    query_text: str, caller: str, target: EmbeddingTarget | None = None
+) -> list[float] | None:
     """Cache wrapper around `_embed_query_or_none`.
 
     Pagination re-runs the whole search for every page, so without this every
@@ -306,13 +342,19 @@ def _embed_query_cached(query_text: str, caller: str) -> list[float] | None:
     weights, so the endpoint has to be part of the fingerprint too (the API key
     is not identity and stays out of the cache key). Failures are not cached: a
     transient outage must not pin searches to FTS-only for the TTL.
+
+    `target` is the serving column and its model (see `serving_embedding`);
+    after a shadow-model switch that is the shadow spec, so the fingerprint
+    changes with it and no old-model query vector is read back.
     """
-    spec = settings.EMBEDDINGS_MODEL
-    if spec is None:
+    if target is None:
+        target = serving_embedding()
+    if target is None:
         # Nothing to embed against. Task 3 adds the caller-side guard so this helper is
         # not even reached in an FTS-only deployment; returning None keeps it correct on
         # its own in the meantime, and afterwards for any future caller.
         return None
+    spec = target.spec
     fingerprint = "\x00".join(
         [
             settings.EMBEDDINGS_BASE_URL,
@@ -326,7 +368,7 @@ def _embed_query_cached(query_text: str, caller: str) -> list[float] | None:
     key = "pgsearch-query-embedding-" + hashlib.sha256(fingerprint.encode()).hexdigest()
     vec = cache.get(key)
     if vec is None:
-        vec = _embed_query_or_none(query_text, caller)
+        vec = _embed_query_or_none(query_text, caller, spec)
         if vec is not None:
             cache.set(key, vec, timeout=settings.EMBEDDINGS_QUERY_CACHE_TIMEOUT_SECONDS)
     return vec
@@ -339,6 +381,9 @@ class _FusedHybrid(NamedTuple):
     total_relation: Literal["exact", "at_least", "approximately"]
     configs: list[tuple[str, list[str]]]
     query_str: str
+    # The vector half was wanted but unavailable (embedding failed or the
+    # circuit is open), so the results are FTS-only.
+    degraded: bool
 
 
 def _fuse_hybrid(search: Search, caller: str) -> _FusedHybrid:
@@ -382,18 +427,21 @@ def _fuse_hybrid(search: Search, caller: str) -> _FusedHybrid:
     # docs/superpowers/specs/hybrid-search.md §7.8).
     query_text = QueryParser.unparse_for_embedding(search.query)
     query_vec: list[float] | None = None
+    target: EmbeddingTarget | None = None
     if settings.EMBEDDINGS_MODEL is not None and query_text.strip():
-        query_vec = _embed_query_cached(query_text, caller)
+        target = serving_embedding()
+        query_vec = _embed_query_cached(query_text, caller, target)
 
     vec_rank: dict[int, int] = {}
     vec_distance: dict[int, float] = {}
-    if query_vec is not None:
+    degraded = target is not None and query_vec is None
+    if query_vec is not None and target is not None:
         vec_qs = ReportSearchIndex.objects.filter(filter_query)
         vec_qs = _exclude_negations(vec_qs, search.query, configs)
         vec_rows = list(
             vec_qs.distinct()
-            .exclude(embedding__isnull=True)
-            .annotate(distance=CosineDistance("embedding", query_vec))
+            .exclude(**{f"{target.column}__isnull": True})
+            .annotate(distance=CosineDistance(target.column, query_vec))
             .order_by("distance", "report_id")
             .values_list("report_id", "distance")[: settings.HYBRID_VECTOR_TOP_K]
         )
@@ -437,6 +485,7 @@ def _fuse_hybrid(search: Search, caller: str) -> _FusedHybrid:
         total_relation=total_relation,
         configs=configs,
         query_str=query_str,
+        degraded=degraded,
     )
 
 
@@ -524,7 +573,12 @@ def search(search: Search) -> SearchResult:
             )
         )
 
-    return SearchResult(total_count=total_count, total_relation=total_relation, documents=documents)
+    return SearchResult(
+        total_count=total_count,
+        total_relation=total_relation,
+        documents=documents,
+        degraded=fused.degraded,
+    )
 
 
 def count(search: Search) -> int:
@@ -535,6 +589,12 @@ def count(search: Search) -> int:
     return len(_fuse_hybrid(search, "Hybrid count").ordered_ids)
 
 
+def retrieve_report_ids(search: Search) -> Iterator[int]:
+    # The fused ids already are report primary keys; extraction preparation
+    # uses them as is instead of round-tripping through document ids.
+    return iter(_fuse_hybrid(search, "Hybrid retrieve").ordered_ids)
+
+
 def retrieve(search: Search) -> Iterator[str]:
     ordered_ids = _fuse_hybrid(search, "Hybrid retrieve").ordered_ids
     if not ordered_ids:
@@ -542,11 +602,3 @@ def retrieve(search: Search) -> Iterator[str]:
 
     id_to_doc = dict(Report.objects.filter(pk__in=ordered_ids).values_list("pk", "document_id"))
     return (id_to_doc[rid] for rid in ordered_ids if rid in id_to_doc)
-
-
-def filter(filter: SearchFilters) -> Iterator[str]:
-    filter_query = _build_filter_query(filter)
-    results = ReportSearchIndex.objects.filter(filter_query).values_list(
-        "report__document_id", flat=True
-    )
-    return results.iterator()
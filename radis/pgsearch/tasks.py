@@ -1,8 +1,10 @@
 import logging
 import time
+from collections.abc import Iterator
 
 from django.conf import settings
-from django.db.models import F
+from django.db import transaction
+from django.db.models import F, QuerySet
 from django.db.models.functions import Now
 from django.utils import timezone
 from procrastinate import RetryStrategy
@@ -23,8 +25,15 @@ from radis.core.utils.rate_limit import (
     with_transient_retries,
 )
 
-from .models import EmbeddingBackfillRun, ReportSearchIndex
-from .utils.indexing import bulk_upsert_report_search_indexes
+from .models import EmbeddingBackfillRun, EmbeddingColumn, EmbeddingLayout, ReportSearchIndex
+from .utils.embedding_columns import (
+    EmbeddingTarget,
+    embedding_coverage,
+    model_key,
+    serving_embedding,
+    shadow_embedding,
+)
+from .utils.indexing import bulk_upsert_report_search_indexes, bulk_write_embeddings
 
 logger = logging.getLogger(__name__)
 
@@ -79,7 +88,7 @@ def bulk_index_reports(report_ids: list[int]) -> None:
         return
     logger.info("Indexing %s reports in bulk.", len(report_ids))
     bulk_upsert_report_search_indexes(report_ids)
-    enqueue_embed_reports(report_ids)
+    enqueue_live_embeddings(report_ids)
 
 
 def enqueue_bulk_index_reports(report_ids: list[int]) -> int | None:
@@ -100,7 +109,9 @@ class ActiveBackfillError(Exception):
     """Raised when starting a backfill while another is still active."""
 
 
-def create_backfill_run(total_reports: int, triggered_by: str) -> EmbeddingBackfillRun:
+def create_backfill_run(
+    total_reports: int, triggered_by: str, column: str = EmbeddingColumn.PRIMARY
+) -> EmbeddingBackfillRun:
     """Create the run row for a backfill, enforcing single-active (§6.8).
 
     Refuses while a run with live subjobs is active. An active run with NO
@@ -125,7 +136,7 @@ def create_backfill_run(total_reports: int, triggered_by: str) -> EmbeddingBackf
             active.total_reports,
         )
     return EmbeddingBackfillRun.objects.create(
-        total_reports=total_reports, triggered_by=triggered_by
+        total_reports=total_reports, triggered_by=triggered_by, column=column
     )
 
 
@@ -135,9 +146,13 @@ def enqueue_embed_reports(
     subjob_size: int | None = None,
     priority: int | None = None,
     run_id: int | None = None,
+    column: str | None = None,
+    reports_per_minute: int | None = None,
+    throttle_offset: int = 0,
 ) -> int:
-    """Chunk `report_ids` into subjobs and defer one `embed_reports_task`
-    per chunk. Returns the number of subjobs deferred.
+    """Chunk `report_ids` into subjobs and defer them in batched multi-row
+    inserts (EMBEDDINGS_DEFER_BATCH_SUBJOBS subjobs per insert). Returns the
+    number of subjobs deferred.
 
     Subjob size defaults to `settings.EMBEDDINGS_SUBJOB_SIZE` (the
     Procrastinate-task granularity). It's distinct from
@@ -157,7 +172,15 @@ def enqueue_embed_reports(
     admin action. Operators read one knob, not several.
 
     `run_id` ties backfill subjobs to their `EmbeddingBackfillRun`;
-    write-path enqueues leave it None.
+    write-path enqueues leave it None. `column` names the embedding column
+    to fill (None: whichever column serves search when the subjob runs).
+
+    `reports_per_minute` throttles a backfill by scheduling subjob i to start
+    no earlier than (throttle_offset + i * subjob_size) / reports_per_minute
+    minutes from now, so a shadow backfill can't take the whole embedding
+    budget from live writes. A paging caller passes the reports it already
+    deferred as `throttle_offset`. Each throttled subjob has its own start
+    time, so those are deferred one insert each.
     """
     if not report_ids:
         return 0
@@ -174,25 +197,92 @@ def enqueue_embed_reports(
     size = subjob_size if subjob_size is not None else settings.EMBEDDINGS_SUBJOB_SIZE
     if priority is None:
         priority = settings.EMBEDDINGS_LIVE_PRIORITY
-    deferrer = app.configure_task(
-        "radis.pgsearch.tasks.embed_reports_task",
-        allow_unknown=False,
-        priority=priority,
-    )
-    count = 0
+
+    subjobs: list[dict[str, JSONValue]] = []
     for start in range(0, len(report_ids), size):
-        chunk = report_ids[start : start + size]
-        kwargs: dict[str, JSONValue] = {"report_ids": list(chunk)}
+        kwargs: dict[str, JSONValue] = {"report_ids": list(report_ids[start : start + size])}
         if run_id is not None:
             kwargs["run_id"] = run_id
-        deferrer.defer(**kwargs)
-        count += 1
+        if column is not None:
+            kwargs["column"] = column
+        subjobs.append(kwargs)
+
+    if reports_per_minute:
+        for i, kwargs in enumerate(subjobs):
+            delay = int((throttle_offset + i * size) * 60 / reports_per_minute)
+            app.configure_task(
+                "radis.pgsearch.tasks.embed_reports_task",
+                allow_unknown=False,
+                priority=priority,
+                schedule_in={"seconds": delay},
+            ).defer(**kwargs)
+    else:
+        deferrer = app.configure_task(
+            "radis.pgsearch.tasks.embed_reports_task",
+            allow_unknown=False,
+            priority=priority,
+        )
+        batch = settings.EMBEDDINGS_DEFER_BATCH_SUBJOBS
+        for start in range(0, len(subjobs), batch):
+            deferrer.batch_defer(*subjobs[start : start + batch])
+
     logger.info(
         "enqueue_embed_reports: deferred %d subjob(s) for %d report(s) at priority=%d",
-        count,
+        len(subjobs),
         len(report_ids),
         priority,
     )
+    return len(subjobs)
+
+
+def iter_pending_pages(
+    queryset: QuerySet[ReportSearchIndex],
+    column: str,
+    *,
+    page_size: int,
+    after_id: int = 0,
+    limit: int | None = None,
+) -> Iterator[tuple[list[int], int]]:
+    """Stream the rows of `queryset` whose `column` is NULL as pages of
+    `(report_ids, cursor)`, where `cursor` is the last `ReportSearchIndex.id`
+    in the page.
+
+    Keyset-paginated on `id` (`id > cursor ORDER BY id LIMIT page_size`),
+    which the column's partial pending index serves directly, so each page
+    costs the same however deep into a multi-million-row backlog it is, and
+    only one page of ids is ever held in memory. Stops after `limit` ids."""
+    remaining = limit
+    cursor = after_id
+    while remaining is None or remaining > 0:
+        size = page_size if remaining is None else min(page_size, remaining)
+        rows = list(
+            queryset.filter(id__gt=cursor, **{f"{column}__isnull": True})
+            .order_by("id")
+            .values_list("id", "report_id")[:size]
+        )
+        if not rows:
+            return
+        cursor = rows[-1][0]
+        if remaining is not None:
+            remaining -= len(rows)
+        yield [report_id for _, report_id in rows], cursor
+        if len(rows) < size:
+            return
+
+
+def enqueue_page_size(subjob_size: int) -> int:
+    """Report ids per streamed page: one batched defer insert's worth."""
+    return subjob_size * settings.EMBEDDINGS_DEFER_BATCH_SUBJOBS
+
+
+def enqueue_live_embeddings(report_ids: list[int]) -> int:
+    """Write-path embedding: the serving column, plus the shadow column while
+    a model migration is in progress — otherwise reports ingested during the
+    backfill would be missing from the new column at switch time."""
+    count = enqueue_embed_reports(report_ids)
+    shadow = shadow_embedding()
+    if shadow is not None:
+        count += enqueue_embed_reports(report_ids, column=shadow.column)
     return count
 
 
@@ -253,9 +343,128 @@ def cancel_backfill_embeddings() -> int:
     return cancelled
 
 
+class EmbeddingMigrationError(Exception):
+    """Raised when a shadow-model migration can't be started as configured."""
+
+
+def _clear_embedding_column(column: str, batch_size: int = 10_000) -> int:
+    """NULL `column` in keyset-paginated batches, so clearing a multi-million
+    row column is many short transactions instead of one long lock."""
+    cleared = 0
+    last_id = 0
+    while True:
+        ids = list(
+            ReportSearchIndex.objects.filter(id__gt=last_id, **{f"{column}__isnull": False})
+            .order_by("id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            return cleared
+        cleared += ReportSearchIndex.objects.filter(id__in=ids).update(**{column: None})
+        last_id = ids[-1]
+
+
+def start_embedding_migration() -> EmbeddingTarget:
+    """Assign EMBEDDINGS_SHADOW_MODEL to the column search is not reading.
+
+    Idempotent: re-running for the same model keeps the vectors already
+    built. A target column still holding another model's vectors (an earlier
+    migration's leftovers) is unassigned first, then cleared in batches, then
+    assigned — so an interrupted clear is simply redone on the next run.
+    Search is untouched throughout; it keeps reading the serving column."""
+    spec = settings.EMBEDDINGS_SHADOW_MODEL
+    if spec is None or settings.EMBEDDINGS_MODEL is None:
+        raise EmbeddingMigrationError(
+            "Set both EMBEDDINGS_MODEL (the model serving search now) and "
+            "EMBEDDINGS_SHADOW_MODEL (the model to migrate to)."
+        )
+    key = model_key(spec)
+    with transaction.atomic():
+        layout, _ = EmbeddingLayout.objects.select_for_update().get_or_create(pk=1)
+        serving = serving_embedding(layout)
+        if serving is not None and model_key(serving.spec) == key:
+            raise EmbeddingMigrationError(
+                f"{spec.model} already serves search from {layout.serving_column}. Promote it: "
+                f"set EMBEDDINGS_MODEL to it and unset EMBEDDINGS_SHADOW_MODEL."
+            )
+        if not layout.model_for(layout.serving_column):
+            # Record what the serving column holds, for the admin and for a
+            # later migration back onto it.
+            layout.set_model_for(layout.serving_column, model_key(settings.EMBEDDINGS_MODEL))
+        target = layout.target_column
+        needs_clear = layout.model_for(target) != key
+        if needs_clear:
+            layout.set_model_for(target, "")
+        layout.save()
+
+    if needs_clear:
+        cleared = _clear_embedding_column(target)
+        logger.info("start_embedding_migration: cleared %d stale vector(s) in %s", cleared, target)
+        layout.set_model_for(target, key)
+        layout.save(update_fields=["primary_model", "shadow_model"])
+    return EmbeddingTarget(target, spec)
+
+
+def _resolve_embedding_target(column: str | None) -> EmbeddingTarget | None:
+    """The column and model an `embed_reports_task` subjob writes.
+
+    None (live writes, legacy subjobs) and the serving column resolve to the
+    serving model. A shadow subjob resolves to the shadow model only while its
+    migration is still in progress. Anything else — a column no migration
+    fills any more, or no embedding model configured at all — resolves to
+    None and the subjob is dropped."""
+    layout = EmbeddingLayout.get()
+    if column is None or column == layout.serving_column:
+        return serving_embedding(layout)
+    shadow = shadow_embedding(layout)
+    if shadow is not None and shadow.column == column:
+        return shadow
+    return None
+
+
+def switch_embedding_column(*, force: bool = False) -> bool:
+    """Point search at the shadow column once it is covered enough.
+
+    Coverage must reach EMBEDDINGS_SHADOW_SWITCH_COVERAGE unless `force`.
+    The switch is one UPDATE of the `EmbeddingLayout` row (locked, so two
+    finishing subjobs can't both switch). Query-cache keys are built from the
+    serving model, so no process reads cached old-model query vectors against
+    the new column. Returns whether it switched."""
+    with transaction.atomic():
+        layout, _ = EmbeddingLayout.objects.select_for_update().get_or_create(pk=1)
+        shadow = shadow_embedding(layout)
+        if shadow is None:
+            return False
+        coverage = embedding_coverage(shadow.column)
+        threshold = settings.EMBEDDINGS_SHADOW_SWITCH_COVERAGE
+        if coverage < threshold and not force:
+            logger.info(
+                "switch_embedding_column: %s coverage %.4f below %.4f; not switching",
+                shadow.column,
+                coverage,
+                threshold,
+            )
+            return False
+        previous = layout.serving_column
+        layout.serving_column = shadow.column
+        layout.switched_at = timezone.now()
+        layout.save(update_fields=["serving_column", "switched_at"])
+    logger.warning(
+        "switch_embedding_column: search switched from %s to %s (model %s, coverage %.4f%s)",
+        previous,
+        shadow.column,
+        shadow.spec.model,
+        coverage,
+        ", forced" if force else "",
+    )
+    return True
+
+
 @app.task(queue="embeddings", retry=EMBEDDING_TASK_RETRY_STRATEGY)
-def embed_reports_task(report_ids: list[int], run_id: int | None = None) -> None:
-    """Embed the named reports.
+def embed_reports_task(
+    report_ids: list[int], run_id: int | None = None, column: str | None = None
+) -> None:
+    """Embed the named reports into `column` (default: the serving column).
 
     Failure handling, from innermost to outermost:
 
@@ -285,6 +494,7 @@ def embed_reports_task(report_ids: list[int], run_id: int | None = None) -> None
     # fails and Procrastinate requeues it, its run is no longer active so future
     # cancels can't see it. Bailing here stops the cancelled backfill from
     # silently continuing. Resuming means re-running embed_pending.
+    run = None
     if run_id is not None:
         run = EmbeddingBackfillRun.objects.filter(pk=run_id).first()
         if run is not None and run.cancelled_at is not None:
@@ -296,7 +506,17 @@ def embed_reports_task(report_ids: list[int], run_id: int | None = None) -> None
             )
             return
 
-    logger.info("embed_reports_task: start; reports=%d", len(report_ids))
+    target = _resolve_embedding_target(column)
+    if target is None:
+        logger.info(
+            "embed_reports_task: no embedding model is configured for column %s; "
+            "skipping %d report(s)",
+            column or "(serving)",
+            len(report_ids),
+        )
+        return
+
+    logger.info("embed_reports_task: start; reports=%d column=%s", len(report_ids), target.column)
     start_t = time.perf_counter()
 
     rsvs = list(
@@ -318,7 +538,7 @@ def embed_reports_task(report_ids: list[int], run_id: int | None = None) -> None
     batch_size = settings.EMBEDDINGS_BATCH_SIZE
     embedded: list[ReportSearchIndex] = []
     try:
-        with EmbeddingClient() as client:
+        with EmbeddingClient(target.spec) as client:
             for start in range(0, len(rsvs), batch_size):
                 chunk = rsvs[start : start + batch_size]
                 vectors = _embed_chunk_with_retry(client, [rsv.report.body for rsv in chunk])
@@ -349,16 +569,15 @@ def embed_reports_task(report_ids: list[int], run_id: int | None = None) -> None
         raise
 
     if embedded:
-        # Count genuine NULL->non-NULL transitions BEFORE the write so progress
-        # accounting is idempotent under at-least-once reruns: a rerun of this
-        # subjob finds the reports already embedded, counts 0, and does not
-        # double-increment the run (which could otherwise flip finished_at while
-        # distinct reports remain unembedded). Also dedupes overlap with any
-        # other subjob that embedded the same report.
-        newly_embedded = ReportSearchIndex.objects.filter(
-            report_id__in=[rsv.report.pk for rsv in embedded], embedding__isnull=True
-        ).count()
-        ReportSearchIndex.objects.bulk_update(embedded, fields=["embedding"])
+        # The writer returns genuine NULL->non-NULL transitions from the same
+        # statement, so progress accounting is idempotent under at-least-once
+        # reruns: a rerun of this subjob finds the reports already embedded,
+        # counts 0, and does not double-increment the run (which could otherwise
+        # flip finished_at while distinct reports remain unembedded). Also dedupes
+        # overlap with any other subjob that embedded the same report.
+        newly_embedded = bulk_write_embeddings(
+            ((rsv.report.pk, rsv.embedding) for rsv in embedded), column=target.column
+        )
 
         if run_id is not None:
             if newly_embedded:
@@ -366,12 +585,19 @@ def embed_reports_task(report_ids: list[int], run_id: int | None = None) -> None
                     processed_reports=F("processed_reports") + newly_embedded
                 )
             # Flip finished_at exactly once, and never on a cancelled run.
-            EmbeddingBackfillRun.objects.filter(
+            finished = EmbeddingBackfillRun.objects.filter(
                 pk=run_id,
                 finished_at__isnull=True,
                 cancelled_at__isnull=True,
                 processed_reports__gte=F("total_reports"),
             ).update(finished_at=Now())
+            # A finished shadow backfill is the natural moment to switch search
+            # over; below the coverage threshold this is a no-op and the
+            # operator decides (`embed_switch`).
+            if finished and run is not None:
+                shadow = shadow_embedding()
+                if shadow is not None and shadow.column == run.column:
+                    switch_embedding_column()
 
     duration_ms = int((time.perf_counter() - start_t) * 1000)
     logger.info(
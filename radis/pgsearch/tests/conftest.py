@@ -23,3 +23,12 @@ def _clear_logged_permanent_failure_configs():
     providers._LOGGED_PERMANENT_FAILURE_CONFIGS.clear()
     yield
     providers._LOGGED_PERMANENT_FAILURE_CONFIGS.clear()
+
+
+@pytest.fixture(autouse=True)
+def _reset_query_embedding_breaker():
+    """The query-embedding circuit breaker is process-global; a test that records
+    failures would otherwise leave it open and turn later tests FTS-only."""
+    providers.QUERY_EMBEDDING_BREAKER.reset()
+    yield
+    providers.QUERY_EMBEDDING_BREAKER.reset()
@@ -190,6 +190,10 @@ def test_pipeline_stats_zero_when_no_queue_activity():
         "failed": 0,
         "run": None,
         "run_stalled": False,
+        "serving_column": "embedding",
+        "serving_model": "",
+        "shadow": None,
+        "shadow_coverage": None,
     }
 
 
@@ -11,7 +11,7 @@ from django.core.management import CommandError, call_command
 from django.db import connection
 
 from radis.core.utils.model_spec import parse_model_spec
-from radis.pgsearch.models import EmbeddingBackfillRun
+from radis.pgsearch.models import EmbeddingBackfillRun, ReportSearchIndex
 from radis.reports.factories import ReportFactory
 
 pytestmark = pytest.mark.django_db
@@ -148,3 +148,72 @@ def test_embed_pending_supersedes_abandoned_run():
     active = EmbeddingBackfillRun.get_active()
     assert active is not None
     assert active.triggered_by == "embed_pending"
+
+
+def test_streams_pages_and_records_cursor(settings):
+    settings.EMBEDDINGS_DEFER_BATCH_SUBJOBS = 1
+    reports = [ReportFactory.create() for _ in range(5)]
+
+    with patch(
+        "radis.pgsearch.management.commands.embed_pending.enqueue_embed_reports",
+        return_value=1,
+    ) as enqueue:
+        call_command("embed_pending", "--subjob-size", "2", stdout=StringIO())
+
+    # One page per batched insert: 2 + 2 + 1 ids, in id order.
+    pages = [c.args[0] for c in enqueue.call_args_list]
+    assert pages == [[r.pk for r in reports[i : i + 2]] for i in (0, 2, 4)]
+    assert [c.kwargs["throttle_offset"] for c in enqueue.call_args_list] == [0, 2, 4]
+    run = EmbeddingBackfillRun.objects.get()
+    assert run.total_reports == 5
+    assert run.enqueued_reports == 5
+    assert run.enqueue_cursor == ReportSearchIndex.objects.get(report_id=reports[-1].pk).pk
+
+
+def test_resume_continues_from_cursor(settings):
+    settings.EMBEDDINGS_DEFER_BATCH_SUBJOBS = 1
+    reports = [ReportFactory.create() for _ in range(4)]
+    cursor = ReportSearchIndex.objects.get(report_id=reports[1].pk).pk
+    run = EmbeddingBackfillRun.objects.create(
+        total_reports=4, enqueued_reports=2, enqueue_cursor=cursor, triggered_by="embed_pending"
+    )
+
+    with patch(
+        "radis.pgsearch.management.commands.embed_pending.enqueue_embed_reports",
+        return_value=1,
+    ) as enqueue:
+        call_command("embed_pending", "--resume", "--subjob-size", "10", stdout=StringIO())
+
+    args, kwargs = enqueue.call_args
+    assert args[0] == [r.pk for r in reports[2:]]
+    assert kwargs["run_id"] == run.pk
+    run.refresh_from_db()
+    assert run.enqueue_complete
+
+
+def test_resume_without_interrupted_run_errors():
+    with pytest.raises(CommandError, match="resume"):
+        call_command("embed_pending", "--resume")
+
+
+def test_total_shrinks_when_rows_are_embedded_mid_enqueue(settings):
+    """A row embedded by a live write between the COUNT and its page is
+    never enqueued; the run's target must shrink or it can never finish."""
+    settings.EMBEDDINGS_DEFER_BATCH_SUBJOBS = 1
+    reports = [ReportFactory.create() for _ in range(2)]
+
+    def embed_second_row(report_ids, **kwargs):
+        ReportSearchIndex.objects.filter(report_id=reports[1].pk).update(
+            embedding=[0.0] * settings.EMBEDDINGS_DIM
+        )
+        return 1
+
+    with patch(
+        "radis.pgsearch.management.commands.embed_pending.enqueue_embed_reports",
+        side_effect=embed_second_row,
+    ):
+        call_command("embed_pending", "--subjob-size", "1", stdout=StringIO())
+
+    run = EmbeddingBackfillRun.objects.get()
+    assert run.total_reports == 1
+    assert run.enqueued_reports == 1
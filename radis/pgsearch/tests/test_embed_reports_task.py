@@ -284,9 +284,12 @@ def test_embedding_error_propagates():
 
 
 def _defer_calls(cfg_mock):
-    """Helper: return the (kwargs of) defer() calls made through the
-    `app.configure_task` mock."""
-    return [c.kwargs for c in cfg_mock.return_value.defer.call_args_list]
+    """Helper: return the kwargs of every subjob deferred through the
+    `app.configure_task` mock, whether by defer() or batch_defer()."""
+    deferrer = cfg_mock.return_value
+    return [c.kwargs for c in deferrer.defer.call_args_list] + [
+        kwargs for c in deferrer.batch_defer.call_args_list for kwargs in c.args
+    ]
 
 
 def test_bulk_index_reports_chains_into_embed_reports_task(settings):
@@ -343,6 +346,21 @@ def test_enqueue_embed_reports_helper_chunks_by_subjob_size(settings):
     ]
 
 
+def test_enqueue_embed_reports_defers_in_multi_row_batches(settings):
+    """Subjobs go out EMBEDDINGS_DEFER_BATCH_SUBJOBS per insert, not one
+    round trip each."""
+    settings.EMBEDDINGS_SUBJOB_SIZE = 1
+    settings.EMBEDDINGS_DEFER_BATCH_SUBJOBS = 2
+
+    with patch("radis.pgsearch.tasks.app.configure_task") as cfg:
+        count = enqueue_embed_reports([1, 2, 3, 4, 5])
+
+    assert count == 5
+    batches = [len(c.args) for c in cfg.return_value.batch_defer.call_args_list]
+    assert batches == [2, 2, 1]
+    cfg.return_value.defer.assert_not_called()
+
+
 def test_enqueue_embed_reports_helper_empty_input_is_noop():
     with patch("radis.pgsearch.tasks.app.configure_task") as cfg:
         count = enqueue_embed_reports([])
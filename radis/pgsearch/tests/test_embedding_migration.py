@@ -0,0 +1,178 @@
+"""Tests for zero-downtime embedding model migrations (shadow column)."""
+
+from io import StringIO
+from unittest.mock import MagicMock, patch
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from radis.core.utils.model_spec import parse_model_spec
+from radis.pgsearch.models import (
+    EmbeddingBackfillRun,
+    EmbeddingColumn,
+    EmbeddingLayout,
+    ReportSearchIndex,
+)
+from radis.pgsearch.tasks import (
+    EmbeddingMigrationError,
+    embed_reports_task,
+    enqueue_live_embeddings,
+    start_embedding_migration,
+    switch_embedding_column,
+)
+from radis.pgsearch.utils.embedding_columns import (
+    model_key,
+    serving_embedding,
+    shadow_embedding,
+)
+from radis.reports.factories import ReportFactory
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def _models_configured(settings):
+    settings.EMBEDDINGS_MODEL = parse_model_spec("old-model")
+    settings.EMBEDDINGS_SHADOW_MODEL = parse_model_spec("new-model")
+    settings.EMBEDDINGS_SHADOW_SWITCH_COVERAGE = 1.0
+
+
+def _unit_vec(dim: int) -> list[float]:
+    return [1.0] + [0.0] * (dim - 1)
+
+
+def _fake_client(dim: int) -> MagicMock:
+    fake = MagicMock()
+    fake.__enter__ = MagicMock(return_value=fake)
+    fake.__exit__ = MagicMock(return_value=None)
+    fake.embed_documents = MagicMock(side_effect=lambda texts: [_unit_vec(dim)] * len(texts))
+    return fake
+
+
+def test_no_migration_without_shadow_model(settings):
+    settings.EMBEDDINGS_SHADOW_MODEL = None
+    assert shadow_embedding() is None
+    assert serving_embedding() == (EmbeddingColumn.PRIMARY, settings.EMBEDDINGS_MODEL)
+    with pytest.raises(EmbeddingMigrationError):
+        start_embedding_migration()
+
+
+def test_start_assigns_non_serving_column_and_records_serving_model():
+    target = start_embedding_migration()
+
+    assert target.column == EmbeddingColumn.SHADOW
+    layout = EmbeddingLayout.get()
+    assert layout.primary_model == "old-model"
+    assert layout.shadow_model == "new-model"
+    assert shadow_embedding() == target
+    # Search is untouched until the switch.
+    assert serving_embedding().column == EmbeddingColumn.PRIMARY
+    assert serving_embedding().spec.model == "old-model"
+
+
+def test_start_clears_vectors_left_by_another_model(settings):
+    report = ReportFactory.create()
+    ReportSearchIndex.objects.filter(report_id=report.pk).update(
+        embedding_shadow=_unit_vec(settings.EMBEDDINGS_DIM)
+    )
+    EmbeddingLayout.objects.create(pk=1, shadow_model="older-experiment")
+
+    start_embedding_migration()
+
+    assert ReportSearchIndex.objects.get(report_id=report.pk).embedding_shadow is None
+    assert EmbeddingLayout.get().shadow_model == "new-model"
+
+
+def test_start_keeps_vectors_of_the_same_model(settings):
+    report = ReportFactory.create()
+    ReportSearchIndex.objects.filter(report_id=report.pk).update(
+        embedding_shadow=_unit_vec(settings.EMBEDDINGS_DIM)
+    )
+    EmbeddingLayout.objects.create(pk=1, shadow_model="new-model")
+
+    start_embedding_migration()
+
+    assert ReportSearchIndex.objects.get(report_id=report.pk).embedding_shadow is not None
+
+
+def test_live_writes_embed_into_both_columns_during_migration():
+    start_embedding_migration()
+    with patch("radis.pgsearch.tasks.enqueue_embed_reports", return_value=1) as enqueue:
+        enqueue_live_embeddings([1, 2])
+    columns = [call.kwargs.get("column") for call in enqueue.call_args_list]
+    assert columns == [None, EmbeddingColumn.SHADOW]
+
+
+def test_embed_pending_shadow_targets_shadow_column(settings):
+    reports = [ReportFactory.create() for _ in range(3)]
+    ReportSearchIndex.objects.filter(report_id=reports[0].pk).update(
+        embedding_shadow=_unit_vec(settings.EMBEDDINGS_DIM)
+    )
+    EmbeddingLayout.objects.create(pk=1, shadow_model="new-model")
+
+    with patch(
+        "radis.pgsearch.management.commands.embed_pending.enqueue_embed_reports",
+        return_value=1,
+    ) as enqueue:
+        call_command("embed_pending", "--shadow", "--reports-per-minute", "100", stdout=StringIO())
+
+    args, kwargs = enqueue.call_args
+    assert args[0] == sorted(r.pk for r in reports[1:])
+    assert kwargs["column"] == EmbeddingColumn.SHADOW
+    assert kwargs["reports_per_minute"] == 100
+    assert EmbeddingBackfillRun.objects.get().column == EmbeddingColumn.SHADOW
+
+
+def test_embed_pending_shadow_requires_shadow_model(settings):
+    settings.EMBEDDINGS_SHADOW_MODEL = None
+    ReportFactory.create()
+    with pytest.raises(CommandError, match="EMBEDDINGS_SHADOW_MODEL"):
+        call_command("embed_pending", "--shadow")
+
+
+def test_switch_respects_coverage_threshold(settings):
+    reports = [ReportFactory.create() for _ in range(2)]
+    start_embedding_migration()
+    ReportSearchIndex.objects.filter(report_id=reports[0].pk).update(
+        embedding_shadow=_unit_vec(settings.EMBEDDINGS_DIM)
+    )
+
+    assert switch_embedding_column() is False
+    assert EmbeddingLayout.get().serving_column == EmbeddingColumn.PRIMARY
+
+    assert switch_embedding_column(force=True) is True
+    layout = EmbeddingLayout.get()
+    assert layout.serving_column == EmbeddingColumn.SHADOW
+    assert layout.switched_at is not None
+    serving = serving_embedding()
+    assert serving.column == EmbeddingColumn.SHADOW
+    assert model_key(serving.spec) == "new-model"
+    # The migration is over: nothing is left to fill.
+    assert shadow_embedding() is None
+
+
+def test_finished_shadow_run_switches_search(settings):
+    reports = [ReportFactory.create() for _ in range(2)]
+    start_embedding_migration()
+    run = EmbeddingBackfillRun.objects.create(total_reports=2, column=EmbeddingColumn.SHADOW)
+
+    fake = _fake_client(settings.EMBEDDINGS_DIM)
+    with patch("radis.pgsearch.tasks.EmbeddingClient", return_value=fake) as client_cls:
+        embed_reports_task([r.pk for r in reports], run_id=run.pk, column=EmbeddingColumn.SHADOW)
+
+    assert client_cls.call_args.args[0].model == "new-model"
+    rows = ReportSearchIndex.objects.filter(report_id__in=[r.pk for r in reports])
+    assert all(row.embedding_shadow is not None for row in rows)
+    assert all(row.embedding is None for row in rows)
+    assert EmbeddingLayout.get().serving_column == EmbeddingColumn.SHADOW
+
+
+def test_stale_shadow_job_is_skipped_after_model_change(settings):
+    report = ReportFactory.create()
+    start_embedding_migration()
+    settings.EMBEDDINGS_SHADOW_MODEL = parse_model_spec("another-model")
+
+    with patch("radis.pgsearch.tasks.EmbeddingClient") as client_cls:
+        embed_reports_task([report.pk], column=EmbeddingColumn.SHADOW)
+
+    client_cls.assert_not_called()
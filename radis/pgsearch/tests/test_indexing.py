@@ -1,7 +1,11 @@
 import pytest
 
 from radis.pgsearch.models import ReportSearchIndex
-from radis.pgsearch.utils.indexing import bulk_upsert_report_search_indexes
+from radis.pgsearch.utils.indexing import (
+    bulk_upsert_report_search_indexes,
+    bulk_write_embeddings,
+)
+from radis.reports.factories import ReportFactory
 from radis.reports.models import Language, Report
 
 
@@ -31,3 +35,27 @@ def test_bulk_index_matches_signal_vector() -> None:
     bulk_vector = ReportSearchIndex.objects.get(report=report).search_vector
 
     assert signal_vector == bulk_vector
+
+
+@pytest.mark.django_db
+def test_bulk_write_embeddings_counts_only_null_transitions(settings) -> None:
+    reports = [ReportFactory.create() for _ in range(3)]
+    vector = [1.0] + [0.0] * (settings.EMBEDDINGS_DIM - 1)
+
+    written = bulk_write_embeddings([(r.pk, vector) for r in reports[:2]])
+    assert written == 2
+
+    # Rewriting already-embedded rows is not a transition; the third report is.
+    # An id without a ReportSearchIndex row is skipped.
+    written = bulk_write_embeddings([(r.pk, vector) for r in reports] + [(-1, vector)])
+    assert written == 1
+
+    embeddings = ReportSearchIndex.objects.filter(report__in=reports).values_list(
+        "embedding", flat=True
+    )
+    assert all(list(e) == vector for e in embeddings)
+
+
+@pytest.mark.django_db
+def test_bulk_write_embeddings_empty_input_is_noop() -> None:
+    assert bulk_write_embeddings([]) == 0
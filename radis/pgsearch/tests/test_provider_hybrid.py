@@ -138,6 +138,39 @@ def test_embedding_failure_falls_back_to_fts(group, reports_with_embeddings):
     assert set(ids) == {r0.document_id, r2.document_id}
 
 
+def test_embedding_failure_marks_result_degraded(group, reports_with_embeddings):
+    with patch("radis.pgsearch.providers.EmbeddingClient") as MockClient:
+        MockClient.return_value.__enter__.return_value = MockClient.return_value
+        MockClient.return_value.__exit__.return_value = None
+        MockClient.return_value.embed_query.side_effect = EmbeddingClientError("down")
+        result = search(_make_search("pneumothorax", group.pk))
+
+    assert result.degraded
+
+
+def test_open_breaker_skips_the_embedding_service(group, reports_with_embeddings, settings):
+    """While the query-embedding circuit is open, searches go straight to
+    FTS-only without calling (or waiting on) the embedding service."""
+    from radis.pgsearch import providers
+
+    r0, _, r2 = reports_with_embeddings
+    with patch("radis.pgsearch.providers.EmbeddingClient") as MockClient:
+        MockClient.return_value.__enter__.return_value = MockClient.return_value
+        MockClient.return_value.__exit__.return_value = None
+        MockClient.return_value.embed_query.side_effect = EmbeddingClientError("down")
+        for i in range(settings.EMBEDDINGS_QUERY_BREAKER_MIN_CALLS):
+            # Distinct query texts: failures aren't cached, but keep it explicit.
+            providers._embed_query_or_none(f"query {i}", "test")
+        assert providers.QUERY_EMBEDDING_BREAKER.state == "open"
+        MockClient.reset_mock()
+
+        result = search(_make_search("pneumothorax", group.pk))
+
+    MockClient.assert_not_called()
+    assert result.degraded
+    assert {d.document_id for d in result.documents} == {r0.document_id, r2.document_id}
+
+
 @override_settings(EMBEDDINGS_MODEL=None)
 def test_search_without_a_configured_model_makes_no_embedding_call(
     group, reports_with_embeddings, caplog, monkeypatch
@@ -150,7 +183,9 @@ def test_search_without_a_configured_model_makes_no_embedding_call(
     from radis.pgsearch import providers
 
     calls = []
-    monkeypatch.setattr(providers, "_embed_query_cached", lambda text, caller: calls.append(text))
+    monkeypatch.setattr(
+        providers, "_embed_query_cached", lambda text, caller, target=None: calls.append(text)
+    )
 
     with caplog.at_level(logging.ERROR, logger="radis.pgsearch.providers"):
         result = search(_make_search("pneumothorax", group.pk))
@@ -278,7 +313,7 @@ def test_search_skips_embedding_when_query_reduces_to_not(monkeypatch, group):
     embed_query_calls: list[str] = []
 
     class FakeEC:
-        def __init__(self):
+        def __init__(self, spec=None):
             pass
 
         def __enter__(self):
@@ -311,7 +346,7 @@ def test_search_embeds_only_positive_branch_for_and_not(monkeypatch, group, sett
     dim = settings.EMBEDDINGS_DIM
 
     class FakeEC:
-        def __init__(self):
+        def __init__(self, spec=None):
             pass
 
         def __enter__(self):
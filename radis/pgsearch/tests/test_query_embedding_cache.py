@@ -130,7 +130,7 @@ def test_differing_spec_parameters_do_not_share_a_cache_entry(monkeypatch):
     # dimensions=2 and dimensions=4 are different vectors for the same model text.
     calls = []
 
-    def fake_embed(text, caller):
+    def fake_embed(text, caller, spec=None):
         calls.append(text)
         return [1.0, 0.0]
 
@@ -151,7 +151,7 @@ def test_differing_base_url_does_not_share_a_cache_entry(monkeypatch):
     # the shared (database-backed, restart-surviving) cache.
     calls = []
 
-    def fake_embed(text, caller):
+    def fake_embed(text, caller, spec=None):
         calls.append(text)
         return [1.0, 0.0]
 
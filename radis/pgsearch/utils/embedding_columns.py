@@ -0,0 +1,83 @@
+"""Which embedding column serves search, and which model goes with it.
+
+Two physical columns (`EmbeddingColumn`) and the `EmbeddingLayout` row make a
+model change a background job instead of an FTS-only outage:
+
+1. Set EMBEDDINGS_SHADOW_MODEL and run `embed_pending --shadow`. The column
+   search is not reading (the *target*) is assigned the new model and
+   backfilled; live writes embed into both columns meanwhile.
+2. Once the target's coverage reaches EMBEDDINGS_SHADOW_SWITCH_COVERAGE,
+   `EmbeddingLayout.serving_column` flips in one UPDATE (automatically when the
+   shadow run finishes, or via `embed_switch`). Search now embeds queries with
+   the shadow model and reads the target column.
+3. Promote the model in the environment: EMBEDDINGS_MODEL=<new>, unset
+   EMBEDDINGS_SHADOW_MODEL. The layout still points at the column holding the
+   new vectors, so the restart changes nothing for search.
+"""
+
+import json
+from typing import NamedTuple
+
+from django.conf import settings
+
+from radis.core.utils.model_spec import ModelSpec
+
+from ..models import EmbeddingLayout, ReportSearchIndex
+
+
+class EmbeddingTarget(NamedTuple):
+    column: str
+    spec: ModelSpec
+
+
+def model_key(spec: ModelSpec) -> str:
+    """Identity of the vectors a spec produces: model plus request parameters
+    (`dimensions=512` and `dimensions=1024` are different vectors)."""
+    if not spec.params:
+        return spec.model
+    return f"{spec.model}?{json.dumps(spec.params, sort_keys=True)}"
+
+
+def serving_embedding(layout: EmbeddingLayout | None = None) -> EmbeddingTarget | None:
+    """The column search reads and the model that embeds queries for it, or
+    None in an FTS-only deployment.
+
+    The shadow model serves only once the layout has switched to the column it
+    filled; otherwise EMBEDDINGS_MODEL does, including when the serving column's
+    recorded model doesn't match it (the legacy clear-and-re-embed procedure)."""
+    spec = settings.EMBEDDINGS_MODEL
+    if spec is None:
+        return None
+    if layout is None:
+        layout = EmbeddingLayout.get()
+    shadow = settings.EMBEDDINGS_SHADOW_MODEL
+    if shadow is not None and layout.model_for(layout.serving_column) == model_key(shadow):
+        return EmbeddingTarget(layout.serving_column, shadow)
+    return EmbeddingTarget(layout.serving_column, spec)
+
+
+def shadow_embedding(layout: EmbeddingLayout | None = None) -> EmbeddingTarget | None:
+    """The column a migration in progress is filling, or None.
+
+    A migration is in progress when EMBEDDINGS_SHADOW_MODEL is set and
+    `embed_pending --shadow` has assigned it to the non-serving column. After
+    the switch the shadow model owns the serving column and this returns None."""
+    shadow = settings.EMBEDDINGS_SHADOW_MODEL
+    if shadow is None or settings.EMBEDDINGS_MODEL is None:
+        return None
+    if layout is None:
+        layout = EmbeddingLayout.get()
+    target = layout.target_column
+    if layout.model_for(target) != model_key(shadow):
+        return None
+    return EmbeddingTarget(target, shadow)
+
+
+def embedding_coverage(column: str) -> float:
+    """Fraction of `ReportSearchIndex` rows with a vector in `column`. The
+    NULL count is served by the column's partial pending index."""
+    total = ReportSearchIndex.objects.count()
+    if not total:
+        return 1.0
+    pending = ReportSearchIndex.objects.filter(**{f"{column}__isnull": True}).count()
+    return (total - pending) / total
@@ -3,10 +3,11 @@ from collections.abc import Iterable
 
 from django.conf import settings
 from django.db import connection
+from pgvector import Vector
 
 from radis.reports.models import Report
 
-from ..models import ReportSearchIndex
+from ..models import EmbeddingColumn, ReportSearchIndex
 from .language_utils import code_to_language
 
 logger = logging.getLogger(__name__)
@@ -70,3 +71,58 @@ def bulk_upsert_report_search_indexes(
                     """,
                     [config, config_ids],
                 )
+
+
+def bulk_write_embeddings(
+    embeddings: Iterable[tuple[int, list[float]]],
+    column: str = EmbeddingColumn.PRIMARY,
+) -> int:
+    """Write `(report_id, vector)` pairs in one set-based statement and return
+    how many rows went from NULL to non-NULL.
+
+    Replaces `bulk_update(fields=["embedding"])`, which Django renders as a
+    `CASE WHEN id=... THEN '[...1024 floats...]'` per row — slow to build,
+    send and plan for a 1,000-row subjob. Here the ids and vectors travel as
+    two array parameters and are joined back with `unnest`, so the statement
+    text is constant-size and the plan is a plain index join.
+
+    The NULL->non-NULL count comes from the same statement: the inner select
+    locks the target rows (`FOR UPDATE`) and reads their pre-update state, so
+    a concurrent writer of the same report can't make us count a transition
+    twice. That keeps `embed_reports_task`'s progress accounting idempotent
+    under at-least-once reruns without the separate `count()` round trip.
+    Report ids without a ReportSearchIndex row are skipped silently.
+
+    `column` picks the physical embedding column (see `EmbeddingColumn`); it
+    is interpolated into the SQL, so only the enum's values are accepted."""
+    if column not in EmbeddingColumn.values:
+        raise ValueError(f"Unknown embedding column {column!r}")
+    report_ids: list[int] = []
+    vectors: list[str] = []
+    for report_id, vector in embeddings:
+        report_ids.append(int(report_id))
+        vectors.append(Vector(vector).to_text())
+    if not report_ids:
+        return 0
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            WITH updated AS (
+                UPDATE pgsearch_reportsearchindex v
+                SET {column} = d.embedding
+                FROM (
+                    SELECT i.id, i.{column} IS NULL AS was_null, u.embedding
+                    FROM unnest(%s::bigint[], %s::vector[]) AS u(report_id, embedding)
+                    JOIN pgsearch_reportsearchindex i ON i.report_id = u.report_id
+                    FOR UPDATE OF i
+                ) d
+                WHERE v.id = d.id
+                RETURNING d.was_null
+            )
+            SELECT count(*) FILTER (WHERE was_null) FROM updated
+            """,
+            [report_ids, vectors],
+        )
+        row = cursor.fetchone()
+    return int(row[0]) if row else 0
@@ -86,6 +86,10 @@ class Report(models.Model):
 
     class Meta:
         ordering = ["-created_at", "document_id"]
+        indexes = [
+            # The subscription launcher reads the reports updated since the last refresh.
+            models.Index(fields=["updated_at"], name="report_updated_at_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"Report {self.document_id} [{self.pk}]"
@@ -29,6 +29,9 @@ class SearchResult(NamedTuple):
     total_count: int
     total_relation: Literal["exact", "at_least", "approximately"]
     documents: list[ReportDocument]
+    # True when the provider had to skip part of its retrieval (e.g. the semantic
+    # half of hybrid search while the embedding service is down).
+    degraded: bool = False
 
 
 @dataclass
@@ -96,6 +96,7 @@ class SearchView(LoginRequiredMixin, UserPassesTestMixin, View):
 
             context["form"] = form
             context["documents"] = result.documents
+            context["search_degraded"] = result.degraded
 
         return render(request, "search/search.html", context)
 
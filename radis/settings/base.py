@@ -423,6 +423,46 @@ LLM_RATE_LIMIT_INTERACTIVE_MAX_WAIT_SECONDS = env.float(
 LLM_TRANSIENT_RETRY_ATTEMPTS = env.int("LLM_TRANSIENT_RETRY_ATTEMPTS", default=2)
 LLM_TRANSIENT_RETRY_BASE_SECONDS = env.float("LLM_TRANSIENT_RETRY_BASE_SECONDS", default=1.0)
 
+# The number of LLM requests one worker process keeps in flight. Every extraction,
+# subscription and labeling task running in the process submits its calls to one shared
+# engine (radis.core.utils.llm_engine), so this caps the process as a whole, not each task.
+# The total across the deployment is LLM_ENGINE_CONCURRENCY * number of llm workers; keep it
+# within whatever concurrency the configured provider allows, otherwise the surplus requests
+# just get rate limited.
+LLM_ENGINE_CONCURRENCY = env.int("LLM_ENGINE_CONCURRENCY", default=6)
+
+# Prices of the configured provider per million tokens, used to project the cost of an
+# extraction job from its preview run. Zero (the default) leaves the cost out.
+LLM_PRICE_PER_MILLION_PROMPT_TOKENS = env.float("LLM_PRICE_PER_MILLION_PROMPT_TOKENS", default=0.0)
+LLM_PRICE_PER_MILLION_COMPLETION_TOKENS = env.float(
+    "LLM_PRICE_PER_MILLION_COMPLETION_TOKENS", default=0.0
+)
+
+# Optional budget shared by all worker and web processes (radis.core.utils.llm_quota). The
+# gate above only coordinates one process; with this on, every LLM request first takes a
+# slot from a Postgres row per provider and feature, so N workers together stay within what
+# the provider allows. Tokens refill at REQUESTS_PER_MINUTE up to BURST; MAX_CONCURRENT caps
+# requests in flight across the deployment; a 429 in any process pauses all of them.
+# Current state is visible in the admin under Core > LLM quotas.
+LLM_SHARED_LIMIT_ENABLED = env.bool("LLM_SHARED_LIMIT_ENABLED", default=False)
+LLM_SHARED_REQUESTS_PER_MINUTE = env.float("LLM_SHARED_REQUESTS_PER_MINUTE", default=600.0)
+LLM_SHARED_BURST = env.int("LLM_SHARED_BURST", default=20)
+LLM_SHARED_MAX_CONCURRENT = env.int("LLM_SHARED_MAX_CONCURRENT", default=16)
+
+# Optional persistent cache of structured-output answers (radis.core.utils.llm_cache),
+# keyed by a hash of model, request parameters, prompt and schema, so retrying or
+# restarting a job does not pay for the reports it already got answers for. Entries expire
+# after TTL_SECONDS; the hourly eviction task also trims the table to MAX_ENTRIES (oldest
+# first). A job's "bypass LLM cache" switch forces fresh answers for that job. Each process
+# adds its hit and miss counts to the admin stats at most every STATS_FLUSH_SECONDS.
+LLM_RESPONSE_CACHE_ENABLED = env.bool("LLM_RESPONSE_CACHE_ENABLED", default=False)
+LLM_RESPONSE_CACHE_TTL_SECONDS = env.int(
+    "LLM_RESPONSE_CACHE_TTL_SECONDS", default=30 * 24 * 60 * 60
+)
+LLM_RESPONSE_CACHE_MAX_ENTRIES = env.int("LLM_RESPONSE_CACHE_MAX_ENTRIES", default=500_000)
+LLM_RESPONSE_CACHE_EVICTION_CRON = "30 * * * *"
+LLM_RESPONSE_CACHE_STATS_FLUSH_SECONDS = 60
+
 # A Retry-After below this is trusted and honored verbatim. At or above it, the header is
 # treated as absurd and ignored, falling back to the exponential backoff ladder instead.
 LLM_RATE_LIMIT_HEADER_CEILING_SECONDS = env.float(
@@ -453,7 +493,7 @@ EMBEDDINGS_REQUEST_TIMEOUT_SECONDS = _optional_env(
 )
 
 
-def _resolve_embeddings_model() -> ModelSpec | None:
+def _resolve_embeddings_model(name: str = "EMBEDDINGS_MODEL") -> ModelSpec | None:
     """The embedding model, or None when hybrid search is not configured.
 
     Unlike the LLM models this one is optional: without it RADIS serves full-text
@@ -466,17 +506,25 @@ def _resolve_embeddings_model() -> ModelSpec | None:
     alongside the model. Parsed here so a malformed spec is a boot error naming the
     setting at fault, not a 400 on the first search.
     """
-    raw = env.str("EMBEDDINGS_MODEL", default="").strip()
+    raw = env.str(name, default="").strip()
     if not raw:
         return None
     try:
         return parse_model_spec(raw)
     except ModelSpecError as err:
-        raise ImproperlyConfigured(f"Invalid EMBEDDINGS_MODEL: {err}") from err
+        raise ImproperlyConfigured(f"Invalid {name}: {err}") from err
 
 
 EMBEDDINGS_MODEL = _resolve_embeddings_model()
 
+# The model a zero-downtime migration moves to. While set, `embed_pending --shadow` fills
+# the column search is not reading with this model and live writes embed into both; search
+# keeps using the current column until the shadow column's coverage reaches
+# EMBEDDINGS_SHADOW_SWITCH_COVERAGE and then switches over in one transaction. Must have
+# the same EMBEDDINGS_DIM (a dim change still needs the drop-and-remigrate procedure).
+EMBEDDINGS_SHADOW_MODEL = _resolve_embeddings_model("EMBEDDINGS_SHADOW_MODEL")
+EMBEDDINGS_SHADOW_SWITCH_COVERAGE = env.float("EMBEDDINGS_SHADOW_SWITCH_COVERAGE", default=0.99)
+
 EMBEDDINGS_DIM = env.int("EMBEDDINGS_DIM", default=1024)
 
 EMBEDDINGS_QUERY_INSTRUCTION = env.str(
@@ -493,12 +541,23 @@ EMBEDDINGS_QUERY_INSTRUCTION = env.str(
 EMBEDDINGS_BATCH_SIZE = env.int("EMBEDDINGS_BATCH_SIZE", default=200)
 # Reports per Procrastinate subjob (task granularity, not HTTP granularity).
 EMBEDDINGS_SUBJOB_SIZE = env.int("EMBEDDINGS_SUBJOB_SIZE", default=1000)
+# Subjobs deferred per multi-row Procrastinate insert. Backfills also page through pending
+# rows this many subjobs at a time, so enqueue memory is bounded by
+# EMBEDDINGS_SUBJOB_SIZE * EMBEDDINGS_DEFER_BATCH_SUBJOBS report ids, not the backlog.
+EMBEDDINGS_DEFER_BATCH_SUBJOBS = env.int("EMBEDDINGS_DEFER_BATCH_SUBJOBS", default=100)
 # Procrastinate task priorities for the `embeddings` queue. Live writes
 # (write-path handler + FTS chain) get LIVE; operator-initiated backfill
 # (`embed_pending`, admin action) gets BACKFILL. A million-row backfill
 # parks itself ahead of every later live write without this split.
 EMBEDDINGS_LIVE_PRIORITY = 1
 EMBEDDINGS_BACKFILL_PRIORITY = 0
+# Local (in-process, CPU) embedding backend, selected with EMBEDDINGS_MODEL=local:<directory>.
+# Threads per ONNX Runtime session (0 lets ONNX Runtime use every core; set it below the
+# container's CPU quota when web and embeddings workers share a node), texts per
+# inference call, and the token length texts are truncated to.
+EMBEDDINGS_LOCAL_THREADS = env.int("EMBEDDINGS_LOCAL_THREADS", default=0)
+EMBEDDINGS_LOCAL_BATCH_SIZE = env.int("EMBEDDINGS_LOCAL_BATCH_SIZE", default=16)
+EMBEDDINGS_LOCAL_MAX_TOKENS = env.int("EMBEDDINGS_LOCAL_MAX_TOKENS", default=512)
 # How long a search query's embedding stays in the Django cache. Paginating re-runs the
 # whole search per page, so this is what keeps page 2..n from re-calling the embedding
 # service for the same query text. Vectors are tiny (~8 KB) and deterministic per model
@@ -518,6 +577,22 @@ EMBEDDINGS_RATE_LIMIT_HEADER_CEILING_SECONDS = 1800.0
 # user is waiting and falling back to FTS-only beats hanging on a closed gate.
 EMBEDDINGS_RATE_LIMIT_MAX_WAIT_SECONDS = 300.0
 EMBEDDINGS_RATE_LIMIT_QUERY_MAX_WAIT_SECONDS = 10.0
+# Circuit breaker around query embedding in interactive search (per process). Over the
+# last WINDOW seconds, once at least MIN_CALLS query embeddings were attempted, an error
+# rate >= ERROR_RATE or a p95 latency >= SLOW_SECONDS opens it: searches then skip the
+# embedding service and run FTS-only, with no wait, for OPEN_SECONDS. After that one
+# probe request is let through; it closes the breaker again if it succeeds in time.
+EMBEDDINGS_QUERY_BREAKER_WINDOW_SECONDS = env.float(
+    "EMBEDDINGS_QUERY_BREAKER_WINDOW_SECONDS", default=60.0
+)
+EMBEDDINGS_QUERY_BREAKER_MIN_CALLS = env.int("EMBEDDINGS_QUERY_BREAKER_MIN_CALLS", default=5)
+EMBEDDINGS_QUERY_BREAKER_ERROR_RATE = env.float("EMBEDDINGS_QUERY_BREAKER_ERROR_RATE", default=0.5)
+EMBEDDINGS_QUERY_BREAKER_SLOW_SECONDS = env.float(
+    "EMBEDDINGS_QUERY_BREAKER_SLOW_SECONDS", default=3.0
+)
+EMBEDDINGS_QUERY_BREAKER_OPEN_SECONDS = env.float(
+    "EMBEDDINGS_QUERY_BREAKER_OPEN_SECONDS", default=30.0
+)
 # Local retries of transient (non-429) embedding call failures, mirroring the
 # LLM_TRANSIENT_RETRY_* knobs above: N retries after the first call, with
 # exponential backoff base * 2**attempt (0.5s, 1s).
@@ -677,19 +752,48 @@ EXTRACTION_URGENT_PRIORITY = 3
 # The number of extraction instances that are processed within one extraction task.
 EXTRACTION_TASK_BATCH_SIZE = 100
 
-# The number of parallel requests the LLM can handle. This limit is enforced within each task. When
-# having multiple workers that uses the LLM, the total number of parallel requests is
-# EXTRACTION_LLM_CONCURRENCY_LIMIT * number of workers. Keep this within whatever concurrency the
-# configured provider allows, otherwise the surplus requests just get rate limited.
-EXTRACTION_LLM_CONCURRENCY_LIMIT = 6
+# The number of extraction instances created per transaction while preparing a job. Tasks
+# and instances are bulk-inserted in chunks of this size (rounded to whole tasks), so a
+# large job neither holds one long transaction nor issues a query per report.
+EXTRACTION_PREPARATION_CHUNK_SIZE = 5000
+
+# Extraction results are written with one bulk update per this many answered instances
+# (and once more when the task ends) instead of one save per instance.
+EXTRACTION_RESULT_FLUSH_SIZE = 25
+
+# Work stealing: every extraction task keeps claiming small leases of the job's unprocessed
+# instances (SELECT ... FOR UPDATE SKIP LOCKED), its own first, until none are left. Tasks
+# that finish early help with the rest, so a few slow LLM calls no longer hold up a whole
+# batch. A task renews its leases every third of LEASE_SECONDS while their calls are queued
+# or running, so only the leases of a crashed worker run out and are claimed again; an
+# instance is claimed at most MAX_ATTEMPTS times per run of the job. A task ends once its
+# own instances are answered or out of attempts, and fails if any are out of attempts.
+EXTRACTION_WORK_STEALING = env.bool("EXTRACTION_WORK_STEALING", default=False)
+EXTRACTION_CLAIM_SIZE = 10
+EXTRACTION_CLAIM_LEASE_SECONDS = 900
+EXTRACTION_CLAIM_MAX_ATTEMPTS = 2
+
+# Preview runs in the extraction wizard: this many reports, sampled across the
+# (modality, language, year) strata of the search results, are answered at this priority
+# in the llm queue (above all job and task priorities) so the results come back while the
+# user waits.
+EXTRACTION_PREVIEW_SAMPLE_SIZE = 20
+EXTRACTION_PREVIEW_PRIORITY = 5
 
 START_EXTRACTION_JOB_UNVERIFIED = False
 
+# Rows per row group of the Parquet/Arrow downloads of extraction results and subscription
+# inboxes (and per fetch of their server-side cursor). Memory stays bounded by one group.
+COLUMNAR_EXPORT_ROW_GROUP_SIZE = 10_000
+
 # Subscription
 SUBSCRIPTION_DEFAULT_PRIORITY = 3
 SUBSCRIPTION_URGENT_PRIORITY = 4
 SUBSCRIPTION_CRON = "0 * * * *"  # Refresh subscriptions at the top of every hour
 SUBSCRIPTION_REFRESH_TASK_BATCH_SIZE = 100
+# Accepted reports are added to the inbox with one bulk insert per this many items (and
+# once more when the task ends).
+SUBSCRIPTION_RESULT_FLUSH_SIZE = 25
 
 # Labeling (radis.labels)
 # Generic prompt: label-specific text rides in each schema field's description; only $report
@@ -725,20 +829,79 @@ Radiology Report:
 $report
 """
 
+# Gate prompt for several reports per call (LABELING_MULTI_REPORT_GATE). $reports is
+# substituted with the reports, each headed "Report <n>:" to match the schema's report_<n>.
+_DEFAULT_MULTI_REPORT_GATE_SYSTEM_PROMPT = """
+You are an AI medical assistant. Below are several numbered radiology reports. The provided
+schema has one field per report (report_1 for "Report 1" and so on), and within it one field
+per topic, each field's description stating the topic's screening question. For every report
+and every topic, answer whether that report contains content relevant to the topic,
+responding with exactly one of:
+  - "YES" — the report clearly contains relevant content
+  - "NO"  — the report clearly does not
+
+Judge each report on its own text only. Return answers in JSON format matching the provided
+schema.
+
+$reports
+"""
+
 LABELING_SYSTEM_PROMPT = env.str("LABELING_SYSTEM_PROMPT", default=_DEFAULT_LABELING_SYSTEM_PROMPT)
 LABELING_GATE_SYSTEM_PROMPT = env.str(
     "LABELING_GATE_SYSTEM_PROMPT", default=_DEFAULT_GATE_SYSTEM_PROMPT
 )
+LABELING_MULTI_REPORT_GATE_SYSTEM_PROMPT = env.str(
+    "LABELING_MULTI_REPORT_GATE_SYSTEM_PROMPT", default=_DEFAULT_MULTI_REPORT_GATE_SYSTEM_PROMPT
+)
 
 # Scan and manual backfill share one priority (only one LabelingJob runs at a time).
 LABELING_JOB_PRIORITY = env.int("LABELING_JOB_PRIORITY", default=1)
+# Label new reports within seconds of ingest instead of at the next scan (see
+# radis.labels.live): they are queued and labeled in micro-batches of
+# LABELING_LIVE_BATCH_SIZE reports, or of whatever arrived within
+# LABELING_LIVE_BATCH_SECONDS of the first one. Their tasks share the llm queue with
+# backfills at LABELING_LIVE_PRIORITY, so a running backfill doesn't hold them up.
+LABELING_LIVE = env.bool("LABELING_LIVE", default=False)
+LABELING_LIVE_BATCH_SIZE = env.int("LABELING_LIVE_BATCH_SIZE", default=20)
+LABELING_LIVE_BATCH_SECONDS = env.int("LABELING_LIVE_BATCH_SECONDS", default=30)
+LABELING_LIVE_PRIORITY = env.int("LABELING_LIVE_PRIORITY", default=2)
 
 LABELING_TASK_BATCH_SIZE = env.int("LABELING_TASK_BATCH_SIZE", default=100)
+# Reports labeled side by side within one task. Their LLM calls still queue on the worker's
+# shared engine (LLM_ENGINE_CONCURRENCY); this only bounds the per-report flows in flight.
 LABELING_LLM_CONCURRENCY_LIMIT = env.int("LABELING_LLM_CONCURRENCY_LIMIT", default=2)
 LABELING_GATE_BATCH_SIZE = env.int("LABELING_GATE_BATCH_SIZE", default=10)
+# Gate answers and label results of a labeling task are written with one upsert per this
+# many labeled reports (and once more when the task ends).
+LABELING_RESULT_FLUSH_SIZE = 25
+# Screen several short reports per gate call instead of one call per report, so the
+# instructions are paid for once per call (see LabelingBatch.screen_gates). Reports are
+# packed up to an estimated LABELING_MULTI_REPORT_GATE_TOKEN_BUDGET tokens of report text and
+# LABELING_MULTI_REPORT_GATE_MAX_REPORTS reports per call; longer reports, and any call that
+# fails or comes back malformed, go through the per-report gate as before.
+LABELING_MULTI_REPORT_GATE = env.bool("LABELING_MULTI_REPORT_GATE", default=False)
+LABELING_MULTI_REPORT_GATE_TOKEN_BUDGET = env.int(
+    "LABELING_MULTI_REPORT_GATE_TOKEN_BUDGET", default=2000
+)
+LABELING_MULTI_REPORT_GATE_MAX_REPORTS = env.int(
+    "LABELING_MULTI_REPORT_GATE_MAX_REPORTS", default=8
+)
+# Answer clearly unrelated gates NO from the report's search embedding instead of the LLM
+# (see radis.labels.prescreen). Only groups calibrated with `calibrate_gate_prescreen` are
+# pre-screened; the calibration picks each group's threshold so that at least
+# LABELING_GATE_PRESCREEN_TARGET_RECALL of the LLM's past YES answers would still reach the
+# LLM. Needs EMBEDDINGS_MODEL.
+LABELING_GATE_PRESCREEN = env.bool("LABELING_GATE_PRESCREEN", default=False)
+LABELING_GATE_PRESCREEN_TARGET_RECALL = env.float(
+    "LABELING_GATE_PRESCREEN_TARGET_RECALL", default=0.99
+)
 
 # Cron schedule for the periodic incremental scan (default: daily at 2 AM).
 LABELING_SCAN_CRON = env.str("LABELING_SCAN_CRON", default="0 2 * * *")
 
+# Cron schedule for folding the label and gate count deltas written by the database triggers
+# into one row per label or group and value (see radis.labels.counts).
+LABELING_COUNTS_COMPACT_CRON = env.str("LABELING_COUNTS_COMPACT_CRON", default="*/10 * * * *")
+
 # The priority for stalled jobs that are retried.
 STALLED_JOBS_RETRY_PRIORITY = 10
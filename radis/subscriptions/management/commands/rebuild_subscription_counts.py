@@ -0,0 +1,31 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from radis.subscriptions.models import SubscribedItem, Subscription
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount the inbox counters of every subscription from its items. Only needed if "
+        "the counters drifted."
+    )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        subscriptions = Subscription._meta.db_table
+        items = SubscribedItem._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                UPDATE {subscriptions} s
+                SET num_reports = (SELECT count(*) FROM {items} i WHERE i.subscription_id = s.id),
+                    num_new_reports = (
+                        SELECT count(*) FROM {items} i
+                        WHERE i.subscription_id = s.id
+                            AND (s.last_viewed_at IS NULL OR i.created_at > s.last_viewed_at)
+                    )
+                """
+            )
+            updated = cursor.rowcount
+        self.stdout.write(f"Recounted the inbox counters of {updated} subscription(s).")
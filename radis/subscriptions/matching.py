@@ -0,0 +1,174 @@
+"""Matching of new reports against all subscriptions in one pass.
+
+Every launcher tick used to run a filter query per subscription over the reports
+updated since that subscription's last refresh, so with many subscriptions the same new
+reports were scanned over and over. Instead, the predicates of all subscriptions (group,
+patient ID, language, modalities, patient sex and age range, study description) are
+compiled into a `SubscriptionIndex` keyed by group and patient ID, the reports updated
+since the oldest last refresh are read once in chunks, and each report is checked only
+against the subscriptions of its groups.
+"""
+
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from datetime import datetime
+from itertools import batched
+from typing import NamedTuple
+
+from radis.reports.models import Report
+
+from .models import Subscription
+
+# Reports read and matched per chunk.
+_MATCH_CHUNK_SIZE = 1000
+
+
+class ReportFacts(NamedTuple):
+    """What the subscription predicates look at of a report."""
+
+    id: int
+    updated_at: datetime
+    group_ids: frozenset[int]
+    patient_id: str
+    language_code: str
+    modality_codes: frozenset[str]
+    patient_sex: str
+    patient_age: int | None
+    study_description: str  # lowercased
+
+
+class SubscriptionPredicate(NamedTuple):
+    """The report filters of a subscription, the same ones its search would apply."""
+
+    subscription_id: int
+    last_refreshed: datetime
+    group_id: int
+    patient_id: str
+    language_code: str
+    modality_codes: frozenset[str]
+    patient_sex: str
+    age_from: int | None
+    age_till: int | None
+    study_description: str  # lowercased
+
+    @classmethod
+    def compile(cls, subscription: Subscription) -> "SubscriptionPredicate":
+        return cls(
+            subscription_id=subscription.pk,
+            last_refreshed=subscription.last_refreshed,
+            group_id=subscription.group_id,  # type: ignore[attr-defined]
+            patient_id=subscription.patient_id,
+            language_code=subscription.language.code if subscription.language else "",
+            modality_codes=frozenset(m.code for m in subscription.modalities.all()),
+            patient_sex=subscription.patient_sex,
+            age_from=subscription.age_from,
+            age_till=subscription.age_till,
+            study_description=subscription.study_description.lower(),
+        )
+
+    def matches(self, report: ReportFacts) -> bool:
+        # Group and patient ID are already matched by the index.
+        if report.updated_at < self.last_refreshed:
+            return False
+        if self.language_code and report.language_code != self.language_code:
+            return False
+        if self.modality_codes and self.modality_codes.isdisjoint(report.modality_codes):
+            return False
+        if self.patient_sex and report.patient_sex != self.patient_sex:
+            return False
+        if self.age_from is not None and (
+            report.patient_age is None or report.patient_age < self.age_from
+        ):
+            return False
+        if self.age_till is not None and (
+            report.patient_age is None or report.patient_age > self.age_till
+        ):
+            return False
+        if self.study_description and self.study_description not in report.study_description:
+            return False
+        return True
+
+
+class SubscriptionIndex:
+    """Subscription predicates by group, and within a group by patient ID ("" for the
+    subscriptions of any patient)."""
+
+    def __init__(self, predicates: Iterable[SubscriptionPredicate]) -> None:
+        self._by_group: dict[int, dict[str, list[SubscriptionPredicate]]] = defaultdict(
+            lambda: defaultdict(list)
+        )
+        self.since: datetime | None = None
+        for predicate in predicates:
+            self._by_group[predicate.group_id][predicate.patient_id].append(predicate)
+            if self.since is None or predicate.last_refreshed < self.since:
+                self.since = predicate.last_refreshed
+
+    def match(self, report: ReportFacts) -> Iterator[int]:
+        """The IDs of the subscriptions the report matches."""
+        for group_id in report.group_ids:
+            by_patient = self._by_group.get(group_id)
+            if by_patient is None:
+                continue
+            for patient_id in {"", report.patient_id}:
+                for predicate in by_patient.get(patient_id, ()):
+                    if predicate.matches(report):
+                        yield predicate.subscription_id
+
+
+def load_report_facts(report_ids: Iterable[int]) -> list[ReportFacts]:
+    report_ids = list(report_ids)
+    group_ids: dict[int, set[int]] = defaultdict(set)
+    for report_id, group_id in Report.groups.through.objects.filter(
+        report_id__in=report_ids
+    ).values_list("report_id", "group_id"):
+        group_ids[report_id].add(group_id)
+    modality_codes: dict[int, set[str]] = defaultdict(set)
+    for report_id, code in Report.modalities.through.objects.filter(
+        report_id__in=report_ids
+    ).values_list("report_id", "modality__code"):
+        modality_codes[report_id].add(code)
+
+    rows = Report.objects.filter(pk__in=report_ids).values(
+        "pk",
+        "updated_at",
+        "patient_id",
+        "language__code",
+        "patient_sex",
+        "patient_age",
+        "study_description",
+    )
+    return [
+        ReportFacts(
+            id=row["pk"],
+            updated_at=row["updated_at"],
+            group_ids=frozenset(group_ids[row["pk"]]),
+            patient_id=row["patient_id"],
+            language_code=row["language__code"],
+            modality_codes=frozenset(modality_codes[row["pk"]]),
+            patient_sex=row["patient_sex"],
+            patient_age=row["patient_age"],
+            study_description=row["study_description"].lower(),
+        )
+        for row in rows
+    ]
+
+
+def match_new_reports(subscriptions: Iterable[Subscription]) -> dict[int, list[int]]:
+    """Subscription ID -> IDs of the reports updated since its last refresh that it
+    matches, for the subscriptions with any."""
+    index = SubscriptionIndex(SubscriptionPredicate.compile(s) for s in subscriptions)
+    candidates: dict[int, list[int]] = defaultdict(list)
+    if index.since is None:
+        return candidates
+
+    report_ids = (
+        Report.objects.filter(updated_at__gte=index.since)
+        .order_by("pk")
+        .values_list("pk", flat=True)
+        .iterator(chunk_size=_MATCH_CHUNK_SIZE)
+    )
+    for chunk in batched(report_ids, _MATCH_CHUNK_SIZE):
+        for report in load_report_facts(chunk):
+            for subscription_id in index.match(report):
+                candidates[subscription_id].append(report.id)
+    return candidates
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("subscriptions", "0011_filter_questions_and_extraction_results"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="subscriptionjob",
+            name="bypass_llm_cache",
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("subscriptions", "0012_subscriptionjob_bypass_llm_cache"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="subscriptiontask",
+            name="shared_jobs",
+            field=models.ManyToManyField(
+                blank=True, related_name="shared_tasks", to="subscriptions.subscriptionjob"
+            ),
+        ),
+    ]
@@ -0,0 +1,85 @@
+from django.db import migrations, models
+
+# Statement-level triggers keep the inbox counters of a subscription in step with its
+# items: inserted items count as new, deleted ones are taken off both counters. The
+# counters are seeded from the current items. See Subscription.num_reports.
+
+CREATE_SQL = """
+    CREATE FUNCTION subscriptions_subscribeditem_count() RETURNS trigger LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            UPDATE subscriptions_subscription s
+            SET num_reports = s.num_reports + d.n, num_new_reports = s.num_new_reports + d.n
+            FROM (
+                SELECT subscription_id, count(*) AS n FROM new_rows GROUP BY subscription_id
+            ) d
+            WHERE s.id = d.subscription_id;
+        ELSE
+            UPDATE subscriptions_subscription s
+            SET num_reports = greatest(s.num_reports - d.n, 0),
+                num_new_reports = greatest(s.num_new_reports - d.new, 0)
+            FROM (
+                SELECT o.subscription_id, count(*) AS n,
+                    count(*) FILTER (
+                        WHERE p.last_viewed_at IS NULL OR o.created_at > p.last_viewed_at
+                    ) AS new
+                FROM old_rows o JOIN subscriptions_subscription p ON p.id = o.subscription_id
+                GROUP BY o.subscription_id
+            ) d
+            WHERE s.id = d.subscription_id;
+        END IF;
+        RETURN NULL;
+    END;
+    $$;
+
+    CREATE TRIGGER subscriptions_subscribeditem_count_insert
+        AFTER INSERT ON subscriptions_subscribeditem
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION subscriptions_subscribeditem_count();
+    CREATE TRIGGER subscriptions_subscribeditem_count_delete
+        AFTER DELETE ON subscriptions_subscribeditem
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION subscriptions_subscribeditem_count();
+"""
+
+DROP_SQL = """
+    DROP TRIGGER IF EXISTS subscriptions_subscribeditem_count_insert
+        ON subscriptions_subscribeditem;
+    DROP TRIGGER IF EXISTS subscriptions_subscribeditem_count_delete
+        ON subscriptions_subscribeditem;
+    DROP FUNCTION IF EXISTS subscriptions_subscribeditem_count();
+"""
+
+SEED_SQL = """
+    UPDATE subscriptions_subscription s
+    SET num_reports = (
+            SELECT count(*) FROM subscriptions_subscribeditem i WHERE i.subscription_id = s.id
+        ),
+        num_new_reports = (
+            SELECT count(*) FROM subscriptions_subscribeditem i
+            WHERE i.subscription_id = s.id
+                AND (s.last_viewed_at IS NULL OR i.created_at > s.last_viewed_at)
+        )
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("subscriptions", "0013_subscriptiontask_shared_jobs"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="subscription",
+            name="num_reports",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="subscription",
+            name="num_new_reports",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunSQL(sql=CREATE_SQL, reverse_sql=DROP_SQL),
+        migrations.RunSQL(sql=SEED_SQL, reverse_sql=migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("subscriptions", "0014_subscription_inbox_counts"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="subscriptiontask",
+            name="shared_jobs",
+        ),
+        migrations.AddField(
+            model_name="subscriptiontask",
+            name="peers",
+            field=models.ManyToManyField(
+                blank=True, related_name="+", to="subscriptions.subscription"
+            ),
+        ),
+        migrations.AddField(
+            model_name="subscriptiontask",
+            name="peer_lock",
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
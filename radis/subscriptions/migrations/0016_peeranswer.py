@@ -0,0 +1,48 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reports", "0014_report_updated_at_idx"),
+        ("subscriptions", "0015_subscriptiontask_peers"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="subscriptiontask",
+            name="peers",
+        ),
+        migrations.CreateModel(
+            name="PeerAnswer",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                    ),
+                ),
+                ("peer_lock", models.CharField(max_length=64)),
+                ("phase", models.CharField(max_length=16)),
+                ("answers", models.JSONField(default=dict)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "report",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="reports.report",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("peer_lock", "report", "phase"),
+                        name="unique_peer_answer_per_lock_report_phase",
+                    )
+                ],
+            },
+        ),
+    ]
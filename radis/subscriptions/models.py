@@ -23,6 +23,9 @@ class PatientSexFilter(models.TextChoices):
     FEMALE = "F", "Female"
 
 
+_COUNTER_FIELDS = ("num_reports", "num_new_reports")
+
+
 class Subscription(models.Model):
     name = models.CharField(max_length=100)
     owner_id: int
@@ -50,6 +53,13 @@ class Subscription(models.Model):
     last_refreshed = models.DateTimeField(auto_now_add=True)
     last_viewed_at = models.DateTimeField(null=True, blank=True)
 
+    # Inbox counters for the subscription list: all items, and those created since the
+    # owner last viewed the inbox. Maintained by database triggers on the items
+    # (migration 0014), reset by the inbox view, and recomputed by
+    # `./manage.py rebuild_subscription_counts`.
+    num_reports = models.PositiveIntegerField(default=0, editable=False)
+    num_new_reports = models.PositiveIntegerField(default=0, editable=False)
+
     filter_questions: models.QuerySet["FilterQuestion"]
     output_fields: models.QuerySet[OutputField]
     items: models.QuerySet["SubscribedItem"]
@@ -69,6 +79,16 @@ class Subscription(models.Model):
     def __str__(self):
         return f"Subscription {self.name} [{self.pk}]"
 
+    def save(self, *args, **kwargs) -> None:
+        # A full save must not write back counters read before the latest items arrived.
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in _COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
 
 class FilterQuestion(models.Model):
     class ExpectedAnswer(models.TextChoices):
@@ -123,6 +143,31 @@ class SubscribedItem(models.Model):
         return f"SubscribedItem of {self.subscription} [{self.pk}]"
 
 
+class PeerAnswer(models.Model):
+    """The LLM answers about a report for the peer tasks of a launch still to run.
+
+    Keyed by filter question or output field ID, so they don't depend on how the call
+    that produced them was composed.
+    """
+
+    peer_lock = models.CharField(max_length=64)
+    report = models.ForeignKey[Report](Report, on_delete=models.CASCADE, related_name="+")
+    phase = models.CharField(max_length=16)
+    answers = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["peer_lock", "report", "phase"],
+                name="unique_peer_answer_per_lock_report_phase",
+            )
+        ]
+
+    def __str__(self):
+        return f"PeerAnswer of {self.peer_lock} for report {self.report_id} [{self.pk}]"
+
+
 class SubscriptionJob(AnalysisJob):
     default_priority = settings.SUBSCRIPTION_DEFAULT_PRIORITY
     urgent_priority = settings.SUBSCRIPTION_URGENT_PRIORITY
@@ -163,6 +208,11 @@ class SubscriptionTask(AnalysisTask):
         SubscriptionJob, on_delete=models.CASCADE, related_name="tasks"
     )
     reports = models.ManyToManyField(Report, blank=True)
+    # Shared by the tasks of all subscriptions that matched exactly these reports in the
+    # same launch (the peer tasks). They run one after another under this lock, and each
+    # LLM call also asks the questions and fields of the peers still to run, whose tasks
+    # then find the answers as PeerAnswers (see SubscriptionTaskProcessor).
+    peer_lock = models.CharField(max_length=64, blank=True)
 
     def __str__(self) -> str:
         return f"SubscriptionTask of {self.job.subscription} [{self.pk}]"
@@ -171,6 +221,7 @@ class SubscriptionTask(AnalysisTask):
         queued_job_id = app.configure_task(
             "radis.subscriptions.tasks.process_subscription_task",
             allow_unknown=False,
+            lock=self.peer_lock or None,
             priority=self.job.urgent_priority if self.job.urgent else self.job.default_priority,
         ).defer(task_id=self.pk)
         self.queued_job_id = queued_job_id
@@ -1,160 +1,344 @@
 import logging
-from concurrent.futures import Future, ThreadPoolExecutor
-from string import Template
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from dataclasses import dataclass
 from typing import Any
 
-from adit_radis_shared.common.types import User
-from django import db
 from django.conf import settings
 
 from radis.core.processors import AnalysisTaskProcessor
-from radis.core.utils.llm_client import LLMClient
-from radis.extractions.utils.processor_utils import (
-    generate_output_fields_prompt,
-    generate_output_fields_schema,
-)
+from radis.core.utils.llm_engine import EngineLLMClient
+from radis.extractions.models import OutputField
+from radis.extractions.utils.processor_utils import ExtractionPlan, compile_extraction_plan
 from radis.reports.models import Report
 
 from .models import (
+    FilterQuestion,
+    PeerAnswer,
     SubscribedItem,
     Subscription,
+    SubscriptionJob,
     SubscriptionTask,
 )
 from .utils.processor_utils import (
-    generate_filter_questions_prompt,
-    generate_filter_questions_schema,
+    compile_filter_plan,
     get_filter_question_field_name,
     get_output_field_name,
+    namespaced_output_field,
 )
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class _Asked:
+    """A subscription whose filter questions and output fields a task's LLM calls ask."""
+
+    subscription: Subscription
+    active_group_id: int | None
+    filter_questions: list[FilterQuestion]
+    output_fields: list[OutputField]
+
+
 class SubscriptionTaskProcessor(AnalysisTaskProcessor):
     def __init__(self, task: SubscriptionTask) -> None:
         super().__init__(task)
-        self.client = LLMClient("subscriptions")
+        self.client = EngineLLMClient("subscriptions", use_cache=not task.job.bypass_llm_cache)
+        # The task's plans per phase and set of subscriptions asked; a task usually asks
+        # the same few sets for every report.
+        self._plans: dict[tuple[str | int, ...], ExtractionPlan] = {}
 
     def process_task(self, task: SubscriptionTask) -> None:
-        user: User = task.job.owner
-        active_group = user.active_group
-
-        futures: list[Future] = []
-        with ThreadPoolExecutor(max_workers=settings.EXTRACTION_LLM_CONCURRENCY_LIMIT) as executor:
-            try:
-                for report in task.reports.filter(groups=active_group):
-                    future = executor.submit(self.process_report, report, task)
-                    futures.append(future)
-
-                exceptions: list[Exception] = []
-                for future in futures:
-                    try:
-                        future.result()
-                    except Exception as e:
-                        logger.error("Error processing report in subscription task: %s", e)
-                        exceptions.append(e)
+        # Every report's filter call goes to the worker's LLM engine up front; a report
+        # that passes its filter queues its extraction call as soon as the answer is in.
+        # All database writes happen here, in the task's own thread.
+        #
+        # A task only fills its own subscription's inbox, but its calls also ask the
+        # questions and fields of the peers still to run (see SubscriptionTask.peer_lock),
+        # and it keeps all answers as PeerAnswers. A peer task takes what it needs from
+        # there and only calls the LLM for what is missing.
+        own = self._asked(task.job.subscription)
+        waiting = self._waiting_peers(task)
+        reports = list(task.reports.prefetch_related("groups"))
 
-                if exceptions:
-                    raise exceptions[0]
+        # A report can be re-selected when its updated_at is bumped again or when a
+        # partially failed task is retried; skip it (and the LLM cost) if it is already
+        # in the inbox. Peers are not asked about reports already in theirs.
+        subscribed = set(
+            SubscribedItem.objects.filter(
+                subscription__in=[own.subscription, *(a.subscription for a in waiting)],
+                report__in=reports,
+            ).values_list("subscription_id", "report_id")
+        )
+        # (report, phase) -> answers by filter question or output field ID
+        stored: dict[tuple[int, str], dict[str, Any]] = {}
+        if task.peer_lock:
+            for answer in PeerAnswer.objects.filter(peer_lock=task.peer_lock):
+                stored[(answer.report_id, answer.phase)] = answer.answers
 
-            finally:
-                db.close_old_connections()
+        # future -> (phase, report, asked subscriptions, own filter results)
+        pending: dict[Future, tuple[str, Report, list[_Asked], dict[str, bool]]] = {}
+        # Accepted reports and fresh answers wait here for the next bulk insert; see _save.
+        items: list[SubscribedItem] = []
+        fresh: dict[tuple[int, str], dict[str, Any]] = {}
 
-    def process_report(self, report: Report, task: SubscriptionTask) -> None:
-        # Runs in a worker thread; its connection must be closed in that same
-        # thread (the close in process_task only reaches the main thread).
-        try:
-            subscription: Subscription = task.job.subscription
+        def asks(asked: _Asked, report: Report) -> bool:
+            return (
+                asked.active_group_id in {group.pk for group in report.groups.all()}
+                and (
+                    asked.subscription.pk,
+                    report.pk,
+                )
+                not in subscribed
+            )
+
+        def remember(report: Report, phase: str, answers: dict[str, Any]) -> dict[str, Any]:
+            known = stored.setdefault((report.pk, phase), {})
+            known.update(answers)
+            if task.peer_lock:
+                fresh[(report.pk, phase)] = known
+            return known
+
+        def add_item(
+            report: Report, filter_results: dict[str, bool], extraction_results: dict[str, Any]
+        ) -> None:
+            items.append(self._build_item(task, report, filter_results, extraction_results))
+            if len(items) >= settings.SUBSCRIPTION_RESULT_FLUSH_SIZE:
+                self._save(task, items, fresh)
 
-            # A report can be re-selected when its updated_at is bumped again or
-            # when a partially failed task is retried; skip it (and the LLM
-            # cost) if it is already in the inbox.
-            if SubscribedItem.objects.filter(subscription=subscription, report=report).exists():
+        def filtered(report: Report, filter_answers: dict[str, Any]) -> None:
+            filter_results = self._evaluate_filter(report, own.filter_questions, filter_answers)
+            if filter_results is None:
                 logger.debug(
-                    "Report %s already subscribed for subscription %s - skipping",
-                    report.pk,
-                    subscription.pk,
+                    f"Report {report.pk} was rejected by subscription {own.subscription.pk}"
                 )
                 return
+            if not own.output_fields:
+                add_item(report, filter_results, {})
+                return
+            known = stored.get((report.pk, "extraction"), {})
+            if not _missing(own.output_fields, known):
+                add_item(report, filter_results, _answers(own.output_fields, known))
+                return
+            # Along with the fields of the waiting peers known to accept the report too.
+            extracting = [own] + [
+                a
+                for a in waiting
+                if asks(a, report)
+                and _missing(a.output_fields, known)
+                and not _missing(a.filter_questions, filter_answers)
+                and self._evaluate_filter(report, a.filter_questions, filter_answers, quiet=True)
+                is not None
+            ]
+            plan = self._extraction_plan(extracting)
+            future = self.client.submit(plan.render(report.body), plan.schema)
+            pending[future] = ("extraction", report, extracting, filter_results)
 
-            filter_results: dict[str, bool] = {}
-            is_accepted = True
+        exceptions: list[Exception] = []
+        try:
+            for report in reports:
+                if own.active_group_id not in {group.pk for group in report.groups.all()}:
+                    continue
+                if (own.subscription.pk, report.pk) in subscribed:
+                    logger.debug(
+                        "Report %s already subscribed for subscription %s - skipping",
+                        report.pk,
+                        own.subscription.pk,
+                    )
+                    continue
 
-            filter_questions = list(subscription.filter_questions.order_by("pk"))
+                # Subscriptions without filter questions accept every report.
+                known = stored.get((report.pk, "filter"), {})
+                if not _missing(own.filter_questions, known):
+                    filtered(report, known)
+                    continue
+                filtering = [own] + [
+                    a for a in waiting if asks(a, report) and _missing(a.filter_questions, known)
+                ]
+                plan = self._filter_plan(filtering)
+                future = self.client.submit(plan.render(report.body), plan.schema)
+                pending[future] = ("filter", report, filtering, {})
 
-            if filter_questions:
-                filter_prompt = Template(settings.SUBSCRIPTION_FILTER_PROMPT).substitute(
-                    {
-                        "report": report.body,
-                        "questions": generate_filter_questions_prompt(filter_questions),
-                    }
-                )
-                filter_schema = generate_filter_questions_schema(filter_questions)
-
-                # LLM/validation errors deliberately propagate: they fail the
-                # task (visible, retryable), and the retry skips reports that
-                # already produced a SubscribedItem. Swallowing them here would
-                # silently drop the report forever, because last_refreshed has
-                # already advanced past it.
-                filter_response = self.client.extract_data(filter_prompt, filter_schema)
-
-                for question in filter_questions:
-                    field_name = get_filter_question_field_name(question)
-                    answer = getattr(filter_response, field_name, None)
-                    if answer is None:
-                        logger.warning(
-                            "LLM returned None for question %s on report %s",
-                            question.pk,
-                            report.pk,
-                        )
-                        is_accepted = False
-                        break
+            # LLM/validation errors deliberately fail the task (visible, retryable), and
+            # the retry skips reports that already produced a SubscribedItem. Swallowing
+            # them would silently drop the report forever, because last_refreshed has
+            # already advanced past it.
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    phase, report, asked, filter_results = pending.pop(future)
+                    try:
+                        response = future.result()
+                    except Exception as e:
+                        logger.error("Error processing report in subscription task: %s", e)
+                        exceptions.append(e)
+                        continue
+
+                    if phase == "filter":
+                        answers = {
+                            str(question.pk): getattr(
+                                response, get_filter_question_field_name(question), None
+                            )
+                            for a in asked
+                            for question in a.filter_questions
+                        }
+                        filtered(report, remember(report, phase, answers))
                     else:
-                        answer_bool = bool(answer)
-                        filter_results[str(question.pk)] = answer_bool
-                        if answer_bool != question.expected_answer_bool:
-                            is_accepted = False
-                            break
-            else:
-                logger.debug(
-                    "Subscription %s has no filter questions; accepting report %s by default",
-                    subscription.pk,
-                    report.pk,
-                )
+                        # Output field names are namespaced when several subscriptions
+                        # share the call; see _compile_extraction_plan.
+                        namespaced = len(asked) > 1
+                        answers = {
+                            str(field.pk): getattr(
+                                response,
+                                get_output_field_name(
+                                    field, a.subscription if namespaced else None
+                                ),
+                                None,
+                            )
+                            for a in asked
+                            for field in a.output_fields
+                        }
+                        known = remember(report, phase, answers)
+                        add_item(report, filter_results, _answers(own.output_fields, known))
+        finally:
+            # Whatever ends the loops, every accepted report reaches the inbox, so a
+            # retry skips exactly those.
+            self._save(task, items, fresh)
 
-            if not is_accepted:
-                logger.debug(f"Report {report.pk} was rejected by subscription {subscription.pk}")
-                return
+        # The last peer task to run drops the answers of its launch.
+        if task.peer_lock and not self._waiting_peers(task):
+            PeerAnswer.objects.filter(peer_lock=task.peer_lock).delete()
 
-            extraction_results: dict[str, Any] = {}
-            output_fields = list(subscription.output_fields.order_by("pk"))
+        if exceptions:
+            raise exceptions[0]
 
-            if output_fields:
-                extraction_prompt = Template(settings.SUBSCRIPTION_EXTRACTION_PROMPT).substitute(
-                    {
-                        "report": report.body,
-                        "fields": generate_output_fields_prompt(output_fields),
-                    }
-                )
-                # SUBSCRIPTION_EXTRACTION_PROMPT instructs the model to answer
-                # null for information the report does not contain, so the
-                # schema must accept null values (keys stay required).
-                extraction_schema = generate_output_fields_schema(output_fields, nullable=True)
+    def _waiting_peers(self, task: SubscriptionTask) -> list[_Asked]:
+        if not task.peer_lock:
+            return []
+        peer_tasks = (
+            SubscriptionTask.objects.filter(
+                peer_lock=task.peer_lock, status=SubscriptionTask.Status.PENDING
+            )
+            .exclude(pk=task.pk)
+            .exclude(
+                job__status__in=[SubscriptionJob.Status.CANCELING, SubscriptionJob.Status.CANCELED]
+            )
+            .select_related("job__subscription__owner")
+            .order_by("pk")
+        )
+        return [self._asked(peer_task.job.subscription) for peer_task in peer_tasks]
 
-                extraction_response = self.client.extract_data(extraction_prompt, extraction_schema)
+    def _asked(self, subscription: Subscription) -> _Asked:
+        return _Asked(
+            subscription=subscription,
+            active_group_id=subscription.owner.active_group_id,  # type: ignore[attr-defined]
+            filter_questions=list(subscription.filter_questions.order_by("pk")),
+            output_fields=list(subscription.output_fields.order_by("pk")),
+        )
 
-                for field in output_fields:
-                    extraction_results[str(field.pk)] = getattr(
-                        extraction_response, get_output_field_name(field), None
+    def _filter_plan(self, asked: list[_Asked]) -> ExtractionPlan:
+        key = ("filter", *(a.subscription.pk for a in asked))
+        if key not in self._plans:
+            # Filter question field names are unique across subscriptions already.
+            questions = [q for a in asked for q in a.filter_questions]
+            self._plans[key] = compile_filter_plan(questions, settings.SUBSCRIPTION_FILTER_PROMPT)
+        return self._plans[key]
+
+    def _extraction_plan(self, asked: list[_Asked]) -> ExtractionPlan:
+        key = ("extraction", *(a.subscription.pk for a in asked))
+        if key not in self._plans:
+            self._plans[key] = self._compile_extraction_plan(asked)
+        return self._plans[key]
+
+    def _compile_extraction_plan(self, asked: list[_Asked]) -> ExtractionPlan:
+        # Output field names are only unique within a subscription, so they are namespaced
+        # when several subscriptions share the call.
+        if len(asked) == 1:
+            fields = asked[0].output_fields
+        else:
+            fields = [
+                namespaced_output_field(field, a.subscription)
+                for a in asked
+                for field in a.output_fields
+            ]
+        # SUBSCRIPTION_EXTRACTION_PROMPT instructs the model to answer null for
+        # information the report does not contain, so the schema must accept null
+        # values (keys stay required).
+        return compile_extraction_plan(
+            fields, settings.SUBSCRIPTION_EXTRACTION_PROMPT, nullable=True
+        )
+
+    def _evaluate_filter(
+        self,
+        report: Report,
+        filter_questions: list[FilterQuestion],
+        filter_answers: dict[str, Any],
+        quiet: bool = False,
+    ) -> dict[str, bool] | None:
+        """The per-question answers if the report passes every filter question, else None."""
+        filter_results: dict[str, bool] = {}
+        for question in filter_questions:
+            answer = filter_answers.get(str(question.pk))
+            if answer is None:
+                if not quiet:
+                    logger.warning(
+                        "LLM returned None for question %s on report %s",
+                        question.pk,
+                        report.pk,
                     )
+                return None
+            answer_bool = bool(answer)
+            filter_results[str(question.pk)] = answer_bool
+            if answer_bool != question.expected_answer_bool:
+                return None
+        return filter_results
 
-            SubscribedItem.objects.create(
-                subscription=task.job.subscription,
-                job=task.job,
-                report=report,
-                filter_results=filter_results or None,
-                extraction_results=extraction_results or None,
+    def _build_item(
+        self,
+        task: SubscriptionTask,
+        report: Report,
+        filter_results: dict[str, bool],
+        extraction_results: dict[str, Any],
+    ) -> SubscribedItem:
+        logger.debug(f"Report {report.pk} was accepted by subscription {task.job.subscription.pk}")
+        return SubscribedItem(
+            subscription=task.job.subscription,
+            job=task.job,
+            report=report,
+            filter_results=filter_results or None,
+            extraction_results=extraction_results or None,
+        )
+
+    def _save(
+        self,
+        task: SubscriptionTask,
+        items: list[SubscribedItem],
+        answers: dict[tuple[int, str], dict[str, Any]],
+    ) -> None:
+        if items:
+            # A conflict means a concurrent task already put the report in the inbox.
+            SubscribedItem.objects.bulk_create(items, ignore_conflicts=True)
+            items.clear()
+        if answers:
+            PeerAnswer.objects.bulk_create(
+                [
+                    PeerAnswer(
+                        peer_lock=task.peer_lock,
+                        report_id=report_id,
+                        phase=phase,
+                        answers=phase_answers,
+                    )
+                    for (report_id, phase), phase_answers in answers.items()
+                ],
+                update_conflicts=True,
+                unique_fields=["peer_lock", "report", "phase"],
+                update_fields=["answers"],
             )
-            logger.debug(f"Report {report.pk} was accepted by subscription {subscription.pk}")
-        finally:
-            db.connections.close_all()
+            answers.clear()
+
+
+def _missing(asked: list[FilterQuestion] | list[OutputField], answers: dict[str, Any]) -> bool:
+    return any(str(obj.pk) not in answers for obj in asked)
+
+
+def _answers(fields: list[OutputField], answers: dict[str, Any]) -> dict[str, Any]:
+    return {str(field.pk): answers.get(str(field.pk)) for field in fields}
@@ -1,23 +1,22 @@
 import logging
-from datetime import datetime
+from collections import defaultdict
+from datetime import datetime, timedelta
 from itertools import batched
 
 from django.conf import settings
-from django.core.exceptions import ImproperlyConfigured
 from django.db import transaction
 from django.db.models import Exists, OuterRef
 from django.utils import timezone
 from procrastinate.contrib.django import app
 
-from radis.reports.models import Report
-from radis.search.site import SearchFilters
-
-from . import site
-from .models import Subscription, SubscriptionJob, SubscriptionTask
+from .matching import match_new_reports
+from .models import PeerAnswer, Subscription, SubscriptionJob, SubscriptionTask
 from .processors import SubscriptionTaskProcessor
 
 logger = logging.getLogger(__name__)
 
+PEER_ANSWER_MAX_AGE = timedelta(days=1)
+
 
 @app.task(queue="llm")
 def process_subscription_task(task_id: int) -> None:
@@ -35,94 +34,78 @@ def process_subscription_job(job_id: int) -> None:
     job = SubscriptionJob.objects.get(id=job_id)
 
     logger.info("Start processing job %s", job)
-    assert job.status == SubscriptionJob.Status.PREPARING
-
-    try:
-        _build_subscription_job(job)
-    except Exception as err:
-        # Without this, the job would stay PREPARING forever and the launcher
-        # would skip the subscription on every future cron tick.
-        job.status = SubscriptionJob.Status.FAILURE
-        job.message = f"Failed to collect new reports: {err}"
-        job.queued_job_id = None
-        job.save()
-        raise
-
+    assert job.status == SubscriptionJob.Status.PENDING
 
-def _build_subscription_job(job: SubscriptionJob) -> None:
-
-    logger.debug("Collecting tasks for job %s", job)
-
-    # Capture the refresh timestamp before querying for new reports so that
-    # any reports arriving during task creation are picked up in the next cycle.
-    refresh_time = timezone.now()
-
-    language_code = ""
-    if job.subscription.language:
-        language_code = job.subscription.language.code
-
-    filters = SearchFilters(
-        group=job.subscription.group.pk,
-        modalities=list(job.subscription.modalities.values_list("code", flat=True)),
-        language=language_code,
-        study_description=job.subscription.study_description,
-        patient_sex=job.subscription.patient_sex,
-        patient_age_from=job.subscription.age_from,
-        patient_age_till=job.subscription.age_till,
-        updated_after=job.subscription.last_refreshed,
-    )
-
-    logger.debug("Searching new reports with filters for job %s", job)
-
-    if site.subscription_filter_provider is None:
-        logger.error("Subscription filter provider is not configured for job %s", job)
-        raise ImproperlyConfigured("Subscription filter provider is not configured.")
-    filter_provider = site.subscription_filter_provider
-    new_document_ids = filter_provider.filter(filters)
-
-    tasks_created = 0
-    for document_ids in batched(new_document_ids, settings.SUBSCRIPTION_REFRESH_TASK_BATCH_SIZE):
-        logger.debug("Creating SubscriptionTask for document IDs: %s", document_ids)
-        # Reports deleted since the filter-provider search are skipped instead
-        # of failing the whole job.
-        reports = list(Report.objects.filter(document_id__in=document_ids))
-        if not reports:
-            continue
-        task = SubscriptionTask.objects.create(job=job, status=SubscriptionTask.Status.PENDING)
-        task.reports.add(*reports)
-        tasks_created += 1
-
-    logger.debug("Starting SubscriptionTasks done.")
-
-    job.subscription.last_refreshed = refresh_time
-    # Don't write back the full object - the user may have edited the
-    # subscription while this refresh was running.
-    job.subscription.save(update_fields=["last_refreshed"])
-
-    if tasks_created == 0:
-        # A job with no tasks is never completed by task processing, so it
-        # would stay PENDING forever and the launcher would skip the
-        # subscription on every future tick. Complete it right away.
-        job.status = SubscriptionJob.Status.SUCCESS
-        job.message = "No new reports found."
-        job.queued_job_id = None
-        job.save()
-        logger.debug("No new reports for job %s - completed without tasks", job)
-        return
-
-    job.status = SubscriptionJob.Status.PENDING
-    job.queued_job_id = None
-    job.save()
-
-    # Important invariant:
-    # Do not enqueue tasks while the job is still PREPARING, otherwise a worker can pick them up
-    # and `AnalysisTaskProcessor.start()` will assert because it expects the job to be
-    # PENDING/IN_PROGRESS.
+    # The launcher creates a job together with its tasks (see _launch_subscription_jobs),
+    # so this only (re-)enqueues the pending tasks that are not queued, on launch as well
+    # as on resume or retry.
     tasks_to_enqueue = job.tasks.filter(status=SubscriptionTask.Status.PENDING)
     for task in tasks_to_enqueue:
         if not task.is_queued:
             task.delay()
 
+    SubscriptionJob.objects.filter(pk=job.pk).update(queued_job_id=None)
+
+
+def _launch_subscription_jobs(
+    subscriptions: list[Subscription], candidates: dict[int, list[int]], refresh_time: datetime
+) -> None:
+    """Create a job with its own tasks for each subscription with candidates.
+
+    Reports are batched by the set of subscriptions that matched them, and every job of
+    the set gets a task for each batch. These peer tasks run one after another and share
+    their LLM answers (see SubscriptionTask.peer_lock), so each report is sent about once
+    for all of them.
+    """
+    report_subscriptions: dict[int, list[int]] = defaultdict(list)
+    for subscription_id, report_ids in candidates.items():
+        for report_id in report_ids:
+            report_subscriptions[report_id].append(subscription_id)
+    reports_by_subscriptions: dict[tuple[int, ...], list[int]] = defaultdict(list)
+    for report_id, subscription_ids in report_subscriptions.items():
+        reports_by_subscriptions[tuple(sorted(subscription_ids))].append(report_id)
+
+    # Jobs, tasks and refresh timestamps commit together, so a crash in between neither
+    # loses the reports nor starts them twice.
+    with transaction.atomic():
+        jobs: dict[int, SubscriptionJob] = {}
+        for subscription in subscriptions:
+            if subscription.pk not in candidates:
+                continue
+            logger.debug(
+                "Creating SubscriptionJob with %d report(s) for Subscription %s of user %s",
+                len(candidates[subscription.pk]),
+                subscription.name,
+                subscription.owner,
+            )
+            jobs[subscription.pk] = SubscriptionJob.objects.create(
+                subscription=subscription,
+                status=SubscriptionJob.Status.PENDING,
+                owner=subscription.owner,
+                owner_id=subscription.owner_id,
+                send_finished_mail=subscription.send_finished_mail,
+            )
+
+        for subscription_ids, report_ids in reports_by_subscriptions.items():
+            for batch in batched(sorted(report_ids), settings.SUBSCRIPTION_REFRESH_TASK_BATCH_SIZE):
+                # Unique per batch, as a report is in one batch per launch only.
+                peer_lock = ""
+                if len(subscription_ids) > 1:
+                    peer_lock = f"subscription-peers-{refresh_time:%Y%m%d%H%M%S}-{batch[0]}"
+                for subscription_id in subscription_ids:
+                    task = SubscriptionTask.objects.create(
+                        job=jobs[subscription_id],
+                        status=SubscriptionTask.Status.PENDING,
+                        peer_lock=peer_lock,
+                    )
+                    task.reports.add(*batch)
+
+        # Don't write back the full objects - the users may have edited their
+        # subscriptions meanwhile.
+        Subscription.objects.filter(pk__in=jobs).update(last_refreshed=refresh_time)
+        for job in jobs.values():
+            transaction.on_commit(job.delay)
+
 
 @app.periodic(cron=settings.SUBSCRIPTION_CRON)
 @app.task()
@@ -134,39 +117,30 @@ def subscription_launcher(timestamp: int):
         SubscriptionJob.Status.IN_PROGRESS.value,
     ]
 
-    subscriptions = (
-        Subscription.objects.annotate(
-            has_active_job=Exists(
+    # Subscriptions with an active job are refreshed once it is done.
+    subscriptions = list(
+        Subscription.objects.exclude(
+            Exists(
                 SubscriptionJob.objects.filter(
                     subscription=OuterRef("pk"), status__in=active_statuses
                 )
             )
         )
-        .all()
-        .iterator(chunk_size=100)
+        .select_related("owner", "language")
+        .prefetch_related("modalities")
     )
 
-    for subscription in subscriptions:
-        # Skip if subscription already has an active job
-        if subscription.has_active_job:  # type: ignore[attr-defined]  # Exists() annotation
-            logger.debug(
-                "Skipping Subscription %s of user %s - active job already exists",
-                subscription.name,
-                subscription.owner,
-            )
-            continue
+    # Captured before matching, so reports arriving meanwhile are matched on the next tick.
+    refresh_time = timezone.now()
+    candidates = match_new_reports(subscriptions)
 
-        logger.debug(
-            "Creating SubscriptionJob for Subscription %s of user %s",
-            subscription.name,
-            subscription.owner,
-        )
-        job = SubscriptionJob.objects.create(
-            subscription=subscription,
-            status=SubscriptionJob.Status.PREPARING,
-            owner=subscription.owner,
-            owner_id=subscription.owner_id,
-            send_finished_mail=subscription.send_finished_mail,
-        )
-        job.save()
-        transaction.on_commit(job.delay)
+    _launch_subscription_jobs(subscriptions, candidates, refresh_time)
+
+    # The last peer task of a launch removes its answers; these are left over by peer
+    # tasks that failed or were canceled.
+    PeerAnswer.objects.filter(created_at__lt=refresh_time - PEER_ANSWER_MAX_AGE).delete()
+
+    # No job for the subscriptions without new reports, just the refresh.
+    Subscription.objects.filter(
+        pk__in=[s.pk for s in subscriptions if s.pk not in candidates]
+    ).update(last_refreshed=refresh_time)
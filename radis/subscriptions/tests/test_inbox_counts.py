@@ -0,0 +1,85 @@
+from datetime import timedelta
+
+import pytest
+from adit_radis_shared.accounts.factories import UserFactory
+from django.core.management import call_command
+from django.test import Client
+from django.utils import timezone
+
+from radis.reports.factories import ReportFactory
+from radis.subscriptions.factories import SubscribedItemFactory, SubscriptionFactory
+from radis.subscriptions.models import SubscribedItem, Subscription
+
+
+def _counts(subscription: Subscription) -> tuple[int, int]:
+    subscription.refresh_from_db()
+    return subscription.num_reports, subscription.num_new_reports
+
+
+@pytest.mark.django_db
+def test_items_are_counted_as_they_are_created_and_deleted():
+    subscription = SubscriptionFactory.create()
+    other = SubscriptionFactory.create()
+    items = SubscribedItem.objects.bulk_create(
+        [SubscribedItem(subscription=subscription, report=ReportFactory.create()) for _ in range(3)]
+        + [SubscribedItem(subscription=other, report=ReportFactory.create())]
+    )
+    assert _counts(subscription) == (3, 3)
+    assert _counts(other) == (1, 1)
+
+    SubscribedItem.objects.filter(pk=items[0].pk).delete()
+
+    assert _counts(subscription) == (2, 2)
+
+
+@pytest.mark.django_db
+def test_viewing_the_inbox_resets_the_new_count(client: Client):
+    user = UserFactory.create(is_active=True)
+    subscription = SubscriptionFactory.create(owner=user)
+    SubscribedItemFactory.create_batch(2, subscription=subscription)
+
+    client.force_login(user)
+    client.get(f"/subscriptions/{subscription.pk}/inbox/")
+    assert _counts(subscription) == (2, 0)
+
+    SubscribedItemFactory.create(subscription=subscription)
+    assert _counts(subscription) == (3, 1)
+
+
+@pytest.mark.django_db
+def test_saving_a_stale_subscription_keeps_the_counters():
+    subscription = SubscriptionFactory.create()
+    stale = Subscription.objects.get(pk=subscription.pk)
+    SubscribedItemFactory.create(subscription=subscription)
+
+    stale.name = "Renamed"
+    stale.save()
+
+    assert _counts(subscription) == (1, 1)
+
+
+@pytest.mark.django_db
+def test_rebuild_recounts_the_counters():
+    subscription = SubscriptionFactory.create()
+    SubscribedItemFactory.create_batch(2, subscription=subscription)
+    Subscription.objects.filter(pk=subscription.pk).update(
+        num_reports=7, num_new_reports=7, last_viewed_at=timezone.now() + timedelta(minutes=1)
+    )
+
+    call_command("rebuild_subscription_counts")
+
+    assert _counts(subscription) == (2, 0)
+
+
+@pytest.mark.django_db
+def test_subscription_list_shows_the_counters(client: Client):
+    user = UserFactory.create(is_active=True)
+    subscription = SubscriptionFactory.create(owner=user)
+    SubscribedItemFactory.create_batch(2, subscription=subscription)
+
+    client.force_login(user)
+    response = client.get("/subscriptions/")
+
+    [listed] = response.context["object_list"]
+    assert (listed.num_reports, listed.num_new_reports) == (2, 2)
+    assert "2 new" in response.content.decode()
@@ -1,23 +1,24 @@
 """Tests for the subscriptions LLM accept/reject gate (processors.py).
 
-The gate (``SubscriptionTaskProcessor.process_report``) sends the report body
+The gate (``SubscriptionTaskProcessor.process_task``) sends the report body
 plus the subscription filter questions to the LLM, receives a per-question
 boolean result, and creates a ``SubscribedItem`` only if EVERY question is
 answered as expected.
 
-The LLM is mocked at the ``openai.OpenAI`` boundary with a fake that CAPTURES
+The LLM is mocked at the ``openai.AsyncOpenAI`` boundary with a fake that CAPTURES
 the prompt and the requested schema so we can assert the report text + questions
 reach the model.
 """
 
+import json
 from typing import Any
 from unittest.mock import MagicMock, patch
 
 import pytest
 from adit_radis_shared.accounts.factories import GroupFactory, UserFactory
 from adit_radis_shared.common.utils.testing_helpers import add_user_to_group
-from pydantic import BaseModel, create_model
 
+from radis.chats.utils.testing_helpers import response_format_fields
 from radis.reports.factories import ReportFactory
 from radis.subscriptions.factories import (
     FilterQuestionFactory,
@@ -40,26 +41,24 @@ class _Capture:
 
 
 def make_capturing_openai_mock(answers: dict[str, bool]) -> tuple[MagicMock, _Capture]:
-    """Fake ``openai.OpenAI`` returning a parsed model built from ``answers``.
+    """Fake ``openai.AsyncOpenAI`` answering with ``answers``.
 
     ``answers`` maps filter question field names (``question_<pk>``) -> bool.
-    The fake records every ``parse`` call (model, messages, response_format).
+    The fake records every ``create`` call (model, messages, response_format).
     """
     capture = _Capture()
-    field_definitions: dict[str, Any] = {name: (bool, ...) for name in answers}
-    Result = create_model("Result", **field_definitions)
-    parsed = Result(**answers)
+    content = json.dumps(answers)
 
-    def fake_parse(
+    async def fake_create(
         *, model: str, messages: Any, response_format: Any, extra_body: Any = None
     ) -> MagicMock:
         capture.calls.append(
             {"model": model, "messages": list(messages), "response_format": response_format}
         )
-        return MagicMock(choices=[MagicMock(message=MagicMock(parsed=parsed))])
+        return MagicMock(choices=[MagicMock(message=MagicMock(content=content))])
 
     openai_mock = MagicMock()
-    openai_mock.beta.chat.completions.parse.side_effect = fake_parse
+    openai_mock.chat.completions.create.side_effect = fake_create
     return openai_mock, capture
 
 
@@ -146,7 +145,7 @@ def test_report_body_and_questions_reach_the_model():
     # Reject (all False) so this test isolates the prompt/schema plumbing from
     # the accept path (covered by test_subscribed_item_created_when_all_answers_true).
     openai_mock, capture = make_capturing_openai_mock({name: False for name in names})
-    with patch("openai.OpenAI", return_value=openai_mock):
+    with patch("openai.AsyncOpenAI", return_value=openai_mock):
         SubscriptionTaskProcessor(task).start()
 
     assert len(capture.calls) == 1
@@ -159,9 +158,7 @@ def test_report_body_and_questions_reach_the_model():
     assert "Is it larger than 5mm?" in sent
 
     # Requested schema carries one boolean field per question.
-    schema = call["response_format"]
-    assert issubclass(schema, BaseModel)
-    assert set(schema.model_fields) == set(names)
+    assert set(response_format_fields(call["response_format"])) == set(names)
 
 
 # --------------------------------------------------------------------------- #
@@ -176,7 +173,7 @@ def test_no_subscribed_item_when_any_answer_is_false():
 
     # One True, one False -> rejected (expected answer defaults to YES).
     openai_mock, _ = make_capturing_openai_mock({names[0]: True, names[1]: False})
-    with patch("openai.OpenAI", return_value=openai_mock):
+    with patch("openai.AsyncOpenAI", return_value=openai_mock):
         SubscriptionTaskProcessor(task).start()
 
     assert SubscribedItem.objects.count() == 0
@@ -193,7 +190,7 @@ def test_reports_not_in_active_group_are_skipped():
     names = _field_names(task)
 
     openai_mock, capture = make_capturing_openai_mock({names[0]: False})
-    with patch("openai.OpenAI", return_value=openai_mock):
+    with patch("openai.AsyncOpenAI", return_value=openai_mock):
         SubscriptionTaskProcessor(task).start()
 
     # The LLM was never consulted because no report matched the active group.
@@ -213,7 +210,7 @@ def test_subscribed_item_created_when_all_answers_true():
     names = _field_names(task)
 
     openai_mock, _ = make_capturing_openai_mock({name: True for name in names})
-    with patch("openai.OpenAI", return_value=openai_mock):
+    with patch("openai.AsyncOpenAI", return_value=openai_mock):
         SubscriptionTaskProcessor(task).start()
 
     item = SubscribedItem.objects.get()
@@ -233,7 +230,7 @@ def test_accept_path_succeeds_and_creates_item():
     names = _field_names(task)
 
     openai_mock, _ = make_capturing_openai_mock({names[0]: True})
-    with patch("openai.OpenAI", return_value=openai_mock):
+    with patch("openai.AsyncOpenAI", return_value=openai_mock):
         SubscriptionTaskProcessor(task).start()
 
     task.refresh_from_db()
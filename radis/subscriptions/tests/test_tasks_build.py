@@ -1,138 +1,195 @@
 """Tests for subscriptions task orchestration (tasks.py):
 
-- process_subscription_job: batching into SubscriptionTasks, report wiring,
-  status transitions, last_refreshed update, and the missing-provider error
-  branch.
-- subscription_launcher: one PREPARING job per subscription, and no new job
-  while one is still active.
+- subscription_launcher: one pass over the new reports for all subscriptions, a
+  PENDING job with batched SubscriptionTasks only for subscriptions with new
+  reports, last_refreshed update, and no new job while one is still active.
+- process_subscription_job: (re-)enqueueing the job's pending tasks.
 
 The existing test_tasks.py already covers the "only enqueue after PENDING"
 invariant; these focus on the build/launch behaviour.
 """
 
+from datetime import timedelta
+
 import pytest
-from adit_radis_shared.accounts.factories import GroupFactory, UserFactory
-from django.core.exceptions import ImproperlyConfigured
+from adit_radis_shared.accounts.factories import GroupFactory
+from django.utils import timezone
 
 from radis.reports.factories import LanguageFactory, ReportFactory
-from radis.subscriptions import site as subscription_site
-from radis.subscriptions.factories import SubscriptionFactory, SubscriptionJobFactory
-from radis.subscriptions.models import SubscriptionJob, SubscriptionTask
-from radis.subscriptions.site import SubscriptionFilterProvider
+from radis.reports.models import Report
+from radis.subscriptions.factories import (
+    SubscriptionFactory,
+    SubscriptionJobFactory,
+    SubscriptionTaskFactory,
+)
+from radis.subscriptions.models import (
+    PeerAnswer,
+    Subscription,
+    SubscriptionJob,
+    SubscriptionTask,
+)
 from radis.subscriptions.tasks import process_subscription_job, subscription_launcher
 
 
-def _preparing_job() -> SubscriptionJob:
-    user = UserFactory.create(is_active=True)
-    group = GroupFactory.create()
-    language = LanguageFactory.create(code="en")
-    subscription = SubscriptionFactory.create(owner=user, group=group, language=language)
-    job = SubscriptionJobFactory.create(subscription=subscription, owner=user)
-    job.status = SubscriptionJob.Status.PREPARING
-    job.save()
-    return job
+def _any_report_subscription(**kwargs) -> Subscription:
+    defaults = dict(
+        patient_id="",
+        language=None,
+        study_description="",
+        patient_sex="",
+        age_from=None,
+        age_till=None,
+    )
+    return SubscriptionFactory.create(**(defaults | kwargs))
 
 
-@pytest.mark.django_db
-def test_new_reports_are_batched_into_tasks(monkeypatch, settings):
-    settings.SUBSCRIPTION_REFRESH_TASK_BATCH_SIZE = 2
-    job = _preparing_job()
+def _report_in(group, **kwargs):
+    report = ReportFactory.create(**kwargs)
+    report.groups.add(group)
+    return report
 
-    doc_ids = ["S-1", "S-2", "S-3"]
-    for doc_id in doc_ids:
-        ReportFactory.create(document_id=doc_id)
 
-    used = {"filter": 0}
+def _matched(subscription: Subscription) -> set[int]:
+    return set(
+        SubscriptionTask.objects.filter(job__subscription=subscription).values_list(
+            "reports", flat=True
+        )
+    )
 
-    def _filter(_filters):
-        used["filter"] += 1
-        return doc_ids
 
-    monkeypatch.setattr(
-        subscription_site,
-        "subscription_filter_provider",
-        SubscriptionFilterProvider(name="f", filter=_filter),
-    )
+@pytest.fixture
+def no_deferral(monkeypatch):
+    # The launcher schedules job.delay via transaction.on_commit; stub it out so
+    # no real Procrastinate deferral happens.
+    monkeypatch.setattr(SubscriptionJob, "delay", lambda self: None, raising=True)
     monkeypatch.setattr(SubscriptionTask, "delay", lambda self: None, raising=True)
 
-    process_subscription_job(int(job.pk))
 
-    assert used == {"filter": 1}
+@pytest.mark.django_db
+def test_new_reports_are_batched_into_tasks(no_deferral, settings):
+    settings.SUBSCRIPTION_REFRESH_TASK_BATCH_SIZE = 2
+    subscription = _any_report_subscription()
+    reports = [_report_in(subscription.group) for _ in range(3)]
+
+    subscription_launcher(0)
 
+    job = subscription.jobs.get()
+    assert job.status == SubscriptionJob.Status.PENDING
+    assert job.owner_id == subscription.owner_id
     tasks = list(job.tasks.all())
     assert len(tasks) == 2  # ceil(3 / 2)
-    total_reports = sum(t.reports.count() for t in tasks)
-    assert total_reports == 3
-
-    job.refresh_from_db()
-    assert job.status == SubscriptionJob.Status.PENDING
+    assert _matched(subscription) == {r.pk for r in reports}
 
 
 @pytest.mark.django_db
-def test_last_refreshed_is_advanced(monkeypatch):
-    job = _preparing_job()
-    before = job.subscription.last_refreshed
-
-    monkeypatch.setattr(
-        subscription_site,
-        "subscription_filter_provider",
-        SubscriptionFilterProvider(name="f", filter=lambda _f: []),
-    )
-    monkeypatch.setattr(SubscriptionTask, "delay", lambda self: None, raising=True)
+def test_reports_are_matched_against_the_subscription_filters(no_deferral):
+    group = GroupFactory.create()
+    en = LanguageFactory.create(code="en")
+    de = LanguageFactory.create(code="de")
+    english_only = _any_report_subscription(group=group, language=en)
+    patient = _any_report_subscription(group=group, patient_id="P-1")
+    thorax = _any_report_subscription(group=group, study_description="thorax")
+    other_group = _any_report_subscription()
 
-    process_subscription_job(int(job.pk))
+    english = _report_in(group, language=en, patient_id="P-2", study_description="Knee")
+    german = _report_in(group, language=de, patient_id="P-1", study_description="CT THORAX")
+
+    subscription_launcher(0)
 
-    job.subscription.refresh_from_db()
-    assert job.subscription.last_refreshed > before
-    # No documents -> no tasks created.
-    assert job.tasks.count() == 0
-    # A task-less job must complete immediately; if it stayed PENDING the
-    # launcher would skip this subscription on every future refresh.
-    job.refresh_from_db()
-    assert job.status == SubscriptionJob.Status.SUCCESS
+    assert _matched(english_only) == {english.pk}
+    assert _matched(patient) == {german.pk}
+    assert _matched(thorax) == {german.pk}
+    assert not other_group.jobs.exists()
 
 
 @pytest.mark.django_db
-def test_missing_filter_provider_raises(monkeypatch):
-    job = _preparing_job()
-    monkeypatch.setattr(subscription_site, "subscription_filter_provider", None)
+def test_reports_matched_by_several_subscriptions_get_peer_tasks_in_every_job(
+    no_deferral, settings
+):
+    # Peer tasks share their answers without the LLM response cache.
+    settings.LLM_RESPONSE_CACHE_ENABLED = False
+    group = GroupFactory.create()
+    first = _any_report_subscription(group=group)
+    second = _any_report_subscription(group=group, study_description="thorax")
+    shared = _report_in(group, study_description="CT Thorax")
+    own = _report_in(group, study_description="CT Knee")
+
+    subscription_launcher(0)
 
-    with pytest.raises(ImproperlyConfigured):
-        process_subscription_job(int(job.pk))
+    first_task = first.jobs.get().tasks.get(reports=shared)
+    second_task = second.jobs.get().tasks.get()
+    assert list(first_task.reports.all()) == [shared]
+    assert list(second_task.reports.all()) == [shared]
+    assert first_task.peer_lock and first_task.peer_lock == second_task.peer_lock
+    own_task = first.jobs.get().tasks.get(reports=own)
+    assert own_task.peer_lock == ""
 
 
 @pytest.mark.django_db
-def test_subscription_launcher_creates_one_preparing_job_per_subscription(monkeypatch):
-    # The launcher schedules job.delay via transaction.on_commit; stub it out so
-    # no real Procrastinate deferral happens.
-    monkeypatch.setattr(SubscriptionJob, "delay", lambda self: None, raising=True)
+def test_only_reports_updated_since_the_last_refresh_are_matched(no_deferral):
+    subscription = _any_report_subscription()
+    old_report = _report_in(subscription.group)
+    Report.objects.filter(pk=old_report.pk).update(
+        updated_at=subscription.last_refreshed - timedelta(minutes=1)
+    )
+    new_report = _report_in(subscription.group)
+
+    subscription_launcher(0)
 
-    subs = [SubscriptionFactory.create() for _ in range(3)]
+    assert _matched(subscription) == {new_report.pk}
+
+
+@pytest.mark.django_db
+def test_subscriptions_without_new_reports_get_no_job_but_are_refreshed(no_deferral):
+    subscription = _any_report_subscription()
+    before = subscription.last_refreshed
 
-    assert SubscriptionJob.objects.count() == 0
     subscription_launcher(0)
 
-    jobs = SubscriptionJob.objects.all()
-    assert jobs.count() == 3
-    assert {j.subscription.pk for j in jobs} == {s.pk for s in subs}
-    assert all(j.status == SubscriptionJob.Status.PREPARING for j in jobs)
-    # Owner is copied from the subscription.
-    for job in jobs:
-        assert job.owner_id == job.subscription.owner_id
+    subscription.refresh_from_db()
+    assert subscription.last_refreshed > before
+    assert not subscription.jobs.exists()
 
 
 @pytest.mark.django_db
-def test_subscription_launcher_skips_subscription_with_active_job(monkeypatch):
-    monkeypatch.setattr(SubscriptionJob, "delay", lambda self: None, raising=True)
+def test_subscription_launcher_drops_peer_answers_left_over_by_earlier_launches(no_deferral):
+    report = ReportFactory.create()
+    left_over = PeerAnswer.objects.create(peer_lock="old", report=report, phase="filter")
+    PeerAnswer.objects.filter(pk=left_over.pk).update(created_at=timezone.now() - timedelta(days=2))
+    recent = PeerAnswer.objects.create(peer_lock="recent", report=report, phase="filter")
+
+    subscription_launcher(0)
 
-    subscription = SubscriptionFactory.create()
+    assert list(PeerAnswer.objects.all()) == [recent]
+
+
+@pytest.mark.django_db
+def test_subscription_launcher_skips_subscription_with_active_job(no_deferral):
+    subscription = _any_report_subscription()
     SubscriptionJobFactory.create(
         subscription=subscription,
         owner=subscription.owner,
         status=SubscriptionJob.Status.IN_PROGRESS,
     )
+    _report_in(subscription.group)
+    before = subscription.last_refreshed
 
     subscription_launcher(0)
 
-    # No second job while one is still active.
+    # No second job while one is still active, and its new reports wait for the next one.
     assert subscription.jobs.count() == 1
+    subscription.refresh_from_db()
+    assert subscription.last_refreshed == before
+
+
+@pytest.mark.django_db
+def test_process_subscription_job_enqueues_its_unqueued_pending_tasks(monkeypatch):
+    job = SubscriptionJobFactory.create(status=SubscriptionJob.Status.PENDING)
+    pending = SubscriptionTaskFactory.create(job=job, status=SubscriptionTask.Status.PENDING)
+    SubscriptionTaskFactory.create(job=job, status=SubscriptionTask.Status.SUCCESS)
+    delayed: list[int] = []
+    monkeypatch.setattr(SubscriptionTask, "delay", lambda self: delayed.append(self.pk))
+
+    process_subscription_job(int(job.pk))
+
+    assert delayed == [pending.pk]
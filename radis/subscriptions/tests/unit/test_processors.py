@@ -1,10 +1,16 @@
+import json
+from concurrent.futures import Future
 from typing import Any
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from pydantic import create_model
 
-from radis.chats.utils.testing_helpers import create_openai_client_mock
+from radis.chats.utils.testing_helpers import (
+    create_async_openai_structured_mock,
+    response_format_fields,
+    structured_completion,
+)
 from radis.subscriptions.models import SubscribedItem
 from radis.subscriptions.processors import SubscriptionTaskProcessor
 from radis.subscriptions.utils.processor_utils import (
@@ -14,6 +20,12 @@ from radis.subscriptions.utils.processor_utils import (
 from radis.subscriptions.utils.testing_helpers import create_subscription_task
 
 
+def _resolved(value: Any) -> Future:
+    future: Future = Future()
+    future.set_result(value)
+    return future
+
+
 @pytest.mark.django_db(transaction=True)
 def test_subscription_task_processor_filters_and_extracts():
     task, filter_question, output_field, report = create_subscription_task()
@@ -32,16 +44,11 @@ def test_subscription_task_processor_filters_and_extracts():
     filter_output = FilterOutput(**{filter_field_name: True})
     extraction_output = ExtractionOutput(**{extraction_field_name: "Pneumothorax status confirmed"})
 
-    filter_response = MagicMock(choices=[MagicMock(message=MagicMock(parsed=filter_output))])
-    extraction_response = MagicMock(
-        choices=[MagicMock(message=MagicMock(parsed=extraction_output))]
-    )
-
-    openai_mock = create_openai_client_mock(extraction_output)
-    openai_mock.beta.chat.completions.parse = MagicMock(
-        side_effect=[filter_response, extraction_response]
+    openai_mock = create_async_openai_structured_mock(extraction_output)
+    openai_mock.chat.completions.create = AsyncMock(
+        side_effect=[structured_completion(filter_output), structured_completion(extraction_output)]
     )
-    with patch("openai.OpenAI", return_value=openai_mock):
+    with patch("openai.AsyncOpenAI", return_value=openai_mock):
         SubscriptionTaskProcessor(task).start()
 
     subscribed_item = SubscribedItem.objects.get(subscription=task.job.subscription, report=report)
@@ -56,14 +63,14 @@ def test_subscription_task_processor_handles_llm_null_response():
     task, _, _, report = create_subscription_task()
 
     processor = SubscriptionTaskProcessor(task)
-    processor.client.extract_data = MagicMock(return_value=None)
+    processor.client.submit = MagicMock(return_value=_resolved(None))
 
     processor.start()
 
     assert not SubscribedItem.objects.filter(
         subscription=task.job.subscription, report=report
     ).exists()
-    processor.client.extract_data.assert_called_once()
+    processor.client.submit.assert_called_once()
 
 
 @pytest.mark.django_db(transaction=True)
@@ -75,14 +82,14 @@ def test_subscription_task_processor_with_no_expected_answer():
     setattr(filter_response, filter_field_name, None)
 
     processor = SubscriptionTaskProcessor(task)
-    processor.client.extract_data = MagicMock(return_value=filter_response)
+    processor.client.submit = MagicMock(return_value=_resolved(filter_response))
 
     processor.start()
 
     assert not SubscribedItem.objects.filter(
         subscription=task.job.subscription, report=report
     ).exists()
-    processor.client.extract_data.assert_called_once()
+    processor.client.submit.assert_called_once()
 
 
 @pytest.mark.django_db(transaction=True)
@@ -97,8 +104,8 @@ def test_subscription_task_processor_extraction_only():
     ExtractionOutput = create_model("ExtractionOnlyOutput", **extraction_field_definitions)
     extraction_output = ExtractionOutput(**{extraction_field_name: "Only extraction response"})
 
-    openai_mock = create_openai_client_mock(extraction_output)
-    with patch("openai.OpenAI", return_value=openai_mock):
+    openai_mock = create_async_openai_structured_mock(extraction_output)
+    with patch("openai.AsyncOpenAI", return_value=openai_mock):
         SubscriptionTaskProcessor(task).start()
 
     subscribed_item = SubscribedItem.objects.get(subscription=task.job.subscription, report=report)
@@ -117,8 +124,8 @@ def test_subscription_task_processor_filter_only():
     FilterOutput = create_model("FilterOnlyOutput", **filter_field_definitions)
     filter_output = FilterOutput(**{filter_field_name: True})
 
-    openai_mock = create_openai_client_mock(filter_output)
-    with patch("openai.OpenAI", return_value=openai_mock):
+    openai_mock = create_async_openai_structured_mock(filter_output)
+    with patch("openai.AsyncOpenAI", return_value=openai_mock):
         SubscriptionTaskProcessor(task).start()
 
     subscribed_item = SubscribedItem.objects.get(subscription=task.job.subscription, report=report)
@@ -141,8 +148,8 @@ def test_no_answer_expected_filter_accepts_negative_llm_answer():
     FilterOutput = create_model("NoExpectedOutput", **field_definitions)
     filter_output = FilterOutput(**{filter_field_name: False})
 
-    openai_mock = create_openai_client_mock(filter_output)
-    with patch("openai.OpenAI", return_value=openai_mock):
+    openai_mock = create_async_openai_structured_mock(filter_output)
+    with patch("openai.AsyncOpenAI", return_value=openai_mock):
         SubscriptionTaskProcessor(task).start()
 
     assert SubscribedItem.objects.filter(subscription=task.job.subscription, report=report).exists()
@@ -163,8 +170,8 @@ def test_no_answer_expected_filter_rejects_positive_llm_answer():
     FilterOutput = create_model("NoExpectedOutputPos", **field_definitions)
     filter_output = FilterOutput(**{filter_field_name: True})
 
-    openai_mock = create_openai_client_mock(filter_output)
-    with patch("openai.OpenAI", return_value=openai_mock):
+    openai_mock = create_async_openai_structured_mock(filter_output)
+    with patch("openai.AsyncOpenAI", return_value=openai_mock):
         SubscriptionTaskProcessor(task).start()
 
     assert not SubscribedItem.objects.filter(
@@ -181,12 +188,149 @@ def test_already_subscribed_report_is_skipped_without_llm_call():
     SubscribedItemFactory.create(subscription=task.job.subscription, job=task.job, report=report)
 
     processor = SubscriptionTaskProcessor(task)
-    processor.client.extract_data = MagicMock()
+    processor.client.submit = MagicMock()
 
     processor.start()
 
-    processor.client.extract_data.assert_not_called()
+    processor.client.submit.assert_not_called()
     assert (
         SubscribedItem.objects.filter(subscription=task.job.subscription, report=report).count()
         == 1
     )
+
+
+def _peer_task(task, subscription, **job_kwargs):
+    from radis.subscriptions.models import SubscriptionJob, SubscriptionTask
+
+    task.peer_lock = "subscription-peers-test"
+    task.save()
+    job = SubscriptionJob.objects.create(
+        subscription=subscription,
+        owner=subscription.owner,
+        status=SubscriptionJob.Status.PENDING,
+        **job_kwargs,
+    )
+    peer_task = SubscriptionTask.objects.create(
+        job=job, status=SubscriptionTask.Status.PENDING, peer_lock=task.peer_lock
+    )
+    peer_task.reports.set(task.reports.all())
+    return peer_task
+
+
+@pytest.mark.django_db(transaction=True)
+def test_peer_task_answers_the_waiting_peers_and_fills_only_its_own_inbox():
+    from radis.extractions.factories import OutputFieldFactory
+    from radis.subscriptions.factories import FilterQuestionFactory, SubscriptionFactory
+    from radis.subscriptions.models import PeerAnswer, SubscriptionJob
+
+    task, filter_question, output_field, report = create_subscription_task()
+    subscription = task.job.subscription
+    other = SubscriptionFactory.create(owner=subscription.owner, group=subscription.group)
+    other_question = FilterQuestionFactory.create(subscription=other)
+    # Same name as the other field; the shared call namespaces them.
+    other_field = OutputFieldFactory.create(subscription=other, job=None, name=output_field.name)
+    other_task = _peer_task(task, other)
+
+    calls: list[list[str]] = []
+
+    def submit(prompt: str, schema: Any) -> Future:
+        fields = list(schema.model_fields)
+        calls.append(fields)
+        answers = {
+            name: True if name.startswith("question_") else f"{name} found" for name in fields
+        }
+        return _resolved(MagicMock(**answers))
+
+    processor = SubscriptionTaskProcessor(task)
+    processor.client.submit = MagicMock(side_effect=submit)
+    processor.start()
+
+    own_name = get_output_field_name(output_field, subscription)
+    other_name = get_output_field_name(other_field, other)
+    assert calls == [
+        [
+            get_filter_question_field_name(filter_question),
+            get_filter_question_field_name(other_question),
+        ],
+        [own_name, other_name],
+    ]
+    item = SubscribedItem.objects.get(subscription=subscription, report=report)
+    assert item.job == task.job
+    assert item.extraction_results == {str(output_field.pk): f"{own_name} found"}
+    assert not SubscribedItem.objects.filter(subscription=other).exists()
+    other_task.job.refresh_from_db()
+    assert other_task.job.status == SubscriptionJob.Status.PENDING
+
+    processor = SubscriptionTaskProcessor(other_task)
+    processor.client.submit = MagicMock(side_effect=submit)
+    processor.start()
+
+    # The peer finds all its answers from the first task's calls.
+    processor.client.submit.assert_not_called()
+    other_item = SubscribedItem.objects.get(subscription=other, report=report)
+    assert other_item.job == other_task.job
+    assert other_item.filter_results == {str(other_question.pk): True}
+    assert other_item.extraction_results == {str(other_field.pk): f"{other_name} found"}
+    # The last peer task drops the answers.
+    assert not PeerAnswer.objects.exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_peer_tasks_make_one_llm_call_per_report_without_the_response_cache(settings):
+    from radis.reports.factories import ReportFactory
+    from radis.subscriptions.factories import FilterQuestionFactory, SubscriptionFactory
+
+    settings.LLM_RESPONSE_CACHE_ENABLED = False
+    task, _, output_field, report = create_subscription_task()
+    output_field.delete()
+    subscription = task.job.subscription
+    second_report = ReportFactory.create(language=report.language, body="No pneumothorax.")
+    second_report.groups.add(subscription.group)
+    task.reports.add(second_report)
+    other = SubscriptionFactory.create(owner=subscription.owner, group=subscription.group)
+    FilterQuestionFactory.create(subscription=other)
+    # Even a peer that bypasses the response cache takes the shared answers.
+    other_task = _peer_task(task, other, bypass_llm_cache=True)
+
+    async def create(*, response_format, **kwargs):
+        fields = response_format_fields(response_format)
+        content = json.dumps({name: True for name in fields})
+        message = MagicMock(content=content)
+        return MagicMock(choices=[MagicMock(message=message, finish_reason="stop")])
+
+    openai_mock = create_async_openai_structured_mock(None)
+    openai_mock.chat.completions.create = AsyncMock(side_effect=create)
+    with patch("openai.AsyncOpenAI", return_value=openai_mock):
+        SubscriptionTaskProcessor(task).start()
+        SubscriptionTaskProcessor(other_task).start()
+
+    assert openai_mock.chat.completions.create.await_count == 2
+    for peer in (subscription, other):
+        assert set(peer.items.values_list("report_id", flat=True)) == {
+            report.pk,
+            second_report.pk,
+        }
+
+
+@pytest.mark.django_db(transaction=True)
+def test_peer_task_skips_the_report_already_in_its_own_inbox():
+    from radis.subscriptions.factories import (
+        FilterQuestionFactory,
+        SubscribedItemFactory,
+        SubscriptionFactory,
+    )
+
+    task, _, _, report = create_subscription_task()
+    subscription = task.job.subscription
+    other = SubscriptionFactory.create(owner=subscription.owner, group=subscription.group)
+    FilterQuestionFactory.create(subscription=other)
+    _peer_task(task, other)
+    SubscribedItemFactory.create(subscription=subscription, job=task.job, report=report)
+
+    processor = SubscriptionTaskProcessor(task)
+    processor.client.submit = MagicMock()
+
+    processor.start()
+
+    processor.client.submit.assert_not_called()
+    assert not SubscribedItem.objects.filter(subscription=other).exists()
@@ -0,0 +1,50 @@
+"""Helpers for exporting subscription inbox items as typed columns (Parquet, Arrow IPC)."""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Sequence
+from typing import Any
+
+from django.conf import settings
+from django.db.models import QuerySet
+
+from radis.core.utils.columnar_export import Column
+from radis.extractions.utils.columnar_export import output_field_column
+from radis.subscriptions.models import SubscribedItem, Subscription
+
+
+def subscribed_item_columns(subscription: Subscription) -> list[Column]:
+    columns = [
+        Column("subscribed_item_id", "int"),
+        Column("report_id", "int"),
+        Column("patient_id", "string"),
+        Column("study_datetime", "timestamp"),
+        Column("study_description", "string"),
+        Column("modalities", "string", is_list=True),
+    ]
+    columns.extend(
+        output_field_column(field) for field in subscription.output_fields.order_by("pk")
+    )
+    return columns
+
+
+def iter_subscribed_item_values(
+    subscription: Subscription, queryset: QuerySet[SubscribedItem]
+) -> Iterable[Sequence[Any]]:
+    """Yield one row of raw values per item, matching `subscribed_item_columns`."""
+    field_pks: list[int] = list(
+        subscription.output_fields.order_by("pk").values_list("pk", flat=True)
+    )
+    items = queryset.select_related("report").prefetch_related("report__modalities")
+    for item in items.iterator(chunk_size=settings.COLUMNAR_EXPORT_ROW_GROUP_SIZE):
+        report = item.report
+        extraction_results: dict[str, Any] = item.extraction_results or {}
+        yield [
+            item.pk,
+            report.pk,
+            report.patient_id,
+            report.study_datetime,
+            report.study_description,
+            sorted(modality.code for modality in report.modalities.all()),
+            *(extraction_results.get(str(field_pk)) for field_pk in field_pks),
+        ]
@@ -1,13 +1,16 @@
 from __future__ import annotations
 
 from collections.abc import Iterable
+from functools import lru_cache
+from string import Template
 from typing import Any
 
 from pydantic import BaseModel, create_model
 
 from radis.extractions.models import OutputField
+from radis.extractions.utils.processor_utils import PLAN_CACHE_SIZE, ExtractionPlan
 
-from ..models import FilterQuestion
+from ..models import FilterQuestion, Subscription
 
 
 def get_filter_question_field_name(question: FilterQuestion) -> str:
@@ -15,13 +18,30 @@ def get_filter_question_field_name(question: FilterQuestion) -> str:
     return f"question_{question.pk}"
 
 
-def get_output_field_name(field: OutputField) -> str:
+def get_output_field_name(field: OutputField, namespace: Subscription | None = None) -> str:
     """Return the attribute name of the field in the Pydantic response schema.
 
+    Field names are only unique within a subscription, so in an extraction shared by
+    several subscriptions they are prefixed with their subscription (``namespace``).
+
     Note: the persisted ``SubscribedItem.extraction_results`` dict is keyed by
     ``str(field.pk)``, not by this name.
     """
-    return field.name
+    if namespace is None:
+        return field.name
+    return f"s{namespace.pk}_{field.name}"
+
+
+def namespaced_output_field(field: OutputField, subscription: Subscription) -> OutputField:
+    """An unsaved copy of `field` named for an extraction shared by several
+    subscriptions; see `get_output_field_name`."""
+    return OutputField(
+        name=get_output_field_name(field, subscription),
+        description=field.description,
+        output_type=field.output_type,
+        selection_options=field.selection_options,
+        is_array=field.is_array,
+    )
 
 
 def generate_filter_questions_schema(questions: Iterable[FilterQuestion]) -> type[BaseModel]:
@@ -42,3 +62,24 @@ def generate_filter_questions_prompt(questions: Iterable[FilterQuestion]) -> str
     for question in questions:
         prompt += f"{get_filter_question_field_name(question)}: {question.question}\n"
     return prompt
+
+
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def _compile_filter_plan(
+    signatures: tuple[tuple[int, str], ...], prompt_template: str
+) -> ExtractionPlan:
+    questions = [FilterQuestion(pk=pk, question=question) for pk, question in signatures]
+    return ExtractionPlan.build(
+        schema=generate_filter_questions_schema(questions),
+        template=Template(prompt_template),
+        substitutions={"questions": generate_filter_questions_prompt(questions)},
+    )
+
+
+def compile_filter_plan(
+    questions: Iterable[FilterQuestion], prompt_template: str
+) -> ExtractionPlan:
+    """The shared plan for asking `questions` with `prompt_template` (which takes
+    `$report` and `$questions`); see `compile_extraction_plan`."""
+    signatures = tuple((question.pk, question.question) for question in questions)
+    return _compile_filter_plan(signatures, prompt_template)
@@ -15,15 +15,19 @@ from django.contrib.auth.mixins import (
 )
 from django.contrib.messages.views import SuccessMessageMixin
 from django.db import IntegrityError, transaction
-from django.db.models import Count, F, Q, QuerySet
+from django.db.models import QuerySet
 from django.forms.models import BaseInlineFormSet
-from django.http import HttpResponse, HttpResponseRedirect, StreamingHttpResponse
+from django.http import Http404, HttpResponse, HttpResponseRedirect, StreamingHttpResponse
 from django.urls import reverse, reverse_lazy
 from django.utils import timezone
 from django.utils.text import slugify
 from django.views.generic import CreateView, DeleteView, DetailView, UpdateView
 from django_tables2 import SingleTableView
 
+from radis.core.utils.columnar_export import (
+    COLUMNAR_FORMATS,
+    stream_columnar_response,
+)
 from radis.core.utils.csv_export import stream_csv_response
 from radis.subscriptions.filters import SubscribedItemFilter, SubscriptionFilter
 from radis.subscriptions.tables import SubscriptionTable
@@ -34,6 +38,7 @@ from .forms import (
     SubscriptionForm,
 )
 from .models import SubscribedItem, Subscription
+from .utils.columnar_export import iter_subscribed_item_values, subscribed_item_columns
 from .utils.csv_export import iter_subscribed_item_rows
 
 logger = getLogger(__name__)
@@ -51,18 +56,8 @@ class SubscriptionListView(LoginRequiredMixin, SingleTableView):
         return context
 
     def get_queryset(self) -> QuerySet[Subscription]:
-        return (
-            Subscription.objects.filter(owner=self.request.user)
-            .annotate(num_reports=Count("items"))
-            .annotate(
-                num_new_reports=Count(
-                    "items",
-                    filter=Q(items__created_at__gt=F("last_viewed_at"))
-                    | Q(last_viewed_at__isnull=True),
-                )
-            )
-            .order_by("-created_at")
-        )
+        # num_reports and num_new_reports are counters kept on the subscription.
+        return Subscription.objects.filter(owner=self.request.user).order_by("-created_at")
 
 
 class SubscriptionDetailView(LoginRequiredMixin, DetailView):
@@ -231,7 +226,8 @@ class SubscriptionInboxView(
         if subscription.owner_id != self.request.user.pk:
             return
         subscription.last_viewed_at = timezone.now()
-        subscription.save(update_fields=["last_viewed_at"])
+        subscription.num_new_reports = 0
+        subscription.save(update_fields=["last_viewed_at", "num_new_reports"])
 
     def get_ordering(self) -> str:
         """Get the ordering from query parameters, defaulting to -created_at."""
@@ -298,7 +294,8 @@ class SubscriptionInboxView(
 
 
 class SubscriptionInboxDownloadView(LoginRequiredMixin, RelatedFilterMixin, DetailView):
-    """Stream subscription inbox items as a CSV download.
+    """Stream subscription inbox items as a CSV download (or with `?format=parquet` or
+    `?format=arrow` as a typed columnar one).
 
     Applies the same filters as SubscriptionInboxView (ignoring pagination),
     but additionally excludes items without extraction results — the download
@@ -362,9 +359,12 @@ class SubscriptionInboxDownloadView(LoginRequiredMixin, RelatedFilterMixin, Deta
         """Required by RelatedFilterMixin."""
         return self.get_related_queryset()
 
-    def get(self, _request: AuthenticatedHttpRequest, *_args, **_kwargs) -> StreamingHttpResponse:
-        """Stream the CSV file response."""
+    def get(self, request: AuthenticatedHttpRequest, *_args, **_kwargs) -> StreamingHttpResponse:
+        """Stream the file response."""
         subscription = cast(Subscription, self.get_object())
+        export_format = request.GET.get("format", "csv")
+        if export_format != "csv" and export_format not in COLUMNAR_FORMATS:
+            raise Http404(f"Export format {export_format!r} is not available.")
 
         # Manually instantiate the filterset to apply filters
         # (RelatedFilterMixin doesn't provide get_filtered_queryset())
@@ -376,13 +376,21 @@ class SubscriptionInboxDownloadView(LoginRequiredMixin, RelatedFilterMixin, Deta
         # Get the filtered queryset from filterset.qs
         filtered_items = filterset.qs
 
+        if export_format != "csv":
+            return stream_columnar_response(
+                subscribed_item_columns(subscription),
+                iter_subscribed_item_values(subscription, filtered_items),
+                export_format,
+                self._build_filename(subscription),
+                f"subscription {subscription.pk}",
+            )
         return stream_csv_response(
             iter_subscribed_item_rows(subscription, filtered_items),
-            self._build_filename(subscription),
+            f"{self._build_filename(subscription)}.csv",
             f"subscription {subscription.pk}",
         )
 
     def _build_filename(self, subscription: Subscription) -> str:
-        """Generate a descriptive CSV filename for the subscription."""
+        """Generate a descriptive filename (without extension) for the subscription."""
         slug = slugify(subscription.name) or "inbox"
-        return f"subscription_{subscription.pk}_{slug}.csv"
+        return f"subscription_{subscription.pk}_{slug}"